@@ -216,34 +216,39 @@ def send_feedback(message_id: str, query: str, is_positive: bool, thread_id: str
         st.error(f"发送反馈时出错: {str(e)}")
         return {"status": "error", "action": str(e)}
 
+def _get_graph_with_etag(url: str, params: Dict, cache_key: str) -> Dict:
+    """
+    带ETag条件请求的图谱获取：会话中已有缓存时发送If-None-Match，
+    服务端返回304说明图谱未变化，直接使用缓存结果
+    """
+    cached = st.session_state.cache.setdefault('knowledge_graphs', {}).get(cache_key)
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    
+    response = requests.get(url, params=params, headers=headers, timeout=30)
+    if response.status_code == 304 and cached:
+        return cached["data"]
+    
+    result = response.json()
+    st.session_state.cache['knowledge_graphs'][cache_key] = {
+        "etag": response.headers.get("ETag"),
+        "data": result
+    }
+    return result
+
 @monitor_performance(endpoint="get_knowledge_graph")
 def get_knowledge_graph(limit: int = 100, query: str = None) -> Dict:
     """获取知识图谱数据"""
     # 生成缓存键
     cache_key = f"kg:limit={limit}:query={query}"
     
-    # 检查缓存
-    if cache_key in st.session_state.cache.get('knowledge_graphs', {}):
-        return st.session_state.cache['knowledge_graphs'][cache_key]
+    params = {"limit": limit}
+    if query:
+        params["query"] = query
     
     try:
-        params = {"limit": limit}
-        if query:
-            params["query"] = query
-            
-        response = requests.get(
-            f"{API_URL}/knowledge_graph",
-            params=params,
-            timeout=30
-        )
-        result = response.json()
-        
-        # 缓存结果
-        if 'knowledge_graphs' not in st.session_state.cache:
-            st.session_state.cache['knowledge_graphs'] = {}
-        st.session_state.cache['knowledge_graphs'][cache_key] = result
-        
-        return result
+        return _get_graph_with_etag(f"{API_URL}/knowledge_graph", params, cache_key)
     except requests.exceptions.RequestException as e:
         st.error(f"获取知识图谱时出错: {str(e)}")
         return {"nodes": [], "links": []}
@@ -255,28 +260,12 @@ def get_knowledge_graph_from_message(message: str, query: str = None):
     message_hash = hashlib.md5(message.encode()).hexdigest()
     cache_key = f"kg_msg:{message_hash}:query={query}"
     
-    # 检查缓存
-    if cache_key in st.session_state.cache.get('knowledge_graphs', {}):
-        return st.session_state.cache['knowledge_graphs'][cache_key]
+    params = {"message": message}
+    if query:
+        params["query"] = query
     
     try:
-        params = {"message": message}
-        if query:
-            params["query"] = query
-            
-        response = requests.get(
-            f"{API_URL}/knowledge_graph_from_message",
-            params=params,
-            timeout=30
-        )
-        result = response.json()
-        
-        # 缓存结果
-        if 'knowledge_graphs' not in st.session_state.cache:
-            st.session_state.cache['knowledge_graphs'] = {}
-        st.session_state.cache['knowledge_graphs'][cache_key] = result
-        
-        return result
+        return _get_graph_with_etag(f"{API_URL}/knowledge_graph_from_message", params, cache_key)
     except requests.exceptions.RequestException as e:
         st.error(f"从响应提取知识图谱时出错: {str(e)}")
         return {"nodes": [], "links": []}
@@ -75,6 +75,8 @@ from graphrag_agent.cache_manager import (
     # 存储后端
     MemoryCacheBackend,
     DiskCacheBackend,
+    SegmentCacheBackend,
+    SharedCacheBackend,
     HybridCacheBackend,
     # 键策略
     SimpleCacheKeyStrategy,
@@ -148,6 +150,8 @@ __all__ = [
     'CacheManager',
     'MemoryCacheBackend',
     'DiskCacheBackend',
+    'SegmentCacheBackend',
+    'SharedCacheBackend',
     'HybridCacheBackend',
     'SimpleCacheKeyStrategy',
     'ContextAwareCacheKeyStrategy',
@@ -16,7 +16,7 @@ from graphrag_agent.cache_manager.manager import (
     HybridCacheBackend
 )
 from graphrag_agent.cache_manager.strategies.global_strategy import GlobalCacheKeyStrategy
-from graphrag_agent.config.settings import AGENT_SETTINGS
+from graphrag_agent.config.settings import AGENT_SETTINGS, CACHE_SETTINGS
 
 class BaseAgent(ABC):
     """Agent 基类，定义通用功能和接口"""
@@ -44,11 +44,7 @@ class BaseAgent(ABC):
         # 常规上下文感知缓存（会话内）
         self.cache_manager = CacheManager(
             key_strategy=ContextAwareCacheKeyStrategy(),
-            storage_backend=HybridCacheBackend(
-                cache_dir=cache_dir,
-                memory_max_size=200,
-                disk_max_size=2000
-            ) if not memory_only else None,
+            storage_backend=self._create_cache_backend(cache_dir, 200, 2000) if not memory_only else None,
             cache_dir=cache_dir,
             memory_only=memory_only
         )
@@ -56,11 +52,7 @@ class BaseAgent(ABC):
         # 全局缓存（跨会话）
         self.global_cache_manager = CacheManager(
             key_strategy=GlobalCacheKeyStrategy(),
-            storage_backend=HybridCacheBackend(
-                cache_dir=f"{cache_dir}/global",
-                memory_max_size=500,
-                disk_max_size=5000
-            ) if not memory_only else None,
+            storage_backend=self._create_cache_backend(f"{cache_dir}/global", 500, 5000) if not memory_only else None,
             cache_dir=f"{cache_dir}/global",
             memory_only=memory_only
         )
@@ -73,6 +65,17 @@ class BaseAgent(ABC):
         # 设置工作流图
         self._setup_graph()
     
+    def _create_cache_backend(self, cache_dir: str, memory_max_size: int, disk_max_size: int):
+        """创建Agent缓存后端，启用共享缓存时各worker共用同一份数据和质量标记"""
+        if CACHE_SETTINGS["shared_enabled"]:
+            return CacheManager.create_shared_backend(cache_dir, disk_max_size)
+        return HybridCacheBackend(
+            cache_dir=cache_dir,
+            memory_max_size=memory_max_size,
+            disk_max_size=disk_max_size,
+            disk_backend=CACHE_SETTINGS["disk_backend"]
+        )
+    
     @abstractmethod
     def _setup_tools(self) -> List:
         """设置工具，子类必须实现"""
@@ -268,19 +271,19 @@ class BaseAgent(ABC):
         return await asyncio.get_event_loop().run_in_executor(None, sync_generate)
     
     def check_fast_cache(self, query: str, thread_id: str = "default") -> str:
-        """专用的快速缓存检查方法，用于高性能路径"""
-        start_time = time.time()
+        """
+        专用的快速缓存检查方法，用于高性能路径
         
-        # 提取关键词，确保在缓存键中使用
-        keywords = self._extract_keywords(query)
-        cache_params = {
-            "thread_id": thread_id,
-            "low_level_keywords": keywords.get("low_level", []),
-            "high_level_keywords": keywords.get("high_level", [])
-        }
+        先按规范化查询查找，不调用LLM；只有主键未命中且缓存键策略使用关键词时，
+        才提取关键词（可能调用LLM）查找带关键词的键。
+        """
+        start_time = time.time()
         
-        # 使用缓存管理器的快速获取方法，传递相关参数
-        result = self.cache_manager.get_fast(query, **cache_params)
+        result = self.cache_manager.get_fast(
+            query,
+            keyword_provider=lambda: self._extract_keywords(query),
+            thread_id=thread_id
+        )
         duration = time.time() - start_time
         self._log_performance("fast_cache_check", {
             "duration": duration,
@@ -485,19 +488,24 @@ class BaseAgent(ABC):
         }
         
         inputs = {"messages": [HumanMessage(content=query)]}
-        try:
+        
+        def run_graph():
             for output in self.graph.stream(inputs, config=config):
                 pass
-                    
             chat_history = self.memory.get(config)["channel_values"]["messages"]
-            answer = chat_history[-1].content
-            
-            # 缓存处理结果 - 同时更新会话缓存和全局缓存
+            return chat_history[-1].content
+        
+        try:
+            # 多个用户同时提出相同问题时只执行一次工作流，其余请求等待结果
+            answer = self.global_cache_manager.get_or_compute(
+                safe_query,
+                run_graph,
+                cacheable=lambda result: bool(result) and len(result) > 10
+            )
+            
+            # 缓存处理结果 - 全局缓存已由get_or_compute写入，这里更新会话缓存
             if answer and len(answer) > 10:
-                # 更新会话缓存
                 self.cache_manager.set(safe_query, answer, thread_id=thread_id)
-                # 更新全局缓存
-                self.global_cache_manager.set(safe_query, answer)
             
             process_time = time.time() - process_start
             overall_time = time.time() - overall_start
@@ -652,16 +660,8 @@ class BaseAgent(ABC):
         """标记回答质量，用于缓存质量控制"""
         start_time = time.time()
         
-        # 提取关键词
-        keywords = self._extract_keywords(query)
-        cache_params = {
-            "thread_id": thread_id,
-            "low_level_keywords": keywords.get("low_level", []),
-            "high_level_keywords": keywords.get("high_level", [])
-        }
-        
-        # 调用缓存管理器的质量标记方法，传递相关参数
-        marked = self.cache_manager.mark_quality(query.strip(), is_positive, **cache_params)
+        # 缓存项按主键存储，并记录了全部键，标记质量不需要提取关键词
+        marked = self.cache_manager.mark_quality(query.strip(), is_positive, thread_id=thread_id)
         
         mark_time = time.time() - start_time
         self._log_performance("mark_quality", {
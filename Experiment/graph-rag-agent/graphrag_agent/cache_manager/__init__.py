@@ -9,6 +9,8 @@ from .backends import (
     CacheStorageBackend,
     MemoryCacheBackend,
     DiskCacheBackend,
+    SegmentCacheBackend,
+    SharedCacheBackend,
     HybridCacheBackend,
     ThreadSafeCacheBackend
 )
@@ -29,6 +31,8 @@ __all__ = [
     'CacheStorageBackend',
     'MemoryCacheBackend',
     'DiskCacheBackend',
+    'SegmentCacheBackend',
+    'SharedCacheBackend',
     'HybridCacheBackend',
     'ThreadSafeCacheBackend',
 
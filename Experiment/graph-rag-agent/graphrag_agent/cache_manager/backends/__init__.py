@@ -1,6 +1,8 @@
 from .base import CacheStorageBackend
 from .memory import MemoryCacheBackend
 from .disk import DiskCacheBackend
+from .segment import SegmentCacheBackend
+from .shared import SharedCacheBackend
 from .hybrid import HybridCacheBackend
 from .thread_safe import ThreadSafeCacheBackend
 
@@ -8,6 +10,8 @@ __all__ = [
     'CacheStorageBackend',
     'MemoryCacheBackend',
     'DiskCacheBackend',
+    'SegmentCacheBackend',
+    'SharedCacheBackend',
     'HybridCacheBackend',
     'ThreadSafeCacheBackend'
 ]
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import time
 import json
+import heapq
 import threading
 from typing import Any, Optional, List, Tuple, Dict
 from collections import OrderedDict
@@ -24,6 +25,12 @@ class DiskCacheBackend(CacheStorageBackend):
         self.last_flush_time = time.time()
         self._lock = threading.RLock()
         
+        # 淘汰优先级堆：(优先级, 键)，过期条目在弹出时惰性丢弃
+        self._heap: List[Tuple[float, str]] = []
+        self._priorities: Dict[str, float] = {}
+        # 老化基准：最近一次被淘汰项的优先级
+        self._clock = 0.0
+        
         # 确保缓存目录存在
         os.makedirs(cache_dir, exist_ok=True)
         
@@ -58,6 +65,7 @@ class DiskCacheBackend(CacheStorageBackend):
         
         # 验证磁盘上的文件并同步索引
         self._sync_index_with_filesystem()
+        self._rebuild_heap()
     
     def _sync_index_with_filesystem(self) -> None:
         """同步索引与文件系统"""
@@ -95,11 +103,50 @@ class DiskCacheBackend(CacheStorageBackend):
     def _save_index(self) -> None:
         """保存缓存索引"""
         try:
+            for key, priority in self._priorities.items():
+                if key in self.metadata:
+                    self.metadata[key]["priority"] = priority
             with open(self._get_index_path(), 'w', encoding='utf-8') as f:
                 json.dump(dict(self.metadata), f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存缓存索引失败: {e}")
     
+    def _compute_priority(self, meta: Dict[str, Any], now: float) -> float:
+        """
+        计算淘汰优先级（越低越先淘汰）
+        
+        在访问或写入时按"访问频率 + 新近度 - 文件大小"计算一次，此刻新近度
+        恒为满分；之后不再随时间重算，而是叠加老化基准，使长期未访问的项
+        相对新近更新的项自然下沉。
+        """
+        age = now - meta.get("created_at", now)
+        frequency_score = meta.get("access_count", 0) / max(age / 3600, 1)  # 每小时访问频率
+        recency_score = 1.0
+        size_penalty = meta.get("file_size", 1000) / 1024  # 大文件惩罚
+        return self._clock + frequency_score + recency_score - size_penalty * 0.1
+    
+    def _update_priority(self, key: str, now: float = None) -> None:
+        """重新计算键的优先级并压入堆"""
+        priority = self._compute_priority(self.metadata[key], now or time.time())
+        self._priorities[key] = priority
+        heapq.heappush(self._heap, (priority, key))
+        
+        # 过期条目过多时重建堆，避免无限增长
+        if len(self._heap) > 2 * len(self._priorities) + 64:
+            self._heap = [(p, k) for k, p in self._priorities.items()]
+            heapq.heapify(self._heap)
+    
+    def _rebuild_heap(self) -> None:
+        """根据加载的元数据重建优先级堆"""
+        self._priorities = {
+            key: meta["priority"] if "priority" in meta else self._compute_priority(meta, meta.get("last_accessed", time.time()))
+            for key, meta in self.metadata.items()
+        }
+        self._heap = [(p, k) for k, p in self._priorities.items()]
+        heapq.heapify(self._heap)
+        # 从仍存活项的最低优先级继续老化
+        self._clock = self._heap[0][0] if self._heap else 0.0
+    
     def get(self, key: str) -> Optional[Any]:
         """获取缓存项"""
         with self._lock:
@@ -116,6 +163,7 @@ class DiskCacheBackend(CacheStorageBackend):
                     
                     # 移动到OrderedDict末尾
                     self.metadata.move_to_end(key)
+                    self._update_priority(key)
                     
                     # 异步保存索引
                     self._schedule_index_save()
@@ -126,6 +174,7 @@ class DiskCacheBackend(CacheStorageBackend):
                     # 如果文件损坏，从索引中删除
                     if key in self.metadata:
                         del self.metadata[key]
+                        self._priorities.pop(key, None)
             
             return None
     
@@ -152,6 +201,7 @@ class DiskCacheBackend(CacheStorageBackend):
                     "last_accessed": current_time,
                     "access_count": 0
                 }
+            self._update_priority(key, current_time)
             
             # 添加到写入队列
             self.write_queue.append((key, value))
@@ -178,6 +228,7 @@ class DiskCacheBackend(CacheStorageBackend):
                 # 更新文件大小信息
                 if key in self.metadata:
                     self.metadata[key]["file_size"] = os.path.getsize(cache_path)
+                    self._update_priority(key)
                 
                 successful_writes.append(key)
             except Exception as e:
@@ -205,17 +256,8 @@ class DiskCacheBackend(CacheStorageBackend):
             if key not in self.metadata:
                 return False
             
-            # 从元数据中删除
-            del self.metadata[key]
-            
-            # 删除文件
-            cache_path = self._get_cache_path(key)
-            if os.path.exists(cache_path):
-                try:
-                    os.remove(cache_path)
-                except Exception as e:
-                    print(f"删除缓存文件失败 ({key}): {e}")
-                    return False
+            if not self._remove_entry(key):
+                return False
             
             # 从写入队列中移除
             self.write_queue = [(k, v) for k, v in self.write_queue if k != key]
@@ -224,6 +266,20 @@ class DiskCacheBackend(CacheStorageBackend):
             self._save_index()
             return True
     
+    def _remove_entry(self, key: str) -> bool:
+        """从元数据中删除键并删除对应文件，不保存索引"""
+        del self.metadata[key]
+        self._priorities.pop(key, None)
+        
+        cache_path = self._get_cache_path(key)
+        if os.path.exists(cache_path):
+            try:
+                os.remove(cache_path)
+            except Exception as e:
+                print(f"删除缓存文件失败 ({key}): {e}")
+                return False
+        return True
+    
     def clear(self) -> None:
         """清空缓存"""
         with self._lock:
@@ -232,6 +288,9 @@ class DiskCacheBackend(CacheStorageBackend):
             
             # 清空元数据
             self.metadata.clear()
+            self._priorities.clear()
+            self._heap.clear()
+            self._clock = 0.0
             
             # 删除所有缓存文件
             for root, dirs, files in os.walk(self.cache_dir):
@@ -251,33 +310,23 @@ class DiskCacheBackend(CacheStorageBackend):
             self._flush_write_queue()
     
     def _evict_items(self, num_to_evict: int = None) -> None:
-        """淘汰缓存项"""
+        """从优先级堆中批量淘汰缓存项，复杂度O(k log n)，只写一次索引"""
         if not self.metadata:
             return
         
         if num_to_evict is None:
             num_to_evict = max(1, len(self.metadata) // 10)  # 淘汰10%
         
-        # 使用复合评分策略：访问频率 + 新近度 + 文件大小
-        current_time = time.time()
-        scores = {}
-        
-        for key, meta in self.metadata.items():
-            age = current_time - meta.get("created_at", current_time)
-            access_count = meta.get("access_count", 0)
-            last_accessed = meta.get("last_accessed", meta.get("created_at", current_time))
-            recency = current_time - last_accessed
-            file_size = meta.get("file_size", 1000)  # 默认1KB
-            
-            # 计算复合分数（分数越低越容易被淘汰）
-            frequency_score = access_count / max(age / 3600, 1)  # 每小时访问频率
-            recency_score = 1 / max(recency / 3600, 1)  # 新近度分数
-            size_penalty = file_size / 1024  # 大文件惩罚
-            
-            scores[key] = frequency_score + recency_score - size_penalty * 0.1
-        
-        # 选择分数最低的项目进行淘汰
-        keys_to_evict = sorted(scores.keys(), key=lambda k: scores[k])[:num_to_evict]
+        evicted = set()
+        while self._heap and len(evicted) < num_to_evict:
+            priority, key = heapq.heappop(self._heap)
+            # 跳过已被更新或删除的过期条目
+            if self._priorities.get(key) != priority or key not in self.metadata:
+                continue
+            self._clock = max(self._clock, priority)
+            self._remove_entry(key)
+            evicted.add(key)
         
-        for key in keys_to_evict:
-            self.delete(key)
\ No newline at end of file
+        if evicted:
+            self.write_queue = [(k, v) for k, v in self.write_queue if k not in evicted]
+            self._save_index()
@@ -2,15 +2,28 @@ from typing import Any, Optional, Set
 from .base import CacheStorageBackend
 from .memory import MemoryCacheBackend
 from .disk import DiskCacheBackend
+from .segment import SegmentCacheBackend
 
 
 class HybridCacheBackend(CacheStorageBackend):
     """混合缓存后端实现（内存+磁盘）"""
     
-    def __init__(self, cache_dir: str = "./cache", memory_max_size: int = 100, disk_max_size: int = 1000):
-        """初始化混合缓存后端"""
+    def __init__(self, cache_dir: str = "./cache", memory_max_size: int = 100, disk_max_size: int = 1000,
+                 disk_backend: str = "file"):
+        """
+        初始化混合缓存后端
+        
+        参数:
+            cache_dir: 磁盘缓存目录
+            memory_max_size: 内存缓存最大项数
+            disk_max_size: 磁盘缓存最大项数
+            disk_backend: 磁盘层实现，file 为逐键JSON文件，segment 为追加写段文件
+        """
         self.memory_cache = MemoryCacheBackend(max_size=memory_max_size)
-        self.disk_cache = DiskCacheBackend(cache_dir=cache_dir, max_size=disk_max_size)
+        if disk_backend == "segment":
+            self.disk_cache = SegmentCacheBackend(cache_dir=cache_dir, max_size=disk_max_size)
+        else:
+            self.disk_cache = DiskCacheBackend(cache_dir=cache_dir, max_size=disk_max_size)
         self.memory_hits = 0
         self.disk_hits = 0
         self.misses = 0
@@ -0,0 +1,604 @@
+import os
+import time
+import json
+import zlib
+import struct
+import threading
+from typing import Any, Optional, List, Tuple, Dict, BinaryIO, Iterator
+from collections import OrderedDict
+from .base import CacheStorageBackend
+
+
+# 记录头：操作类型、键长度、值长度、CRC32
+_RECORD_HEADER = struct.Struct("<BIII")
+# 索引头：魔数、版本、检查点段号、检查点偏移、条目数
+_INDEX_HEADER = struct.Struct("<4sHIQI")
+# 索引条目：段号、偏移、记录长度、创建时间、最后访问时间、访问次数、键长度
+_INDEX_ENTRY = struct.Struct("<IQIddIH")
+
+_OP_PUT = 1
+_OP_DELETE = 2
+_INDEX_MAGIC = b"SGIX"
+_INDEX_VERSION = 1
+
+
+class SegmentCacheBackend(CacheStorageBackend):
+    """
+    日志结构的磁盘缓存后端
+
+    所有写入以追加方式写入段文件（segments/*.seg），内存中维护键到
+    (段号, 偏移) 的索引，并定期保存为紧凑的二进制索引文件。启动时只需
+    加载索引并重放检查点之后的少量记录；被覆盖或删除的旧记录由后台压缩回收。
+    """
+
+    def __init__(self, cache_dir: str = "./cache", max_size: int = 1000,
+                 segment_max_bytes: int = 16 * 1024 * 1024,
+                 index_save_interval: float = 30.0,
+                 compaction_interval: float = 300.0,
+                 compaction_threshold: float = 0.5):
+        """
+        初始化段存储缓存后端
+
+        参数:
+            cache_dir: 缓存目录，段文件保存在其下的segments子目录
+            max_size: 最大缓存项数量
+            segment_max_bytes: 单个段文件的最大字节数，超过后滚动到新段
+            index_save_interval: 两次自动保存索引之间的最小间隔（秒）
+            compaction_interval: 后台压缩检查间隔（秒），0 表示只手动压缩
+            compaction_threshold: 段内无效数据占比超过该值时参与压缩
+        """
+        self.cache_dir = cache_dir
+        self.segment_dir = os.path.join(cache_dir, "segments")
+        self.max_size = max_size
+        self.segment_max_bytes = segment_max_bytes
+        self.index_save_interval = index_save_interval
+        self.compaction_interval = compaction_interval
+        self.compaction_threshold = compaction_threshold
+
+        # 键 -> [段号, 偏移, 记录长度]，OrderedDict维护LRU顺序
+        self.locations: OrderedDict[str, List[int]] = OrderedDict()
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        # 段号 -> 有效字节数
+        self.live_bytes: Dict[int, int] = {}
+        self.segment_ids: List[int] = []
+
+        self._lock = threading.RLock()
+        self._writer: Optional[BinaryIO] = None
+        self._active_id = 0
+        self._active_size = 0
+        self._readers: Dict[int, BinaryIO] = {}
+        self._index_dirty = False
+        self._last_index_save = time.time()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self._load()
+
+    # ----- 路径与文件句柄 -----
+
+    def _segment_path(self, segment_id: int) -> str:
+        """获取段文件路径"""
+        return os.path.join(self.segment_dir, f"{segment_id:08d}.seg")
+
+    def _get_index_path(self) -> str:
+        """获取二进制索引文件路径"""
+        return os.path.join(self.segment_dir, "index.bin")
+
+    def _list_segments(self) -> List[int]:
+        """列出磁盘上的全部段号（升序）"""
+        ids = []
+        for filename in os.listdir(self.segment_dir):
+            if filename.endswith(".seg"):
+                try:
+                    ids.append(int(filename[:-4]))
+                except ValueError:
+                    continue
+        return sorted(ids)
+
+    def _reader(self, segment_id: int) -> BinaryIO:
+        """获取（并缓存）段文件的只读句柄"""
+        handle = self._readers.get(segment_id)
+        if handle is None:
+            handle = open(self._segment_path(segment_id), "rb")
+            self._readers[segment_id] = handle
+        return handle
+
+    def _close_reader(self, segment_id: int) -> None:
+        """关闭段文件的只读句柄"""
+        handle = self._readers.pop(segment_id, None)
+        if handle is not None:
+            handle.close()
+
+    def _open_writer(self, segment_id: int) -> None:
+        """以追加方式打开活动段"""
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = open(self._segment_path(segment_id), "ab")
+        self._active_id = segment_id
+        self._active_size = self._writer.tell()
+        if segment_id not in self.segment_ids:
+            self.segment_ids.append(segment_id)
+            self.live_bytes.setdefault(segment_id, 0)
+
+    def _roll_segment(self) -> None:
+        """封存当前活动段并开启新段"""
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._open_writer(self._active_id + 1)
+
+    # ----- 记录编解码 -----
+
+    @staticmethod
+    def _encode_record(op: int, key: str, value: Any = None) -> bytes:
+        """编码一条记录"""
+        key_bytes = key.encode("utf-8")
+        if op == _OP_PUT:
+            value_bytes = json.dumps(
+                value, ensure_ascii=False, separators=(",", ":"), default=str
+            ).encode("utf-8")
+        else:
+            value_bytes = b""
+        crc = zlib.crc32(value_bytes, zlib.crc32(key_bytes))
+        header = _RECORD_HEADER.pack(op, len(key_bytes), len(value_bytes), crc)
+        return header + key_bytes + value_bytes
+
+    def _iter_records(self, segment_id: int, start: int = 0) -> Iterator[Tuple[int, int, int, str, bytes]]:
+        """
+        顺序遍历段文件中的记录，遇到不完整或校验失败的记录时停止
+
+        返回:
+            迭代 (偏移, 记录长度, 操作类型, 键, 值字节)
+        """
+        with open(self._segment_path(segment_id), "rb") as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    return
+                op, key_len, value_len, crc = _RECORD_HEADER.unpack(header)
+                body = f.read(key_len + value_len)
+                if len(body) < key_len + value_len or zlib.crc32(body) != crc or op not in (_OP_PUT, _OP_DELETE):
+                    return
+                length = _RECORD_HEADER.size + key_len + value_len
+                yield offset, length, op, body[:key_len].decode("utf-8"), body[key_len:]
+                offset += length
+
+    def _read_value(self, key: str, location: List[int]) -> Any:
+        """按位置读取并解码记录值"""
+        segment_id, offset, length = location
+        handle = self._reader(segment_id)
+        handle.seek(offset)
+        data = handle.read(length)
+        op, key_len, value_len, crc = _RECORD_HEADER.unpack_from(data)
+        body = data[_RECORD_HEADER.size:]
+        if (op != _OP_PUT or len(body) != key_len + value_len or zlib.crc32(body) != crc
+                or body[:key_len].decode("utf-8") != key):
+            raise ValueError("记录校验失败")
+        return json.loads(body[key_len:].decode("utf-8"))
+
+    # ----- 启动加载 -----
+
+    def _load(self) -> None:
+        """加载索引并重放检查点之后的记录"""
+        on_disk = self._list_segments()
+        checkpoint = self._load_index(on_disk)
+
+        if checkpoint is None:
+            # 没有可用索引，全量重放
+            self.locations.clear()
+            self.metadata.clear()
+            self.live_bytes = {segment_id: 0 for segment_id in on_disk}
+            for segment_id in on_disk:
+                self._replay(segment_id, 0)
+        else:
+            checkpoint_id, checkpoint_offset = checkpoint
+            for segment_id in on_disk:
+                if segment_id == checkpoint_id:
+                    self._replay(segment_id, checkpoint_offset)
+                elif segment_id > checkpoint_id:
+                    self._replay(segment_id, 0)
+
+        self.segment_ids = on_disk
+        self._open_writer(on_disk[-1] if on_disk else 0)
+
+        if not on_disk:
+            self._import_legacy_files()
+
+        if self._index_dirty:
+            self._save_index()
+
+    def _load_index(self, on_disk: List[int]) -> Optional[Tuple[int, int]]:
+        """
+        加载二进制索引
+
+        返回:
+            (检查点段号, 检查点偏移)，索引不可用时返回None
+        """
+        index_path = self._get_index_path()
+        if not os.path.exists(index_path):
+            return None
+
+        existing = set(on_disk)
+        try:
+            with open(index_path, "rb") as f:
+                data = f.read()
+            magic, version, checkpoint_id, checkpoint_offset, count = _INDEX_HEADER.unpack_from(data)
+            if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+                return None
+
+            pos = _INDEX_HEADER.size
+            entries = []
+            for _ in range(count):
+                segment_id, offset, length, created_at, last_accessed, access_count, key_len = \
+                    _INDEX_ENTRY.unpack_from(data, pos)
+                pos += _INDEX_ENTRY.size
+                key = data[pos:pos + key_len].decode("utf-8")
+                pos += key_len
+                if segment_id not in existing:
+                    return None
+                entries.append((last_accessed, key, segment_id, offset, length, created_at, access_count))
+        except Exception as e:
+            print(f"加载段缓存索引失败，将全量重放: {e}")
+            return None
+
+        # 按最后访问时间恢复LRU顺序
+        self.live_bytes = {segment_id: 0 for segment_id in on_disk}
+        for last_accessed, key, segment_id, offset, length, created_at, access_count in sorted(entries):
+            self.locations[key] = [segment_id, offset, length]
+            self.metadata[key] = {
+                "created_at": created_at,
+                "last_accessed": last_accessed,
+                "access_count": access_count
+            }
+            self.live_bytes[segment_id] += length
+        return checkpoint_id, checkpoint_offset
+
+    def _replay(self, segment_id: int, start: int) -> None:
+        """重放段文件中从start开始的记录，并截断尾部损坏的数据"""
+        end = start
+        for offset, length, op, key, _ in self._iter_records(segment_id, start):
+            if op == _OP_PUT:
+                self._apply_put(key, [segment_id, offset, length], time.time())
+            else:
+                self._drop_location(key)
+            end = offset + length
+            self._index_dirty = True
+
+        path = self._segment_path(segment_id)
+        if os.path.getsize(path) > end:
+            print(f"段文件 {path} 尾部存在不完整记录，已截断")
+            with open(path, "r+b") as f:
+                f.truncate(end)
+
+    def _import_legacy_files(self) -> None:
+        """首次启用时导入DiskCacheBackend留下的逐键JSON文件"""
+        legacy_index = os.path.join(self.cache_dir, "index.json")
+        if not os.path.exists(legacy_index):
+            return
+
+        try:
+            with open(legacy_index, "r", encoding="utf-8") as f:
+                legacy_meta = json.load(f)
+        except Exception as e:
+            print(f"读取旧版缓存索引失败: {e}")
+            return
+
+        imported = 0
+        for key in sorted(legacy_meta, key=lambda k: legacy_meta[k].get("last_accessed", 0)):
+            path = os.path.join(self.cache_dir, key[:2], f"{key}.json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            except Exception:
+                continue
+            self.set(key, value)
+            self.metadata[key].update({
+                k: legacy_meta[key][k]
+                for k in ("created_at", "last_accessed", "access_count")
+                if k in legacy_meta[key]
+            })
+            imported += 1
+
+        if imported:
+            print(f"已从旧版磁盘缓存导入 {imported} 项")
+
+    # ----- 内存索引维护 -----
+
+    def _apply_put(self, key: str, location: List[int], now: float) -> None:
+        """记录键的新位置"""
+        previous = self.metadata.get(key)
+        self._drop_location(key)
+        self.locations[key] = location
+        self.live_bytes[location[0]] = self.live_bytes.get(location[0], 0) + location[2]
+        self.metadata[key] = previous or {
+            "created_at": now,
+            "last_accessed": now,
+            "access_count": 0
+        }
+        self.metadata[key]["last_accessed"] = now
+
+    def _drop_location(self, key: str) -> bool:
+        """从内存索引中移除键"""
+        location = self.locations.pop(key, None)
+        self.metadata.pop(key, None)
+        if location is None:
+            return False
+        self.live_bytes[location[0]] = self.live_bytes.get(location[0], 0) - location[2]
+        return True
+
+    def _append(self, record: bytes) -> List[int]:
+        """追加一条记录到活动段，返回其位置"""
+        if self._active_size > 0 and self._active_size + len(record) > self.segment_max_bytes:
+            self._roll_segment()
+        offset = self._active_size
+        self._writer.write(record)
+        # 刷到操作系统缓冲区，保证读句柄立即可见
+        self._writer.flush()
+        self._active_size += len(record)
+        return [self._active_id, offset, len(record)]
+
+    # ----- CacheStorageBackend 接口 -----
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存项"""
+        with self._lock:
+            location = self.locations.get(key)
+            if location is None:
+                return None
+
+            try:
+                value = self._read_value(key, location)
+            except Exception as e:
+                print(f"读取段缓存记录失败 ({key}): {e}")
+                self._drop_location(key)
+                self._index_dirty = True
+                return None
+
+            meta = self.metadata[key]
+            meta["last_accessed"] = time.time()
+            meta["access_count"] = meta.get("access_count", 0) + 1
+            self.locations.move_to_end(key)
+            self._index_dirty = True
+            self._maybe_save_index()
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """设置缓存项"""
+        with self._lock:
+            if len(self.locations) >= self.max_size and key not in self.locations:
+                self._evict_items()
+
+            try:
+                location = self._append(self._encode_record(_OP_PUT, key, value))
+            except Exception as e:
+                print(f"写入段缓存记录失败 ({key}): {e}")
+                return
+
+            self._apply_put(key, location, time.time())
+            self._index_dirty = True
+            self._maybe_save_index()
+            self._ensure_compaction_thread()
+
+    def delete(self, key: str) -> bool:
+        """删除缓存项"""
+        with self._lock:
+            if key not in self.locations:
+                return False
+
+            try:
+                self._append(self._encode_record(_OP_DELETE, key))
+            except Exception as e:
+                print(f"写入删除标记失败 ({key}): {e}")
+                return False
+
+            self._drop_location(key)
+            self._index_dirty = True
+            self._maybe_save_index()
+            return True
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for segment_id in list(self._readers):
+                self._close_reader(segment_id)
+
+            for segment_id in self._list_segments():
+                try:
+                    os.remove(self._segment_path(segment_id))
+                except Exception as e:
+                    print(f"删除段文件失败: {e}")
+
+            self.locations.clear()
+            self.metadata.clear()
+            self.live_bytes.clear()
+            self.segment_ids = []
+            self._open_writer(0)
+            self._save_index()
+
+    def flush(self) -> None:
+        """将活动段落盘并保存索引"""
+        with self._lock:
+            self._save_index()
+
+    def close(self) -> None:
+        """停止后台压缩线程并关闭所有文件"""
+        self._stop_event.set()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join(timeout=1)
+            self._compaction_thread = None
+
+        with self._lock:
+            self.flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for segment_id in list(self._readers):
+                self._close_reader(segment_id)
+
+    # ----- 淘汰 -----
+
+    def _evict_items(self, num_to_evict: int = None) -> None:
+        """按LRU顺序淘汰缓存项"""
+        if not self.locations:
+            return
+
+        if num_to_evict is None:
+            num_to_evict = max(1, len(self.locations) // 10)  # 淘汰10%
+
+        keys_to_evict = []
+        for key in self.locations:
+            if len(keys_to_evict) >= num_to_evict:
+                break
+            keys_to_evict.append(key)
+
+        for key in keys_to_evict:
+            self.delete(key)
+
+    # ----- 索引持久化 -----
+
+    def _maybe_save_index(self) -> None:
+        """距上次保存超过间隔时保存索引"""
+        if self._index_dirty and time.time() - self._last_index_save > self.index_save_interval:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        """原子地保存二进制索引，检查点为活动段的当前末尾"""
+        try:
+            # 索引引用的记录必须先落盘
+            if self._writer is not None:
+                self._writer.flush()
+                os.fsync(self._writer.fileno())
+
+            parts = [_INDEX_HEADER.pack(
+                _INDEX_MAGIC, _INDEX_VERSION, self._active_id, self._active_size, len(self.locations)
+            )]
+            for key, (segment_id, offset, length) in self.locations.items():
+                meta = self.metadata.get(key, {})
+                key_bytes = key.encode("utf-8")
+                parts.append(_INDEX_ENTRY.pack(
+                    segment_id, offset, length,
+                    float(meta.get("created_at", 0.0)),
+                    float(meta.get("last_accessed", 0.0)),
+                    int(meta.get("access_count", 0)),
+                    len(key_bytes)
+                ))
+                parts.append(key_bytes)
+
+            index_path = self._get_index_path()
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(parts))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, index_path)
+
+            self._index_dirty = False
+            self._last_index_save = time.time()
+        except Exception as e:
+            print(f"保存段缓存索引失败: {e}")
+
+    # ----- 压缩 -----
+
+    def _compaction_candidates(self) -> List[int]:
+        """找出无效数据占比超过阈值的封存段"""
+        candidates = []
+        for segment_id in self.segment_ids:
+            if segment_id == self._active_id:
+                continue
+            try:
+                total = os.path.getsize(self._segment_path(segment_id))
+            except OSError:
+                continue
+            live = self.live_bytes.get(segment_id, 0)
+            if total == 0 or (total - live) / total >= self.compaction_threshold:
+                candidates.append(segment_id)
+        return candidates
+
+    def compact(self) -> int:
+        """
+        压缩封存段：把仍有效的记录复制到活动段，然后删除旧段文件
+
+        返回:
+            int: 被回收的段文件数量
+        """
+        with self._lock:
+            candidates = self._compaction_candidates()
+            if not candidates:
+                return 0
+
+            older_puts = None
+            copied_tombstones = set()
+            for segment_id in candidates:
+                for offset, length, op, key, value_bytes in self._iter_records(segment_id):
+                    if op == _OP_PUT:
+                        if self.locations.get(key) != [segment_id, offset, length]:
+                            continue
+                        key_bytes = key.encode("utf-8")
+                        body = key_bytes + value_bytes
+                        record = _RECORD_HEADER.pack(_OP_PUT, len(key_bytes), len(value_bytes), zlib.crc32(body)) + body
+                        location = self._append(record)
+                        self.live_bytes[segment_id] -= length
+                        self.live_bytes[location[0]] = self.live_bytes.get(location[0], 0) + location[2]
+                        self.locations[key] = location
+                    elif key not in self.locations and key not in copied_tombstones:
+                        if older_puts is None:
+                            older_puts = self._oldest_put_segments(candidates)
+                        # 更早的段仍有该键的写入记录时保留删除标记，防止全量重放时旧值复活
+                        if older_puts.get(key, segment_id) < segment_id:
+                            self._append(self._encode_record(_OP_DELETE, key))
+                            copied_tombstones.add(key)
+
+            # 先让新位置落盘并写入索引，再删除旧段
+            self.flush()
+
+            for segment_id in candidates:
+                self._close_reader(segment_id)
+                try:
+                    os.remove(self._segment_path(segment_id))
+                except Exception as e:
+                    print(f"删除段文件失败 ({segment_id}): {e}")
+                    continue
+                self.segment_ids.remove(segment_id)
+                self.live_bytes.pop(segment_id, None)
+
+            return len(candidates)
+
+    def _oldest_put_segments(self, candidates: List[int]) -> Dict[str, int]:
+        """
+        扫描压缩后仍保留的较早封存段，找出每个键最早出现写入记录的段
+
+        参数:
+            candidates: 本次参与压缩的段号
+
+        返回:
+            Dict[str, int]: 键 -> 最早包含其写入记录的段号
+        """
+        oldest: Dict[str, int] = {}
+        newest_candidate = max(candidates)
+        for segment_id in self.segment_ids:
+            if segment_id in candidates or segment_id > newest_candidate:
+                continue
+            for _, _, op, key, _ in self._iter_records(segment_id):
+                if op == _OP_PUT:
+                    oldest.setdefault(key, segment_id)
+        return oldest
+
+    def _ensure_compaction_thread(self) -> None:
+        """按需启动后台压缩线程"""
+        if self.compaction_interval <= 0 or self._compaction_thread is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(self.compaction_interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"段缓存压缩失败: {e}")
+
+        self._compaction_thread = threading.Thread(target=run, name="segment-cache-compaction", daemon=True)
+        self._compaction_thread.start()
@@ -0,0 +1,231 @@
+import os
+import time
+import json
+import zlib
+import sqlite3
+import threading
+from typing import Any, Optional, List, Dict, Tuple
+from .base import CacheStorageBackend
+
+
+class SharedCacheBackend(CacheStorageBackend):
+    """
+    跨进程共享的缓存后端
+
+    数据保存在按键哈希分片的SQLite文件（WAL模式）中，同一台机器上的多个
+    FastAPI worker 打开同一目录即可共享缓存命中和质量标记。进程间的写冲突
+    由SQLite文件锁处理；访问统计在进程内合并后批量写回，避免每次读取都争用写锁。
+    """
+
+    def __init__(self, cache_dir: str = "./cache/shared", namespace: str = "default",
+                 max_size: int = 1000, num_shards: int = 4,
+                 busy_timeout: float = 5.0, access_flush_interval: float = 5.0):
+        """
+        初始化共享缓存后端
+
+        参数:
+            cache_dir: 分片数据库所在目录，所有进程需指向同一目录
+            namespace: 命名空间，不同工具/Agent的缓存互不干扰
+            max_size: 本命名空间允许的最大缓存项数量
+            num_shards: 分片数量，分散不同键的写锁竞争
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+            access_flush_interval: 访问统计批量写回的间隔（秒）
+        """
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.max_size = max_size
+        self.num_shards = max(1, num_shards)
+        self.busy_timeout = busy_timeout
+        self.access_flush_interval = access_flush_interval
+
+        # 每个分片一个连接，连接只在创建它的进程内使用
+        self._connections: List[Optional[sqlite3.Connection]] = [None] * self.num_shards
+        self._locks = [threading.Lock() for _ in range(self.num_shards)]
+        self._pid = os.getpid()
+
+        # 待写回的访问统计：键 -> (最后访问时间, 新增访问次数)
+        self._pending_access: Dict[str, Tuple[float, int]] = {}
+        self._access_lock = threading.Lock()
+        self._last_access_flush = time.time()
+        self._writes_since_check = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for shard in range(self.num_shards):
+            self._connect(shard)
+
+    def _shard_of(self, key: str) -> int:
+        """计算键所在分片（各进程结果一致）"""
+        return zlib.crc32(key.encode("utf-8")) % self.num_shards
+
+    def _connect(self, shard: int) -> sqlite3.Connection:
+        """获取分片连接，fork后自动重新连接"""
+        if self._pid != os.getpid():
+            # 子进程不能复用父进程的连接
+            self._connections = [None] * self.num_shards
+            self._locks = [threading.Lock() for _ in range(self.num_shards)]
+            self._pid = os.getpid()
+
+        conn = self._connections[shard]
+        if conn is None:
+            path = os.path.join(self.cache_dir, f"shard_{shard:02d}.db")
+            conn = sqlite3.connect(path, timeout=self.busy_timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_accessed REAL NOT NULL, "
+                "access_count INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (ns, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (ns, last_accessed)")
+            self._connections[shard] = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存项"""
+        shard = self._shard_of(key)
+        try:
+            with self._locks[shard]:
+                row = self._connect(shard).execute(
+                    "SELECT value FROM cache WHERE ns = ? AND key = ?", (self.namespace, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"读取共享缓存失败 ({key}): {e}")
+            return None
+
+        if row is None:
+            return None
+
+        self._record_access(key)
+        try:
+            return json.loads(row[0])
+        except Exception as e:
+            print(f"解析共享缓存失败 ({key}): {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """设置缓存项"""
+        shard = self._shard_of(key)
+        now = time.time()
+        try:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+            with self._locks[shard]:
+                self._connect(shard).execute(
+                    "INSERT INTO cache (ns, key, value, created_at, last_accessed, access_count) "
+                    "VALUES (?, ?, ?, ?, ?, 0) "
+                    "ON CONFLICT(ns, key) DO UPDATE SET value = excluded.value, "
+                    "last_accessed = excluded.last_accessed",
+                    (self.namespace, key, payload, now, now)
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"写入共享缓存失败 ({key}): {e}")
+            return
+
+        # 每写入一批检查一次容量，避免每次都做COUNT；计数器跨分片共享，需在锁内更新
+        with self._access_lock:
+            self._writes_since_check += 1
+            due = self._writes_since_check >= max(1, self.max_size // 20)
+            if due:
+                self._writes_since_check = 0
+        if due:
+            self._enforce_capacity()
+
+    def delete(self, key: str) -> bool:
+        """删除缓存项"""
+        shard = self._shard_of(key)
+        with self._access_lock:
+            self._pending_access.pop(key, None)
+        try:
+            with self._locks[shard]:
+                cursor = self._connect(shard).execute(
+                    "DELETE FROM cache WHERE ns = ? AND key = ?", (self.namespace, key)
+                )
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"删除共享缓存失败 ({key}): {e}")
+            return False
+
+    def clear(self) -> None:
+        """清空本命名空间的缓存"""
+        with self._access_lock:
+            self._pending_access.clear()
+        for shard in range(self.num_shards):
+            try:
+                with self._locks[shard]:
+                    self._connect(shard).execute("DELETE FROM cache WHERE ns = ?", (self.namespace,))
+            except sqlite3.Error as e:
+                print(f"清空共享缓存失败: {e}")
+
+    def flush(self) -> None:
+        """写回进程内累积的访问统计"""
+        with self._access_lock:
+            pending = self._pending_access
+            self._pending_access = {}
+            self._last_access_flush = time.time()
+
+        by_shard: Dict[int, List[Tuple[float, int, str, str]]] = {}
+        for key, (last_accessed, count) in pending.items():
+            by_shard.setdefault(self._shard_of(key), []).append((last_accessed, count, self.namespace, key))
+
+        for shard, rows in by_shard.items():
+            try:
+                with self._locks[shard]:
+                    conn = self._connect(shard)
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        conn.executemany(
+                            "UPDATE cache SET last_accessed = MAX(last_accessed, ?), "
+                            "access_count = access_count + ? WHERE ns = ? AND key = ?",
+                            rows
+                        )
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+            except sqlite3.Error as e:
+                print(f"写回共享缓存访问统计失败: {e}")
+
+    def close(self) -> None:
+        """写回访问统计并关闭连接"""
+        self.flush()
+        for shard, conn in enumerate(self._connections):
+            if conn is not None:
+                with self._locks[shard]:
+                    conn.close()
+                self._connections[shard] = None
+
+    def _record_access(self, key: str) -> None:
+        """在进程内累积访问统计，按间隔批量写回"""
+        now = time.time()
+        with self._access_lock:
+            _, count = self._pending_access.get(key, (now, 0))
+            self._pending_access[key] = (now, count + 1)
+            due = now - self._last_access_flush > self.access_flush_interval
+        if due:
+            self.flush()
+
+    def _enforce_capacity(self) -> None:
+        """超出容量时按LRU淘汰约10%的缓存项"""
+        shard_limit = max(1, self.max_size // self.num_shards)
+        # 淘汰前写回访问统计，避免误删刚被其他请求读取的项
+        self.flush()
+
+        for shard in range(self.num_shards):
+            try:
+                with self._locks[shard]:
+                    conn = self._connect(shard)
+                    count = conn.execute(
+                        "SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)
+                    ).fetchone()[0]
+                    if count <= shard_limit:
+                        continue
+                    num_to_evict = count - shard_limit + max(1, shard_limit // 10)
+                    conn.execute(
+                        "DELETE FROM cache WHERE ns = ? AND key IN ("
+                        "SELECT key FROM cache WHERE ns = ? ORDER BY last_accessed LIMIT ?)",
+                        (self.namespace, self.namespace, num_to_evict)
+                    )
+            except sqlite3.Error as e:
+                print(f"共享缓存淘汰失败: {e}")
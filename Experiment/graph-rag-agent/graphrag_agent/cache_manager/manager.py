@@ -1,15 +1,32 @@
 import time
-from typing import Any, Dict, Optional, Callable
+import threading
+from typing import Any, Dict, Optional, Callable, List, Tuple
 from pathlib import Path
 
 from .strategies import CacheKeyStrategy, SimpleCacheKeyStrategy, ContextAwareCacheKeyStrategy, ContextAndKeywordAwareCacheKeyStrategy
-from .backends import CacheStorageBackend, MemoryCacheBackend, HybridCacheBackend, ThreadSafeCacheBackend
+from .backends import CacheStorageBackend, MemoryCacheBackend, HybridCacheBackend, SharedCacheBackend, ThreadSafeCacheBackend
 from .models import CacheItem
 from .vector_similarity import VectorSimilarityMatcher, get_cache_embedding_provider
 
 from graphrag_agent.config.settings import CACHE_SETTINGS
 
 
+# 只影响关键词感知键的参数，主键（规范化查询键）生成时忽略
+_KEYWORD_PARAMS = ("keywords", "low_level_keywords", "high_level_keywords")
+
+
+class _InFlightComputation:
+    """正在进行中的一次缓存计算，供并发的相同请求等待"""
+    
+    def __init__(self, query: str, context_info: Dict[str, Any], embedding: Any = None):
+        self.query = query
+        self.context_info = context_info
+        self.embedding = embedding
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
 class CacheManager:
     """统一缓存管理器，提供高级缓存功能和向量相似性匹配"""
     
@@ -64,7 +81,7 @@ class CacheManager:
         # 设置存储后端
         backend = self._create_storage_backend(
             storage_backend, memory_only, cache_dir, 
-            max_memory_size, max_disk_size
+            max_memory_size, max_disk_size, cache_config["disk_backend"]
         )
         
         # 如果需要线程安全，添加包装器
@@ -86,7 +103,10 @@ class CacheManager:
                 embedding_provider=embedding_provider,
                 similarity_threshold=similarity_threshold,
                 max_vectors=max_vectors,
-                index_file=vector_index_file
+                index_file=vector_index_file,
+                eviction_policy=cache_config["vector_eviction_policy"],
+                compaction_interval=cache_config["vector_compaction_interval"],
+                embedding_memo_size=cache_config["embedding_memo_size"]
             )
         else:
             self.vector_matcher = None
@@ -96,26 +116,75 @@ class CacheManager:
             'exact_hits': 0,
             'vector_hits': 0,
             'misses': 0,
-            'total_queries': 0
+            'total_queries': 0,
+            'coalesced': 0,
+            'coalesce_timeouts': 0
         }
+        
+        # 等待其他请求计算结果的默认最长时间，避免计算者卡住时等待者永远阻塞
+        self.coalesce_timeout = cache_config["coalesce_timeout"]
+        
+        # 进行中的计算：缓存键 -> _InFlightComputation
+        self._inflight: Dict[str, _InFlightComputation] = {}
+        self._inflight_lock = threading.Lock()
     
     def _create_storage_backend(self, storage_backend, memory_only, cache_dir, 
-                              max_memory_size, max_disk_size) -> CacheStorageBackend:
+                              max_memory_size, max_disk_size, disk_backend="file") -> CacheStorageBackend:
         """创建存储后端"""
         if storage_backend:
             return storage_backend
         elif memory_only:
             return MemoryCacheBackend(max_size=max_memory_size)
+        elif CACHE_SETTINGS["shared_enabled"]:
+            return self.create_shared_backend(cache_dir, max_disk_size)
         else:
             return HybridCacheBackend(
                 cache_dir=cache_dir,
                 memory_max_size=max_memory_size,
-                disk_max_size=max_disk_size
+                disk_max_size=max_disk_size,
+                disk_backend=disk_backend
             )
     
+    @staticmethod
+    def create_shared_backend(namespace: str, max_size: int) -> SharedCacheBackend:
+        """
+        创建跨进程共享的缓存后端，多个worker中同一命名空间的缓存互通
+        
+        参数:
+            namespace: 命名空间，通常使用原本的缓存目录
+            max_size: 最大缓存项数量
+        """
+        return SharedCacheBackend(
+            cache_dir=str(CACHE_SETTINGS["shared_dir"]),
+            namespace=str(namespace),
+            max_size=max_size,
+            num_shards=CACHE_SETTINGS["shared_shards"]
+        )
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """规范化查询文本：去掉首尾空白并合并连续空白"""
+        return " ".join(str(query).split())
+    
     def _get_consistent_key(self, query: str, **kwargs) -> str:
         """生成一致的缓存键"""
-        return self.key_strategy.generate_key(query, **kwargs)
+        return self.key_strategy.generate_key(self._normalize_query(query), **kwargs)
+    
+    def _primary_key(self, query: str, **kwargs) -> str:
+        """主键：规范化查询加上下文参数，不含关键词，生成时不需要调用LLM"""
+        params = {k: v for k, v in kwargs.items() if k not in _KEYWORD_PARAMS}
+        return self._get_consistent_key(query, **params)
+    
+    def _candidate_keys(self, query: str, **kwargs) -> List[str]:
+        """精确匹配时依次尝试的键：带关键词的键在前，主键在后（两者相同时只有一个）"""
+        return list(dict.fromkeys([
+            self._get_consistent_key(query, **kwargs),
+            self._primary_key(query, **kwargs),
+        ]))
+    
+    def _uses_keywords(self) -> bool:
+        """当前键策略是否把关键词编入缓存键"""
+        return isinstance(self.key_strategy, ContextAndKeywordAwareCacheKeyStrategy)
     
     def _extract_context_info(self, **kwargs) -> Dict[str, Any]:
         """提取上下文信息用于向量匹配"""
@@ -131,15 +200,15 @@ class CacheManager:
         start_time = time.time()
         self.performance_metrics['total_queries'] += 1
         
-        # 生成缓存键
-        key = self._get_consistent_key(query, **kwargs)
-        
         # 首先尝试精确匹配
-        cached_data = self.storage.get(key)
-        if cached_data is not None:
+        for key in self._candidate_keys(query, **kwargs):
+            cached_data = self.storage.get(key)
+            if cached_data is None:
+                continue
             self.performance_metrics['exact_hits'] += 1
             cache_item = CacheItem.from_any(cached_data)
             cache_item.update_access_stats()
+            self._record_vector_access(key, cache_item)
             
             # 验证逻辑
             if skip_validation or cache_item.is_high_quality():
@@ -162,6 +231,7 @@ class CacheManager:
                     self.performance_metrics['vector_hits'] += 1
                     cache_item = CacheItem.from_any(cached_data)
                     cache_item.update_access_stats()
+                    self._record_vector_access(similar_key, cache_item)
                     
                     # 添加相似性信息到元数据
                     cache_item.metadata['similarity_score'] = similarity_score
@@ -182,28 +252,47 @@ class CacheManager:
         self.performance_metrics["get_time"] = time.time() - start_time
         return None
     
-    def get_fast(self, query: str, **kwargs) -> Optional[Any]:
-        """快速获取高质量缓存内容"""
-        start_time = time.time()
+    def get_fast(self, query: str, keyword_provider: Optional[Callable[[], Dict[str, List[str]]]] = None,
+                 **kwargs) -> Optional[Any]:
+        """
+        快速获取高质量缓存内容
         
-        # 生成缓存键
-        key = self._get_consistent_key(query, **kwargs)
+        先用主键（规范化查询，不含关键词）查找；未命中且键策略使用关键词时，
+        才通过keyword_provider提取关键词并查找带关键词的键，命中主键时不会调用它。
         
-        # 获取缓存项
-        cached_data = self.storage.get(key)
-        if cached_data is not None:
-            cache_item = CacheItem.from_any(cached_data)
+        参数:
+            query: 查询字符串
+            keyword_provider: 返回 {"low_level": [...], "high_level": [...]} 的函数，通常需要调用LLM
+            **kwargs: 上下文参数，与get/set一致
             
-            # 只返回高质量缓存
-            if cache_item.is_high_quality():
-                cache_item.update_access_stats()
-                
-                # 更新上下文历史
-                self._update_strategy_history(query, **kwargs)
-                
-                content = cache_item.get_content()
-                self.performance_metrics["fast_get_time"] = time.time() - start_time
-                return content
+        返回:
+            高质量缓存内容，未命中时为None
+        """
+        start_time = time.time()
+        
+        # 第一级：主键
+        key = self._primary_key(query, **kwargs)
+        content = self._get_high_quality(key, query, **kwargs)
+        
+        # 第二级：带关键词的键，只在主键未命中时生成
+        if content is None and self._uses_keywords():
+            if keyword_provider is not None and not any(kwargs.get(p) for p in _KEYWORD_PARAMS):
+                try:
+                    keywords = keyword_provider() or {}
+                    kwargs = {
+                        **kwargs,
+                        "low_level_keywords": keywords.get("low_level", []),
+                        "high_level_keywords": keywords.get("high_level", []),
+                    }
+                except Exception as e:
+                    print(f"提取缓存关键词失败: {e}")
+            keyword_key = self._get_consistent_key(query, **kwargs)
+            if keyword_key != key:
+                content = self._get_high_quality(keyword_key, query, **kwargs)
+        
+        if content is not None:
+            self.performance_metrics["fast_get_time"] = time.time() - start_time
+            return content
         
         # 尝试向量相似性匹配高质量缓存
         if self.enable_vector_similarity and self.vector_matcher:
@@ -217,6 +306,7 @@ class CacheManager:
                     
                     if cache_item.is_high_quality():
                         cache_item.update_access_stats()
+                        self._record_vector_access(similar_key, cache_item)
                         cache_item.metadata['similarity_score'] = similarity_score
                         cache_item.metadata['matched_via_vector'] = True
                         
@@ -227,6 +317,42 @@ class CacheManager:
         self.performance_metrics["fast_get_time"] = time.time() - start_time
         return None
     
+    def _get_high_quality(self, key: str, query: str, **kwargs) -> Optional[Any]:
+        """按键读取缓存项，只返回高质量内容"""
+        cached_data = self.storage.get(key)
+        if cached_data is None:
+            return None
+        
+        cache_item = CacheItem.from_any(cached_data)
+        if not cache_item.is_high_quality():
+            return None
+        
+        cache_item.update_access_stats()
+        self._record_vector_access(key, cache_item)
+        
+        # 更新上下文历史
+        self._update_strategy_history(query, **kwargs)
+        return cache_item.get_content()
+    
+    def _store(self, query: str, cache_item: CacheItem, **kwargs) -> str:
+        """
+        写入缓存项：主键一份；带关键词的键与主键不同时作为第二个键再写一份
+        
+        两份缓存项都在metadata["cache_keys"]中记录全部键，质量标记和删除会同步处理。
+        
+        返回:
+            str: 主键
+        """
+        key = self._primary_key(query, **kwargs)
+        keys = self._candidate_keys(query, **kwargs)
+        if len(keys) > 1:
+            cache_item.metadata["cache_keys"] = keys
+        
+        item_dict = cache_item.to_dict()
+        for cache_key in keys:
+            self.storage.set(cache_key, item_dict)
+        return key
+    
     def set(self, query: str, result: Any, **kwargs) -> None:
         """设置缓存内容"""
         start_time = time.time()
@@ -234,14 +360,8 @@ class CacheManager:
         # 更新策略历史
         self._update_strategy_history(query, **kwargs)
         
-        # 生成缓存键
-        key = self._get_consistent_key(query, **kwargs)
-        
-        # 包装缓存项
-        cache_item = self._wrap_cache_item(result)
-        
-        # 存储缓存项
-        self.storage.set(key, cache_item.to_dict())
+        # 存储缓存项（主键 + 关键词键）
+        key = self._store(query, self._wrap_cache_item(result), **kwargs)
         
         # 添加到向量索引
         if self.enable_vector_similarity and self.vector_matcher:
@@ -250,6 +370,119 @@ class CacheManager:
         
         self.performance_metrics["set_time"] = time.time() - start_time
     
+    def warm_up(self, entries: List[Tuple[str, Any]], **kwargs) -> None:
+        """
+        批量预热缓存，向量索引对所有查询只做一次批量编码
+        
+        参数:
+            entries: (query, result) 列表
+            **kwargs: 上下文参数，作用于所有条目
+        """
+        start_time = time.time()
+        vector_items = []
+        
+        for query, result in entries:
+            self._update_strategy_history(query, **kwargs)
+            key = self._store(query, self._wrap_cache_item(result), **kwargs)
+            vector_items.append((key, query, self._extract_context_info(**kwargs)))
+        
+        if self.enable_vector_similarity and self.vector_matcher:
+            self.vector_matcher.add_vectors(vector_items)
+        
+        self.performance_metrics["warm_up_time"] = time.time() - start_time
+    
+    def get_or_compute(self, query: str, fn: Callable[[], Any],
+                       coalesce_similar: bool = False,
+                       cacheable: Optional[Callable[[Any], bool]] = None,
+                       timeout: Optional[float] = None,
+                       **kwargs) -> Any:
+        """
+        获取缓存，未命中时计算并写入缓存；同一键的并发未命中只执行一次计算
+        
+        参数:
+            query: 查询字符串
+            fn: 未命中时执行的计算函数，无参数
+            coalesce_similar: 是否也等待向量相似（且上下文一致）的进行中计算
+            cacheable: 判断结果是否写入缓存的函数，默认非None即写入
+            timeout: 等待其他请求计算结果的最长时间（秒），超时后自行计算；
+                默认使用CACHE_SETTINGS["coalesce_timeout"]
+            **kwargs: 上下文参数，与get/set一致
+            
+        返回:
+            缓存内容或计算结果
+        """
+        cached = self.get(query, **kwargs)
+        if cached is not None:
+            return cached
+        
+        key = self._primary_key(query, **kwargs)
+        context_info = self._extract_context_info(**kwargs)
+        embedding = None
+        if coalesce_similar and self.enable_vector_similarity and self.vector_matcher:
+            embedding = self.vector_matcher.encode_queries([query])[0]
+        
+        with self._inflight_lock:
+            flight = self._inflight.get(key) or self._find_similar_inflight(context_info, embedding)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlightComputation(query, context_info, embedding)
+                self._inflight[key] = flight
+        
+        if not is_leader:
+            self.performance_metrics['coalesced'] += 1
+            if flight.done.wait(self.coalesce_timeout if timeout is None else timeout):
+                if flight.error is not None:
+                    raise flight.error
+                if flight.result is not None:
+                    return flight.result
+            else:
+                self.performance_metrics['coalesce_timeouts'] += 1
+            # 等待超时或对方没有结果时自行计算
+            return fn()
+        
+        try:
+            # 上一个计算者可能在本次未命中之后、登记之前写入缓存并退出，登记后再查一次
+            cached_data = self.storage.get(key)
+            if cached_data is not None:
+                result = CacheItem.from_any(cached_data).get_content()
+                flight.result = result
+                return result
+            
+            result = fn()
+            if result is not None and (cacheable is None or cacheable(result)):
+                self.set(query, result, **kwargs)
+            flight.result = result
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+    
+    def _find_similar_inflight(self, context_info: Dict[str, Any], embedding: Any) -> Optional[_InFlightComputation]:
+        """查找与查询向量相似且上下文一致的进行中计算，需持有_inflight_lock"""
+        if embedding is None:
+            return None
+        
+        best, best_score = None, self.vector_matcher.similarity_threshold
+        for flight in self._inflight.values():
+            if flight.embedding is None:
+                continue
+            if flight.context_info.get('thread_id') != context_info.get('thread_id'):
+                continue
+            # 向量均已归一化，内积即余弦相似度
+            score = float(embedding @ flight.embedding)
+            if score >= best_score:
+                best, best_score = flight, score
+        return best
+    
+    def _record_vector_access(self, key: str, cache_item: CacheItem):
+        """将缓存项的访问统计同步给向量匹配器，用于向量淘汰"""
+        if self.enable_vector_similarity and self.vector_matcher:
+            self.vector_matcher.record_access(key, cache_item.metadata)
+    
     def _update_strategy_history(self, query: str, **kwargs):
         """更新策略历史"""
         if isinstance(self.key_strategy, (ContextAwareCacheKeyStrategy, ContextAndKeywordAwareCacheKeyStrategy)):
@@ -267,11 +500,8 @@ class CacheManager:
         """标记缓存质量"""
         start_time = time.time()
         
-        # 生成缓存键
-        key = self._get_consistent_key(query, **kwargs)
-        
-        # 获取缓存项
-        cached_data = self.storage.get(key)
+        # 获取缓存项（主键或关键词键）
+        key, cached_data = self._find_stored(query, **kwargs)
         if cached_data is None:
             self.performance_metrics["mark_time"] = time.time() - start_time
             return False
@@ -287,22 +517,39 @@ class CacheManager:
         if is_positive and cache_item.is_high_quality():
             item_dict["metadata"]["fast_path_eligible"] = True
         
-        self.storage.set(key, item_dict)
+        # 同一缓存项的所有键一起更新
+        for cache_key in cache_item.metadata.get("cache_keys") or [key]:
+            self.storage.set(cache_key, item_dict)
         
         self.performance_metrics["mark_time"] = time.time() - start_time
         return True
     
+    def _find_stored(self, query: str, **kwargs) -> Tuple[Optional[str], Optional[Any]]:
+        """按候选键查找已存储的缓存项，返回 (键, 数据)"""
+        for key in self._candidate_keys(query, **kwargs):
+            cached_data = self.storage.get(key)
+            if cached_data is not None:
+                return key, cached_data
+        return None, None
+    
     def delete(self, query: str, **kwargs) -> bool:
         """删除缓存项"""
-        # 生成缓存键
-        key = self._get_consistent_key(query, **kwargs)
+        keys = self._candidate_keys(query, **kwargs)
+        _, cached_data = self._find_stored(query, **kwargs)
+        if cached_data is not None:
+            keys += CacheItem.from_any(cached_data).metadata.get("cache_keys") or []
+        keys = list(dict.fromkeys(keys))
         
         # 从向量索引中删除
         if self.enable_vector_similarity and self.vector_matcher:
-            self.vector_matcher.remove_vector(key)
+            for key in keys:
+                self.vector_matcher.remove_vector(key)
         
         # 删除缓存项
-        return self.storage.delete(key)
+        deleted = False
+        for key in keys:
+            deleted = self.storage.delete(key) or deleted
+        return deleted
     
     def clear(self) -> None:
         """清空缓存"""
@@ -1,11 +1,15 @@
 import faiss
+import heapq
+from collections import OrderedDict
 import pickle
 import os
+import time
 import threading
-from typing import List, Tuple, Dict, Any
+import numpy as np
+from typing import List, Tuple, Dict, Any, Optional, Iterable
 from .embeddings import EmbeddingProvider, get_cache_embedding_provider
 
-from graphrag_agent.config.settings import similarity_threshold as st
+from graphrag_agent.config.settings import similarity_threshold as st, CACHE_SETTINGS
 
 
 class VectorSimilarityMatcher:
@@ -15,105 +19,238 @@ class VectorSimilarityMatcher:
                  embedding_provider: EmbeddingProvider = None,
                  similarity_threshold: float = st,
                  max_vectors: int = 10000,
-                 index_file: str = None):
+                 index_file: str = None,
+                 eviction_policy: str = None,
+                 compaction_interval: float = None,
+                 embedding_memo_size: int = None):
         """
         初始化向量相似性匹配器
 
         参数:
             embedding_provider: 嵌入向量提供者，如果为None则根据配置自动选择
             similarity_threshold: 相似度阈值
-            max_vectors: 最大向量数量
+            max_vectors: 最大向量数量，同时也是FAISS索引中物理向量数的上限
             index_file: 索引文件路径
+            eviction_policy: 淘汰策略，lru（最近最少使用）或 lfu（最不经常使用）
+            compaction_interval: 后台压缩间隔（秒），0表示只在超出容量时同步压缩
+            embedding_memo_size: 查询向量备忘录容量，get/set同一查询时只编码一次
         """
         self.embedding_provider = embedding_provider or get_cache_embedding_provider()
         self.similarity_threshold = similarity_threshold
         self.max_vectors = max_vectors
         self.index_file = index_file
-        
-        # 初始化FAISS索引
+        self.eviction_policy = eviction_policy or CACHE_SETTINGS["vector_eviction_policy"]
+        self.compaction_interval = (
+            CACHE_SETTINGS["vector_compaction_interval"]
+            if compaction_interval is None
+            else compaction_interval
+        )
+
+        # 初始化FAISS索引，使用ID映射以支持真正的删除
         self.dimension = self.embedding_provider.get_dimension()
-        self.index = faiss.IndexFlatIP(self.dimension)
-        
+        self.index = self._create_index()
+
         # 存储键到向量的映射
         self.key_to_index = {}
         self.index_to_key = {}
         self.key_to_context = {}
         self.key_to_query = {}  # 存储原始查询
-        
+        self.key_to_stats = {}  # 访问统计，驱动淘汰策略
+
+        # 查询向量备忘录（按规范化查询文本），避免同一查询重复调用嵌入模型
+        self.embedding_memo_size = (
+            CACHE_SETTINGS["embedding_memo_size"]
+            if embedding_memo_size is None
+            else embedding_memo_size
+        )
+        self._embedding_memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        # 已逻辑删除、等待从FAISS中物理移除的向量ID
+        self._pending_removals: List[int] = []
+
         self._lock = threading.RLock()
         self._next_index = 0
-        
+
+        # 后台压缩线程，首次出现待移除向量时启动
+        self._compaction_thread = None
+        self._stop_event = threading.Event()
+
         # 如果指定了索引文件，尝试加载
         if self.index_file and os.path.exists(f"{self.index_file}.pkl"):
             self._load_index()
-    
+
+    def _create_index(self):
+        """创建支持按ID删除的FAISS索引"""
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
     def add_vector(self, cache_key: str, query: str, context_info: Dict[str, Any] = None):
         """添加向量到索引"""
         with self._lock:
-            # 如果已存在，先删除
-            if cache_key in self.key_to_index:
-                self.remove_vector(cache_key)
+            self._add_embeddings([(cache_key, query, context_info)], self.encode_queries([query]))
+
+    def add_vectors(self, items: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """
+        批量添加向量，所有未缓存的查询只调用一次嵌入模型，适合批量预热
 
-            # 生成嵌入向量
-            embedding = self.embedding_provider.encode(query)
-            if embedding.ndim == 1:
-                embedding = embedding.reshape(1, -1)
+        参数:
+            items: (cache_key, query, context_info) 列表
+        """
+        items = list(items)
+        if not items:
+            return
+
+        with self._lock:
+            embeddings = self.encode_queries([query for _, query, _ in items])
+            self._add_embeddings(items, embeddings)
+
+    def _add_embeddings(self, items: List[Tuple[str, str, Optional[Dict[str, Any]]]], embeddings: np.ndarray):
+        """将已编码的向量写入索引并更新映射"""
+        with self._lock:
+            # 同一批次内重复的键只保留最后一次
+            latest = {cache_key: i for i, (cache_key, _, _) in enumerate(items)}
+            positions = sorted(latest.values())
+
+            # 如果已存在，先删除
+            for i in positions:
+                if items[i][0] in self.key_to_index:
+                    self.remove_vector(items[i][0])
 
             # 添加到FAISS索引
-            faiss_index = self._next_index
-            self.index.add(embedding)
+            faiss_ids = np.arange(self._next_index, self._next_index + len(positions), dtype=np.int64)
+            self.index.add_with_ids(
+                np.ascontiguousarray(embeddings[positions], dtype=np.float32),
+                faiss_ids
+            )
 
             # 更新映射
-            self.key_to_index[cache_key] = faiss_index
-            self.index_to_key[faiss_index] = cache_key
-            self.key_to_context[cache_key] = context_info or {}
-            self.key_to_query[cache_key] = query
+            now = time.time()
+            for faiss_index, i in zip(faiss_ids.tolist(), positions):
+                cache_key, query, context_info = items[i]
+                self.key_to_index[cache_key] = faiss_index
+                self.index_to_key[faiss_index] = cache_key
+                self.key_to_context[cache_key] = context_info or {}
+                self.key_to_query[cache_key] = query
+                self.key_to_stats[cache_key] = {
+                    "access_count": 0,
+                    "last_accessed": now,
+                    "created_at": now
+                }
 
-            self._next_index += 1
+            self._next_index += len(positions)
 
             # 检查是否超出最大容量
-            if self._next_index > self.max_vectors:
-                self._cleanup_old_vectors()
-    
+            if len(self.key_to_index) > self.max_vectors:
+                self._evict_vectors()
+            if self.index.ntotal > self.max_vectors:
+                self.compact()
+
     def find_similar(self, query: str, context_info: Dict[str, Any] = None, top_k: int = 5) -> List[Tuple[str, float]]:
         """查找相似的缓存键"""
         with self._lock:
-            if self.index.ntotal == 0:
+            if self.index.ntotal == 0 or not self.key_to_index:
                 return []
 
-            # 生成查询向量
-            query_embedding = self.embedding_provider.encode(query)
-            if query_embedding.ndim == 1:
-                query_embedding = query_embedding.reshape(1, -1)
+            # 生成查询向量（优先复用备忘录）
+            query_embedding = self.encode_queries([query])
 
-            # 搜索相似向量
-            scores, indices = self.index.search(query_embedding, min(top_k * 2, self.index.ntotal))
+            # 搜索相似向量，为尚未压缩的已删除向量预留名额
+            search_k = min(top_k * 2 + len(self._pending_removals), self.index.ntotal)
+            scores, indices = self.index.search(
+                np.ascontiguousarray(query_embedding, dtype=np.float32), search_k
+            )
 
             results = []
             for score, idx in zip(scores[0], indices[0]):
-                if idx == -1 or idx >= len(self.index_to_key):
+                if idx == -1:
                     continue
 
-                if idx in self.index_to_key:
-                    cache_key = self.index_to_key[idx]
+                cache_key = self.index_to_key.get(int(idx))
+                if cache_key is None:
+                    continue
 
-                    # 检查上下文匹配
-                    if self._context_matches(context_info, self.key_to_context.get(cache_key, {})):
-                        if score >= self.similarity_threshold:
-                            results.append((cache_key, float(score)))
+                # 检查上下文匹配
+                if self._context_matches(context_info, self.key_to_context.get(cache_key, {})):
+                    if score >= self.similarity_threshold:
+                        results.append((cache_key, float(score)))
 
             # 按相似度排序
             results.sort(key=lambda x: x[1], reverse=True)
             return results[:top_k]
-    
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """规范化查询文本，作为查询向量备忘录的键"""
+        return " ".join(str(query).split()).lower()
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        编码一组查询，命中备忘录的直接复用，其余去重后一次性批量编码
+
+        参数:
+            queries: 查询列表
+
+        返回:
+            np.ndarray: 与输入顺序一致的向量矩阵
+        """
+        with self._lock:
+            normalized = [self._normalize_query(q) for q in queries]
+
+            missing = []
+            for text in normalized:
+                if text in self._embedding_memo:
+                    self._embedding_memo.move_to_end(text)
+                elif text not in missing:
+                    missing.append(text)
+
+            if missing:
+                encoded = self.embedding_provider.encode(missing)
+                if encoded.ndim == 1:
+                    encoded = encoded.reshape(1, -1)
+                for text, vector in zip(missing, encoded):
+                    self._remember_embedding(text, np.asarray(vector, dtype=np.float32))
+
+            # 备忘录容量小于本批数量时，直接使用本次编码结果
+            fresh = dict(zip(missing, encoded)) if missing else {}
+            rows = [
+                self._embedding_memo[text] if text in self._embedding_memo else fresh[text]
+                for text in normalized
+            ]
+            return np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+
+    def _remember_embedding(self, text: str, vector: np.ndarray):
+        """写入查询向量备忘录，超出容量时淘汰最久未用的条目"""
+        if self.embedding_memo_size <= 0:
+            return
+        self._embedding_memo[text] = vector
+        self._embedding_memo.move_to_end(text)
+        while len(self._embedding_memo) > self.embedding_memo_size:
+            self._embedding_memo.popitem(last=False)
+
+    def record_access(self, cache_key: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        记录缓存项的访问，用于LRU/LFU淘汰
+
+        参数:
+            cache_key: 缓存键
+            metadata: CacheItem的元数据，提供时直接采用其中的访问统计
+        """
+        with self._lock:
+            stats = self.key_to_stats.get(cache_key)
+            if stats is None:
+                return
+
+            metadata = metadata or {}
+            stats["access_count"] = max(stats["access_count"] + 1, metadata.get("access_count") or 0)
+            stats["last_accessed"] = metadata.get("last_accessed") or time.time()
+
     def remove_vector(self, cache_key: str):
         """从索引中移除向量"""
         with self._lock:
             if cache_key not in self.key_to_index:
                 return
-            
+
             faiss_index = self.key_to_index[cache_key]
-            
+
             # 从映射中删除
             del self.key_to_index[cache_key]
             if faiss_index in self.index_to_key:
@@ -122,7 +259,28 @@ class VectorSimilarityMatcher:
                 del self.key_to_context[cache_key]
             if cache_key in self.key_to_query:
                 del self.key_to_query[cache_key]
-    
+            if cache_key in self.key_to_stats:
+                del self.key_to_stats[cache_key]
+
+            # 记录待物理删除的向量，由压缩统一处理
+            self._pending_removals.append(faiss_index)
+            self._ensure_compaction_thread()
+
+    def compact(self) -> int:
+        """
+        从FAISS索引中物理移除已删除的向量
+
+        返回:
+            int: 移除的向量数量
+        """
+        with self._lock:
+            if not self._pending_removals:
+                return 0
+
+            removed = self.index.remove_ids(np.array(self._pending_removals, dtype=np.int64))
+            self._pending_removals.clear()
+            return int(removed)
+
     def clear(self):
         """清空所有向量"""
         with self._lock:
@@ -131,55 +289,99 @@ class VectorSimilarityMatcher:
             self.index_to_key.clear()
             self.key_to_context.clear()
             self.key_to_query.clear()
+            self.key_to_stats.clear()
+            self._pending_removals.clear()
+            self._embedding_memo.clear()
             self._next_index = 0
-    
+
+    def close(self):
+        """停止后台压缩线程并完成最后一次压缩"""
+        self._stop_event.set()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join(timeout=1)
+            self._compaction_thread = None
+        self.compact()
+
     def _context_matches(self, context1: Dict[str, Any], context2: Dict[str, Any]) -> bool:
         """检查两个上下文是否匹配"""
         if not context1 and not context2:
             return True
-        
+
         if not context1 or not context2:
             return False
-        
+
         # 检查线程ID是否匹配
         thread_id1 = context1.get('thread_id', 'default')
         thread_id2 = context2.get('thread_id', 'default')
-        
+
         return thread_id1 == thread_id2
-    
-    def _cleanup_old_vectors(self):
-        """清理旧向量以保持在最大容量内"""
-        # 重建索引，保留最近的向量
-        pass
-    
+
+    def _evict_vectors(self):
+        """按淘汰策略移除向量，使数量回落到最大容量的90%"""
+        num_to_evict = len(self.key_to_index) - self.max_vectors + max(1, self.max_vectors // 10)
+
+        if self.eviction_policy == "lfu":
+            def score(key):
+                stats = self.key_to_stats.get(key, {})
+                return (stats.get("access_count", 0), stats.get("last_accessed", 0))
+        else:
+            def score(key):
+                return self.key_to_stats.get(key, {}).get("last_accessed", 0)
+
+        for key in heapq.nsmallest(num_to_evict, self.key_to_index.keys(), key=score):
+            self.remove_vector(key)
+
+    def _ensure_compaction_thread(self):
+        """按需启动后台压缩线程"""
+        if self.compaction_interval <= 0 or self._compaction_thread is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(self.compaction_interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"向量索引压缩失败: {e}")
+
+        self._compaction_thread = threading.Thread(target=run, name="vector-index-compaction", daemon=True)
+        self._compaction_thread.start()
+
     def save_index(self, file_path: str = None):
         """保存索引到文件"""
         if file_path is None:
             file_path = self.index_file
-        
+
         if file_path is None:
             return
-        
+
         with self._lock:
             try:
+                # 保存前先压缩，避免持久化已删除的向量
+                self.compact()
+
                 data = {
                     'key_to_index': self.key_to_index,
                     'index_to_key': self.index_to_key,
                     'key_to_context': self.key_to_context,
                     'key_to_query': self.key_to_query,
+                    'key_to_stats': self.key_to_stats,
                     'next_index': self._next_index
                 }
-                
+
                 # 保存FAISS索引
                 if self.index.ntotal > 0:
                     faiss.write_index(self.index, f"{file_path}.faiss")
-                
+
+                    # 同时保存原始向量，索引文件缺失或损坏时无需重新调用嵌入模型
+                    ids, vectors = self._export_vectors()
+                    np.savez(f"{file_path}.vectors.npz", ids=ids, vectors=vectors)
+
                 # 保存映射关系
                 with open(f"{file_path}.pkl", 'wb') as f:
                     pickle.dump(data, f)
             except Exception as e:
                 print(f"保存向量索引失败: {e}")
-    
+
     def _load_index(self):
         """从文件加载索引"""
         try:
@@ -190,36 +392,105 @@ class VectorSimilarityMatcher:
                 self.index_to_key = data.get('index_to_key', {})
                 self.key_to_context = data.get('key_to_context', {})
                 self.key_to_query = data.get('key_to_query', {})
+                self.key_to_stats = data.get('key_to_stats', {})
                 self._next_index = data.get('next_index', 0)
-            
+
+            # 旧版本没有访问统计，补齐默认值
+            now = time.time()
+            for key in self.key_to_index:
+                self.key_to_stats.setdefault(key, {
+                    "access_count": 0,
+                    "last_accessed": now,
+                    "created_at": now
+                })
+
             # 加载FAISS索引
             faiss_file = f"{self.index_file}.faiss"
+            index = None
             if os.path.exists(faiss_file):
-                self.index = faiss.read_index(faiss_file)
-            else:
-                # 如果FAISS文件不存在，重建索引
+                try:
+                    index = faiss.read_index(faiss_file)
+                except Exception as e:
+                    print(f"读取FAISS索引失败，将使用持久化向量重建: {e}")
+
+            if index is None:
+                # 如果FAISS文件不存在或已损坏，重建索引
                 self._rebuild_index()
-                
+            elif isinstance(index, faiss.IndexIDMap2):
+                self.index = index
+            else:
+                # 旧版本的IndexFlatIP按位置编号，转换为ID映射索引
+                self._migrate_flat_index(index)
+
         except Exception as e:
             print(f"加载向量索引失败: {e}")
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self.index = self._create_index()
             self.key_to_index.clear()
             self.index_to_key.clear()
             self.key_to_context.clear()
             self.key_to_query.clear()
+            self.key_to_stats.clear()
             self._next_index = 0
-    
+
+    def _migrate_flat_index(self, flat_index):
+        """将按位置编号的旧索引迁移为ID映射索引，丢弃已删除的行"""
+        self.index = self._create_index()
+
+        live_ids = [idx for idx in sorted(self.index_to_key) if idx < flat_index.ntotal]
+        if live_ids:
+            vectors = flat_index.reconstruct_n(0, flat_index.ntotal)[live_ids]
+            self.index.add_with_ids(
+                np.ascontiguousarray(vectors, dtype=np.float32),
+                np.array(live_ids, dtype=np.int64)
+            )
+
+        # 移除索引中不存在向量的映射
+        for idx in [idx for idx in self.index_to_key if idx >= flat_index.ntotal]:
+            cache_key = self.index_to_key.pop(idx)
+            self.key_to_index.pop(cache_key, None)
+            self.key_to_context.pop(cache_key, None)
+            self.key_to_query.pop(cache_key, None)
+            self.key_to_stats.pop(cache_key, None)
+
+    def _export_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """导出索引中的全部向量ID与向量"""
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        vectors = faiss.downcast_index(self.index.index).reconstruct_n(0, self.index.ntotal)
+        return ids, vectors
+
+    def _load_saved_vectors(self) -> Dict[int, np.ndarray]:
+        """加载持久化的原始向量"""
+        vector_file = f"{self.index_file}.vectors.npz"
+        if not os.path.exists(vector_file):
+            return {}
+
+        try:
+            data = np.load(vector_file)
+            if data["vectors"].ndim != 2 or data["vectors"].shape[1] != self.dimension:
+                return {}
+            return {int(i): v for i, v in zip(data["ids"], data["vectors"])}
+        except Exception as e:
+            print(f"加载持久化向量失败: {e}")
+            return {}
+
     def _rebuild_index(self):
-        """重建FAISS索引"""
+        """重建FAISS索引，优先使用持久化的向量，仅对缺失的查询批量编码"""
         if not self.key_to_query:
             return
-        
+
         # 重新创建索引
-        self.index = faiss.IndexFlatIP(self.dimension)
-        
+        self.index = self._create_index()
+
+        saved_vectors = self._load_saved_vectors()
+        keys = list(self.key_to_query.keys())
+        missing = [key for key in keys if self.key_to_index[key] not in saved_vectors]
+
+        if missing:
+            encoded = self.encode_queries([self.key_to_query[key] for key in missing])
+            for key, vector in zip(missing, encoded):
+                saved_vectors[self.key_to_index[key]] = vector
+
         # 重新添加所有向量
-        for cache_key, query in self.key_to_query.items():
-            embedding = self.embedding_provider.encode(query)
-            if embedding.ndim == 1:
-                embedding = embedding.reshape(1, -1)
-            self.index.add(embedding)
\ No newline at end of file
+        ids = np.array([self.key_to_index[key] for key in keys], dtype=np.int64)
+        vectors = np.vstack([saved_vectors[int(i)] for i in ids])
+        self.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
@@ -1,13 +1,15 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict
+import hashlib
+import json
 from langchain_community.graphs import Neo4jGraph
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from graphrag_agent.models.get_models import get_llm_model
+from graphrag_agent.models.get_models import get_llm_model, get_embeddings_model
 import concurrent.futures
 import time
 
-from graphrag_agent.config.settings import MAX_WORKERS
+from graphrag_agent.config.settings import MAX_WORKERS, EMBEDDING_BATCH_SIZE, COMMUNITY_INDEX_SETTINGS
 from graphrag_agent.config.prompts import COMMUNITY_SUMMARY_PROMPT
 
 class BaseCommunityDescriber:
@@ -44,6 +46,24 @@ class BaseCommunityDescriber:
         except Exception as e:
             print(f"格式化社区信息时出错: {e}")
             return f"Error: {str(e)}\nData: {str(data)}"
+    
+    @staticmethod
+    def fingerprint(data: Dict) -> str:
+        """
+        计算社区内容指纹：成员实体和社区内关系（含类型与描述）排序后的哈希
+        
+        与社区ID无关，成员和关系不变时重新检测社区也得到相同的指纹。
+        """
+        nodes = sorted(
+            (str(node.get('id')), str(node.get('type')), str(node.get('description') or ''))
+            for node in data.get('nodes', [])
+        )
+        rels = sorted(
+            (str(rel.get('start')), str(rel.get('type')), str(rel.get('end')), str(rel.get('description') or ''))
+            for rel in data.get('rels', [])
+        )
+        payload = json.dumps([nodes, rels], ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
 
 class BaseCommunityRanker:
     """社区权重计算工具"""
@@ -89,6 +109,28 @@ class BaseCommunityStorer:
     def __init__(self, graph: Neo4jGraph):
         self.graph = graph
     
+    def load_summaries(self, fingerprints: List[str]) -> List[Dict]:
+        """查询指纹命中的已有社区摘要（包括其他社区ID下的摘要）"""
+        if not fingerprints:
+            return []
+        try:
+            self.graph.query(
+                "CREATE INDEX IF NOT EXISTS FOR (c:__Community__) ON (c.summary_fingerprint)"
+            )
+            return self.graph.query("""
+            UNWIND $fingerprints AS fingerprint
+            MATCH (c:__Community__ {summary_fingerprint: fingerprint})
+            WHERE c.summary IS NOT NULL
+            RETURN c.id AS community,
+                   c.summary_fingerprint AS fingerprint,
+                   c.summary AS summary,
+                   c.full_content AS full_content,
+                   c.embedding AS embedding
+            """, params={"fingerprints": fingerprints})
+        except Exception as e:
+            print(f"查询已有社区摘要时出错: {e}")
+            return []
+    
     def store_summaries(self, summaries: List[Dict]) -> None:
         """存储社区摘要"""
         if not summaries:
@@ -111,6 +153,8 @@ class BaseCommunityStorer:
                 MERGE (c:__Community__ {id:row.community})
                 SET c.summary = row.summary, 
                     c.full_content = row.full_content,
+                    c.summary_fingerprint = row.fingerprint,
+                    c.embedding = row.embedding,
                     c.summary_created_at = datetime()
                 """, params={"data": batch})
                 
@@ -129,11 +173,115 @@ class BaseCommunityStorer:
                 MERGE (c:__Community__ {id:$community})
                 SET c.summary = $summary, 
                     c.full_content = $full_content,
+                    c.summary_fingerprint = $fingerprint,
+                    c.embedding = $embedding,
                     c.summary_created_at = datetime()
-                """, params=summary)
+                """, params={
+                    "fingerprint": None,
+                    "embedding": None,
+                    **summary
+                })
             except Exception as e:
                 print(f"存储单个社区摘要时出错: {e}")
 
+class BaseCommunityIndexer:
+    """社区摘要向量与索引工具"""
+    
+    def __init__(self, graph: Neo4jGraph, embeddings=None):
+        self.graph = graph
+        self.embeddings = embeddings
+        self.vector_index = COMMUNITY_INDEX_SETTINGS["vector_index"]
+        self.fulltext_index = COMMUNITY_INDEX_SETTINGS["fulltext_index"]
+    
+    def index_summaries(self, summaries: List[Dict]) -> None:
+        """为刚写入的摘要计算向量，并确保向量索引和全文索引存在"""
+        start_time = time.time()
+        self.ensure_fulltext_index()
+        
+        rows = [
+            {"community": s["community"], "summary": s["summary"]}
+            for s in summaries if s.get("summary")
+        ]
+        # 之前构建的社区可能还没有向量，一并补齐
+        rows += self._missing_embeddings(exclude={row["community"] for row in rows})
+        if not rows:
+            return
+        
+        try:
+            if self.embeddings is None:
+                self.embeddings = get_embeddings_model()
+            
+            dimension = None
+            for i in range(0, len(rows), EMBEDDING_BATCH_SIZE):
+                batch = rows[i:i+EMBEDDING_BATCH_SIZE]
+                vectors = self.embeddings.embed_documents([row["summary"] for row in batch])
+                self.graph.query("""
+                UNWIND $data AS row
+                MATCH (c:__Community__ {id:row.community})
+                SET c.embedding = row.embedding
+                """, params={"data": [
+                    {"community": row["community"], "embedding": vector}
+                    for row, vector in zip(batch, vectors)
+                ]})
+                if vectors and dimension is None:
+                    dimension = len(vectors[0])
+            
+            if dimension:
+                self.ensure_vector_index(dimension)
+            print(f"社区摘要向量写入完成，共 {len(rows)} 个社区，"
+                  f"耗时: {time.time() - start_time:.2f}秒")
+        except Exception as e:
+            print(f"生成社区摘要向量时出错: {e}")
+    
+    def _missing_embeddings(self, exclude: set) -> List[Dict]:
+        """查找有摘要但没有向量的社区"""
+        try:
+            result = self.graph.query("""
+            MATCH (c:__Community__)
+            WHERE c.summary IS NOT NULL AND c.embedding IS NULL
+            RETURN c.id AS community, c.summary AS summary
+            """)
+            return [row for row in result if row["community"] not in exclude]
+        except Exception as e:
+            print(f"查询缺少向量的社区时出错: {e}")
+            return []
+    
+    def ensure_vector_index(self, dimension: int) -> None:
+        """创建社区摘要向量索引（余弦相似度）"""
+        try:
+            self.graph.query(f"""
+            CREATE VECTOR INDEX {self.vector_index} IF NOT EXISTS
+            FOR (c:__Community__) ON (c.embedding)
+            OPTIONS {{indexConfig: {{
+                `vector.dimensions`: {int(dimension)},
+                `vector.similarity_function`: 'cosine'
+            }}}}
+            """)
+        except Exception:
+            # 旧版本Neo4j不支持CREATE VECTOR INDEX语法，改用过程创建
+            try:
+                exists = self.graph.query(
+                    "SHOW INDEXES YIELD name WHERE name = $name RETURN name",
+                    params={"name": self.vector_index}
+                )
+                if not exists:
+                    self.graph.query(
+                        "CALL db.index.vector.createNodeIndex($name, '__Community__', 'embedding', $dimension, 'cosine')",
+                        params={"name": self.vector_index, "dimension": int(dimension)}
+                    )
+            except Exception as e:
+                print(f"创建社区向量索引时出错: {e}")
+    
+    def ensure_fulltext_index(self) -> None:
+        """创建社区摘要和内容的全文索引"""
+        try:
+            self.graph.query(f"""
+            CREATE FULLTEXT INDEX {self.fulltext_index} IF NOT EXISTS
+            FOR (c:__Community__) ON EACH [c.summary, c.full_content]
+            """)
+        except Exception as e:
+            print(f"创建社区全文索引时出错: {e}")
+
 class BaseSummarizer(ABC):
     """社区摘要生成器基类"""
     
@@ -144,14 +292,17 @@ class BaseSummarizer(ABC):
         self.describer = BaseCommunityDescriber()
         self.ranker = BaseCommunityRanker(graph)
         self.storer = BaseCommunityStorer(graph)
+        self.indexer = BaseCommunityIndexer(graph)
         self._setup_llm_chain()
         
         # 性能监控
         self.llm_time = 0
         self.query_time = 0
         self.store_time = 0
+        self.index_time = 0
         
         self.max_workers = MAX_WORKERS
+        self.incremental = COMMUNITY_INDEX_SETTINGS["incremental_summary"]
         print(f"社区摘要生成器初始化，并行线程数: {self.max_workers}")
 
     def _setup_llm_chain(self) -> None:
@@ -172,7 +323,16 @@ class BaseSummarizer(ABC):
         pass
 
     def process_communities(self) -> List[Dict]:
-        """处理所有社区"""
+        """
+        处理所有社区
+        
+        每个社区按成员和关系计算指纹：指纹与社区上次的摘要一致时跳过，
+        与其他社区（例如重新检测前的旧社区ID）的摘要一致时直接复制摘要和向量，
+        只有指纹没有命中的社区才调用LLM生成摘要。
+        
+        Returns:
+            List[Dict]: 本次收集到的全部社区的摘要
+        """
         total_start_time = time.time()
         print("开始处理社区摘要...")
         
@@ -191,24 +351,34 @@ class BaseSummarizer(ABC):
                 print("没有找到需要处理的社区")
                 return []
             
+            # 按指纹复用已有摘要
+            pending, reused, unchanged = self._match_existing_summaries(community_info)
+            
             # 并行生成摘要
             llm_start = time.time()
-            optimal_workers = min(self.max_workers, max(1, len(community_info) // 2))
-            print(f"开始并行生成 {len(community_info)} 个社区摘要，"
-                  f"使用 {optimal_workers} 个线程...")
-            
-            summaries = self._process_communities_parallel(
-                community_info, 
-                optimal_workers
-            )
+            summaries = []
+            if pending:
+                optimal_workers = min(self.max_workers, max(1, len(pending) // 2))
+                print(f"开始并行生成 {len(pending)} 个社区摘要，"
+                      f"使用 {optimal_workers} 个线程...")
+                
+                summaries = self._process_communities_parallel(
+                    pending, 
+                    optimal_workers
+                )
             
             self.llm_time = time.time() - llm_start
             
-            # 保存摘要
+            # 保存摘要（未变化的社区无需写入）
             store_start = time.time()
-            self.storer.store_summaries(summaries)
+            self.storer.store_summaries(summaries + reused)
             self.store_time = time.time() - store_start
             
+            # 摘要向量和检索索引（复用的摘要已带向量）
+            index_start = time.time()
+            self.indexer.index_summaries(summaries)
+            self.index_time = time.time() - index_start
+            
             # 输出性能统计
             total_time = time.time() - total_start_time
             self._print_performance_stats(
@@ -217,12 +387,56 @@ class BaseSummarizer(ABC):
                 self.store_time
             )
             
-            return summaries
+            return [
+                {key: s.get(key) for key in ("community", "summary", "full_content", "fingerprint")}
+                for s in summaries + reused + unchanged
+            ]
             
         except Exception as e:
             print(f"处理社区摘要时出错: {str(e)}")
             raise
     
+    def _match_existing_summaries(self, community_info: List[Dict]):
+        """
+        按指纹把社区分为待生成、可复用和未变化三类
+        
+        Args:
+            community_info: 社区信息列表，会为每项写入fingerprint
+            
+        Returns:
+            Tuple: (待生成的社区信息, 复用的摘要行, 未变化的摘要行)
+        """
+        for info in community_info:
+            info['fingerprint'] = self.describer.fingerprint(info)
+        
+        if not self.incremental:
+            return community_info, [], []
+        
+        existing = self.storer.load_summaries(
+            list({info['fingerprint'] for info in community_info})
+        )
+        by_fingerprint = {}
+        current = {}
+        for row in existing:
+            by_fingerprint.setdefault(row['fingerprint'], row)
+            current[row['community']] = row
+        
+        pending, reused, unchanged = [], [], []
+        for info in community_info:
+            community_id = info.get('communityId')
+            fingerprint = info['fingerprint']
+            own = current.get(community_id)
+            if own is not None and own['fingerprint'] == fingerprint:
+                unchanged.append({**own, "community": community_id})
+            elif fingerprint in by_fingerprint:
+                reused.append({**by_fingerprint[fingerprint], "community": community_id})
+            else:
+                pending.append(info)
+        
+        print(f"社区摘要增量统计: 未变化 {len(unchanged)} 个, 复用 {len(reused)} 个, "
+              f"需要生成 {len(pending)} 个")
+        return pending, reused, unchanged
+    
     def _process_communities_parallel(
         self, 
         community_info: List[Dict], 
@@ -262,7 +476,8 @@ class BaseSummarizer(ABC):
                 return {
                     "community": community_id,
                     "summary": "此社区没有足够的信息生成摘要。",
-                    "full_content": stringify_info
+                    "full_content": stringify_info,
+                    "fingerprint": community.get('fingerprint')
                 }
             
             summary = self.community_chain.invoke({'community_info': stringify_info})
@@ -270,7 +485,8 @@ class BaseSummarizer(ABC):
             return {
                 "community": community_id,
                 "summary": summary,
-                "full_content": stringify_info
+                "full_content": stringify_info,
+                "fingerprint": community.get('fingerprint')
             }
         except Exception as e:
             print(f"处理社区 {community_id} 摘要时出错: {e}")
@@ -294,3 +510,4 @@ class BaseSummarizer(ABC):
         print(f"  社区信息查询: {query_time:.2f}秒 ({query_time/total_time*100:.1f}%)")
         print(f"  摘要生成(LLM): {llm_time:.2f}秒 ({llm_time/total_time*100:.1f}%)")
         print(f"  结果存储: {store_time:.2f}秒 ({store_time/total_time*100:.1f}%)")
+        print(f"  向量与索引: {self.index_time:.2f}秒 ({self.index_time/total_time*100:.1f}%)")
@@ -98,6 +98,8 @@ community_algorithm = os.getenv("GRAPH_COMMUNITY_ALGORITHM", "leiden")
 CHUNK_SIZE = _get_env_int("CHUNK_SIZE", 500) or 500  # 文本分块大小
 OVERLAP = _get_env_int("CHUNK_OVERLAP", 100) or 100  # 分块重叠长度
 MAX_TEXT_LENGTH = _get_env_int("MAX_TEXT_LENGTH", 500000) or 500000  # 最大文本长度
+CHUNK_WORKERS = _get_env_int("CHUNK_WORKERS", 1) or 1  # 分块进程数，1为串行
+TOKENIZE_BATCH_SIZE = _get_env_int("TOKENIZE_BATCH_SIZE", 32) or 32  # 每次送入分词器的段落数
 similarity_threshold = _get_env_float("SIMILARITY_THRESHOLD", 0.9) or 0.9  # 向量相似度阈值
 
 # ===== 回答生成配置 =====
@@ -135,6 +137,62 @@ EMBEDDING_BATCH_SIZE = _get_env_int("EMBEDDING_BATCH_SIZE", 64) or 64  # 向量
 LLM_BATCH_SIZE = _get_env_int("LLM_BATCH_SIZE", 5) or 5  # LLM 批次
 COMMUNITY_BATCH_SIZE = _get_env_int("COMMUNITY_BATCH_SIZE", 50) or 50  # 社区批次大小
 
+# 异步实体抽取：全局并发窗口随限流和吞吐自适应调整
+EXTRACTION_ASYNC_SETTINGS = {
+    "enabled": _get_env_bool("EXTRACTION_ASYNC_ENABLED", True),
+    "initial_concurrency": _get_env_int("EXTRACTION_INITIAL_CONCURRENCY", MAX_WORKERS)
+    or MAX_WORKERS,
+    "min_concurrency": _get_env_int("EXTRACTION_MIN_CONCURRENCY", 1) or 1,
+    "max_concurrency": _get_env_int("EXTRACTION_MAX_CONCURRENCY", 32) or 32,
+    "request_timeout": _get_env_float("EXTRACTION_REQUEST_TIMEOUT", 120.0) or 120.0,
+    "max_retries": _get_env_int("EXTRACTION_MAX_RETRIES", 5) or 5,
+    "adjust_interval": _get_env_float("EXTRACTION_ADJUST_INTERVAL", 10.0) or 10.0,
+}
+
+# 抽取结果写入图数据库：原生 UNWIND/MERGE 批量写入
+GRAPH_WRITE_SETTINGS = {
+    "native": _get_env_bool("GRAPH_WRITE_NATIVE", True),
+    "rows_per_tx": _get_env_int("GRAPH_WRITE_ROWS_PER_TX", 5000) or 5000,
+    "parallel_sessions": _get_env_int("GRAPH_WRITE_PARALLEL_SESSIONS", 4) or 4,
+}
+
+# 流式构建：读取 → 分块 → 结构写入 → 抽取 → 图写入，各阶段通过有界队列衔接
+INGESTION_STREAMING_SETTINGS = {
+    "enabled": _get_env_bool("INGESTION_STREAMING_ENABLED", False),
+    "chunk_workers": _get_env_int("INGESTION_CHUNK_WORKERS", 2) or 2,
+    "struct_workers": _get_env_int("INGESTION_STRUCT_WORKERS", 2) or 2,
+    "queue_size": _get_env_int("INGESTION_QUEUE_SIZE", 4) or 4,
+    "max_pending_chunks": _get_env_int("INGESTION_MAX_PENDING_CHUNKS", 256) or 256,
+}
+
+# 增量更新的文件变更检测
+FILE_CHANGE_SETTINGS = {
+    "hash_workers": _get_env_int("FILE_HASH_WORKERS", 4) or 4,
+    "hash_buffer_size": _get_env_int("FILE_HASH_BUFFER_SIZE", 1024 * 1024) or 1024 * 1024,
+    "watch": _get_env_bool("FILE_WATCH_ENABLED", False),
+}
+
+# ===== 图快照配置 =====
+
+GRAPH_SNAPSHOT_SETTINGS = {
+    "enabled": _get_env_bool("GRAPH_SNAPSHOT_ENABLED", True),
+    "check_interval": _get_env_float("GRAPH_SNAPSHOT_CHECK_INTERVAL", 5.0) or 5.0,
+    "fetch_batch_size": _get_env_int("GRAPH_SNAPSHOT_FETCH_BATCH_SIZE", 5000) or 5000,
+    "changelog_size": _get_env_int("GRAPH_SNAPSHOT_CHANGELOG_SIZE", 200) or 200,
+    "expand_limit": _get_env_int("GRAPH_SNAPSHOT_EXPAND_LIMIT", 100) or 100,
+    "retry_interval": _get_env_float("GRAPH_SNAPSHOT_RETRY_INTERVAL", 60.0) or 60.0,
+}
+
+# 实体名称索引（查询中的实体识别，随图版本增量刷新）
+ENTITY_NAME_INDEX_SETTINGS = {
+    "enabled": _get_env_bool("ENTITY_NAME_INDEX_ENABLED", True),
+    "min_name_length": _get_env_int("ENTITY_NAME_MIN_LENGTH", 2) or 2,
+    # 查询基本由已知实体名称组成时直接用实体作为关键词，不再调用LLM提取
+    "skip_llm_keywords": _get_env_bool("ENTITY_LINKING_SKIP_LLM", True),
+    # 实体名称覆盖查询中字母数字字符的比例达到该值时才跳过LLM
+    "skip_llm_min_coverage": _get_env_float("ENTITY_LINKING_SKIP_LLM_COVERAGE", 0.8) or 0.8,
+}
+
 # ===== GDS 相关配置 =====
 
 GDS_MEMORY_LIMIT = _get_env_int("GDS_MEMORY_LIMIT", 6) or 6  # GDS 内存限制(GB)
@@ -186,6 +244,12 @@ CACHE_SETTINGS = {
     "memory_only": _get_env_bool("CACHE_MEMORY_ONLY", False),
     "max_memory_size": _get_env_int("CACHE_MAX_MEMORY_SIZE", 100) or 100,
     "max_disk_size": _get_env_int("CACHE_MAX_DISK_SIZE", 1000) or 1000,
+    "disk_backend": _get_env_choice("CACHE_DISK_BACKEND", {"file", "segment"}, "file"),
+    "shared_enabled": _get_env_bool("CACHE_SHARED_ENABLED", False),
+    "shared_dir": Path(
+        os.getenv("CACHE_SHARED_DIR", CACHE_DIR / "shared")
+    ).expanduser(),
+    "shared_shards": _get_env_int("CACHE_SHARED_SHARDS", 4) or 4,
     "thread_safe": _get_env_bool("CACHE_THREAD_SAFE", True),
     "enable_vector_similarity": _get_env_bool(
         "CACHE_ENABLE_VECTOR_SIMILARITY", True
@@ -195,6 +259,25 @@ CACHE_SETTINGS = {
     )
     or similarity_threshold,
     "max_vectors": _get_env_int("CACHE_MAX_VECTORS", 10000) or 10000,
+    "vector_eviction_policy": _get_env_choice(
+        "CACHE_VECTOR_EVICTION_POLICY", {"lru", "lfu"}, "lru"
+    ),
+    "vector_compaction_interval": _get_env_float(
+        "CACHE_VECTOR_COMPACTION_INTERVAL", 300.0
+    ),
+    "embedding_memo_size": _get_env_int("CACHE_EMBEDDING_MEMO_SIZE", 1024) or 0,
+    # get_or_compute中等待其他请求计算结果的最长时间（秒），超时后自行计算
+    "coalesce_timeout": _get_env_float("CACHE_COALESCE_TIMEOUT", 120.0) or 120.0,
+}
+
+# 按 (模型, 文本哈希) 持久化的嵌入向量缓存，所有索引构建与查询共用
+EMBEDDING_CACHE_SETTINGS = {
+    "enabled": _get_env_bool("EMBEDDING_CACHE_ENABLED", True),
+    "path": Path(
+        os.getenv("EMBEDDING_CACHE_PATH", CACHE_DIR / "embeddings" / "embeddings.db")
+    ).expanduser(),
+    # 查询向量只在进程内按LRU保留，不写入持久化存储
+    "query_memo_size": _get_env_int("EMBEDDING_QUERY_MEMO_SIZE", 1024) or 0,
 }
 
 # ===== Neo4j 连接配置 =====
@@ -276,10 +359,33 @@ LOCAL_SEARCH_SETTINGS = {
 GLOBAL_SEARCH_SETTINGS = {
     "default_level": _get_env_int("GLOBAL_SEARCH_LEVEL", 0) or 0,
     "community_batch_size": _get_env_int("GLOBAL_SEARCH_BATCH_SIZE", 5) or 5,
+    "map_token_budget": _get_env_int("GLOBAL_SEARCH_MAP_TOKEN_BUDGET", 6000) or 6000,
+    "map_concurrency": _get_env_int("GLOBAL_SEARCH_MAP_CONCURRENCY", 4) or 4,
+    "reduce_token_budget": _get_env_int("GLOBAL_SEARCH_REDUCE_TOKEN_BUDGET", 12000) or 12000,
+}
+
+# 社区摘要的向量索引和全文索引（写入摘要时建立，全局搜索和社区增强共用）
+COMMUNITY_INDEX_SETTINGS = {
+    "vector_index": os.getenv("COMMUNITY_VECTOR_INDEX_NAME", "community_vector"),
+    "fulltext_index": os.getenv("COMMUNITY_FULLTEXT_INDEX_NAME", "community_fulltext"),
+    "candidate_limit": _get_env_int("COMMUNITY_SEARCH_CANDIDATES", 20) or 20,
+    # 按社区成员指纹复用已有摘要，只为内容变化的社区重新调用LLM
+    "incremental_summary": _get_env_bool("COMMUNITY_SUMMARY_INCREMENTAL", True),
 }
 
 NAIVE_SEARCH_TOP_K = _get_env_int("NAIVE_SEARCH_TOP_K", 3) or 3
 
+CHUNK_VECTOR_INDEX_SETTINGS = {
+    "enabled": _get_env_bool("CHUNK_INDEX_ENABLED", True),
+    "dir": Path(
+        os.getenv("CHUNK_INDEX_DIR", CACHE_DIR / "chunk_index")
+    ).expanduser(),
+    "sync_interval": _get_env_float("CHUNK_INDEX_SYNC_INTERVAL", 60.0) or 60.0,
+    "fetch_batch_size": _get_env_int("CHUNK_INDEX_FETCH_BATCH_SIZE", 1000) or 1000,
+    "ivf_threshold": _get_env_int("CHUNK_INDEX_IVF_THRESHOLD", 20000) or 20000,
+    "nprobe": _get_env_int("CHUNK_INDEX_NPROBE", 16) or 16,
+}
+
 HYBRID_SEARCH_SETTINGS = {
     "entity_limit": _get_env_int("HYBRID_SEARCH_ENTITY_LIMIT", 15) or 15,
     "max_hop_distance": _get_env_int("HYBRID_SEARCH_MAX_HOP", 2) or 2,
@@ -2,6 +2,16 @@ from graphrag_agent.graph.core import (
     GraphConnectionManager, 
     connection_manager,
     BaseIndexer,
+    GraphSnapshot,
+    GraphSnapshotManager,
+    SnapshotEdge,
+    get_graph_snapshot,
+    get_graph_version,
+    mark_graph_changed,
+    EntityMatch,
+    EntityNameIndex,
+    EntityNameIndexManager,
+    get_entity_name_index,
     timer,
     generate_hash,
     batch_process,
@@ -42,6 +52,16 @@ __all__ = [
     'GraphConnectionManager',
     'connection_manager',
     'BaseIndexer',
+    'GraphSnapshot',
+    'GraphSnapshotManager',
+    'SnapshotEdge',
+    'get_graph_snapshot',
+    'get_graph_version',
+    'mark_graph_changed',
+    'EntityMatch',
+    'EntityNameIndex',
+    'EntityNameIndexManager',
+    'get_entity_name_index',
     'timer',
     'generate_hash',
     'batch_process',
@@ -1,5 +1,19 @@
 from .graph_connection import GraphConnectionManager, connection_manager
 from .base_indexer import BaseIndexer
+from .graph_snapshot import (
+    GraphSnapshot,
+    GraphSnapshotManager,
+    SnapshotEdge,
+    get_graph_snapshot,
+    get_graph_version,
+    mark_graph_changed
+)
+from .entity_name_index import (
+    EntityMatch,
+    EntityNameIndex,
+    EntityNameIndexManager,
+    get_entity_name_index
+)
 from .utils import (
     timer, 
     generate_hash, 
@@ -13,6 +27,16 @@ __all__ = [
     'GraphConnectionManager',
     'connection_manager',
     'BaseIndexer',
+    'GraphSnapshot',
+    'GraphSnapshotManager',
+    'SnapshotEdge',
+    'get_graph_snapshot',
+    'get_graph_version',
+    'mark_graph_changed',
+    'EntityMatch',
+    'EntityNameIndex',
+    'EntityNameIndexManager',
+    'get_entity_name_index',
     'timer',
     'generate_hash',
     'batch_process',
@@ -0,0 +1,286 @@
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from graphrag_agent.config.settings import ENTITY_NAME_INDEX_SETTINGS, GRAPH_SNAPSHOT_SETTINGS
+from graphrag_agent.graph.core.graph_snapshot import (
+    VersionedCacheManager,
+    add_graph_change_listener,
+    get_changed_entities,
+    get_graph_version,
+)
+
+
+# 转移表的键为 (状态 << 21) | 字符码位，Unicode码位不超过21位
+_CHAR_BITS = 21
+
+
+class EntityMatch(NamedTuple):
+    """查询中识别出的一个实体名称（位置对应转成小写后的文本）"""
+    start: int
+    end: int
+    name: str
+    entity_ids: Tuple[str, ...]
+
+
+def _is_word_char(char: str) -> bool:
+    """是否为ASCII字母或数字"""
+    return char.isascii() and char.isalnum()
+
+
+class EntityNameIndex:
+    """
+    实体名称的Aho-Corasick自动机
+
+    一次扫描找出文本中出现的全部实体名称（忽略大小写），耗时只与文本长度和命中数有关，
+    与实体数量无关。名称可以对应多个实体：实体自身以及消歧得到的canonical_id实体。
+    """
+
+    def __init__(self, names: Dict[str, Sequence[str]], version: int = 0):
+        """
+        构建自动机
+
+        Args:
+            names: 名称到实体ID列表的映射
+            version: 构建时的图版本
+        """
+        self.version = version
+        self.targets: Dict[str, Tuple[str, ...]] = {}
+        for name, entity_ids in names.items():
+            key = name.lower()
+            if key:
+                merged = self.targets.get(key, ()) + tuple(entity_ids)
+                self.targets[key] = tuple(dict.fromkeys(merged))
+
+        goto: Dict[int, int] = {}
+        parent = [0]
+        chars = [0]
+        depth = [0]
+        term = [0]
+        for name in self.targets:
+            state = 0
+            for char in name:
+                key = (state << _CHAR_BITS) | ord(char)
+                nxt = goto.get(key)
+                if nxt is None:
+                    nxt = len(parent)
+                    goto[key] = nxt
+                    parent.append(state)
+                    chars.append(ord(char))
+                    depth.append(depth[state] + 1)
+                    term.append(0)
+                state = nxt
+            term[state] = len(name)
+
+        # 按深度顺序计算失败指针，父节点的失败指针总是先算好
+        fail = [0] * len(parent)
+        output = [0] * len(parent)
+        for state in sorted(range(1, len(parent)), key=depth.__getitem__):
+            if parent[state]:
+                fallback = fail[parent[state]]
+                while True:
+                    nxt = goto.get((fallback << _CHAR_BITS) | chars[state])
+                    if nxt is not None or fallback == 0:
+                        fail[state] = nxt or 0
+                        break
+                    fallback = fail[fallback]
+            # output指向失败链上最近的名称结尾状态
+            fallback = fail[state]
+            output[state] = fallback if term[fallback] else output[fallback]
+
+        self._goto = goto
+        self._fail = fail
+        self._term = term
+        self._output = output
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def lookup(self, name: str) -> Tuple[str, ...]:
+        """按完整名称查找实体ID"""
+        return self.targets.get(name.lower(), ())
+
+    def find(self, text: str, overlapping: bool = False) -> List[EntityMatch]:
+        """
+        找出文本中出现的实体名称
+
+        由ASCII字母数字组成的名称要求两侧不是字母数字，避免在单词内部命中。
+
+        Args:
+            text: 待识别的文本
+            overlapping: 是否返回互相重叠的全部命中；默认只保留最左最长的不重叠命中
+
+        Returns:
+            List[EntityMatch]: 按出现位置排序的命中
+        """
+        text = text.lower()
+        goto, fail, term, output = self._goto, self._fail, self._term, self._output
+        spans = []
+        state = 0
+        for i, char in enumerate(text):
+            code = ord(char)
+            while True:
+                nxt = goto.get((state << _CHAR_BITS) | code)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            hit = state if term[state] else output[state]
+            while hit:
+                start, end = i + 1 - term[hit], i + 1
+                if not (
+                    (start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]))
+                    or (end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end]))
+                ):
+                    spans.append((start, end))
+                hit = output[hit]
+
+        spans.sort(key=lambda span: (span[0], span[0] - span[1]))
+        matches = []
+        covered = 0
+        for start, end in spans:
+            if not overlapping and start < covered:
+                continue
+            name = text[start:end]
+            matches.append(EntityMatch(start, end, name, self.targets[name]))
+            covered = max(covered, end)
+        return matches
+
+    def entity_ids(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """
+        文本中提到的实体ID，按出现顺序去重
+
+        Args:
+            text: 待识别的文本
+            limit: 最多返回的实体数
+
+        Returns:
+            List[str]: 实体ID列表
+        """
+        ids = list(dict.fromkeys(
+            entity_id for match in self.find(text) for entity_id in match.entity_ids
+        ))
+        return ids[:limit] if limit is not None else ids
+
+
+class EntityNameIndexManager(VersionedCacheManager):
+    """
+    名称索引的加载与刷新
+
+    与图快照共用图版本和变更记录：版本未变直接复用；增量变更只重新读取受影响实体的
+    名称和canonical_id，再用更新后的名称表重建自动机；其余情况全量读取。
+    首次加载在后台进行，完成前get()返回None，查询回退到LLM关键词提取。
+    """
+
+    name = "实体名称索引"
+
+    def __init__(self, graph=None, check_interval: Optional[float] = None,
+                 min_name_length: Optional[int] = None, fetch_batch_size: Optional[int] = None,
+                 retry_interval: Optional[float] = None):
+        """
+        初始化名称索引管理器
+
+        Args:
+            graph: Neo4j图数据库对象，为空时使用全局连接
+            check_interval: 两次版本检查的最小间隔（秒）
+            min_name_length: 参与识别的名称最短长度
+            fetch_batch_size: 增量刷新时每次查询的实体数
+            retry_interval: 首次加载失败后重试的间隔（秒）
+        """
+        super().__init__(check_interval, retry_interval)
+        self._graph = graph
+        self.min_name_length = max(1, min_name_length or ENTITY_NAME_INDEX_SETTINGS["min_name_length"])
+        self.fetch_batch_size = max(1, fetch_batch_size or GRAPH_SNAPSHOT_SETTINGS["fetch_batch_size"])
+        # 实体ID -> 该实体贡献的 (名称, 实体ID列表)
+        self._rows: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._value: Optional[EntityNameIndex] = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from graphrag_agent.config.neo4jdb import get_db_manager
+            self._graph = get_db_manager().get_graph()
+        return self._graph
+
+    def _refresh(self) -> None:
+        """根据版本差异选择增量更新或全量加载"""
+        version, full_version = get_graph_version(self.graph)
+        current = self._value
+        if current is not None and current.version == version:
+            return
+
+        changed = None
+        if current is not None and current.version < version and full_version <= current.version:
+            changed = get_changed_entities(self.graph, current.version, version)
+
+        start = time.time()
+        if changed is None:
+            self._rows = self._fetch_rows()
+        else:
+            changed_ids = sorted(changed)
+            for entity_id in changed_ids:
+                self._rows.pop(entity_id, None)
+            for i in range(0, len(changed_ids), self.fetch_batch_size):
+                self._rows.update(self._fetch_rows(changed_ids[i:i + self.fetch_batch_size]))
+
+        self._value = self._build(version)
+        mode = "全量加载" if changed is None else f"增量更新 {len(changed)} 个实体"
+        print(f"实体名称索引{mode}: {len(self._value)} 个名称, 版本 {version}, "
+              f"耗时 {time.time() - start:.2f}秒")
+
+    def _fetch_rows(self, entity_ids: Optional[List[str]] = None) -> Dict[str, Tuple[str, Tuple[str, ...]]]:
+        """读取实体名称和canonical_id，entity_ids为空时读取全部实体"""
+        if entity_ids is None:
+            results = self.graph.query("""
+            MATCH (e:`__Entity__`)
+            WHERE e.id IS NOT NULL
+            RETURN e.id AS id, e.canonical_id AS canonical_id
+            """)
+        else:
+            results = self.graph.query("""
+            UNWIND $ids AS entity_id
+            MATCH (e:`__Entity__` {id: entity_id})
+            RETURN e.id AS id, e.canonical_id AS canonical_id
+            """, params={"ids": entity_ids})
+
+        rows = {}
+        for row in results:
+            entity_id = str(row["id"])
+            canonical_id = row.get("canonical_id")
+            # 别名同时指向自身和消歧后的规范实体
+            targets = (entity_id,) if not canonical_id or canonical_id == entity_id else (entity_id, str(canonical_id))
+            rows[entity_id] = (entity_id.strip().lower(), targets)
+        return rows
+
+    def _build(self, version: int) -> EntityNameIndex:
+        names: Dict[str, List[str]] = {}
+        for name, targets in self._rows.values():
+            if len(name) >= self.min_name_length:
+                names.setdefault(name, []).extend(targets)
+        return EntityNameIndex(names, version)
+
+
+_manager: Optional[EntityNameIndexManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_entity_name_index() -> Optional[EntityNameIndex]:
+    """
+    获取进程内共享的实体名称索引
+
+    Returns:
+        Optional[EntityNameIndex]: 名称索引；未启用、首次加载尚未完成或加载失败时返回None，
+            调用方应回退到原有检索方式
+    """
+    global _manager
+    if not ENTITY_NAME_INDEX_SETTINGS["enabled"]:
+        return None
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = EntityNameIndexManager()
+                add_graph_change_listener(_manager.invalidate)
+    return _manager.get()
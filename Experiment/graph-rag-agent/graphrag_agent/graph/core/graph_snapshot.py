@@ -0,0 +1,811 @@
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from graphrag_agent.config.settings import GRAPH_SNAPSHOT_SETTINGS
+
+
+# 图版本记录：构建流程和图编辑在写入后递增版本，增量变更同时记录受影响的实体
+GRAPH_META_LABEL = "__GraphMeta__"
+GRAPH_CHANGE_LABEL = "__GraphChange__"
+
+# 同一进程内依赖图版本的缓存（快照、实体名称索引等），图变更后立即失效
+_change_listeners: List[Callable[[], None]] = []
+
+
+class SnapshotEdge(NamedTuple):
+    """快照中的一条关系（保持Neo4j中的原始方向）"""
+    source: str
+    target: str
+    type: str
+    weight: float
+
+
+def get_graph_version(graph) -> Tuple[int, int]:
+    """
+    读取图版本
+
+    Args:
+        graph: Neo4j图数据库对象
+
+    Returns:
+        Tuple[int, int]: (当前版本, 最近一次全量变更的版本)，从未记录过时为 (0, 0)
+    """
+    result = graph.query(
+        f"MATCH (m:`{GRAPH_META_LABEL}` {{id: 'graph'}}) "
+        "RETURN m.version AS version, m.full_version AS full_version"
+    )
+    if not result:
+        return 0, 0
+    return int(result[0].get("version") or 0), int(result[0].get("full_version") or 0)
+
+
+def get_changed_entities(graph, since: int, version: int) -> Optional[Set[str]]:
+    """
+    读取两个版本之间的增量变更
+
+    Args:
+        graph: Neo4j图数据库对象
+        since: 起始版本（不含）
+        version: 截止版本（含）
+
+    Returns:
+        Optional[Set[str]]: 变更涉及的实体ID；变更记录不完整（已被清理或包含全量变更）时返回None
+    """
+    changes = graph.query(
+        f"MATCH (c:`{GRAPH_CHANGE_LABEL}`) WHERE c.version > $since AND c.version <= $version "
+        "RETURN c.entity_ids AS entity_ids",
+        params={"since": since, "version": version}
+    )
+    if len(changes) != version - since:
+        return None
+
+    changed = set()
+    for change in changes:
+        changed.update(change.get("entity_ids") or [])
+    return changed
+
+
+def add_graph_change_listener(callback: Callable[[], None]) -> None:
+    """
+    注册图变更回调，本进程调用mark_graph_changed后触发
+
+    Args:
+        callback: 无参数回调，通常是缓存的invalidate方法
+    """
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+
+def mark_graph_changed(graph, entity_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    记录一次图变更并递增版本
+
+    Args:
+        graph: Neo4j图数据库对象
+        entity_ids: 关系发生变化的实体ID；为None表示全量变更（如重新构建）
+
+    Returns:
+        int: 新的版本号，记录失败时返回0
+    """
+    ids = None if entity_ids is None else sorted({str(entity_id) for entity_id in entity_ids})
+    try:
+        result = graph.query(f"""
+        MERGE (m:`{GRAPH_META_LABEL}` {{id: 'graph'}})
+        WITH m, coalesce(m.version, 0) + 1 AS next
+        SET m.version = next,
+            m.full_version = CASE WHEN $entity_ids IS NULL THEN next ELSE coalesce(m.full_version, 0) END,
+            m.updated_at = datetime()
+        FOREACH (_ IN CASE WHEN $entity_ids IS NULL THEN [] ELSE [1] END |
+            CREATE (:`{GRAPH_CHANGE_LABEL}` {{version: next, entity_ids: $entity_ids, created_at: datetime()}})
+        )
+        RETURN next AS version
+        """, params={"entity_ids": ids})
+        version = int(result[0]["version"]) if result else 0
+
+        # 只保留最近的变更记录，落后太多的快照直接全量重建
+        graph.query(
+            f"MATCH (c:`{GRAPH_CHANGE_LABEL}`) WHERE c.version <= $oldest DETACH DELETE c",
+            params={"oldest": version - GRAPH_SNAPSHOT_SETTINGS["changelog_size"]}
+        )
+    except Exception as e:
+        print(f"记录图版本失败: {e}")
+        return 0
+
+    # 同一进程内的快照等缓存下次访问时立即检查版本
+    for callback in list(_change_listeners):
+        try:
+            callback()
+        except Exception as e:
+            print(f"图变更回调失败: {e}")
+    return version
+
+
+class VersionedCacheManager:
+    """
+    按图版本刷新的进程内缓存（图快照、实体名称索引）的公共加载逻辑
+
+    首次加载在后台线程进行，完成前get()返回None，调用方回退到Cypher查询，
+    不会有请求因等待全图加载而阻塞；加载失败后间隔retry_interval秒再重试。
+    已有数据时按check_interval检查版本，由一个调用线程刷新，其他线程继续使用旧数据。
+    子类实现_refresh()，根据版本差异更新self._value。
+    """
+
+    name = "缓存"
+
+    def __init__(self, check_interval: Optional[float] = None, retry_interval: Optional[float] = None):
+        """
+        初始化
+
+        Args:
+            check_interval: 两次版本检查的最小间隔（秒）
+            retry_interval: 首次加载失败后重试的间隔（秒）
+        """
+        self.check_interval = (
+            check_interval if check_interval is not None else GRAPH_SNAPSHOT_SETTINGS["check_interval"]
+        )
+        self.retry_interval = (
+            retry_interval if retry_interval is not None else GRAPH_SNAPSHOT_SETTINGS["retry_interval"]
+        )
+        self._value = None
+        self._last_check = 0.0
+        self._retry_at = 0.0
+        self._loading = False
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """下次访问时立即检查版本"""
+        self._last_check = 0.0
+
+    def get(self):
+        """
+        获取最新数据，不阻塞调用方
+
+        Returns:
+            数据；首次加载尚未完成或失败时返回None
+        """
+        value = self._value
+        if value is None:
+            self._start_initial_load()
+            return self._value
+        if time.time() - self._last_check < self.check_interval:
+            return value
+
+        # 其他线程正在刷新时直接使用旧数据
+        if not self._lock.acquire(blocking=False):
+            return value
+        try:
+            if time.time() - self._last_check >= self.check_interval:
+                self._refresh_once()
+            return self._value
+        finally:
+            self._lock.release()
+
+    def load(self):
+        """
+        在当前线程同步加载或刷新（离线任务和测试使用）
+
+        Returns:
+            加载后的数据，失败时为None
+        """
+        with self._lock:
+            self._refresh_once()
+            return self._value
+
+    def _refresh_once(self) -> None:
+        """刷新一次，失败只打印错误，需持有锁"""
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"刷新{self.name}失败: {e}")
+        self._last_check = time.time()
+
+    def _start_initial_load(self) -> None:
+        """启动后台首次加载；已在加载或处于失败退避期时不重复启动"""
+        with self._state_lock:
+            if self._loading or time.time() < self._retry_at:
+                return
+            self._loading = True
+        threading.Thread(target=self._initial_load, name=f"{type(self).__name__}-load", daemon=True).start()
+
+    def _initial_load(self) -> None:
+        try:
+            with self._lock:
+                if self._value is None:
+                    self._refresh_once()
+            if self._value is None:
+                self._retry_at = time.time() + self.retry_interval
+        finally:
+            with self._state_lock:
+                self._loading = False
+
+    def _refresh(self) -> None:
+        raise NotImplementedError
+
+
+def _gather(indptr: np.ndarray, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    取出一组节点在CSR中的全部位置
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (每个位置所属的节点, 在邻接数组中的下标)
+    """
+    starts = indptr[frontier]
+    lengths = indptr[frontier + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+    return np.repeat(frontier, lengths), offsets
+
+
+def _first_seen(values: np.ndarray) -> np.ndarray:
+    """去重并保持首次出现的顺序，返回保留元素的下标"""
+    _, first = np.unique(values, return_index=True)
+    return np.sort(first)
+
+
+class GraphSnapshot:
+    """
+    __Entity__图的只读CSR快照
+
+    实体映射为连续的整数下标，关系以COO数组（源、目标、类型编码、权重）保存，
+    并按源节点和目标节点各建一份CSR，出边、入边和无向邻居都能以切片取得。
+    BFS、k跳扩展、最短路径、路径枚举和个性化PageRank全部在内存中完成，
+    Neo4j只用于补全最终结果的节点属性。
+    """
+
+    def __init__(self, ids: List[str], index: Dict[str, int],
+                 src: np.ndarray, dst: np.ndarray, etype: np.ndarray, weight: np.ndarray,
+                 rel_types: List[str], version: int = 0):
+        """
+        初始化快照
+
+        Args:
+            ids: 下标到实体ID的映射（删除的实体保留槽位）
+            index: 实体ID到下标的映射（只包含仍然存在的实体）
+            src: 关系源节点下标
+            dst: 关系目标节点下标
+            etype: 关系类型编码
+            weight: 关系权重
+            rel_types: 关系类型编码表
+            version: 对应的图版本
+        """
+        self.ids = ids
+        self.index = index
+        self.src = src
+        self.dst = dst
+        self.etype = etype
+        self.weight = weight
+        self.rel_types = rel_types
+        self.version = version
+        self.loaded_at = time.time()
+
+        n = len(ids)
+        self.out_indptr, self.out_eid = self._build_csr(src, n)
+        self.out_nbr = dst[self.out_eid]
+        self.in_indptr, self.in_eid = self._build_csr(dst, n)
+        self.in_nbr = src[self.in_eid]
+        self._undirected = None
+
+    @staticmethod
+    def _build_csr(keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """按keys分组构建 (indptr, 关系下标)"""
+        order = np.argsort(keys, kind="stable").astype(np.int64)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+        return indptr, order
+
+    @classmethod
+    def from_edges(cls, entity_ids: Sequence[str], edges: Iterable[Tuple[str, str, str, float]],
+                   version: int = 0) -> "GraphSnapshot":
+        """
+        由实体ID和关系列表构建快照
+
+        Args:
+            entity_ids: 全部实体ID
+            edges: (源ID, 目标ID, 关系类型, 权重)
+            version: 图版本
+
+        Returns:
+            GraphSnapshot: 快照
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        index = {entity_id: i for i, entity_id in enumerate(ids)}
+        rel_codes: Dict[str, int] = {}
+        src, dst, etype, weight = [], [], [], []
+        for source, target, rel_type, rel_weight in edges:
+            for entity_id in (source, target):
+                if entity_id not in index:
+                    index[entity_id] = len(ids)
+                    ids.append(entity_id)
+            src.append(index[source])
+            dst.append(index[target])
+            etype.append(rel_codes.setdefault(rel_type, len(rel_codes)))
+            weight.append(rel_weight)
+
+        return cls(
+            ids, index,
+            np.asarray(src, dtype=np.int64),
+            np.asarray(dst, dtype=np.int64),
+            np.asarray(etype, dtype=np.int32),
+            np.asarray(weight, dtype=np.float32),
+            list(rel_codes),
+            version,
+        )
+
+    # ----- 基本访问 -----
+
+    @property
+    def node_count(self) -> int:
+        return len(self.index)
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.src.shape[0])
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self.index
+
+    def _indices(self, entity_ids: Iterable[str]) -> np.ndarray:
+        """实体ID转下标，忽略不存在的实体"""
+        return np.asarray(
+            list(dict.fromkeys(self.index[e] for e in entity_ids if e in self.index)), dtype=np.int64
+        )
+
+    def edge(self, eid: int) -> SnapshotEdge:
+        """按关系下标取出关系"""
+        return SnapshotEdge(
+            self.ids[self.src[eid]], self.ids[self.dst[eid]],
+            self.rel_types[self.etype[eid]], float(self.weight[eid])
+        )
+
+    def _expand(self, frontier: np.ndarray, direction: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        展开一层邻居
+
+        Args:
+            frontier: 当前层节点下标
+            direction: "out"（出边）、"in"（入边）或"both"（无向）
+
+        Returns:
+            Tuple: (来源节点, 邻居节点, 关系下标)
+        """
+        origins, neighbors, eids = [], [], []
+        if direction in ("out", "both"):
+            origin, offsets = _gather(self.out_indptr, frontier)
+            origins.append(origin)
+            neighbors.append(self.out_nbr[offsets])
+            eids.append(self.out_eid[offsets])
+        if direction in ("in", "both"):
+            origin, offsets = _gather(self.in_indptr, frontier)
+            origins.append(origin)
+            neighbors.append(self.in_nbr[offsets])
+            eids.append(self.in_eid[offsets])
+        return np.concatenate(origins), np.concatenate(neighbors), np.concatenate(eids)
+
+    def neighbors(self, entity_ids: Iterable[str], direction: str = "both",
+                  exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, SnapshotEdge]]:
+        """
+        获取一组实体的全部邻接关系
+
+        Args:
+            entity_ids: 实体ID列表
+            direction: "out"、"in"或"both"
+            exclude: 邻居在此集合中的关系不返回
+
+        Returns:
+            List[Tuple[str, SnapshotEdge]]: (邻居实体ID, 关系)
+        """
+        frontier = self._indices(entity_ids)
+        if frontier.size == 0:
+            return []
+        _, neighbor, eid = self._expand(frontier, direction)
+        if exclude:
+            keep = ~np.isin(neighbor, self._indices(exclude))
+            neighbor, eid = neighbor[keep], eid[keep]
+        return [(self.ids[n], self.edge(e)) for n, e in zip(neighbor.tolist(), eid.tolist())]
+
+    # ----- 遍历 -----
+
+    def bfs(self, sources: Iterable[str], max_depth: int, direction: str = "both",
+            max_nodes: Optional[int] = None) -> Dict[str, int]:
+        """
+        多源BFS
+
+        Args:
+            sources: 起始实体ID
+            max_depth: 最大跳数
+            direction: "out"、"in"或"both"
+            max_nodes: 返回节点数上限（按距离由近到远截断）
+
+        Returns:
+            Dict[str, int]: 实体ID到距离的映射（按距离排序）
+        """
+        depth = self._depths(self._indices(sources), max_depth, direction, max_nodes)
+        reached = np.flatnonzero(depth >= 0)
+        reached = reached[np.argsort(depth[reached], kind="stable")]
+        return {self.ids[i]: int(depth[i]) for i in reached}
+
+    def _depths(self, frontier: np.ndarray, max_depth: int, direction: str,
+                max_nodes: Optional[int] = None) -> np.ndarray:
+        """BFS距离数组，未到达的节点为-1"""
+        depth = np.full(len(self.ids), -1, dtype=np.int32)
+        if frontier.size == 0:
+            return depth
+        depth[frontier] = 0
+        count = frontier.size
+        for level in range(1, max_depth + 1):
+            _, neighbor, _ = self._expand(frontier, direction)
+            neighbor = neighbor[depth[neighbor] < 0]
+            if neighbor.size == 0:
+                break
+            frontier = neighbor[_first_seen(neighbor)]
+            if max_nodes is not None and count + frontier.size > max_nodes:
+                frontier = frontier[:max(0, max_nodes - count)]
+            depth[frontier] = level
+            count += frontier.size
+            if max_nodes is not None and count >= max_nodes:
+                break
+        return depth
+
+    def k_hop_edges(self, sources: Iterable[str], k: int, direction: str = "out",
+                    max_edges_per_hop: Optional[int] = None) -> List[SnapshotEdge]:
+        """
+        逐层扩展k跳，返回扩展过程中经过的关系
+
+        每一层从上一层新发现的节点出发；超过max_edges_per_hop时优先保留权重大的关系。
+
+        Args:
+            sources: 起始实体ID
+            k: 跳数
+            direction: "out"、"in"或"both"
+            max_edges_per_hop: 每一层保留的关系数上限
+
+        Returns:
+            List[SnapshotEdge]: 按层次顺序排列的关系
+        """
+        frontier = self._indices(sources)
+        visited = np.zeros(len(self.ids), dtype=bool)
+        visited[frontier] = True
+        collected: List[np.ndarray] = []
+        for _ in range(k):
+            if frontier.size == 0:
+                break
+            _, neighbor, eid = self._expand(frontier, direction)
+            if eid.size == 0:
+                break
+            if max_edges_per_hop is not None and eid.size > max_edges_per_hop:
+                keep = np.sort(np.argsort(-self.weight[eid], kind="stable")[:max_edges_per_hop])
+                neighbor, eid = neighbor[keep], eid[keep]
+            collected.append(eid)
+            fresh = neighbor[~visited[neighbor]]
+            frontier = fresh[_first_seen(fresh)]
+            visited[frontier] = True
+
+        if not collected:
+            return []
+        eids = np.concatenate(collected)
+        return [self.edge(e) for e in eids[_first_seen(eids)]]
+
+    def shortest_path(self, source: str, target: str, max_hops: int,
+                      direction: str = "both") -> Optional[List[SnapshotEdge]]:
+        """
+        BFS求最短路径
+
+        Args:
+            source: 起点实体ID
+            target: 终点实体ID
+            max_hops: 最大跳数
+            direction: "out"、"in"或"both"
+
+        Returns:
+            Optional[List[SnapshotEdge]]: 路径上的关系，不可达时返回None
+        """
+        if source not in self.index or target not in self.index:
+            return None
+        start, goal = self.index[source], self.index[target]
+        if start == goal:
+            return []
+
+        n = len(self.ids)
+        parent = np.full(n, -1, dtype=np.int64)
+        parent_edge = np.full(n, -1, dtype=np.int64)
+        seen = np.zeros(n, dtype=bool)
+        seen[start] = True
+        frontier = np.asarray([start], dtype=np.int64)
+        for _ in range(max_hops):
+            origin, neighbor, eid = self._expand(frontier, direction)
+            fresh = ~seen[neighbor]
+            origin, neighbor, eid = origin[fresh], neighbor[fresh], eid[fresh]
+            if neighbor.size == 0:
+                return None
+            keep = _first_seen(neighbor)
+            frontier = neighbor[keep]
+            parent[frontier] = origin[keep]
+            parent_edge[frontier] = eid[keep]
+            seen[frontier] = True
+            if seen[goal]:
+                break
+        if not seen[goal]:
+            return None
+
+        path = []
+        node = goal
+        while node != start:
+            path.append(self.edge(parent_edge[node]))
+            node = parent[node]
+        return path[::-1]
+
+    def paths(self, source: str, target: str, max_depth: int, limit: int = 10,
+              direction: str = "both") -> List[List[SnapshotEdge]]:
+        """
+        枚举简单路径（节点不重复），短路径优先
+
+        source与target相同时枚举经过source的环路。
+
+        Args:
+            source: 起点实体ID
+            target: 终点实体ID
+            max_depth: 最大路径长度
+            limit: 返回路径数上限
+            direction: "out"、"in"或"both"
+
+        Returns:
+            List[List[SnapshotEdge]]: 路径列表
+        """
+        if source not in self.index or target not in self.index or limit <= 0:
+            return []
+        start, goal = self.index[source], self.index[target]
+
+        # 反向BFS得到各节点到终点的距离，用于剪枝
+        reverse = {"out": "in", "in": "out"}.get(direction, "both")
+        to_goal = self._depths(np.asarray([goal], dtype=np.int64), max_depth, reverse)
+
+        results: List[List[int]] = []
+        for length in range(1, max_depth + 1):
+            self._collect_paths(start, goal, length, direction, to_goal, limit, results)
+            if len(results) >= limit:
+                break
+        return [[self.edge(e) for e in path] for path in results[:limit]]
+
+    def _collect_paths(self, start: int, goal: int, length: int, direction: str,
+                       to_goal: np.ndarray, limit: int, results: List[List[int]]) -> None:
+        """
+        深度优先收集长度恰好为length的路径
+
+        中间节点不重复，因此只有回到起点的环路可能重复使用同一条关系（无向时沿原边返回），
+        到达终点时拒绝已在路径中的关系；自环在无向展开中出现两次，结果按关系序列去重。
+        """
+        stack = [(start, [], {start})]
+        while stack and len(results) < limit:
+            node, path, on_path = stack.pop()
+            remaining = length - len(path)
+            _, neighbor, eid = self._expand(np.asarray([node], dtype=np.int64), direction)
+            # 逆序入栈，保证按邻接顺序展开
+            for nxt, e in zip(neighbor[::-1].tolist(), eid[::-1].tolist()):
+                if nxt == goal:
+                    if remaining == 1 and e not in path and path + [e] not in results:
+                        results.append(path + [e])
+                    continue
+                if remaining > 1 and nxt not in on_path and 0 <= to_goal[nxt] <= remaining - 1:
+                    stack.append((nxt, path + [e], on_path | {nxt}))
+
+    def personalized_pagerank(self, seeds: Iterable[str], alpha: float = 0.85, max_iter: int = 50,
+                              tol: float = 1e-6, top_k: Optional[int] = 20,
+                              include_seeds: bool = False) -> List[Tuple[str, float]]:
+        """
+        以种子实体为重启分布的个性化PageRank（无向、按关系权重）
+
+        Args:
+            seeds: 种子实体ID
+            alpha: 沿关系游走的概率
+            max_iter: 最大迭代次数
+            tol: L1收敛阈值
+            top_k: 返回的实体数，None表示全部
+            include_seeds: 结果中是否包含种子实体
+
+        Returns:
+            List[Tuple[str, float]]: (实体ID, 分数)，按分数降序
+        """
+        seed_idx = self._indices(seeds)
+        n = len(self.ids)
+        if seed_idx.size == 0 or n == 0:
+            return []
+
+        if self._undirected is None:
+            sources = np.concatenate([self.src, self.dst])
+            targets = np.concatenate([self.dst, self.src])
+            weights = np.clip(np.concatenate([self.weight, self.weight]).astype(np.float64), 1e-12, None)
+            out_weight = np.bincount(sources, weights=weights, minlength=n)
+            self._undirected = (sources, targets, weights, out_weight)
+        sources, targets, weights, out_weight = self._undirected
+
+        restart = np.zeros(n)
+        restart[seed_idx] = 1.0 / seed_idx.size
+        dangling = out_weight == 0
+        share = np.divide(weights, out_weight[sources], out=np.zeros_like(weights), where=out_weight[sources] > 0)
+
+        rank = restart.copy()
+        for _ in range(max_iter):
+            updated = alpha * np.bincount(targets, weights=rank[sources] * share, minlength=n)
+            updated += ((1 - alpha) + alpha * rank[dangling].sum()) * restart
+            converged = np.abs(updated - rank).sum() < tol
+            rank = updated
+            if converged:
+                break
+
+        alive = np.zeros(n, dtype=bool)
+        alive[list(self.index.values())] = True
+        if not include_seeds:
+            alive[seed_idx] = False
+        candidates = np.flatnonzero(alive & (rank > 0))
+        order = candidates[np.argsort(-rank[candidates], kind="stable")]
+        if top_k is not None:
+            order = order[:top_k]
+        return [(self.ids[i], float(rank[i])) for i in order]
+
+
+class GraphSnapshotManager(VersionedCacheManager):
+    """
+    快照的加载与刷新
+
+    按check_interval检查图版本：版本未变直接复用；只有增量变更时重新拉取受影响实体的
+    关系并合并到新快照；出现全量变更、变更记录缺失或版本回退（数据库被清空）时全量重建。
+    首次加载在后台进行，刷新期间其他线程继续使用旧快照。
+    """
+
+    name = "图快照"
+
+    def __init__(self, graph=None, check_interval: Optional[float] = None,
+                 fetch_batch_size: Optional[int] = None, retry_interval: Optional[float] = None):
+        """
+        初始化快照管理器
+
+        Args:
+            graph: Neo4j图数据库对象，为空时使用全局连接
+            check_interval: 两次版本检查的最小间隔（秒）
+            fetch_batch_size: 每次查询拉取的实体数
+            retry_interval: 首次加载失败后重试的间隔（秒）
+        """
+        super().__init__(check_interval, retry_interval)
+        self._graph = graph
+        self.fetch_batch_size = max(1, fetch_batch_size or GRAPH_SNAPSHOT_SETTINGS["fetch_batch_size"])
+        self._value: Optional[GraphSnapshot] = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from graphrag_agent.config.neo4jdb import get_db_manager
+            self._graph = get_db_manager().get_graph()
+        return self._graph
+
+    def _refresh(self) -> None:
+        """根据版本差异选择增量合并或全量重建"""
+        version, full_version = get_graph_version(self.graph)
+        current = self._value
+        if current is not None and current.version == version:
+            return
+
+        if current is None or version < current.version or full_version > current.version:
+            self._value = self._load_full(version)
+            return
+
+        changed = get_changed_entities(self.graph, current.version, version)
+        if changed is None:
+            self._value = self._load_full(version)
+            return
+        self._value = self._apply_delta(current, changed, version)
+
+    def _fetch_edges(self, entity_ids: List[str], undirected: bool = False) -> List[Tuple[str, str, str, float]]:
+        """
+        分批拉取实体的关系
+
+        无向拉取时两端都在entity_ids中的关系会返回两次，按关系的elementId去重；
+        端点、类型和权重都相同的平行关系是不同的关系，全部保留。
+        """
+        pattern = "-[r]-" if undirected else "-[r]->"
+        edges = []
+        seen = set()
+        for i in range(0, len(entity_ids), self.fetch_batch_size):
+            rows = self.graph.query(f"""
+            UNWIND $ids AS entity_id
+            MATCH (e:`__Entity__` {{id: entity_id}}){pattern}(other:`__Entity__`)
+            RETURN elementId(r) AS rel_id, startNode(r).id AS source, endNode(r).id AS target,
+                   type(r) AS type, r.weight AS weight
+            """, params={"ids": entity_ids[i:i + self.fetch_batch_size]})
+            for row in rows:
+                rel_id = row.get("rel_id")
+                if rel_id is not None:
+                    if rel_id in seen:
+                        continue
+                    seen.add(rel_id)
+                edges.append((row["source"], row["target"], row["type"], self._to_weight(row.get("weight"))))
+        return edges
+
+    @staticmethod
+    def _to_weight(value) -> float:
+        try:
+            return float(value) if value is not None else 1.0
+        except (TypeError, ValueError):
+            return 1.0
+
+    def _load_full(self, version: int) -> GraphSnapshot:
+        """全量构建快照"""
+        start = time.time()
+        entity_ids = [row["id"] for row in self.graph.query("MATCH (e:`__Entity__`) RETURN e.id AS id")
+                      if row["id"] is not None]
+        snapshot = GraphSnapshot.from_edges(entity_ids, self._fetch_edges(entity_ids), version)
+        print(f"图快照已加载: {snapshot.node_count} 个实体, {snapshot.edge_count} 条关系, "
+              f"版本 {version}, 耗时 {time.time() - start:.2f}秒")
+        return snapshot
+
+    def _apply_delta(self, snapshot: GraphSnapshot, changed: set, version: int) -> GraphSnapshot:
+        """重新拉取变更实体的关系，与未受影响的关系合并成新快照"""
+        changed_ids = sorted(changed)
+        existing = set()
+        for i in range(0, len(changed_ids), self.fetch_batch_size):
+            rows = self.graph.query(
+                "UNWIND $ids AS entity_id MATCH (e:`__Entity__` {id: entity_id}) RETURN e.id AS id",
+                params={"ids": changed_ids[i:i + self.fetch_batch_size]}
+            )
+            existing.update(row["id"] for row in rows)
+        fresh = self._fetch_edges(sorted(existing), undirected=True)
+
+        ids = list(snapshot.ids)
+        index = dict(snapshot.index)
+        touched = np.asarray([index[e] for e in changed_ids if e in index], dtype=np.int64)
+        for entity_id in changed_ids:
+            if entity_id not in existing:
+                index.pop(entity_id, None)
+        for entity_id in [e for e in changed_ids if e in existing] + [e for edge in fresh for e in edge[:2]]:
+            if entity_id not in index:
+                index[entity_id] = len(ids)
+                ids.append(entity_id)
+
+        keep = ~(np.isin(snapshot.src, touched) | np.isin(snapshot.dst, touched))
+        rel_types = list(snapshot.rel_types)
+        rel_codes = {rel_type: code for code, rel_type in enumerate(rel_types)}
+        for _, _, rel_type, _ in fresh:
+            if rel_type not in rel_codes:
+                rel_codes[rel_type] = len(rel_types)
+                rel_types.append(rel_type)
+
+        merged = GraphSnapshot(
+            ids, index,
+            np.concatenate([snapshot.src[keep], np.asarray([index[e[0]] for e in fresh], dtype=np.int64)]),
+            np.concatenate([snapshot.dst[keep], np.asarray([index[e[1]] for e in fresh], dtype=np.int64)]),
+            np.concatenate([snapshot.etype[keep], np.asarray([rel_codes[e[2]] for e in fresh], dtype=np.int32)]),
+            np.concatenate([snapshot.weight[keep], np.asarray([e[3] for e in fresh], dtype=np.float32)]),
+            rel_types,
+            version,
+        )
+        print(f"图快照增量更新: {len(changed_ids)} 个实体, {len(fresh)} 条关系, 版本 {version}")
+        return merged
+
+
+_manager: Optional[GraphSnapshotManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_graph_snapshot() -> Optional[GraphSnapshot]:
+    """
+    获取进程内共享的图快照
+
+    Returns:
+        Optional[GraphSnapshot]: 快照；未启用、首次加载尚未完成或加载失败时返回None，
+            调用方应回退到Cypher查询
+    """
+    global _manager
+    if not GRAPH_SNAPSHOT_SETTINGS["enabled"]:
+        return None
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = GraphSnapshotManager()
+                add_graph_change_listener(_manager.invalidate)
+    return _manager.get()
@@ -1,7 +1,13 @@
 from .entity_extractor import EntityRelationExtractor
 from .graph_writer import GraphWriter
+from .bulk_writer import BulkGraphWriter
+from .result_store import ExtractionResultStore
+from .async_extractor import AsyncExtractionEngine
 
 __all__ = [
     'EntityRelationExtractor',
-    'GraphWriter'
+    'GraphWriter',
+    'BulkGraphWriter',
+    'ExtractionResultStore',
+    'AsyncExtractionEngine'
 ]
\ No newline at end of file
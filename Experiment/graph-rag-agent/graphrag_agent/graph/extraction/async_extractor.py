@@ -0,0 +1,385 @@
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    可动态调整上限的并发窗口
+
+    与asyncio.Semaphore不同，上限可以在运行中增减；下调时已在执行的请求
+    不受影响，只是新的请求需要等到在途数量降到新上限以下。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            while self.in_flight >= self.limit:
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            # 只唤醒一个等待者，避免大量排队请求时的惊群
+            self._condition.notify(1)
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._condition:
+            self.limit = max(1, limit)
+            self._condition.notify_all()
+
+
+class AsyncExtractionEngine:
+    """
+    基于chain.ainvoke的异步实体关系抽取引擎
+
+    所有文件的chunk共享一个全局并发窗口；遇到429或超时时按乘性递减收缩
+    窗口并指数退避，平时根据观测到的tokens/秒做爬山式调整：窗口扩大后吞吐
+    仍在上升就继续扩大，吞吐下降则回退。每个chunk完成后立即回调，
+    可用于把结果流式写入GraphWriter；回调在线程中执行，可以阻塞（如写入有界队列）
+    而不拖住事件循环。
+    """
+
+    def __init__(self, extractor, initial_concurrency: int = 4,
+                 min_concurrency: int = 1, max_concurrency: int = 32,
+                 request_timeout: float = 120.0, max_retries: int = 5,
+                 adjust_interval: float = 10.0):
+        """
+        初始化异步抽取引擎
+
+        Args:
+            extractor: EntityRelationExtractor实例，复用其处理链与结果缓存
+            initial_concurrency: 初始并发数
+            min_concurrency: 并发下限
+            max_concurrency: 并发上限
+            request_timeout: 单次LLM请求超时（秒）
+            max_retries: 单个chunk的最大重试次数
+            adjust_interval: 根据吞吐调整并发的间隔（秒）
+        """
+        self.extractor = extractor
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.initial_concurrency = min(max(initial_concurrency, self.min_concurrency), self.max_concurrency)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.adjust_interval = adjust_interval
+
+        # 运行统计
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "failures": 0,
+            # 重试用尽后放弃的chunk数，这些chunk的结果为空字符串
+            "failed_chunks": 0,
+            "tokens": 0,
+            "peak_concurrency": self.initial_concurrency,
+        }
+        # 最近一次arun中放弃的chunk (文件序号, chunk序号)
+        self.failed_chunks: Optional[List[Tuple[int, int]]] = None
+
+    # ----- 对外接口 -----
+
+    def run(self, file_contents: List[List], progress_callback: Optional[Callable[[int], None]] = None,
+            on_result: Optional[Callable[[int, int, str], None]] = None) -> List[List]:
+        """
+        同步入口，在新的事件循环中执行抽取
+
+        Args:
+            file_contents: 文件内容列表，每项为 [文件名, 原文, chunks, ...]
+            progress_callback: 进度回调函数
+            on_result: 每个chunk完成时的回调 (文件序号, chunk序号, 结果)
+
+        Returns:
+            List[List]: 每个文件末尾追加按原顺序排列的抽取结果
+        """
+        return asyncio.run(self.arun(file_contents, progress_callback, on_result))
+
+    async def arun(self, file_contents: List[List], progress_callback: Optional[Callable[[int], None]] = None,
+                   on_result: Optional[Callable[[int, int, str], None]] = None) -> List[List]:
+        """
+        异步执行所有文件的抽取，所有文件共享同一个并发窗口
+
+        Args:
+            file_contents: 文件内容列表，每项为 [文件名, 原文, chunks, ...]
+            progress_callback: 进度回调函数
+            on_result: 每个chunk完成时的回调 (文件序号, chunk序号, 结果)，在线程中执行
+
+        Returns:
+            List[List]: 每个文件末尾追加按原顺序排列的抽取结果
+        """
+        t0 = time.time()
+        self._reset_state()
+        self.stats["failed_chunks"] = 0
+        self.failed_chunks = []
+        completed = 0
+
+        results: List[List[Optional[str]]] = []
+        pending: List[Tuple[int, int, str, str]] = []
+
+        # 一次批量查找所有文件的缓存命中
+        for file_idx, file_content in enumerate(file_contents):
+            texts = [''.join(chunk) for chunk in file_content[2]]
+            keys = [self.extractor._generate_cache_key(text) for text in texts]
+            cached = self.extractor._load_many_from_cache(keys)
+            file_results = [cached[key] for key in keys]
+            results.append(file_results)
+            for chunk_idx, (key, text) in enumerate(zip(keys, texts)):
+                if file_results[chunk_idx] is None:
+                    pending.append((file_idx, chunk_idx, key, text))
+
+        # 缓存命中的结果立即交给下游
+        for file_idx, file_results in enumerate(results):
+            for chunk_idx, result in enumerate(file_results):
+                if result is not None:
+                    await self._emit(on_result, file_idx, chunk_idx, result)
+                    if progress_callback:
+                        progress_callback(completed)
+                    completed += 1
+
+        if pending:
+            await self.start()
+        tasks = [asyncio.create_task(self._extract(item)) for item in pending]
+
+        try:
+            for future in asyncio.as_completed(tasks):
+                file_idx, chunk_idx, result = await future
+                results[file_idx][chunk_idx] = result
+                await self._emit(on_result, file_idx, chunk_idx, result)
+                if progress_callback:
+                    progress_callback(completed)
+                completed += 1
+        finally:
+            await self.stop()
+
+        for file_content, file_results in zip(file_contents, results):
+            file_content.append(file_results)
+
+        elapsed = time.time() - t0
+        print(f"异步抽取完成: {completed} 个chunks, LLM请求 {self.stats['requests']} 次, "
+              f"限流 {self.stats['rate_limited']} 次, 超时 {self.stats['timeouts']} 次, "
+              f"失败 {self.stats['failed_chunks']} 个chunks, "
+              f"峰值并发 {self.stats['peak_concurrency']}, 耗时 {elapsed:.2f}秒")
+        if self.failed_chunks:
+            failed_ids = [self._chunk_label(file_contents, file_idx, chunk_idx)
+                          for file_idx, chunk_idx in self.failed_chunks]
+            print(f"以下chunk抽取失败，结果为空: {', '.join(failed_ids[:20])}"
+                  + (f" 等{len(failed_ids)}个" if len(failed_ids) > 20 else ""))
+        return file_contents
+
+    @staticmethod
+    def _chunk_label(file_contents: List[List], file_idx: int, chunk_idx: int) -> str:
+        """失败chunk的标识：有chunks_with_hash时用chunk_id，否则用 文件名#序号"""
+        file_content = file_contents[file_idx]
+        if len(file_content) > 4 and chunk_idx < len(file_content[3]):
+            chunk = file_content[3][chunk_idx]
+            if isinstance(chunk, dict) and chunk.get("chunk_id"):
+                return str(chunk["chunk_id"])
+        return f"{file_content[0]}#{chunk_idx}"
+
+    async def start(self) -> None:
+        """在当前事件循环中初始化并发窗口并启动吞吐调整任务，供流式调用方使用"""
+        if getattr(self, "_adjuster", None) is not None:
+            return
+        if getattr(self, "_limiter", None) is None:
+            self._reset_state()
+        self._adjuster = asyncio.create_task(self._adjust_loop())
+
+    async def stop(self) -> None:
+        """停止吞吐调整任务"""
+        adjuster = getattr(self, "_adjuster", None)
+        if adjuster is not None:
+            adjuster.cancel()
+            self._adjuster = None
+        self._limiter = None
+
+    async def extract_text(self, text: str) -> str:
+        """
+        抽取单段文本（先查缓存），与其他调用共享并发窗口
+
+        Args:
+            text: chunk文本
+
+        Returns:
+            str: 抽取结果，失败时为空字符串
+        """
+        cache_key = self.extractor._generate_cache_key(text)
+        cached = self.extractor._load_many_from_cache([cache_key])[cache_key]
+        if cached is not None:
+            return cached
+        _, _, result = await self._extract((0, 0, cache_key, text))
+        return result
+
+    def _reset_state(self) -> None:
+        """重置并发窗口与吞吐统计"""
+        self._limiter = AdaptiveConcurrencyLimiter(self.initial_concurrency)
+        self._adjuster = None
+        self._backoff_until = 0.0
+        self._consecutive_throttles = 0
+        self._token_events: Deque[Tuple[float, int]] = deque()
+        self._last_throughput = 0.0
+        self._last_direction = 1
+
+    # ----- 单个chunk -----
+
+    async def _extract(self, item: Tuple[int, int, str, str]) -> Tuple[int, int, str]:
+        """抽取单个chunk，失败时按错误类型退避重试，最终失败返回空结果"""
+        file_idx, chunk_idx, cache_key, text = item
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_backoff()
+            await self._limiter.acquire()
+            started = time.time()
+            error = None
+            try:
+                self.stats["requests"] += 1
+                response = await asyncio.wait_for(
+                    self.extractor.chain.ainvoke(self.extractor._build_chain_input(text)),
+                    timeout=self.request_timeout
+                )
+            except Exception as e:
+                error = e
+            finally:
+                # 任务被取消（CancelledError不是Exception）时也要归还并发名额
+                await self._limiter.release()
+
+            if error is not None:
+                throttled = self._is_throttle_error(error)
+                if throttled:
+                    await self._on_throttle(error)
+                else:
+                    self.stats["failures"] += 1
+                if attempt >= self.max_retries:
+                    print(f"Chunk {file_idx}-{chunk_idx} 抽取失败，已放弃: {error}")
+                    self._record_failure(file_idx, chunk_idx)
+                    return file_idx, chunk_idx, ""
+                if not throttled:
+                    await asyncio.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+                continue
+
+            result = response.content
+            self._consecutive_throttles = 0
+            self._record_tokens(text, response, time.time() - started)
+            self.extractor._save_to_cache(cache_key, result)
+            return file_idx, chunk_idx, result
+
+        self._record_failure(file_idx, chunk_idx)
+        return file_idx, chunk_idx, ""
+
+    def _record_failure(self, file_idx: int, chunk_idx: int) -> None:
+        """记录重试用尽后放弃的chunk"""
+        self.stats["failed_chunks"] += 1
+        if self.failed_chunks is not None:
+            self.failed_chunks.append((file_idx, chunk_idx))
+
+    @staticmethod
+    async def _emit(on_result, file_idx: int, chunk_idx: int, result: str) -> None:
+        """
+        在线程中调用结果回调，回调阻塞（如下游写入队列已满）时不拖住事件循环里的其他抽取；
+        回调异常不影响抽取
+        """
+        if on_result is None:
+            return
+        try:
+            await asyncio.to_thread(on_result, file_idx, chunk_idx, result)
+        except Exception as e:
+            print(f"处理抽取结果回调时出错: {e}")
+
+    # ----- 限流与退避 -----
+
+    def _is_throttle_error(self, error: Exception) -> bool:
+        """判断是否为限流（429）或超时错误"""
+        if isinstance(error, asyncio.TimeoutError):
+            self.stats["timeouts"] += 1
+            return True
+
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        name = type(error).__name__.lower()
+        if status == 429 or "ratelimit" in name or "rate_limit" in name:
+            self.stats["rate_limited"] += 1
+            return True
+        if "timeout" in name:
+            self.stats["timeouts"] += 1
+            return True
+        return False
+
+    async def _on_throttle(self, error: Exception) -> None:
+        """限流或超时：并发乘性减半，并设置全局退避时间"""
+        self._consecutive_throttles += 1
+        new_limit = max(self.min_concurrency, self._limiter.limit // 2)
+        if new_limit != self._limiter.limit:
+            await self._limiter.set_limit(new_limit)
+
+        # 优先使用服务端给出的Retry-After
+        delay = None
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            try:
+                delay = float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                delay = None
+        if delay is None:
+            delay = min(2 ** self._consecutive_throttles, 60)
+        delay *= 0.5 + random.random()
+        self._backoff_until = max(self._backoff_until, time.time() + delay)
+
+    async def _wait_backoff(self) -> None:
+        """全局退避期间暂停发送新请求"""
+        remaining = self._backoff_until - time.time()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    # ----- 基于吞吐的并发调整 -----
+
+    def _record_tokens(self, text: str, response: Any, latency: float) -> None:
+        """记录一次成功请求消耗的token数"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        tokens = usage.get("total_tokens") if isinstance(usage, dict) else None
+        if not tokens:
+            # 没有用量信息时按字符数粗略估计
+            tokens = (len(text) + len(response.content or "")) // 2
+        self.stats["tokens"] += tokens
+        self._token_events.append((time.time(), tokens))
+
+    def _throughput(self) -> float:
+        """最近一个调整周期内的tokens/秒"""
+        cutoff = time.time() - self.adjust_interval
+        while self._token_events and self._token_events[0][0] < cutoff:
+            self._token_events.popleft()
+        return sum(tokens for _, tokens in self._token_events) / self.adjust_interval
+
+    async def _adjust_loop(self) -> None:
+        """周期性地根据吞吐变化爬山调整并发窗口"""
+        while True:
+            await asyncio.sleep(self.adjust_interval)
+            if time.time() < self._backoff_until:
+                continue
+
+            throughput = self._throughput()
+            limit = self._limiter.limit
+            if throughput >= self._last_throughput * 1.05:
+                # 吞吐仍在增长，沿原方向继续
+                step = self._last_direction
+            elif throughput < self._last_throughput * 0.9:
+                # 吞吐明显下降，反向调整
+                step = -self._last_direction
+            else:
+                step = 0
+
+            # 窗口未被占满时扩大没有意义
+            if step > 0 and self._limiter.in_flight < limit:
+                step = 0
+
+            new_limit = min(self.max_concurrency, max(self.min_concurrency, limit + step))
+            if new_limit != limit:
+                await self._limiter.set_limit(new_limit)
+                self._last_direction = 1 if new_limit > limit else -1
+                self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], new_limit)
+            self._last_throughput = throughput
@@ -0,0 +1,271 @@
+import time
+import zlib
+import concurrent.futures
+from typing import Any, Dict, Iterable, List, Tuple
+
+from langchain_community.graphs.graph_document import GraphDocument
+
+
+# 关系端点缺失时生成的占位节点类型，占位节点不覆盖已有实体的属性
+PLACEHOLDER_TYPE = "未知"
+
+
+def _remove_backticks(text: str) -> str:
+    """去掉标签/关系类型中的反引号（与add_graph_documents保持一致）"""
+    return text.replace("`", "")
+
+
+class BulkGraphWriter:
+    """
+    基于 UNWIND/MERGE 的批量图写入器
+
+    把一批GraphDocument拆成实体、关系和MENTIONS三类行，在客户端按标签/关系类型
+    分组去重后，用参数化的 ``UNWIND $rows MERGE ...`` 大事务写入。实体按id哈希分区，
+    多个会话并行写入时互不争用同一节点的锁；关系分区后并行写入，遇到死锁的批次
+    最后串行重试，重试仍失败时抛出异常，由调用方回退到add_graph_documents。
+    MENTIONS直接连到__Chunk__节点，不再经过临时Document节点。
+
+    与逐条SET的add_graph_documents不同，类型为"未知"的占位节点只在实体不存在时
+    写入属性和标签（ON CREATE SET），不会覆盖已有实体的description，也不会给已有
+    实体追加"未知"标签；同一批次中已有真实类型的实体不再写占位行。
+    """
+
+    def __init__(self, graph, rows_per_tx: int = 5000, parallel_sessions: int = 4):
+        """
+        初始化批量写入器
+
+        Args:
+            graph: Neo4j图数据库对象
+            rows_per_tx: 单个事务写入的最大行数
+            parallel_sessions: 并行写入的会话数
+        """
+        self.graph = graph
+        self.rows_per_tx = max(1, rows_per_tx)
+        self.parallel_sessions = max(1, parallel_sessions)
+        self._index_ready = False
+
+        self.stats = {
+            "nodes": 0,
+            "relationships": 0,
+            "mentions": 0,
+            "seconds": 0.0,
+        }
+
+    def write_graph_documents(self, documents: Iterable[GraphDocument]) -> Dict[str, Any]:
+        """
+        写入一批图文档
+
+        Args:
+            documents: 图文档列表，source.metadata中的chunk_id用于建立MENTIONS关系
+
+        Returns:
+            Dict: 本次写入的行数、耗时和每秒行数
+
+        Raises:
+            RuntimeError: 串行重试后仍有批次写入失败
+        """
+        start = time.time()
+        nodes, relationships, mentions = self._collect_rows(documents)
+        if not nodes and not relationships:
+            return {"nodes": 0, "relationships": 0, "mentions": 0, "seconds": 0.0, "rows_per_second": 0.0}
+
+        self._ensure_index()
+        self._write_nodes(nodes)
+        self._write_relationships(relationships)
+        self._write_mentions(mentions)
+
+        elapsed = time.time() - start
+        total_rows = len(nodes) + len(relationships) + len(mentions)
+        self.stats["nodes"] += len(nodes)
+        self.stats["relationships"] += len(relationships)
+        self.stats["mentions"] += len(mentions)
+        self.stats["seconds"] += elapsed
+
+        result = {
+            "nodes": len(nodes),
+            "relationships": len(relationships),
+            "mentions": len(mentions),
+            "seconds": elapsed,
+            "rows_per_second": total_rows / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"批量写入 {len(nodes)} 个实体, {len(relationships)} 条关系, {len(mentions)} 条MENTIONS, "
+              f"耗时 {elapsed:.2f}s ({result['rows_per_second']:.0f} 行/秒)")
+        return result
+
+    def rows_per_second(self) -> float:
+        """累计写入速度（行/秒）"""
+        total_rows = self.stats["nodes"] + self.stats["relationships"] + self.stats["mentions"]
+        return total_rows / self.stats["seconds"] if self.stats["seconds"] > 0 else 0.0
+
+    # ----- 行收集与去重 -----
+
+    def _collect_rows(self, documents: Iterable[GraphDocument]) -> Tuple[Dict, Dict, Dict]:
+        """
+        把图文档展开为去重后的行
+
+        Returns:
+            Tuple: (实体 {(标签, id): 行}, 关系 {(源, 目标, 类型): 行}, MENTIONS {(chunk_id, 实体id): 行})
+        """
+        nodes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        real_ids = set()
+        relationships: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        mentions: Dict[Tuple[str, str], Dict[str, str]] = {}
+
+        for document in documents:
+            chunk_id = document.source.metadata.get("chunk_id") if document.source else None
+
+            for node in document.nodes:
+                label = _remove_backticks(node.type or "")
+                placeholder = label == PLACEHOLDER_TYPE
+                if not placeholder:
+                    real_ids.add(node.id)
+                # 同一实体以最后一次出现的属性为准，与逐条SET的结果一致
+                nodes[(label, node.id)] = {
+                    "id": node.id,
+                    "properties": dict(node.properties or {}),
+                    "placeholder": placeholder,
+                }
+                if chunk_id:
+                    mentions[(chunk_id, node.id)] = {"chunk_id": chunk_id, "entity_id": node.id}
+
+            for rel in document.relationships:
+                rel_type = _remove_backticks(rel.type.replace(" ", "_").upper())
+                if not rel_type:
+                    continue
+                # 与实体相同，同一关系以最后一次出现的属性为准
+                relationships[(rel.source.id, rel.target.id, rel_type)] = {
+                    "source": rel.source.id,
+                    "target": rel.target.id,
+                    "properties": dict(rel.properties or {}),
+                }
+
+        # 批内已有真实类型的实体不再写占位节点
+        nodes = {
+            key: row for key, row in nodes.items()
+            if not (row["placeholder"] and row["id"] in real_ids)
+        }
+        return nodes, relationships, mentions
+
+    # ----- 写入 -----
+
+    def _ensure_index(self) -> None:
+        """确保MERGE使用的__Entity__(id)索引存在"""
+        if self._index_ready:
+            return
+        try:
+            self.graph.query("CREATE INDEX IF NOT EXISTS FOR (e:`__Entity__`) ON (e.id)")
+        except Exception as e:
+            print(f"创建实体索引失败: {e}")
+        self._index_ready = True
+
+    def _partition(self, key: str) -> int:
+        """按键计算分区，同一实体总落在同一会话"""
+        return zlib.crc32(key.encode("utf-8")) % self.parallel_sessions
+
+    def _write_nodes(self, nodes: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        """按 (分区, 标签, 是否占位) 分组写入实体"""
+        groups: Dict[Tuple[int, str, bool], List[Dict[str, Any]]] = {}
+        for (label, node_id), row in nodes.items():
+            groups.setdefault((self._partition(node_id), label, row["placeholder"]), []).append(
+                {"id": row["id"], "properties": row["properties"]}
+            )
+
+        jobs = []
+        for (partition, label, placeholder), rows in groups.items():
+            label_clause = f", e:`{label}`" if label else ""
+            if placeholder:
+                query = (
+                    "UNWIND $rows AS row "
+                    "MERGE (e:`__Entity__` {id: row.id}) "
+                    f"ON CREATE SET e += row.properties{label_clause}"
+                )
+            else:
+                query = (
+                    "UNWIND $rows AS row "
+                    "MERGE (e:`__Entity__` {id: row.id}) "
+                    f"SET e += row.properties{label_clause}"
+                )
+            jobs.append((partition, query, rows))
+
+        self._run_partitioned(jobs, "实体")
+
+    def _write_relationships(self, relationships: Dict[Tuple[str, str, str], Dict[str, Any]]) -> None:
+        """按 (分区, 关系类型) 分组写入关系"""
+        groups: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+        for (source, _, rel_type), row in relationships.items():
+            groups.setdefault((self._partition(source), rel_type), []).append(row)
+
+        jobs = []
+        for (partition, rel_type), rows in groups.items():
+            query = (
+                "UNWIND $rows AS row "
+                "MERGE (s:`__Entity__` {id: row.source}) "
+                "MERGE (t:`__Entity__` {id: row.target}) "
+                f"MERGE (s)-[r:`{rel_type}`]->(t) "
+                "SET r += row.properties"
+            )
+            jobs.append((partition, query, rows))
+
+        self._run_partitioned(jobs, "关系")
+
+    def _write_mentions(self, mentions: Dict[Tuple[str, str], Dict[str, str]]) -> None:
+        """直接建立 __Chunk__ -[:MENTIONS]-> __Entity__ 关系"""
+        groups: Dict[int, List[Dict[str, str]]] = {}
+        for (chunk_id, _), row in mentions.items():
+            groups.setdefault(self._partition(chunk_id), []).append(row)
+
+        query = (
+            "UNWIND $rows AS row "
+            "MATCH (c:`__Chunk__` {id: row.chunk_id}) "
+            "MATCH (e:`__Entity__` {id: row.entity_id}) "
+            "MERGE (c)-[:MENTIONS]->(e)"
+        )
+        self._run_partitioned([(partition, query, rows) for partition, rows in groups.items()], "MENTIONS")
+
+    def _run_partitioned(self, jobs: List[Tuple[int, str, List[Dict[str, Any]]]], kind: str) -> None:
+        """
+        每个分区一个会话顺序执行自己的事务，各分区并行；失败的事务最后串行重试
+
+        Args:
+            jobs: (分区, 查询, 行) 列表
+            kind: 日志中显示的数据类型
+
+        Raises:
+            RuntimeError: 串行重试后仍有批次失败
+        """
+        by_partition: Dict[int, List[Tuple[str, List[Dict[str, Any]]]]] = {}
+        for partition, query, rows in jobs:
+            for i in range(0, len(rows), self.rows_per_tx):
+                by_partition.setdefault(partition, []).append((query, rows[i:i + self.rows_per_tx]))
+
+        def run_partition(statements):
+            failed = []
+            for query, rows in statements:
+                try:
+                    self.graph.query(query, params={"rows": rows})
+                except Exception:
+                    # 并行会话之间可能因关系两端加锁而死锁，留到最后串行重试
+                    failed.append((query, rows))
+            return failed
+
+        retry: List[Tuple[str, List[Dict[str, Any]]]] = []
+        if len(by_partition) <= 1:
+            for statements in by_partition.values():
+                retry.extend(run_partition(statements))
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.parallel_sessions) as executor:
+                for failed in executor.map(run_partition, by_partition.values()):
+                    retry.extend(failed)
+
+        failed_rows = 0
+        last_error = None
+        for query, rows in retry:
+            try:
+                self.graph.query(query, params={"rows": rows})
+            except Exception as e:
+                print(f"写入{kind}批次失败 ({len(rows)} 行): {e}")
+                failed_rows += len(rows)
+                last_error = e
+
+        if last_error is not None:
+            raise RuntimeError(f"{failed_rows} 行{kind}重试后仍写入失败: {last_error}") from last_error
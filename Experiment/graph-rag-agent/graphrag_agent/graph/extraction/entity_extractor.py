@@ -1,8 +1,7 @@
 import time
 import os
-import pickle
 import concurrent.futures
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from langchain.prompts import (
     ChatPromptTemplate,
     HumanMessagePromptTemplate,
@@ -11,7 +10,13 @@ from langchain.prompts import (
 )
 
 from graphrag_agent.graph.core import retry, generate_hash
-from graphrag_agent.config.settings import MAX_WORKERS as DEFAULT_MAX_WORKERS, BATCH_SIZE as DEFAULT_BATCH_SIZE
+from graphrag_agent.graph.extraction.result_store import ExtractionResultStore
+from graphrag_agent.graph.extraction.async_extractor import AsyncExtractionEngine
+from graphrag_agent.config.settings import (
+    MAX_WORKERS as DEFAULT_MAX_WORKERS,
+    BATCH_SIZE as DEFAULT_BATCH_SIZE,
+    EXTRACTION_ASYNC_SETTINGS,
+)
 
 class EntityRelationExtractor:
     """
@@ -62,9 +67,8 @@ class EntityRelationExtractor:
         self.cache_dir = cache_dir
         self.enable_cache = True
         
-        # 确保缓存目录存在
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+        # 索引化的抽取结果存储（首次打开时迁移旧版pickle缓存）
+        self.result_store = ExtractionResultStore(cache_dir)
         
         # 并行处理配置
         self.max_workers = max_workers or DEFAULT_MAX_WORKERS
@@ -86,18 +90,6 @@ class EntityRelationExtractor:
         """
         return generate_hash(text)
     
-    def _cache_path(self, cache_key: str) -> str:
-        """
-        获取缓存文件路径
-        
-        Args:
-            cache_key: 缓存键
-            
-        Returns:
-            str: 缓存文件路径
-        """
-        return os.path.join(self.cache_dir, f"{cache_key}.pkl")
-    
     def _save_to_cache(self, cache_key: str, result: str) -> None:
         """
         保存结果到缓存
@@ -109,10 +101,8 @@ class EntityRelationExtractor:
         if not self.enable_cache:
             return
             
-        cache_path = self._cache_path(cache_key)
         try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(result, f)
+            self.result_store.put(cache_key, result)
         except Exception as e:
             print(f"缓存保存错误: {e}")
     
@@ -126,21 +116,31 @@ class EntityRelationExtractor:
         Returns:
             Optional[str]: 缓存的结果，如果不存在则返回None
         """
-        if not self.enable_cache:
-            return None
+        return self._load_many_from_cache([cache_key])[cache_key]
+    
+    def _load_many_from_cache(self, cache_keys: List[str]) -> Dict[str, Optional[str]]:
+        """
+        批量从缓存加载结果，命中检查只是一次内存索引查找
+        
+        Args:
+            cache_keys: 缓存键列表
             
-        cache_path = self._cache_path(cache_key)
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'rb') as f:
-                    result = pickle.load(f)
-                    self.cache_hits += 1
-                    return result
-            except Exception as e:
-                print(f"缓存加载错误: {e}")
-        
-        self.cache_misses += 1
-        return None
+        Returns:
+            Dict[str, Optional[str]]: 缓存键到结果的映射，未命中为None
+        """
+        results = {key: None for key in cache_keys}
+        if not self.enable_cache:
+            return results
+        
+        try:
+            results.update(self.result_store.get_many(cache_keys))
+        except Exception as e:
+            print(f"缓存加载错误: {e}")
+        
+        hits = sum(1 for value in results.values() if value is not None)
+        self.cache_hits += hits
+        self.cache_misses += len(results) - hits
+        return results
         
     def process_chunks(self, file_contents: List[Tuple], progress_callback=None) -> List[Tuple]:
         """
@@ -163,7 +163,7 @@ class EntityRelationExtractor:
             
             # 预检查缓存命中率
             cache_keys = [self._generate_cache_key(''.join(chunk)) for chunk in chunks]
-            cached_results = {key: self._load_from_cache(key) for key in cache_keys}
+            cached_results = self._load_many_from_cache(cache_keys)
             non_cached_indices = [idx for idx, key in enumerate(cache_keys) if cached_results[key] is None]
             
             if len(non_cached_indices) > 0:
@@ -217,6 +217,56 @@ class EntityRelationExtractor:
         print(f"所有chunks处理完成, 总耗时: {process_time:.2f}秒, 平均每chunk: {process_time/total_chunks:.2f}秒")
         return file_contents
     
+    def process_chunks_async(self, file_contents: List[List], progress_callback=None, graph_writer=None) -> List[List]:
+        """
+        使用异步引擎处理所有文件的chunks，所有文件共享一个自适应并发窗口
+        
+        Args:
+            file_contents: 文件内容列表，[文件名, 原文, chunks] 或
+                [文件名, 原文, chunks, chunks_with_hash]
+            progress_callback: 进度回调函数
+            graph_writer: 可选的GraphWriter；文件内容中带有chunks_with_hash时，
+                每个chunk的结果一完成就流式写入图数据库
+            
+        Returns:
+            List[List]: 处理结果，抽取结果追加在每个文件内容末尾
+        """
+        engine = self.create_async_engine()
+        
+        if graph_writer is None:
+            on_result = None
+        else:
+            def on_result(file_idx, chunk_idx, result):
+                file_content = file_contents[file_idx]
+                if len(file_content) < 4 or not result:
+                    return
+                chunk = file_content[3][chunk_idx]
+                graph_writer.stream_result(chunk["chunk_id"], chunk["chunk_doc"].page_content, result)
+            graph_writer.start_stream()
+        
+        try:
+            return engine.run(file_contents, progress_callback, on_result)
+        finally:
+            if graph_writer is not None:
+                graph_writer.close_stream()
+    
+    def create_async_engine(self) -> AsyncExtractionEngine:
+        """
+        按配置创建异步抽取引擎
+        
+        Returns:
+            AsyncExtractionEngine: 复用本实例处理链与结果缓存的引擎
+        """
+        return AsyncExtractionEngine(
+            self,
+            initial_concurrency=EXTRACTION_ASYNC_SETTINGS["initial_concurrency"],
+            min_concurrency=EXTRACTION_ASYNC_SETTINGS["min_concurrency"],
+            max_concurrency=EXTRACTION_ASYNC_SETTINGS["max_concurrency"],
+            request_timeout=EXTRACTION_ASYNC_SETTINGS["request_timeout"],
+            max_retries=EXTRACTION_ASYNC_SETTINGS["max_retries"],
+            adjust_interval=EXTRACTION_ASYNC_SETTINGS["adjust_interval"],
+        )
+    
     def process_chunks_batch(self, file_contents: List[Tuple], progress_callback=None) -> List[Tuple]:
         """
         批量处理chunks，减少LLM调用次数
@@ -245,7 +295,8 @@ class EntityRelationExtractor:
                 
                 # 缓存检查
                 batch_keys = [self._generate_cache_key(''.join(chunk)) for chunk in batch_chunks]
-                cached_batch_results = [self._load_from_cache(key) for key in batch_keys]
+                cached_lookup = self._load_many_from_cache(batch_keys)
+                cached_batch_results = [cached_lookup[key] for key in batch_keys]
                 
                 # 如果所有结果都已缓存，则跳过LLM调用
                 if None not in cached_batch_results:
@@ -331,6 +382,26 @@ class EntityRelationExtractor:
         parts = batch_content.split(f"\n{'-'*50}\n")
         return [part.strip() for part in parts]
     
+    def _build_chain_input(self, input_text: str) -> dict:
+        """
+        构建抽取链的输入参数
+        
+        Args:
+            input_text: 输入文本
+            
+        Returns:
+            dict: 处理链输入
+        """
+        return {
+            "chat_history": self.chat_history,
+            "entity_types": self.entity_types,
+            "relationship_types": self.relationship_types,
+            "tuple_delimiter": self.tuple_delimiter,
+            "record_delimiter": self.record_delimiter,
+            "completion_delimiter": self.completion_delimiter,
+            "input_text": input_text
+        }
+    
     @retry(times=3, exceptions=(Exception,), delay=1.0)
     def _process_single_chunk(self, input_text: str) -> str:
         """
@@ -351,15 +422,7 @@ class EntityRelationExtractor:
             return cached_result
         
         # 未缓存，调用LLM处理
-        response = self.chain.invoke({
-            "chat_history": self.chat_history,
-            "entity_types": self.entity_types,
-            "relationship_types": self.relationship_types,
-            "tuple_delimiter": self.tuple_delimiter,
-            "record_delimiter": self.record_delimiter,
-            "completion_delimiter": self.completion_delimiter,
-            "input_text": input_text
-        })
+        response = self.chain.invoke(self._build_chain_input(input_text))
         
         result = response.content
         
@@ -431,18 +494,11 @@ class EntityRelationExtractor:
                 if cached_result:
                     # 如果缓存命中，直接处理结果
                     try:
-                        graph_document = graph_writer.convert_to_graph_document(
+                        graph_writer.write_extraction_results([(
                             chunk_data['chunk_id'],
                             chunk_data['chunk_doc'].page_content,
                             cached_result
-                        )
-                        
-                        if len(graph_document.nodes) > 0 or len(graph_document.relationships) > 0:
-                            graph_writer.graph.add_graph_documents(
-                                [graph_document],
-                                baseEntityLabel=True,
-                                include_source=True
-                            )
+                        )])
                     except Exception as e:
                         print(f"处理缓存结果时出错: {e}")
                 else:
@@ -457,18 +513,11 @@ class EntityRelationExtractor:
                     result = future.result()
                     
                     # 实时写入一个chunk的结果到图数据库
-                    graph_document = graph_writer.convert_to_graph_document(
+                    graph_writer.write_extraction_results([(
                         chunk_data['chunk_id'],
                         chunk_data['chunk_doc'].page_content,
                         result
-                    )
-                    
-                    if len(graph_document.nodes) > 0 or len(graph_document.relationships) > 0:
-                        graph_writer.graph.add_graph_documents(
-                            [graph_document],
-                            baseEntityLabel=True,
-                            include_source=True
-                        )
+                    )])
                         
                 except Exception as exc:
                     print(f"处理chunk {chunk_data['chunk_id']} 时发生错误: {exc}")
\ No newline at end of file
@@ -1,12 +1,19 @@
 import re
+import queue
+import threading
 import concurrent.futures
-from typing import List, Set
+from typing import Callable, List, Optional, Set, Tuple
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.documents import Document
 from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
 
 from graphrag_agent.graph.core import connection_manager
-from graphrag_agent.config.settings import BATCH_SIZE as DEFAULT_BATCH_SIZE, MAX_WORKERS as DEFAULT_MAX_WORKERS
+from graphrag_agent.graph.extraction.bulk_writer import BulkGraphWriter
+from graphrag_agent.config.settings import (
+    BATCH_SIZE as DEFAULT_BATCH_SIZE,
+    MAX_WORKERS as DEFAULT_MAX_WORKERS,
+    GRAPH_WRITE_SETTINGS,
+)
 
 class GraphWriter:
     """
@@ -33,6 +40,20 @@ class GraphWriter:
         # 用于跟踪已经处理的节点，减少重复操作
         self.processed_nodes: Set[str] = set()
         
+        # 原生UNWIND/MERGE批量写入器，关闭时回退到add_graph_documents
+        self.bulk_writer = None
+        if GRAPH_WRITE_SETTINGS["native"]:
+            self.bulk_writer = BulkGraphWriter(
+                self.graph,
+                rows_per_tx=GRAPH_WRITE_SETTINGS["rows_per_tx"],
+                parallel_sessions=GRAPH_WRITE_SETTINGS["parallel_sessions"],
+            )
+        
+        # 流式写入：抽取结果入队，由后台线程按批写入
+        self._stream_queue: Optional[queue.Queue] = None
+        self._stream_thread: Optional[threading.Thread] = None
+        self.streamed_chunks = 0
+        
     def convert_to_graph_document(self, chunk_id: str, input_text: str, result: str) -> GraphDocument:
         """
         将提取的实体关系文本转换为GraphDocument对象
@@ -195,23 +216,136 @@ class GraphWriter:
         
         print(f"共处理 {total_chunks} 个chunks, 有效文档 {len(all_graph_documents)}, 错误 {error_count}")
         
-        # 批量写入图文档
-        self._batch_write_graph_documents(all_graph_documents)
+        # 批量写入图文档（原生写入时MENTIONS已直接连到Chunk，无需再合并）
+        if self._batch_write_graph_documents(all_graph_documents):
+            return
         
         # 批量合并chunk关系
         if all_chunk_ids:
             self.merge_chunk_relationships(all_chunk_ids)
     
-    def _batch_write_graph_documents(self, documents: List[GraphDocument]) -> None:
+    def write_extraction_results(self, items: List[Tuple[str, str, str]]) -> int:
+        """
+        转换并写入一批抽取结果
+        
+        Args:
+            items: (chunk_id, chunk文本, 抽取结果) 列表
+            
+        Returns:
+            int: 写入的有效文档数
+        """
+        documents = []
+        for chunk_id, text, result in items:
+            try:
+                graph_document = self.convert_to_graph_document(chunk_id, text, result or "")
+            except Exception as e:
+                print(f"处理chunk时出错: {e}")
+                continue
+            if len(graph_document.nodes) > 0 or len(graph_document.relationships) > 0:
+                documents.append(graph_document)
+        
+        if not self._batch_write_graph_documents(documents):
+            chunk_ids = [doc.source.metadata.get("chunk_id") for doc in documents]
+            if chunk_ids:
+                self.merge_chunk_relationships(chunk_ids)
+        return len(documents)
+    
+    def start_stream(self, max_pending: int = 1000,
+                     on_written: Optional[Callable[[int], None]] = None) -> None:
+        """
+        启动后台流式写入线程，抽取结果可随产生随写入
+        
+        Args:
+            max_pending: 队列中允许积压的最大结果数，超过时提交方阻塞
+            on_written: 每批结果写入完成后在写入线程中调用，参数为该批的结果数
+        """
+        if self._stream_thread is not None:
+            return
+        
+        self._stream_queue = queue.Queue(maxsize=max_pending)
+        self.streamed_chunks = 0
+        
+        def run():
+            stopping = False
+            while not stopping:
+                batch = [self._stream_queue.get()]
+                # 尽量凑满一批再写入
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._stream_queue.get(timeout=0.5))
+                    except queue.Empty:
+                        break
+                if batch[-1] is None or None in batch:
+                    stopping = True
+                    batch = [item for item in batch if item is not None]
+                if batch:
+                    try:
+                        self.write_extraction_results(batch)
+                        self.streamed_chunks += len(batch)
+                    except Exception as e:
+                        print(f"流式写入图文档时出错: {e}")
+                        continue
+                    if on_written is not None:
+                        try:
+                            on_written(len(batch))
+                        except Exception as e:
+                            print(f"流式写入回调出错: {e}")
+        
+        self._stream_thread = threading.Thread(target=run, name="graph-writer-stream", daemon=True)
+        self._stream_thread.start()
+    
+    def stream_result(self, chunk_id: str, text: str, result: str) -> None:
+        """
+        提交一个抽取结果到流式写入队列
+        
+        Args:
+            chunk_id: 文本块ID
+            text: 文本块内容
+            result: 抽取结果
+        """
+        if self._stream_queue is None:
+            self.start_stream()
+        self._stream_queue.put((chunk_id, text, result))
+    
+    def close_stream(self) -> None:
+        """写完队列中剩余的结果并停止后台线程"""
+        if self._stream_thread is None:
+            return
+        self._stream_queue.put(None)
+        self._stream_thread.join()
+        self._stream_thread = None
+        self._stream_queue = None
+    
+    def _batch_write_graph_documents(self, documents: List[GraphDocument]) -> bool:
         """
         批量写入图文档
         
         Args:
             documents: 图文档列表
+            
+        Returns:
+            bool: 是否由原生写入器完成（此时MENTIONS已直接连到Chunk节点）
         """
         if not documents:
-            return
-            
+            return self.bulk_writer is not None
+        
+        if self.bulk_writer is not None:
+            try:
+                self.bulk_writer.write_graph_documents(documents)
+                return True
+            except Exception as e:
+                print(f"原生批量写入失败，回退到add_graph_documents: {e}")
+        
+        self._write_with_langchain(documents)
+        return False
+    
+    def _write_with_langchain(self, documents: List[GraphDocument]) -> None:
+        """
+        通过LangChain add_graph_documents写入图文档（会生成临时Document节点）
+        
+        Args:
+            documents: 图文档列表
+        """
         # 增加批处理大小的动态调整
         optimal_batch_size = min(self.batch_size, max(10, len(documents) // 10))
         total_batches = (len(documents) + optimal_batch_size - 1) // optimal_batch_size
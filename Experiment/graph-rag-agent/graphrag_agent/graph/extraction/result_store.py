@@ -0,0 +1,214 @@
+import os
+import mmap
+import struct
+import pickle
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# 索引记录：键长度 + 键 + (偏移, 长度)
+_KEY_LEN = struct.Struct("<H")
+_LOCATION = struct.Struct("<QI")
+
+
+class ExtractionResultStore:
+    """
+    LLM抽取结果的索引化存储
+
+    所有结果追加写入单个数据文件（results.dat），键到(偏移, 长度)的索引
+    追加写入results.idx，并在打开时一次性加载到内存。读取通过内存映射完成，
+    因此整批chunk的命中检查只是字典查找，不再需要逐个打开小文件。
+    """
+
+    def __init__(self, store_dir: str):
+        """
+        初始化抽取结果存储
+
+        Args:
+            store_dir: 存储目录，同时会从中迁移旧版的逐chunk pickle文件
+        """
+        self.store_dir = store_dir
+        self.data_path = os.path.join(store_dir, "results.dat")
+        self.index_path = os.path.join(store_dir, "results.idx")
+
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+        os.makedirs(store_dir, exist_ok=True)
+        is_new = not os.path.exists(self.index_path)
+
+        self._data_file = open(self.data_path, "ab+")
+        self._index_file = open(self.index_path, "ab+")
+        self._load_index()
+
+        if is_new:
+            self._migrate_pickles()
+
+    def _load_index(self) -> None:
+        """加载索引文件，忽略尾部不完整或指向数据文件之外的记录"""
+        data_size = os.path.getsize(self.data_path)
+        with open(self.index_path, "rb") as f:
+            raw = f.read()
+
+        pos = 0
+        valid_end = 0
+        while pos + _KEY_LEN.size <= len(raw):
+            (key_len,) = _KEY_LEN.unpack_from(raw, pos)
+            end = pos + _KEY_LEN.size + key_len + _LOCATION.size
+            if end > len(raw):
+                break
+            key = raw[pos + _KEY_LEN.size:pos + _KEY_LEN.size + key_len].decode("utf-8")
+            offset, length = _LOCATION.unpack_from(raw, pos + _KEY_LEN.size + key_len)
+            if offset + length > data_size:
+                break
+            self._index[key] = (offset, length)
+            pos = valid_end = end
+
+        if valid_end < len(raw):
+            print(f"抽取结果索引尾部存在不完整记录，已截断 ({len(raw) - valid_end} 字节)")
+            self._index_file.truncate(valid_end)
+
+    def _migrate_pickles(self) -> None:
+        """把旧版 {cache_key}.pkl 文件一次性导入存储，导入成功的文件随后删除"""
+        legacy = [name for name in os.listdir(self.store_dir) if name.endswith(".pkl")]
+        if not legacy:
+            return
+
+        items = []
+        for name in legacy:
+            try:
+                with open(os.path.join(self.store_dir, name), "rb") as f:
+                    items.append((name[:-4], pickle.load(f)))
+            except Exception as e:
+                print(f"迁移缓存文件失败 ({name}): {e}")
+
+        self.put_many(items)
+        for key, _ in items:
+            try:
+                os.remove(os.path.join(self.store_dir, f"{key}.pkl"))
+            except OSError as e:
+                print(f"删除已迁移的缓存文件失败 ({key}.pkl): {e}")
+        print(f"已将 {len(items)} 个旧版抽取缓存文件迁移到索引存储")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def missing(self, keys: Iterable[str]) -> List[str]:
+        """
+        批量检查未命中的键
+
+        Args:
+            keys: 键列表
+
+        Returns:
+            List[str]: 不在存储中的键（保持输入顺序）
+        """
+        index = self._index
+        return [key for key in keys if key not in index]
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取单个结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[str]: 结果，不存在时返回None
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        批量读取结果
+
+        Args:
+            keys: 键列表
+
+        Returns:
+            Dict[str, str]: 命中的键到结果的映射
+        """
+        locations = [(key, self._index.get(key)) for key in keys]
+        locations = [(key, loc) for key, loc in locations if loc is not None]
+        if not locations:
+            return {}
+
+        with self._lock:
+            view = self._ensure_mapped(max(offset + length for _, (offset, length) in locations))
+            results = {}
+            for key, (offset, length) in locations:
+                try:
+                    results[key] = view[offset:offset + length].decode("utf-8")
+                except UnicodeDecodeError as e:
+                    print(f"抽取结果损坏 ({key}): {e}")
+            return results
+
+    def put(self, key: str, value: str) -> None:
+        """
+        写入单个结果
+
+        Args:
+            key: 缓存键
+            value: LLM抽取结果文本
+        """
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        批量写入结果，先写数据再写索引，保证索引不会指向未写入的数据
+
+        Args:
+            items: (键, 结果) 列表
+        """
+        with self._lock:
+            self._data_file.seek(0, os.SEEK_END)
+            offset = self._data_file.tell()
+
+            data_parts = []
+            index_parts = []
+            new_locations = {}
+            for key, value in items:
+                if value is None:
+                    continue
+                payload = str(value).encode("utf-8")
+                key_bytes = key.encode("utf-8")
+                data_parts.append(payload)
+                index_parts.append(_KEY_LEN.pack(len(key_bytes)) + key_bytes + _LOCATION.pack(offset, len(payload)))
+                new_locations[key] = (offset, len(payload))
+                offset += len(payload)
+
+            if not data_parts:
+                return
+
+            self._data_file.write(b"".join(data_parts))
+            self._data_file.flush()
+            self._index_file.write(b"".join(index_parts))
+            self._index_file.flush()
+            self._index.update(new_locations)
+
+    def _ensure_mapped(self, required_size: int):
+        """确保内存映射覆盖所需范围，数据文件增长后重新映射，需持有锁"""
+        # 空文件无法映射；命中的结果全为空字符串时无需读取
+        if required_size == 0:
+            return b""
+        if self._mmap is None or required_size > self._mapped_size:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._data_file.flush()
+            self._mapped_size = os.path.getsize(self.data_path)
+            self._mmap = mmap.mmap(self._data_file.fileno(), self._mapped_size, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self) -> None:
+        """关闭文件与内存映射"""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._data_file.close()
+            self._index_file.close()
@@ -282,7 +282,8 @@ class ChunkIndexManager(BaseIndexer):
                 query = f"""
                 UNWIND $updates AS update
                 MATCH (c) WHERE id(c) = update.id
-                SET c.{embedding_property} = update.embedding
+                SET c.{embedding_property} = update.embedding,
+                    c.last_embedded = datetime()
                 """
                 self.graph.query(query, params={"updates": update_data})
             except Exception as e:
@@ -292,7 +293,8 @@ class ChunkIndexManager(BaseIndexer):
                     try:
                         single_query = f"""
                         MATCH (c) WHERE id(c) = $id
-                        SET c.{embedding_property} = $embedding
+                        SET c.{embedding_property} = $embedding,
+                            c.last_embedded = datetime()
                         """
                         self.graph.query(single_query, params={
                             "id": update["id"],
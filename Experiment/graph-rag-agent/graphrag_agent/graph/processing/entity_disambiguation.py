@@ -4,6 +4,8 @@ from difflib import SequenceMatcher
 import numpy as np
 
 from graphrag_agent.graph.core import connection_manager
+from graphrag_agent.graph.core.graph_snapshot import get_graph_version
+from graphrag_agent.graph.processing.similar_entity import bounded_edit_distance
 from graphrag_agent.models.get_models import get_embeddings_model
 from graphrag_agent.config.settings import (
     DISAMBIG_STRING_THRESHOLD,
@@ -12,6 +14,125 @@ from graphrag_agent.config.settings import (
     DISAMBIG_TOP_K
 )
 
+# 批量消歧时每次查询拉取的候选实体数
+_FETCH_BATCH_SIZE = 2000
+# 向量重排时每块计算的 (mention, 候选) 对数，控制临时矩阵的内存
+_RERANK_CHUNK_SIZE = 4096
+
+
+class _NgramIndex:
+    """
+    实体ID的本地二元组倒排索引，用于批量字符串召回
+
+    两个字符串编辑距离为k时，一次编辑最多破坏两个二元组，所以公共二元组（去重后）
+    至少有 max(Da, Db) - 2k 个，其中D为去重后的二元组数。先用长度和公共二元组数
+    过滤候选，再对剩下的候选计算编辑距离，结果与Cypher中的
+    apoc.text.levenshteinSimilarity（忽略大小写）一致。
+    """
+
+    def __init__(self, entity_ids: List[str]):
+        """
+        构建索引
+
+        Args:
+            entity_ids: 实体ID列表
+        """
+        self.ids_by_text: Dict[str, List[str]] = {}
+        for entity_id in entity_ids:
+            if entity_id:
+                self.ids_by_text.setdefault(entity_id.lower(), []).append(entity_id)
+
+        self.texts = list(self.ids_by_text)
+        self.lengths = np.array([len(text) for text in self.texts], dtype=np.int64)
+        gram_counts = []
+        postings: Dict[str, List[int]] = {}
+        for index, text in enumerate(self.texts):
+            grams = self._grams(text)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(index)
+        self.gram_counts = np.array(gram_counts, dtype=np.int64)
+        self.postings = {gram: np.array(items, dtype=np.int64) for gram, items in postings.items()}
+
+        # 按长度分桶，公共二元组下界不为正时需要检查整个桶
+        self.by_length: Dict[int, np.ndarray] = {}
+        for length in np.unique(self.lengths):
+            self.by_length[int(length)] = np.flatnonzero(self.lengths == length)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        """首尾补位后的去重二元组"""
+        padded = f"\x02{text}\x03"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+    @staticmethod
+    def _max_distance(length: int, threshold: float) -> int:
+        """相似度不低于阈值时允许的最大编辑距离"""
+        return int((1.0 - threshold) * length + 1e-9)
+
+    def search(self, mention: str, threshold: float, top_k: int) -> List[Tuple[str, float]]:
+        """
+        召回与mention的Levenshtein相似度不低于阈值的实体
+
+        Args:
+            mention: 实体提及
+            threshold: 相似度阈值
+            top_k: 最多返回的实体数
+
+        Returns:
+            List[Tuple[str, float]]: (实体ID, 相似度)，按相似度降序
+        """
+        text = mention.lower()
+        length = len(text)
+        if not text or not self.texts:
+            return []
+
+        grams = self._grams(text)
+        arrays = [self.postings[gram] for gram in grams if gram in self.postings]
+        if arrays:
+            candidates, shared = np.unique(np.concatenate(arrays), return_counts=True)
+        else:
+            candidates = np.empty(0, dtype=np.int64)
+            shared = np.empty(0, dtype=np.int64)
+
+        # 长度过滤 + 公共二元组数过滤
+        longest = np.maximum(self.lengths[candidates], length)
+        max_distances = ((1.0 - threshold) * longest + 1e-9).astype(np.int64)
+        required = np.maximum(self.gram_counts[candidates], len(grams)) - 2 * max_distances
+        keep = (np.abs(self.lengths[candidates] - length) <= max_distances) & (shared >= required)
+        selected = set(candidates[keep].tolist())
+
+        # 极短的字符串即使没有公共二元组也可能满足阈值
+        if threshold > 0:
+            min_length = int(np.floor(threshold * length))
+            max_length = int(np.ceil(length / threshold))
+        else:
+            min_length, max_length = 0, max(self.by_length) if self.by_length else 0
+        for other_length, members in self.by_length.items():
+            if other_length < min_length or other_length > max_length:
+                continue
+            if len(grams) - 2 * self._max_distance(max(length, other_length), threshold) <= 0:
+                selected.update(members.tolist())
+
+        matches = []
+        for index in selected:
+            other = self.texts[index]
+            longest = max(length, len(other))
+            max_distance = self._max_distance(longest, threshold)
+            distance = bounded_edit_distance(text, other, max_distance)
+            if distance > max_distance:
+                continue
+            similarity = 1.0 - distance / longest
+            if similarity >= threshold:
+                matches.extend((entity_id, similarity) for entity_id in self.ids_by_text[other])
+
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches[:top_k]
+
+
 class EntityDisambiguator:
     """
     实体消歧器: mention → 字符串召回 → 向量重排 → NIL检测 → canonical_id
@@ -23,6 +144,10 @@ class EntityDisambiguator:
         self.graph = connection_manager.get_connection()
         self.embeddings = get_embeddings_model()
         
+        # 批量消歧使用的实体ID索引及其对应的图版本，图版本变化后重建
+        self._ngram_index: Optional[_NgramIndex] = None
+        self._ngram_version: Optional[int] = None
+        
         # 性能统计
         self.stats = {
             'mentions_processed': 0,
@@ -146,15 +271,215 @@ class EntityDisambiguator:
             'candidates': reranked[:3]  # 返回前3个候选
         }
     
+    def build_index(self) -> int:
+        """
+        从图谱读取全部实体ID，重建批量字符串召回使用的本地索引
+        
+        批量消歧在图版本变化时会自动调用；未通过mark_graph_changed记录的写入
+        （如构建流程中途）需要手动调用。
+        
+        Returns:
+            int: 索引中的实体数
+        """
+        version = self._graph_version()
+        results = self.graph.query("""
+        MATCH (e:`__Entity__`)
+        WHERE e.id IS NOT NULL
+        RETURN e.id AS entity_id
+        """)
+        self._ngram_index = _NgramIndex([r['entity_id'] for r in results])
+        self._ngram_version = version
+        return len(self._ngram_index)
+    
+    def _graph_version(self) -> Optional[int]:
+        """读取当前图版本，失败时返回None"""
+        try:
+            return get_graph_version(self.graph)[0]
+        except Exception as e:
+            print(f"读取图版本失败: {e}")
+            return None
+    
+    def _ensure_index(self) -> None:
+        """索引不存在或图版本已变化时重建，与逐条消歧的Cypher召回保持一致"""
+        if self._ngram_index is None:
+            self.build_index()
+            return
+        version = self._graph_version()
+        if version is not None and version != self._ngram_version:
+            self.build_index()
+    
+    def _embed_mentions(self, mentions: List[str]) -> List[List[float]]:
+        """
+        计算mention的查询向量，与逐条消歧的embed_query一致
+        
+        嵌入模型提供embed_queries批量接口时一次完成，否则逐条调用embed_query。
+        """
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if callable(embed_queries):
+            return embed_queries(mentions)
+        return [self.embeddings.embed_query(mention) for mention in mentions]
+    
     def batch_disambiguate(self, mentions: List[str]) -> List[Dict[str, Any]]:
-        """批量消歧"""
+        """
+        批量消歧
+        
+        字符串召回走本地二元组索引（图版本变化时重建），mention的查询向量批量计算，
+        候选实体的描述和向量批量拉取，向量相似度按块用矩阵运算计算；召回、打分和NIL检测的
+        规则与disambiguate相同。批量流程失败时退回逐条消歧。
+        
+        Args:
+            mentions: 实体提及列表
+            
+        Returns:
+            List[Dict]: 与mentions一一对应的消歧结果
+        """
+        if not mentions:
+            return []
+        
+        try:
+            reranked_by_mention = self._batch_recall_and_rerank(mentions)
+        except Exception as e:
+            print(f"批量消歧失败，改为逐条消歧: {e}")
+            return [self.disambiguate(mention) for mention in mentions]
+        
         results = []
         for mention in mentions:
-            result = self.disambiguate(mention)
-            results.append(result)
+            self.stats['mentions_processed'] += 1
+            reranked = reranked_by_mention.get(mention)
+            if reranked is None:
+                results.append({
+                    'mention': mention,
+                    'canonical_id': None,
+                    'is_nil': True,
+                    'candidates': []
+                })
+                continue
+            
+            is_nil, canonical_id = self.nil_detection(mention, reranked)
+            if not is_nil:
+                self.stats['disambiguated'] += 1
+            
+            results.append({
+                'mention': mention,
+                'canonical_id': canonical_id,
+                'is_nil': is_nil,
+                'candidates': reranked[:3]
+            })
         
         return results
     
+    def _batch_recall_and_rerank(self, mentions: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量完成字符串召回和向量重排
+        
+        Args:
+            mentions: 实体提及列表
+            
+        Returns:
+            Dict[str, List[Dict]]: mention到重排后候选的映射，没有召回到候选的mention不在其中
+        """
+        self._ensure_index()
+        
+        # 字符串召回（重复的mention只算一次）
+        recalled: Dict[str, List[Tuple[str, float]]] = {}
+        for mention in dict.fromkeys(mentions):
+            matches = self._ngram_index.search(mention, DISAMBIG_STRING_THRESHOLD, DISAMBIG_TOP_K)
+            if matches:
+                recalled[mention] = matches
+        for mention in mentions:
+            self.stats['candidates_recalled'] += len(recalled.get(mention, []))
+        if not recalled:
+            return {}
+        
+        # 一次拉取全部候选实体的描述和向量
+        candidate_ids = list(dict.fromkeys(
+            entity_id for matches in recalled.values() for entity_id, _ in matches
+        ))
+        descriptions, entity_vectors = self._fetch_candidates(candidate_ids)
+        
+        # 批量计算mention的查询向量（与逐条消歧一样使用查询侧编码）
+        unique_mentions = list(recalled)
+        mention_matrix = self._normalize(np.asarray(
+            self._embed_mentions(unique_mentions), dtype=np.float32
+        ))
+        
+        entity_rows = {}
+        vectors = []
+        for entity_id in candidate_ids:
+            vector = entity_vectors.get(entity_id)
+            if vector is not None and len(vector) == mention_matrix.shape[1]:
+                entity_rows[entity_id] = len(vectors)
+                vectors.append(vector)
+        entity_matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, mention_matrix.shape[1]))
+        
+        # 展开 (mention, 候选) 对，没有向量的候选与逐条消歧一样被丢弃
+        pairs = []
+        pair_mentions = []
+        pair_entities = []
+        for mention_row, mention in enumerate(unique_mentions):
+            for entity_id, similarity in recalled[mention]:
+                if entity_id in entity_rows:
+                    pairs.append((mention, entity_id, similarity))
+                    pair_mentions.append(mention_row)
+                    pair_entities.append(entity_rows[entity_id])
+        
+        vector_similarities = np.empty(len(pairs), dtype=np.float32)
+        pair_mentions = np.asarray(pair_mentions, dtype=np.int64)
+        pair_entities = np.asarray(pair_entities, dtype=np.int64)
+        for start in range(0, len(pairs), _RERANK_CHUNK_SIZE):
+            end = start + _RERANK_CHUNK_SIZE
+            vector_similarities[start:end] = np.einsum(
+                'ij,ij->i',
+                mention_matrix[pair_mentions[start:end]],
+                entity_matrix[pair_entities[start:end]]
+            )
+        
+        reranked_by_mention: Dict[str, List[Dict[str, Any]]] = {mention: [] for mention in unique_mentions}
+        for (mention, entity_id, similarity), vector_similarity in zip(pairs, vector_similarities.tolist()):
+            reranked_by_mention[mention].append({
+                'entity_id': entity_id,
+                'description': descriptions.get(entity_id),
+                'similarity': similarity,
+                'vector_similarity': vector_similarity,
+                'combined_score': 0.4 * similarity + 0.6 * vector_similarity
+            })
+        for reranked in reranked_by_mention.values():
+            reranked.sort(key=lambda x: x['combined_score'], reverse=True)
+        
+        return reranked_by_mention
+    
+    def _fetch_candidates(self, entity_ids: List[str]) -> Tuple[Dict[str, Any], Dict[str, List[float]]]:
+        """
+        分批拉取候选实体的描述和向量
+        
+        Args:
+            entity_ids: 实体ID列表
+            
+        Returns:
+            Tuple: (实体ID到描述的映射, 实体ID到向量的映射)
+        """
+        query = """
+        UNWIND $entity_ids AS eid
+        MATCH (e:`__Entity__` {id: eid})
+        RETURN e.id AS entity_id, e.description AS description, e.embedding AS embedding
+        """
+        descriptions = {}
+        embeddings = {}
+        for start in range(0, len(entity_ids), _FETCH_BATCH_SIZE):
+            batch = entity_ids[start:start + _FETCH_BATCH_SIZE]
+            for r in self.graph.query(query, params={'entity_ids': batch}):
+                descriptions[r['entity_id']] = r['description']
+                if r['embedding'] is not None:
+                    embeddings[r['entity_id']] = r['embedding']
+        return descriptions, embeddings
+    
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """按行归一化，零向量保持为零（余弦相似度为0）"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
     def apply_to_graph(self) -> int:
         """
         将消歧结果应用到图谱
@@ -1,8 +1,13 @@
 import time
 from graphdatascience import GraphDataScience
-from typing import Tuple, List, Any, Dict
+from typing import Tuple, List, Any, Dict, Set
 from dataclasses import dataclass
 
+try:
+    from rapidfuzz.distance import Levenshtein as _Levenshtein
+except ImportError:  # rapidfuzz为可选依赖，未安装时使用纯Python实现
+    _Levenshtein = None
+
 from graphrag_agent.config.settings import (
     similarity_threshold,
     BATCH_SIZE,
@@ -12,6 +17,116 @@ from graphrag_agent.config.settings import (
 )
 from graphrag_agent.graph.core import connection_manager, timer, get_performance_stats, print_performance_stats
 
+
+class _DisjointSet:
+    """并查集（路径减半 + 按大小合并）"""
+    
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+    
+    def find(self, item: str) -> str:
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+    
+    def union(self, a: str, b: str) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size.get(root_a, 1) < self.size.get(root_b, 1):
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] = self.size.get(root_a, 1) + self.size.get(root_b, 1)
+    
+    def groups(self) -> List[List[str]]:
+        members: Dict[str, List[str]] = {}
+        for item in self.parent:
+            members.setdefault(self.find(item), []).append(item)
+        return [group for group in members.values() if len(group) > 1]
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein编辑距离，超过max_distance时提前返回max_distance + 1
+    
+    Args:
+        a: 字符串a
+        b: 字符串b
+        max_distance: 距离上限
+        
+    Returns:
+        int: 编辑距离（超过上限时为max_distance + 1）
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if _Levenshtein is not None:
+        return _Levenshtein.distance(a, b, score_cutoff=max_distance)
+    
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, char_b in enumerate(b, 1):
+        current = [j]
+        row_min = j
+        for i, char_a in enumerate(a, 1):
+            value = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (char_a != char_b))
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        # 每行最小值单调不减，超过上限即可停止
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def _deletion_keys(text: str, max_deletions: int) -> Set[str]:
+    """删除至多max_deletions个字符得到的全部字符串（含原串）"""
+    keys = {text}
+    frontier = {text}
+    for _ in range(max_deletions):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        keys |= frontier
+    return keys
+
+
+def find_edit_distance_groups(entity_ids: List[str], max_distance: int) -> List[List[str]]:
+    """
+    找出编辑距离（忽略大小写）不超过max_distance的实体，并合并成连通的组
+    
+    编辑距离不超过k的两个字符串，各自删除至多k个字符后必有一个公共结果，
+    因此按删除邻域分块不会漏掉任何一对；只有落在同一块中的实体才需要计算编辑距离。
+    
+    Args:
+        entity_ids: 实体ID列表
+        max_distance: 允许的最大编辑距离
+        
+    Returns:
+        List[List[str]]: 排序后的实体组，每组至少两个实体
+    """
+    lowered = {entity_id: entity_id.lower() for entity_id in dict.fromkeys(entity_ids)}
+    blocks: Dict[str, List[str]] = {}
+    for entity_id, text in lowered.items():
+        for key in _deletion_keys(text, max_distance):
+            blocks.setdefault(key, []).append(entity_id)
+    
+    disjoint_set = _DisjointSet()
+    for members in blocks.values():
+        for i in range(1, len(members)):
+            current = members[i]
+            for other in members[:i]:
+                if disjoint_set.find(current) == disjoint_set.find(other):
+                    continue
+                if bounded_edit_distance(lowered[current], lowered[other], max_distance) <= max_distance:
+                    disjoint_set.union(current, other)
+    
+    return sorted(sorted(group) for group in disjoint_set.groups())
+
 @dataclass
 class GDSConfig:
     """Neo4j GDS配置参数"""
@@ -297,79 +412,40 @@ class SimilarEntityDetector:
         """
         查找潜在的重复实体
         
+        一次导出全部实体ID及其WCC社区（KNN相似度形成的向量分桶），在客户端完成分组：
+        同一社区内按删除邻域生成候选键分块，候选对用有上限的编辑距离校验，
+        再用并查集合并有交集的组。结果与原先的Cypher一致（同一社区且编辑距离小于
+        word_edit_distance），但不再对每个社区做两两比较和嵌套reduce。
+        
         Returns:
-            List[Any]: 潜在重复实体的候选列表
+            List[Any]: 潜在重复实体的候选列表，每组为排序后的实体ID列表
         """
         query_start = time.time()
         
-        # 查找包含多个实体的社区
-        community_counts = self.graph.query(
+        rows = self.graph.query(
             """
             MATCH (e:`__Entity__`)
-            WHERE e.wcc IS NOT NULL AND size(e.id) > 1
-            WITH e.wcc AS community, count(*) AS count
-            WHERE count > 1
-            RETURN community, count
-            ORDER BY count DESC
+            WHERE size(e.id) > 1  // 长度大于1个字符
+            RETURN e.id AS id, e.wcc AS community
             """
         )
         
-        if not community_counts:
-            print("没有找到可能包含重复实体的社区")
-            return []
+        communities: Dict[Any, List[str]] = {}
+        for row in rows:
+            communities.setdefault(row["community"], []).append(row["id"])
         
-        # 为有效社区查找潜在重复
-        results = self.graph.query(
-            """
-            MATCH (e:`__Entity__`)
-            WHERE size(e.id) > 1  // 长度大于1个字符
-            WITH e.wcc AS community, collect(e) AS nodes, count(*) AS count
-            WHERE count > 1
-            UNWIND nodes AS node
-            // 添加文本距离计算
-            WITH distinct
-                [n IN nodes WHERE apoc.text.distance(toLower(node.id), toLower(n.id)) < $distance | n.id] 
-                AS intermediate_results
-            WHERE size(intermediate_results) > 1
-            WITH collect(intermediate_results) AS results
-            // 如果组之间有共同元素，则合并组
-            UNWIND range(0, size(results)-1, 1) as index
-            WITH results, index, results[index] as result
-            WITH apoc.coll.sort(reduce(acc = result, 
-                index2 IN range(0, size(results)-1, 1) |
-                CASE WHEN index <> index2 AND
-                    size(apoc.coll.intersection(acc, results[index2])) > 0
-                    THEN apoc.coll.union(acc, results[index2])
-                    ELSE acc
-                END
-            )) as combinedResult
-            WITH distinct(combinedResult) as combinedResult
-            // 额外过滤
-            WITH collect(combinedResult) as allCombinedResults
-            UNWIND range(0, size(allCombinedResults)-1, 1) as combinedResultIndex
-            WITH allCombinedResults[combinedResultIndex] as combinedResult, 
-                combinedResultIndex, 
-                allCombinedResults
-            WHERE NOT any(x IN range(0,size(allCombinedResults)-1,1)
-                WHERE x <> combinedResultIndex
-                AND apoc.coll.containsAll(allCombinedResults[x], combinedResult)
-            )
-            RETURN combinedResult
-            """,
-            params={'distance': self.config.word_edit_distance}
-        )
+        max_distance = self.config.word_edit_distance - 1
+        groups = []
+        if max_distance >= 0:
+            for entity_ids in communities.values():
+                if len(entity_ids) > 1:
+                    groups.extend(find_edit_distance_groups(entity_ids, max_distance))
         
         self.query_time = time.time() - query_start
         
-        # 转换查询结果为简单的字符串列表列表格式
-        processed_results = []
-        for record in results:
-            if "combinedResult" in record and isinstance(record["combinedResult"], list):
-                processed_results.append(record["combinedResult"])
-        
-        print(f"潜在重复实体查找完成，找到 {len(processed_results)} 组候选实体, 用时: {self.query_time:.2f}秒")
+        print(f"潜在重复实体查找完成，找到 {len(groups)} 组候选实体, 用时: {self.query_time:.2f}秒")
         
-        return processed_results
+        return groups
     
     def cleanup(self) -> None:
         """清理内存中的投影图"""
@@ -22,12 +22,16 @@ from graphrag_agent.config.settings import (
     CHUNK_SIZE,
     OVERLAP,
     MAX_WORKERS, BATCH_SIZE,
+    EXTRACTION_ASYNC_SETTINGS,
+    INGESTION_STREAMING_SETTINGS,
 )
 from graphrag_agent.config.neo4jdb import get_db_manager
 from graphrag_agent.pipelines.ingestion.document_processor import DocumentProcessor
 from graphrag_agent.graph import GraphStructureBuilder
 from graphrag_agent.graph import EntityRelationExtractor
 from graphrag_agent.graph import GraphWriter
+from graphrag_agent.graph import mark_graph_changed
+from graphrag_agent.integrations.build.streaming_pipeline import StreamingIngestionPipeline
 
 import shutup
 shutup.please()
@@ -143,10 +147,14 @@ class KnowledgeGraphBuilder:
         构建基础知识图谱
         
         Returns:
-            List: 处理后的文件内容列表，包含文件名、原文、分块和处理结果
+            List: 处理后的文件内容列表，包含文件名、原文、分块和处理结果；
+                流式构建时为每个文件的摘要（不保留原文和分块）
         """
         self._display_stage_header("构建基础知识图谱")
         
+        if INGESTION_STREAMING_SETTINGS["enabled"]:
+            return self._build_base_graph_streaming()
+        
         try:
             # 1. 处理文件（读取和分块）
             process_start = time.time()
@@ -228,6 +236,12 @@ class KnowledgeGraphBuilder:
             
             # 4. 提取实体和关系
             extract_start = time.time()
+            use_async = EXTRACTION_ASYNC_SETTINGS["enabled"]
+            graph_writer = GraphWriter(
+                self.graph,
+                batch_size=50,
+                max_workers=os.cpu_count() or 4
+            )
             with self._create_progress() as progress:
                 total_chunks = sum(doc.get("chunk_count", 0) for doc in self.processed_documents)
                 task = progress.add_task("[cyan]提取实体和关系...", total=total_chunks)
@@ -245,8 +259,25 @@ class KnowledgeGraphBuilder:
                             doc["chunks"]
                         ])
                 
-                # 根据数据集大小选择处理方法
-                if total_chunks > 100:
+                # 根据配置和数据集大小选择处理方法
+                if use_async:
+                    # 异步引擎：全局自适应并发，结果随完成流式写入图数据库
+                    for file_content, doc in zip(
+                        file_contents_format,
+                        [d for d in self.processed_documents if "chunks" in d and d["chunks"]]
+                    ):
+                        file_content.append(doc.get("graph_result") or [])
+                    processed_file_contents = self.entity_extractor.process_chunks_async(
+                        file_contents_format,
+                        progress_callback,
+                        graph_writer=graph_writer
+                    )
+                    # 统一为 [文件名, 原文, chunks, 抽取结果] 格式
+                    processed_file_contents = [
+                        processed_file[:3] + processed_file[4:]
+                        for processed_file in processed_file_contents
+                    ]
+                elif total_chunks > 100:
                     # 对于大型数据集使用批处理模式
                     processed_file_contents = self.entity_extractor.process_chunks_batch(
                         file_contents_format,
@@ -288,6 +319,8 @@ class KnowledgeGraphBuilder:
             
             # 5. 写入数据库
             write_start = time.time()
+            if use_async:
+                self.console.print(f"[blue]实体抽取阶段已流式写入 {graph_writer.streamed_chunks} 个chunk的结果[/blue]")
             with self._create_progress() as progress:
                 task = progress.add_task("[cyan]写入数据库...", total=1)
                 
@@ -317,13 +350,9 @@ class KnowledgeGraphBuilder:
                             entity_data,    # 这应该是实体提取结果
                         ])
                 
-                # 使用优化的GraphWriter
-                graph_writer = GraphWriter(
-                    self.graph, 
-                    batch_size=50,
-                    max_workers=os.cpu_count() or 4
-                )
-                graph_writer.process_and_write_graph_documents(graph_writer_data)
+                # 使用优化的GraphWriter（异步抽取时已流式写入，无需重复写入）
+                if not use_async:
+                    graph_writer.process_and_write_graph_documents(graph_writer_data)
                 progress.update(task, completed=1)
             
             self.performance_stats["写入数据库"] = time.time() - write_start
@@ -363,6 +392,71 @@ class KnowledgeGraphBuilder:
             self.console.print(f"[red]基础图谱构建失败: {str(e)}[/red]")
             raise
 
+    def _build_base_graph_streaming(self) -> List[Dict[str, Any]]:
+        """
+        流式构建基础知识图谱，各阶段通过有界队列并行推进
+        
+        Returns:
+            List[Dict]: 每个文件的摘要
+        """
+        stream_start = time.time()
+        graph_writer = GraphWriter(
+            self.graph,
+            batch_size=50,
+            max_workers=os.cpu_count() or 4
+        )
+        pipeline = StreamingIngestionPipeline(
+            self.document_processor,
+            self.struct_builder,
+            self.entity_extractor,
+            graph_writer,
+            chunk_workers=INGESTION_STREAMING_SETTINGS["chunk_workers"],
+            struct_workers=INGESTION_STREAMING_SETTINGS["struct_workers"],
+            queue_size=INGESTION_STREAMING_SETTINGS["queue_size"],
+            max_pending_chunks=INGESTION_STREAMING_SETTINGS["max_pending_chunks"],
+            uri=str(FILES_DIR),
+            domain=theme
+        )
+        
+        try:
+            with self._create_progress() as progress:
+                # 总chunk数在流式模式下事先未知
+                task = progress.add_task("[cyan]流式构建图谱...", total=None)
+                
+                def progress_callback(completed):
+                    progress.update(task, completed=completed)
+                
+                summaries = pipeline.run(progress_callback=progress_callback)
+        except Exception as e:
+            self.console.print(f"[red]基础图谱构建失败: {str(e)}[/red]")
+            raise
+        
+        # 各阶段重叠执行，耗时统一计入流式构建
+        self.performance_stats = {
+            "初始化": self.performance_stats["初始化"],
+            "流式构建": time.time() - stream_start,
+        }
+        
+        stats = pipeline.stats
+        first_write = stats["first_write_latency"]
+        self._display_results_table("流式构建统计", {
+            "文件数": stats["files"],
+            "文本块数": stats["chunks"],
+            "抽取成功": stats["extracted"],
+            "抽取失败": stats["failed"],
+            "首个结果写入耗时(秒)": f"{first_write:.2f}" if first_write is not None else "-",
+            "写入图数据库的chunk": graph_writer.streamed_chunks,
+        })
+        
+        cache_hits = getattr(self.entity_extractor, 'cache_hits', 0)
+        cache_misses = getattr(self.entity_extractor, 'cache_misses', 0)
+        total_requests = cache_hits + cache_misses
+        cache_rate = (cache_hits / total_requests * 100) if total_requests > 0 else 0
+        self.console.print(f"[blue]LLM调用缓存命中率: {cache_rate:.1f}% ({cache_hits}/{total_requests})[/blue]")
+        
+        self.console.print("[green]基础知识图谱构建完成[/green]")
+        return summaries
+
     def process(self):
         """执行知识图谱构建流程"""
         try:
@@ -383,6 +477,9 @@ class KnowledgeGraphBuilder:
             # 构建基础图谱
             result = self.build_base_graph()
             
+            # 通知各进程的图快照全量重建
+            mark_graph_changed(self.graph)
+            
             # 记录结束时间
             self.end_time = time.time()
             elapsed_time = self.end_time - self.start_time
@@ -12,6 +12,7 @@ from graphrag_agent.config.settings import community_algorithm
 from graphrag_agent.graph import EntityIndexManager
 from graphrag_agent.graph import GDSConfig, SimilarEntityDetector
 from graphrag_agent.graph import EntityMerger
+from graphrag_agent.graph import mark_graph_changed
 from graphrag_agent.graph.processing import EntityQualityProcessor
 from graphrag_agent.community import CommunityDetectorFactory
 from graphrag_agent.community import CommunitySummarizerFactory
@@ -311,6 +312,9 @@ class IndexCommunityBuilder:
             # 构建索引和社区
             self.build_index_and_communities()
             
+            # 实体合并会改写关系，图快照需要全量重建
+            mark_graph_changed(self.graph)
+            
             # 记录结束时间
             self.end_time = time.time()
             elapsed_time = self.end_time - self.start_time
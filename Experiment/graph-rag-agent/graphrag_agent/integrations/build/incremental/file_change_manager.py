@@ -1,12 +1,43 @@
 import os
+import stat
 import json
 import hashlib
 import time
+import threading
+import concurrent.futures
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set
 
-from graphrag_agent.config.settings import FILE_REGISTRY_PATH
+from graphrag_agent.config.settings import FILE_REGISTRY_PATH, FILE_CHANGE_SETTINGS
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+
+class _ChangeEventHandler(FileSystemEventHandler):
+    """把文件系统事件记录为待检查的路径"""
+
+    def __init__(self, manager: "FileChangeManager"):
+        super().__init__()
+        self.manager = manager
+
+    def on_any_event(self, event):
+        paths = [event.src_path, getattr(event, "dest_path", None)]
+        if event.is_directory:
+            # 目录移动/删除会影响其下所有文件，下次检测时重新扫描
+            if event.event_type in ("moved", "deleted"):
+                self.manager._mark_dirty(None)
+            return
+        for path in paths:
+            if path:
+                self.manager._mark_dirty(path)
 
 class FileChangeManager:
     """
@@ -16,15 +47,22 @@ class FileChangeManager:
     1. 扫描文件目录，计算文件哈希值
     2. 与历史记录比较，识别变更的文件
     3. 更新文件注册表
+    
+    扫描时信任注册表中的 (大小, 修改时间, inode)，只有这三项发生变化的文件
+    才在线程池中重新计算哈希。开启监听模式后由文件系统事件标记变化的路径，
+    空闲时检测变更不再遍历目录。
     """
     
-    def __init__(self, files_dir: str, registry_path: str = None):
+    def __init__(self, files_dir: str, registry_path: str = None,
+                 hash_workers: int = None, watch: bool = None):
         """
         初始化文件变更管理器
 
         Args:
             files_dir: 要监控的文件目录
             registry_path: 文件注册表保存路径，默认使用配置中的路径
+            hash_workers: 计算哈希的线程数，默认使用配置
+            watch: 是否监听文件系统事件，默认使用配置
         """
         if registry_path is None:
             registry_path = str(FILE_REGISTRY_PATH)
@@ -32,6 +70,23 @@ class FileChangeManager:
         self.files_dir = Path(files_dir)
         self.registry_path = Path(registry_path)
         self.registry = self._load_registry()
+        self.hash_workers = max(1, hash_workers or FILE_CHANGE_SETTINGS["hash_workers"])
+        self.hash_buffer_size = FILE_CHANGE_SETTINGS["hash_buffer_size"]
+        
+        # 扫描统计：最近一次扫描中复用stat和重新计算哈希的文件数
+        self.last_scan_stats = {"files": 0, "hashed": 0, "reused": 0}
+        
+        # 监听模式状态
+        self._observer = None
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty: Set[str] = set()
+        self._full_rescan = True
+        self._dirty_lock = threading.Lock()
+        
+        if watch is None:
+            watch = FILE_CHANGE_SETTINGS["watch"]
+        if watch:
+            self.start_watching()
     
     def _load_registry(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -67,9 +122,14 @@ class FileChangeManager:
         """
         hash_obj = hashlib.sha256()
         try:
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b''):
-                    hash_obj.update(chunk)
+            with open(file_path, 'rb', buffering=0) as f:
+                buffer = bytearray(self.hash_buffer_size)
+                view = memoryview(buffer)
+                while True:
+                    size = f.readinto(buffer)
+                    if not size:
+                        break
+                    hash_obj.update(view[:size])
             return hash_obj.hexdigest()
         except Exception as e:
             print(f"计算文件哈希值失败: {file_path}, 错误: {e}")
@@ -82,30 +142,170 @@ class FileChangeManager:
         Returns:
             Dict: 当前文件状态，键为文件路径，值为文件元数据
         """
-        current_files = {}
-        
-        # 遍历文件目录
+        if self._observer is not None:
+            return self._refresh_snapshot()
+        return self._stat_scan()
+    
+    def _stat_scan(self, known: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """遍历目录读取stat，只对stat变化的文件计算哈希，known默认为注册表"""
+        stats = {}
         for root, _, files in os.walk(self.files_dir):
             for filename in files:
                 file_path = Path(root) / filename
                 rel_path = str(file_path.relative_to(self.files_dir))
-                
-                # 计算文件哈希值
-                file_hash = self._compute_file_hash(file_path)
-                if not file_hash:
-                    continue
-                
-                # 记录文件元数据
-                file_info = {
-                    "hash": file_hash,
-                    "size": file_path.stat().st_size,
-                    "last_modified": file_path.stat().st_mtime,
-                    "last_scanned": time.time()
-                }
-                current_files[rel_path] = file_info
+                try:
+                    stats[rel_path] = file_path.stat()
+                except OSError as e:
+                    print(f"读取文件状态失败: {file_path}, 错误: {e}")
+        
+        return self._build_file_infos(stats, self.registry if known is None else known)
+    
+    def _build_file_infos(self, stats: Dict[str, os.stat_result],
+                          known: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        根据stat结果生成文件元数据，stat未变的文件复用已知哈希，其余并行计算
+        
+        Args:
+            stats: 相对路径到stat结果的映射
+            known: 已知的文件元数据（注册表或监听快照）
+            
+        Returns:
+            Dict: 文件元数据
+        """
+        now = time.time()
+        current_files = {}
+        to_hash = []
+        
+        for rel_path, st in stats.items():
+            previous = known.get(rel_path)
+            if (previous and previous.get("hash")
+                    and previous.get("size") == st.st_size
+                    and previous.get("last_modified") == st.st_mtime
+                    and previous.get("inode") == st.st_ino):
+                file_hash = previous["hash"]
+            else:
+                to_hash.append(rel_path)
+                continue
+            current_files[rel_path] = self._file_info(file_hash, st, now)
+        
+        if to_hash:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.hash_workers, len(to_hash))) as executor:
+                hashes = executor.map(lambda rel: self._compute_file_hash(self.files_dir / rel), to_hash)
+                for rel_path, file_hash in zip(to_hash, hashes):
+                    if file_hash:
+                        current_files[rel_path] = self._file_info(file_hash, stats[rel_path], now)
         
+        self.last_scan_stats = {
+            "files": len(stats),
+            "hashed": len(to_hash),
+            "reused": len(stats) - len(to_hash),
+        }
         return current_files
     
+    @staticmethod
+    def _file_info(file_hash: str, st: os.stat_result, scanned_at: float) -> Dict[str, Any]:
+        """构造单个文件的元数据"""
+        return {
+            "hash": file_hash,
+            "size": st.st_size,
+            "last_modified": st.st_mtime,
+            "inode": st.st_ino,
+            "last_scanned": scanned_at
+        }
+    
+    # ----- 监听模式 -----
+    
+    def start_watching(self) -> bool:
+        """
+        开始监听文件目录的变化
+        
+        Returns:
+            bool: 是否成功启动监听（未安装watchdog时返回False，继续使用stat扫描）
+        """
+        if self._observer is not None:
+            return True
+        if not WATCHDOG_AVAILABLE:
+            print("未安装watchdog，文件变更检测使用stat扫描")
+            return False
+        
+        try:
+            observer = Observer()
+            observer.schedule(_ChangeEventHandler(self), str(self.files_dir), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            print(f"启动文件监听失败，使用stat扫描: {e}")
+            return False
+        
+        with self._dirty_lock:
+            self._observer = observer
+            self._full_rescan = True
+            self._dirty.clear()
+        return True
+    
+    def stop_watching(self):
+        """停止监听文件目录"""
+        observer = self._observer
+        if observer is None:
+            return
+        self._observer = None
+        self._snapshot = None
+        observer.stop()
+        observer.join(timeout=5)
+    
+    def _mark_dirty(self, path: Optional[str]):
+        """
+        记录发生变化的路径
+        
+        Args:
+            path: 绝对路径；为None时表示需要重新扫描整个目录
+        """
+        with self._dirty_lock:
+            if path is None:
+                self._full_rescan = True
+                return
+            try:
+                rel_path = str(Path(path).relative_to(self.files_dir))
+            except ValueError:
+                return
+            self._dirty.add(rel_path)
+    
+    def _refresh_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """根据监听到的事件更新快照，只检查变化过的路径"""
+        with self._dirty_lock:
+            full_rescan = self._full_rescan or self._snapshot is None
+            dirty = self._dirty
+            self._dirty = set()
+            self._full_rescan = False
+        
+        if full_rescan:
+            # 首次或目录级变化时完整扫描一次（仍然只对stat变化的文件计算哈希）
+            self._snapshot = self._stat_scan({**self.registry, **(self._snapshot or {})})
+            return dict(self._snapshot)
+        
+        if dirty:
+            stats = {}
+            for rel_path in dirty:
+                try:
+                    st = (self.files_dir / rel_path).stat()
+                except OSError:
+                    st = None
+                if st is None or not stat.S_ISREG(st.st_mode):
+                    # 文件已删除或不再是普通文件
+                    self._snapshot.pop(rel_path, None)
+                    continue
+                stats[rel_path] = st
+            updated = self._build_file_infos(stats, self._snapshot)
+            for rel_path in stats:
+                if rel_path in updated:
+                    self._snapshot[rel_path] = updated[rel_path]
+                else:
+                    self._snapshot.pop(rel_path, None)
+        else:
+            self.last_scan_stats = {"files": len(self._snapshot), "hashed": 0, "reused": len(self._snapshot)}
+        
+        return dict(self._snapshot)
+    
     def detect_changes(self) -> Dict[str, List[str]]:
         """
         检测文件变更
@@ -9,6 +9,7 @@ from rich.text import Text
 
 from incremental_graph_builder import IncrementalGraphUpdater
 from graphrag_agent.graph.graph_consistency_validator import GraphConsistencyValidator
+from graphrag_agent.graph.core.graph_snapshot import mark_graph_changed
 from graphrag_agent.integrations.build.incremental.manual_edit_manager import ManualEditManager
 from graphrag_agent.graph.indexing.embedding_manager import EmbeddingManager
 from graphrag_agent.community import CommunityDetectorFactory, CommunitySummarizerFactory
@@ -96,6 +97,9 @@ class IncrementalUpdateManager:
                 if deleted_count > 0:
                     self.verify_graph_consistency()
                 
+                # 通知图快照刷新
+                self._mark_graph_changed(changes)
+                
                 # 更新统计信息
                 self.stats["updates_performed"] += 1
                 self.stats["files_processed"] += total_changed
@@ -109,6 +113,33 @@ class IncrementalUpdateManager:
             self.stats["errors"] += 1
             return {"error": str(e)}
     
+    def _mark_graph_changed(self, changes):
+        """
+        记录文件变更影响的实体，供图快照增量刷新
+        
+        删除文件会移除实体和关系，直接标记为全量变更；否则只记录变更文件的Chunk提到的实体。
+        
+        Args:
+            changes: 文件变更信息
+        """
+        try:
+            if changes.get("deleted"):
+                mark_graph_changed(self.graph)
+                return
+            
+            filenames = [
+                os.path.basename(file_path)
+                for file_path in changes.get("added", []) + changes.get("modified", [])
+            ]
+            result = self.graph.query("""
+            MATCH (c:`__Chunk__`)-[:MENTIONS]->(e:`__Entity__`)
+            WHERE c.fileName IN $filenames
+            RETURN collect(DISTINCT e.id) AS entity_ids
+            """, params={"filenames": filenames})
+            mark_graph_changed(self.graph, result[0]["entity_ids"] if result else [])
+        except Exception as e:
+            self.console.print(f"[yellow]记录图变更失败: {e}[/yellow]")
+    
     def update_entity_embeddings(self):
         """
         更新实体Embedding
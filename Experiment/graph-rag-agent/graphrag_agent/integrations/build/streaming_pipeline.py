@@ -0,0 +1,273 @@
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+
+from graphrag_agent.config.settings import FILES_DIR, theme
+
+
+# 队列结束标记，每个下游工作线程收到一个
+_DONE = object()
+
+
+class StreamingIngestionPipeline:
+    """
+    流式知识图谱构建流水线
+
+    读取 → 分块 → 结构写入 → 实体抽取 → 图写入 五个阶段各自拥有工作线程，
+    阶段之间通过有界队列衔接：下游处理不过来时上游自然阻塞，因此同时驻留
+    内存的只有队列中的少量文件和等待抽取的chunk，而第一个文件的实体在其余
+    文件还在读取时就已写入Neo4j。
+    """
+
+    def __init__(self, document_processor, struct_builder, entity_extractor, graph_writer,
+                 chunk_workers: int = 2, struct_workers: int = 2,
+                 queue_size: int = 4, max_pending_chunks: int = 256,
+                 uri: str = str(FILES_DIR), domain: str = theme):
+        """
+        初始化流式构建流水线
+
+        Args:
+            document_processor: DocumentProcessor，提供文件读取和分块
+            struct_builder: GraphStructureBuilder，写入Document/Chunk结构
+            entity_extractor: EntityRelationExtractor，提供异步抽取引擎与结果缓存
+            graph_writer: GraphWriter，后台流式写入抽取结果
+            chunk_workers: 分块线程数
+            struct_workers: 结构写入线程数
+            queue_size: 文件级队列长度
+            max_pending_chunks: 等待抽取或写入的chunk上限
+            uri: Document节点的uri
+            domain: Document节点的domain
+        """
+        self.document_processor = document_processor
+        self.struct_builder = struct_builder
+        self.entity_extractor = entity_extractor
+        self.graph_writer = graph_writer
+        self.chunk_workers = max(1, chunk_workers)
+        self.struct_workers = max(1, struct_workers)
+        self.queue_size = max(1, queue_size)
+        self.max_pending_chunks = max(1, max_pending_chunks)
+        self.uri = uri
+        self.domain = domain
+
+        self.summaries: List[Dict[str, Any]] = []
+        self.stats = {
+            "files": 0,
+            "chunks": 0,
+            "extracted": 0,
+            "failed": 0,
+            "first_write_latency": None,
+        }
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._extract_input_done = False
+
+    def run(self, file_extensions: Optional[List[str]] = None, recursive: bool = True,
+            progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        执行流式构建（会先清空数据库）
+
+        Args:
+            file_extensions: 要处理的文件扩展名，如不指定则处理所有支持的类型
+            recursive: 是否递归处理子目录
+            progress_callback: 每完成一个chunk的抽取时调用
+
+        Returns:
+            List[Dict]: 每个文件的摘要（不含原文和分块内容）
+        """
+        self._started = time.time()
+        self.struct_builder.clear_database()
+
+        read_queue = queue.Queue(maxsize=self.queue_size)
+        chunk_queue = queue.Queue(maxsize=self.queue_size)
+        extract_queue = queue.Queue(maxsize=self.max_pending_chunks)
+
+        self.graph_writer.start_stream(max_pending=self.max_pending_chunks, on_written=self._on_written)
+
+        read_thread = threading.Thread(
+            target=self._read_stage, args=(read_queue, file_extensions, recursive),
+            name="ingest-read", daemon=True
+        )
+        extract_thread = threading.Thread(
+            target=self._run_extract_stage, args=(extract_queue, progress_callback),
+            name="ingest-extract", daemon=True
+        )
+        read_thread.start()
+        extract_thread.start()
+
+        threads = [read_thread, extract_thread]
+        threads += self._start_stage("ingest-chunk", self.chunk_workers, self._chunk_file,
+                                     read_queue, chunk_queue, self.struct_workers)
+        threads += self._start_stage("ingest-struct", self.struct_workers, self._write_structure,
+                                     chunk_queue, extract_queue, 1)
+
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self.graph_writer.close_stream()
+
+        return self.summaries
+
+    # ----- 各阶段 -----
+
+    def _read_stage(self, out_queue: queue.Queue, file_extensions, recursive: bool) -> None:
+        """逐个读取文件，读完后通知所有分块线程"""
+        try:
+            for filepath, content in self.document_processor.file_reader.iter_files(file_extensions, recursive):
+                out_queue.put((filepath, content))
+        except Exception as e:
+            print(f"流式读取文件时出错: {e}")
+        finally:
+            for _ in range(self.chunk_workers):
+                out_queue.put(_DONE)
+
+    def _start_stage(self, name: str, workers: int, handler: Callable,
+                     in_queue: queue.Queue, out_queue: queue.Queue, downstream_workers: int) -> List[threading.Thread]:
+        """
+        启动一个多线程阶段，最后一个退出的线程负责通知下游
+
+        Args:
+            name: 线程名前缀
+            workers: 线程数
+            handler: 处理函数，接收一个队列元素并向out_queue输出
+            in_queue: 输入队列
+            out_queue: 输出队列
+            downstream_workers: 下游消费线程数（决定结束标记数量）
+
+        Returns:
+            List[threading.Thread]: 已启动的线程
+        """
+        remaining = [workers]
+        remaining_lock = threading.Lock()
+
+        def worker():
+            while True:
+                item = in_queue.get()
+                if item is _DONE:
+                    break
+                try:
+                    handler(item, out_queue)
+                except Exception as e:
+                    print(f"{name} 处理失败: {e}")
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for _ in range(downstream_workers):
+                    out_queue.put(_DONE)
+
+        threads = [threading.Thread(target=worker, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _chunk_file(self, item, out_queue: queue.Queue) -> None:
+        """对文件分块，分块失败的文件只记录摘要"""
+        filepath, content = item
+        doc = self.document_processor.process_file(filepath, content)
+        if doc.get("chunks"):
+            out_queue.put(doc)
+        else:
+            self._add_summary(doc)
+
+    def _write_structure(self, doc: Dict[str, Any], out_queue: queue.Queue) -> None:
+        """写入Document节点和Chunk链，然后把每个chunk交给抽取阶段"""
+        self.struct_builder.create_document(
+            type="local",
+            uri=self.uri,
+            file_name=doc["filename"],
+            domain=self.domain
+        )
+        if doc["chunk_count"] > 100:
+            chunks_with_hash = self.struct_builder.parallel_process_chunks(doc["filename"], doc["chunks"])
+        else:
+            chunks_with_hash = self.struct_builder.create_relation_between_chunks(doc["filename"], doc["chunks"])
+
+        # 结构已写入，原文和分块不再需要
+        self._add_summary(doc)
+        doc.pop("content", None)
+        doc.pop("chunks", None)
+
+        with self._lock:
+            self.stats["chunks"] += len(chunks_with_hash)
+        for chunk in chunks_with_hash:
+            out_queue.put((chunk["chunk_id"], chunk["chunk_doc"].page_content))
+
+    def _run_extract_stage(self, in_queue: queue.Queue, progress_callback) -> None:
+        """抽取线程入口，事件循环异常退出时继续消费队列，避免上游永久阻塞"""
+        try:
+            asyncio.run(self._extract_stage(in_queue, progress_callback))
+        except Exception as e:
+            print(f"流式抽取阶段异常退出: {e}")
+            while not self._extract_input_done:
+                if in_queue.get() is _DONE:
+                    break
+                self.stats["failed"] += 1
+
+    async def _extract_stage(self, in_queue: queue.Queue, progress_callback) -> None:
+        """在独立事件循环中抽取chunk，未完成的chunk数受max_pending_chunks限制"""
+        loop = asyncio.get_running_loop()
+        engine = self.entity_extractor.create_async_engine()
+        window = asyncio.Semaphore(self.max_pending_chunks)
+        pending = set()
+        # 读队列和写队列的阻塞操作放在各自的线程中，不占用默认线程池
+        reader = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-extract-read")
+        writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-extract-write")
+
+        await engine.start()
+        try:
+            while True:
+                item = await loop.run_in_executor(reader, in_queue.get)
+                if item is _DONE:
+                    self._extract_input_done = True
+                    break
+                await window.acquire()
+                task = asyncio.create_task(self._extract_chunk(engine, item, window, writer, progress_callback))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            await engine.stop()
+            reader.shutdown(wait=False)
+            writer.shutdown(wait=True)
+
+    async def _extract_chunk(self, engine, item, window: asyncio.Semaphore,
+                             writer: concurrent.futures.Executor, progress_callback) -> None:
+        """抽取单个chunk并提交给GraphWriter的流式队列"""
+        chunk_id, text = item
+        try:
+            result = await engine.extract_text(text)
+            if result:
+                await asyncio.get_running_loop().run_in_executor(
+                    writer, self.graph_writer.stream_result, chunk_id, text, result
+                )
+                self.stats["extracted"] += 1
+            else:
+                self.stats["failed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Chunk {chunk_id} 抽取失败: {e}")
+        finally:
+            window.release()
+            if progress_callback:
+                try:
+                    progress_callback(self.stats["extracted"] + self.stats["failed"])
+                except Exception:
+                    pass
+
+    def _on_written(self, count: int) -> None:
+        """GraphWriter写完一批结果后记录首次写入延迟"""
+        with self._lock:
+            if self.stats["first_write_latency"] is None:
+                self.stats["first_write_latency"] = time.time() - self._started
+
+    def _add_summary(self, doc: Dict[str, Any]) -> None:
+        """记录文件摘要"""
+        summary = {key: value for key, value in doc.items() if key not in ("content", "chunks")}
+        with self._lock:
+            self.summaries.append(summary)
+            self.stats["files"] += 1
@@ -0,0 +1,339 @@
+import os
+import array
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+# 单条SQL中IN参数的上限，低于SQLite默认的变量数限制
+_LOOKUP_BATCH = 500
+
+
+class EmbeddingStore:
+    """
+    按内容寻址的持久化向量存储
+
+    键为 (模型标识, 类型, 文本SHA-256)，向量以float32字节保存在SQLite（WAL模式）中，
+    多个进程可以共用同一个文件。命中/未命中计数在进程内累计。
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        初始化向量存储
+
+        Args:
+            path: SQLite文件路径
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取连接，fork后自动重新连接"""
+        if self._pid != os.getpid():
+            self._conn = None
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, kind TEXT NOT NULL, hash TEXT NOT NULL, "
+                "vector BLOB NOT NULL, PRIMARY KEY (model, kind, hash)) WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """计算文本的内容哈希"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, kind: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        批量读取向量
+
+        Args:
+            model: 模型标识
+            kind: 向量类型（document/query）
+            hashes: 文本哈希列表
+
+        Returns:
+            Dict[str, List[float]]: 命中的哈希到向量的映射
+        """
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        try:
+            with self._lock:
+                conn = self._connect()
+                for start in range(0, len(unique), _LOOKUP_BATCH):
+                    batch = unique[start:start + _LOOKUP_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT hash, vector FROM embeddings WHERE model = ? AND kind = ? "
+                        f"AND hash IN ({placeholders})",
+                        (model, kind, *batch)
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = array.array("f")
+                        vector.frombytes(blob)
+                        found[text_hash] = vector.tolist()
+        except sqlite3.Error as e:
+            print(f"读取向量缓存失败: {e}")
+        return found
+
+    def put_many(self, model: str, kind: str, items: List[Tuple[str, List[float]]]) -> None:
+        """
+        批量写入向量
+
+        Args:
+            model: 模型标识
+            kind: 向量类型（document/query）
+            items: (文本哈希, 向量) 列表
+        """
+        if not items:
+            return
+        rows = [(model, kind, text_hash, array.array("f", vector).tobytes()) for text_hash, vector in items]
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, kind, hash, vector) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"写入向量缓存失败: {e}")
+
+    def record(self, hits: int, misses: int) -> None:
+        """累计命中/未命中次数"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict[str, float]:
+        """
+        获取命中统计
+
+        Returns:
+            Dict: hits、misses和hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        """关闭连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带持久化缓存的嵌入模型包装
+
+    相同模型下文本内容不变就不会再次调用嵌入API：每次调用先按内容哈希批量查找，
+    只把未命中的文本（去重后）合并成一次embed_documents请求，结果写回存储。
+    查询文本大多只出现一次，查询向量只保存在进程内容量有限的LRU备忘录中，不写入存储。
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore, model_name: str,
+                 base_url: Optional[str] = None, provider: Optional[str] = None,
+                 query_memo_size: int = 1024, symmetric_queries: bool = False):
+        """
+        初始化缓存嵌入模型
+
+        Args:
+            embeddings: 实际的嵌入模型
+            store: 向量存储
+            model_name: 模型名
+            base_url: 嵌入服务地址，不同服务下的同名模型互不共用向量
+            provider: 提供方标识，默认取实际嵌入模型的类名
+            query_memo_size: 查询向量备忘录容量，0表示不缓存查询向量
+            symmetric_queries: 实际模型的embed_query是否等价于单条embed_documents，
+                为True时embed_queries把未命中的查询合并成一次批量请求
+        """
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name
+        self.base_url = base_url or ""
+        self.provider = provider or type(embeddings).__name__
+        # 缓存键中的模型标识：提供方、服务地址和模型名共同决定向量空间
+        self.cache_namespace = f"{self.provider}|{self.base_url}|{model_name}"
+        self.query_memo_size = max(0, query_memo_size)
+        self.symmetric_queries = symmetric_queries
+        self._query_memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @property
+    def hits(self) -> int:
+        return self.store.hits
+
+    @property
+    def misses(self) -> int:
+        return self.store.misses
+
+    def cache_stats(self) -> Dict[str, float]:
+        """获取缓存命中统计"""
+        return self.store.stats()
+
+    def _lookup(self, texts: List[str], kind: str) -> Tuple[List[str], Dict[str, List[float]], List[str]]:
+        """查找缓存，返回 (各文本哈希, 命中向量, 去重后的未命中哈希)"""
+        hashes = [EmbeddingStore.text_hash(text) for text in texts]
+        found = self.store.get_many(self.cache_namespace, kind, hashes)
+        missing = [h for h in dict.fromkeys(hashes) if h not in found]
+        hit_count = sum(1 for h in hashes if h in found)
+        self.store.record(hit_count, len(hashes) - hit_count)
+        return hashes, found, missing
+
+    def _miss_texts(self, texts: List[str], hashes: List[str], missing: List[str]) -> List[str]:
+        """按未命中哈希的顺序取出对应文本"""
+        text_of = dict(zip(hashes, texts))
+        return [text_of[h] for h in missing]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量嵌入文档，未命中的文本合并为一次请求"""
+        if not texts:
+            return []
+        hashes, found, missing = self._lookup(texts, "document")
+        if missing:
+            vectors = self.embeddings.embed_documents(self._miss_texts(texts, hashes, missing))
+            computed = list(zip(missing, vectors))
+            self.store.put_many(self.cache_namespace, "document", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    def _memo_get(self, text: str) -> Optional[List[float]]:
+        """从查询备忘录读取向量并记录命中统计"""
+        with self._memo_lock:
+            vector = self._query_memo.get(text)
+            if vector is not None:
+                self._query_memo.move_to_end(text)
+        self.store.record(int(vector is not None), int(vector is None))
+        return vector
+
+    def _memo_put(self, text: str, vector: List[float]) -> None:
+        """写入查询备忘录，超出容量时淘汰最久未用的查询"""
+        if self.query_memo_size <= 0:
+            return
+        with self._memo_lock:
+            self._query_memo[text] = vector
+            self._query_memo.move_to_end(text)
+            while len(self._query_memo) > self.query_memo_size:
+                self._query_memo.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        """嵌入查询文本"""
+        vector = self._memo_get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._memo_put(text, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量嵌入查询文本，结果与逐条embed_query一致
+
+        查询与文档编码方式相同的模型合并为一次embed_documents请求，否则逐条调用embed_query。
+
+        Args:
+            texts: 查询文本列表
+
+        Returns:
+            List[List[float]]: 与texts一一对应的查询向量
+        """
+        vectors: Dict[str, List[float]] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            vector = self._memo_get(text)
+            if vector is None:
+                missing.append(text)
+            else:
+                vectors[text] = vector
+
+        if missing:
+            if self.symmetric_queries:
+                computed = self.embeddings.embed_documents(missing)
+            else:
+                computed = [self.embeddings.embed_query(text) for text in missing]
+            for text, vector in zip(missing, computed):
+                self._memo_put(text, vector)
+                vectors[text] = vector
+        return [vectors[text] for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """异步批量嵌入文档"""
+        if not texts:
+            return []
+        hashes, found, missing = self._lookup(texts, "document")
+        if missing:
+            vectors = await self.embeddings.aembed_documents(self._miss_texts(texts, hashes, missing))
+            computed = list(zip(missing, vectors))
+            self.store.put_many(self.cache_namespace, "document", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """异步嵌入查询文本"""
+        vector = self._memo_get(text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._memo_put(text, vector)
+        return vector
+
+    def __getattr__(self, name):
+        # 其余属性（如model、dimensions）透传给实际模型
+        embeddings = self.__dict__.get("embeddings")
+        if embeddings is None:
+            raise AttributeError(name)
+        return getattr(embeddings, name)
+
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(path: str) -> EmbeddingStore:
+    """
+    获取指定路径的向量存储，同一进程内共享一个实例
+
+    Args:
+        path: SQLite文件路径
+
+    Returns:
+        EmbeddingStore: 向量存储
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = EmbeddingStore(path)
+            _stores[path] = store
+        return store
@@ -5,12 +5,15 @@ from langchain.callbacks.manager import AsyncCallbackManager
 
 
 import os
+import functools
 
 from graphrag_agent.config.settings import (
     TIKTOKEN_CACHE_DIR,
     OPENAI_EMBEDDING_CONFIG,
     OPENAI_LLM_CONFIG,
+    EMBEDDING_CACHE_SETTINGS,
 )
+from graphrag_agent.models.embedding_cache import CachedEmbeddings, get_embedding_store
 
 
 # 设置 tiktoken 缓存目录，避免每次联网拉取
@@ -23,7 +26,21 @@ setup_cache()
 
 def get_embeddings_model():
     config = {k: v for k, v in OPENAI_EMBEDDING_CONFIG.items() if v}
-    return OpenAIEmbeddings(**config)
+    embeddings = OpenAIEmbeddings(**config)
+    if not EMBEDDING_CACHE_SETTINGS["enabled"]:
+        return embeddings
+
+    # 同一模型下内容不变的文本直接复用已持久化的向量
+    store = get_embedding_store(str(EMBEDDING_CACHE_SETTINGS["path"]))
+    return CachedEmbeddings(
+        embeddings,
+        store,
+        model_name=embeddings.model,
+        base_url=OPENAI_EMBEDDING_CONFIG.get("base_url"),
+        query_memo_size=EMBEDDING_CACHE_SETTINGS["query_memo_size"],
+        # OpenAIEmbeddings的embed_query就是单条embed_documents，查询可以合并批量请求
+        symmetric_queries=True,
+    )
 
 
 def get_llm_model():
@@ -39,6 +56,18 @@ def get_stream_llm_model():
     config.update({"streaming": True, "callbacks": manager})
     return ChatOpenAI(**config)
 
+@functools.lru_cache(maxsize=None)
+def _get_token_encoder(kind):
+    """加载并缓存分词器，进程内只加载一次；加载失败返回None，之后不再重试"""
+    try:
+        if kind == 'deepseek':
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-V3")
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
 def count_tokens(text):
     """简单通用的token计数"""
     if not text:
@@ -46,22 +75,13 @@ def count_tokens(text):
     
     model_name = (OPENAI_LLM_CONFIG.get("model") or "").lower()
     
-    # 如果是deepseek，使用transformers
-    if 'deepseek' in model_name:
-        try:
-            from transformers import AutoTokenizer
-            tokenizer = AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-V3")
-            return len(tokenizer.encode(text))
-        except:
-            pass
-    
-    # 如果是gpt，使用tiktoken
-    if 'gpt' in model_name:
+    # deepseek使用transformers分词器，gpt使用tiktoken
+    kind = 'deepseek' if 'deepseek' in model_name else 'gpt' if 'gpt' in model_name else None
+    encoder = _get_token_encoder(kind) if kind else None
+    if encoder is not None:
         try:
-            import tiktoken
-            encoding = tiktoken.get_encoding("cl100k_base")
-            return len(encoding.encode(text))
-        except:
+            return len(encoder.encode(text))
+        except Exception:
             pass
     
     # 备用方案：简单计算
@@ -43,39 +43,64 @@ class DocumentProcessor:
         if len(file_contents) > 0:
             print(f"文件类型: {[os.path.splitext(f[0])[1] for f in file_contents]}")
         
+        # 多进程模式下先把所有文件交给进程池分块，输出顺序与串行一致
+        if self.chunker.workers > 1 and len(file_contents) > 1:
+            try:
+                all_chunks = self.chunker.chunk_texts(
+                    [content for _, content in file_contents],
+                    workers=self.chunker.workers
+                )
+                return [
+                    self.process_file(filepath, content, chunks)
+                    for (filepath, content), chunks in zip(file_contents, all_chunks)
+                ]
+            except Exception as e:
+                print(f"批量分块失败，改为逐个文件分块: {str(e)}")
+        
         # 处理每个文件
-        results = []
-        for filepath, content in file_contents:
-            file_ext = os.path.splitext(filepath)[1].lower()
-            
-            # 创建文件处理结果字典
-            file_result = {
-                "filepath": filepath,  # 相对路径
-                "filename": os.path.basename(filepath),  # 仅文件名
-                "extension": file_ext,
-                "content": content,
-                "content_length": len(content),
-                "chunks": None
-            }
+        return [self.process_file(filepath, content) for filepath, content in file_contents]
+    
+    def process_file(self, filepath: str, content: str, chunks: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+        """
+        对单个文件的内容进行分块
+        
+        Args:
+            filepath: 文件路径（相对路径）
+            content: 文件内容
+            chunks: 已计算好的分块结果，不提供时在此分块
             
-            # 对文本内容进行分块
-            try:
+        Returns:
+            Dict: 文件处理结果，包含文件名、内容、分块等信息
+        """
+        file_ext = os.path.splitext(filepath)[1].lower()
+        
+        # 创建文件处理结果字典
+        file_result = {
+            "filepath": filepath,  # 相对路径
+            "filename": os.path.basename(filepath),  # 仅文件名
+            "extension": file_ext,
+            "content": content,
+            "content_length": len(content),
+            "chunks": None
+        }
+        
+        # 对文本内容进行分块
+        try:
+            if chunks is None:
                 chunks = self.chunker.chunk_text(content)
-                file_result["chunks"] = chunks
-                file_result["chunk_count"] = len(chunks)
-                
-                # 计算每个块的长度
-                chunk_lengths = [len(''.join(chunk)) for chunk in chunks]
-                file_result["chunk_lengths"] = chunk_lengths
-                file_result["average_chunk_length"] = sum(chunk_lengths) / len(chunk_lengths) if chunk_lengths else 0
-                
-            except Exception as e:
-                file_result["chunk_error"] = str(e)
-                print(f"分块错误 ({filepath}): {str(e)}")
-                
-            results.append(file_result)
+            file_result["chunks"] = chunks
+            file_result["chunk_count"] = len(chunks)
+            
+            # 计算每个块的长度
+            chunk_lengths = [len(''.join(chunk)) for chunk in chunks]
+            file_result["chunk_lengths"] = chunk_lengths
+            file_result["average_chunk_length"] = sum(chunk_lengths) / len(chunk_lengths) if chunk_lengths else 0
+            
+        except Exception as e:
+            file_result["chunk_error"] = str(e)
+            print(f"分块错误 ({filepath}): {str(e)}")
             
-        return results
+        return file_result
         
     def get_file_stats(self, file_extensions: Optional[List[str]] = None, recursive: bool = True) -> Dict[str, Any]:
         """
@@ -1,6 +1,6 @@
 import codecs
 import os
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Iterator
 import PyPDF2
 from docx import Document
 import csv
@@ -44,41 +44,58 @@ class FileReader:
         Returns:
             List[Tuple[str, str]]: 文件名和内容的元组列表
         """
-        supported_extensions = {
-            '.txt': self._read_txt,
-            '.pdf': self._read_pdf,
-            '.md': self._read_markdown,
-            '.docx': self._read_docx,
-            '.doc': self._read_doc,
-            '.csv': self._read_csv,
-            '.json': self._read_json,
-            '.yaml': self._read_yaml,
-            '.yml': self._read_yaml,
-        }
+        results = list(self.iter_files(file_extensions, recursive))
+        if recursive:
+            print(f"递归读取目录完成，总共读取了 {len(results)} 个文件")
+        else:
+            print(f"总共读取了 {len(results)} 个文件")
+        return results
+    
+    def iter_files(self, file_extensions: Optional[List[str]] = None, recursive: bool = True) -> Iterator[Tuple[str, str]]:
+        """
+        逐个读取文件的生成器，每次只在内存中保留一个文件的内容，供流式构建使用
+        
+        Args:
+            file_extensions: 文件扩展名列表，如不指定则读取所有支持的格式
+            recursive: 是否递归读取子目录，默认为True
+            
+        Yields:
+            Tuple[str, str]: 文件名（递归时为相对路径）和内容
+        """
+        supported_extensions = self._supported_readers()
         
         # 如未指定扩展名，则使用所有支持的扩展名
         if file_extensions is None:
             file_extensions = list(supported_extensions.keys())
-            
-        results = []
+        
         try:
             if recursive:
                 # 递归读取所有文件
-                results = self._read_files_recursive(self.directory_path, file_extensions, supported_extensions)
-                print(f"递归读取目录完成，总共读取了 {len(results)} 个文件")
+                yield from self._read_files_recursive(self.directory_path, file_extensions, supported_extensions)
             else:
                 # 仅读取当前目录的文件
                 all_filenames = os.listdir(self.directory_path)
                 print(f"当前目录中共有 {len(all_filenames)} 个文件")
                 
-                results = self._process_files_in_dir(self.directory_path, all_filenames, file_extensions, supported_extensions)
-                print(f"总共读取了 {len(results)} 个文件")
+                yield from self._process_files_in_dir(self.directory_path, all_filenames, file_extensions, supported_extensions)
         except Exception as e:
             print(f"列出目录 {self.directory_path} 中的文件时出错: {str(e)}")
-            
-        return results
     
-    def _read_files_recursive(self, root_dir: str, file_extensions: List[str], supported_extensions: Dict) -> List[Tuple[str, str]]:
+    def _supported_readers(self) -> Dict:
+        """支持的文件扩展名及对应的读取方法"""
+        return {
+            '.txt': self._read_txt,
+            '.pdf': self._read_pdf,
+            '.md': self._read_markdown,
+            '.docx': self._read_docx,
+            '.doc': self._read_doc,
+            '.csv': self._read_csv,
+            '.json': self._read_json,
+            '.yaml': self._read_yaml,
+            '.yml': self._read_yaml,
+        }
+    
+    def _read_files_recursive(self, root_dir: str, file_extensions: List[str], supported_extensions: Dict) -> Iterator[Tuple[str, str]]:
         """
         递归读取目录及其子目录中的文件
         
@@ -87,11 +104,9 @@ class FileReader:
             file_extensions: 要处理的文件扩展名列表
             supported_extensions: 支持的文件扩展名及对应处理函数
             
-        Returns:
-            List[Tuple[str, str]]: 文件名和内容的元组列表
+        Yields:
+            Tuple[str, str]: 文件名（相对路径）和内容
         """
-        results = []
-        
         try:
             # 遍历目录内容
             for item in os.listdir(root_dir):
@@ -100,8 +115,7 @@ class FileReader:
                 # 如果是目录，递归处理
                 if os.path.isdir(item_path):
                     print(f"递归进入子目录: {item_path}")
-                    sub_results = self._read_files_recursive(item_path, file_extensions, supported_extensions)
-                    results.extend(sub_results)
+                    yield from self._read_files_recursive(item_path, file_extensions, supported_extensions)
                 
                 # 如果是文件，处理文件
                 elif os.path.isfile(item_path):
@@ -117,18 +131,17 @@ class FileReader:
                         if file_ext in supported_extensions:
                             try:
                                 content = supported_extensions[file_ext](item_path)
-                                # 存储相对路径而不是仅文件名，以便区分不同目录中的同名文件
-                                results.append((rel_path, content))
-                                print(f"成功读取文件: {rel_path}, 内容长度: {len(content)}")
                             except Exception as e:
                                 print(f"读取文件 {rel_path} 时出错: {str(e)}")
+                                continue
+                            print(f"成功读取文件: {rel_path}, 内容长度: {len(content)}")
+                            # 存储相对路径而不是仅文件名，以便区分不同目录中的同名文件
+                            yield rel_path, content
         except Exception as e:
             print(f"列出目录 {root_dir} 中的文件时出错: {str(e)}")
-            
-        return results
     
     def _process_files_in_dir(self, directory: str, filenames: List[str], file_extensions: List[str], 
-                              supported_extensions: Dict) -> List[Tuple[str, str]]:
+                              supported_extensions: Dict) -> Iterator[Tuple[str, str]]:
         """
         处理指定目录中的文件（不递归）
         
@@ -138,11 +151,9 @@ class FileReader:
             file_extensions: 要处理的文件扩展名列表
             supported_extensions: 支持的文件扩展名及对应处理函数
             
-        Returns:
-            List[Tuple[str, str]]: 文件名和内容的元组列表
+        Yields:
+            Tuple[str, str]: 文件名和内容
         """
-        results = []
-        
         for filename in filenames:
             file_ext = os.path.splitext(filename)[1].lower()
             
@@ -154,12 +165,11 @@ class FileReader:
                 if file_ext in supported_extensions:
                     try:
                         content = supported_extensions[file_ext](file_path)
-                        results.append((filename, content))
-                        print(f"成功读取文件: {filename}, 内容长度: {len(content)}")
                     except Exception as e:
                         print(f"读取文件 {filename} 时出错: {str(e)}")
-        
-        return results
+                        continue
+                    print(f"成功读取文件: {filename}, 内容长度: {len(content)}")
+                    yield filename, content
     
     def _read_txt(self, file_path: str) -> str:
         """读取TXT文件"""
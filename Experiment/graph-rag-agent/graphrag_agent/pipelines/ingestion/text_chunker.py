@@ -1,13 +1,42 @@
 import hanlp
 import re
-from typing import List, Tuple
+import threading
+import multiprocessing
+import concurrent.futures
+from typing import List, Tuple, Optional
+
+from graphrag_agent.config.settings import (
+    CHUNK_SIZE,
+    OVERLAP,
+    MAX_TEXT_LENGTH,
+    CHUNK_WORKERS,
+    TOKENIZE_BATCH_SIZE,
+)
+
+
+# 分块子进程内的分块器，每个进程只加载一次模型
+_worker_chunker = None
+# 多个线程共用一个分块器时，保证分词模型只加载一次
+_tokenizer_lock = threading.Lock()
+
+
+def _init_chunk_worker(chunk_size: int, overlap: int, max_text_length: int, batch_size: int) -> None:
+    """分块子进程初始化：加载本进程的分词模型"""
+    global _worker_chunker
+    _worker_chunker = ChineseTextChunker(chunk_size, overlap, max_text_length, batch_size=batch_size)
+    _worker_chunker.tokenizer
+
+
+def _chunk_in_worker(texts: List[str]) -> List[List[List[str]]]:
+    """在子进程中对一组文本分块"""
+    return _worker_chunker.chunk_texts(texts)
 
-from graphrag_agent.config.settings import CHUNK_SIZE, OVERLAP, MAX_TEXT_LENGTH
 
 class ChineseTextChunker:
     """中文文本分块器，将长文本分割成带有重叠的文本块"""
     
-    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP, max_text_length: int = MAX_TEXT_LENGTH):
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP, max_text_length: int = MAX_TEXT_LENGTH,
+                 workers: int = CHUNK_WORKERS, batch_size: int = TOKENIZE_BATCH_SIZE):
         """
         初始化分块器
         
@@ -15,6 +44,8 @@ class ChineseTextChunker:
             chunk_size: 每个文本块的目标大小（tokens数量）
             overlap: 相邻文本块的重叠大小（tokens数量）
             max_text_length: HanLP处理的最大文本长度，超过此长度将进行预分割
+            workers: 多文件分块时的进程数，1表示在当前进程串行处理
+            batch_size: 每次送入分词器的段落数
         """
         if chunk_size <= overlap:
             raise ValueError("chunk_size必须大于overlap")
@@ -22,7 +53,18 @@ class ChineseTextChunker:
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.max_text_length = max_text_length
-        self.tokenizer = hanlp.load(hanlp.pretrained.tok.COARSE_ELECTRA_SMALL_ZH)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._tokenizer = None
+    
+    @property
+    def tokenizer(self):
+        """HanLP分词模型，首次使用时加载（多进程模式下主进程无需加载）"""
+        if self._tokenizer is None:
+            with _tokenizer_lock:
+                if self._tokenizer is None:
+                    self._tokenizer = hanlp.load(hanlp.pretrained.tok.COARSE_ELECTRA_SMALL_ZH)
+        return self._tokenizer
         
     def process_files(self, file_contents: List[Tuple[str, str]]) -> List[Tuple[str, str, List[List[str]]]]:
         """
@@ -34,12 +76,93 @@ class ChineseTextChunker:
         Returns:
             List of (filename, content, chunks) tuples
         """
+        all_chunks = self.chunk_texts([content for _, content in file_contents], workers=self.workers)
+        return [
+            (filename, content, chunks)
+            for (filename, content), chunks in zip(file_contents, all_chunks)
+        ]
+    
+    def chunk_texts(self, texts: List[str], workers: Optional[int] = None) -> List[List[List[str]]]:
+        """
+        对多个文本分块，结果与逐个调用chunk_text完全一致
+        
+        串行模式下所有文本的段落合并后按批送入分词器；多进程模式下文件按顺序
+        分组交给进程池，每个子进程加载一份模型，结果按输入顺序返回。
+        
+        Args:
+            texts: 文本列表
+            workers: 进程数，默认为1（串行）
+            
+        Returns:
+            每个文本的分块结果，顺序与输入一致
+        """
+        workers = max(1, workers or 1)
+        if workers > 1 and len(texts) > 1:
+            return self._chunk_texts_parallel(texts, workers)
+        
+        # 先收集所有文本的待分词段落，再批量分词
+        plans = []
+        segments = []
+        for text in texts:
+            if not text or len(text) < self.chunk_size / 10:
+                # 短文本整段分词，作为一个块
+                plans.append(("short", len(segments)))
+                segments.append(text)
+            else:
+                text_segments = self._preprocess_large_text(text)
+                plans.append(("segments", (len(segments), len(text_segments))))
+                segments.extend(text_segments)
+        
+        tokenized = self._safe_tokenize_batch(segments)
+        
         results = []
-        for filename, content in file_contents:
-            chunks = self.chunk_text(content)
-            results.append((filename, content, chunks))
+        for kind, info in plans:
+            if kind == "short":
+                tokens = tokenized[info]
+                results.append([tokens] if tokens else [])
+            else:
+                start, count = info
+                chunks = []
+                for tokens in tokenized[start:start + count]:
+                    chunks.extend(self._chunk_tokens(tokens))
+                results.append(chunks)
         return results
     
+    def _chunk_texts_parallel(self, texts: List[str], workers: int) -> List[List[List[str]]]:
+        """使用进程池分块，按文本长度把连续的文件分组，保持输出顺序"""
+        # 每个进程分到若干组，组内连续的文件在子进程中一起批量分词
+        total_length = sum(len(text or "") for text in texts)
+        target = max(1, total_length // (workers * 4))
+        groups = []
+        current = []
+        current_length = 0
+        for text in texts:
+            current.append(text)
+            current_length += len(text or "")
+            if current_length >= target:
+                groups.append(current)
+                current = []
+                current_length = 0
+        if current:
+            groups.append(current)
+        
+        # 使用spawn启动子进程，避免fork已加载的模型和线程状态
+        context = multiprocessing.get_context("spawn")
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(workers, len(groups)),
+                mp_context=context,
+                initializer=_init_chunk_worker,
+                initargs=(self.chunk_size, self.overlap, self.max_text_length, self.batch_size)
+            ) as executor:
+                results = []
+                for group_result in executor.map(_chunk_in_worker, groups):
+                    results.extend(group_result)
+                return results
+        except Exception as e:
+            print(f"多进程分块失败，回退到串行分块: {e}")
+            return self.chunk_texts(texts, workers=1)
+    
     def _preprocess_large_text(self, text: str) -> List[str]:
         """
         预处理过大的文本，将其分割成较小的段落
@@ -162,6 +285,41 @@ class ChineseTextChunker:
         
         return segments
     
+    def _safe_tokenize_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        批量分词，结果与逐个调用_safe_tokenize一致
+        
+        Args:
+            texts: 要分词的文本列表
+            
+        Returns:
+            每个文本的分词结果
+        """
+        results: List[Optional[List[str]]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = self._safe_tokenize(text)
+            elif len(text) > self.max_text_length:
+                results[i] = list(text)
+            else:
+                pending.append(i)
+        
+        for start in range(0, len(pending), self.batch_size):
+            indices = pending[start:start + self.batch_size]
+            try:
+                batch_tokens = self.tokenizer([texts[i] for i in indices])
+                if len(batch_tokens) != len(indices):
+                    raise ValueError("分词结果数量与输入不一致")
+                for i, tokens in zip(indices, batch_tokens):
+                    results[i] = tokens if tokens else []
+            except Exception:
+                # 整批失败时逐个分词，单个文本的异常处理与串行一致
+                for i in indices:
+                    results[i] = self._safe_tokenize(texts[i])
+        
+        return results
+    
     def _safe_tokenize(self, text: str) -> List[str]:
         """
         安全的分词方法，处理可能的异常
@@ -200,29 +358,23 @@ class ChineseTextChunker:
         # 预处理过大文本
         text_segments = self._preprocess_large_text(text)
         
-        # 处理每个文本段落
+        # 批量分词后处理每个文本段落
         all_chunks = []
-        for segment in text_segments:
-            segment_chunks = self._chunk_single_segment(segment)
-            all_chunks.extend(segment_chunks)
+        for tokens in self._safe_tokenize_batch(text_segments):
+            all_chunks.extend(self._chunk_tokens(tokens))
         
         return all_chunks
     
-    def _chunk_single_segment(self, text: str) -> List[List[str]]:
+    def _chunk_tokens(self, all_tokens: List[str]) -> List[List[str]]:
         """
-        处理单个文本段落的分块
+        按token切分已分词的段落
         
         Args:
-            text: 单个文本段落
+            all_tokens: 段落的分词结果
             
         Returns:
             分块结果
         """
-        if not text:
-            return []
-            
-        # 先将整个文本分词
-        all_tokens = self._safe_tokenize(text)
         if not all_tokens:
             return []
         
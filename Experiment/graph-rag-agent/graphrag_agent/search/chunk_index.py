@@ -0,0 +1,382 @@
+import os
+import time
+import math
+import pickle
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from graphrag_agent.config.settings import CHUNK_VECTOR_INDEX_SETTINGS
+
+
+class ChunkVectorIndex:
+    """
+    __Chunk__向量的本地近似最近邻索引
+
+    首次使用时从Neo4j分页拉取全部Chunk向量构建FAISS索引并持久化到本地，
+    之后依据EmbeddingManager写入的last_embedded时间戳做增量同步，
+    查询时不再需要把候选向量通过Bolt传输到客户端。
+    """
+
+    def __init__(self,
+                 graph,
+                 index_dir: Optional[str] = None,
+                 sync_interval: Optional[float] = None,
+                 fetch_batch_size: Optional[int] = None,
+                 ivf_threshold: Optional[int] = None,
+                 nprobe: Optional[int] = None):
+        """
+        初始化Chunk向量索引
+
+        参数:
+            graph: Neo4jGraph实例，用于拉取Chunk向量
+            index_dir: 索引文件目录
+            sync_interval: 两次增量同步之间的最小间隔（秒）
+            fetch_batch_size: 分页拉取向量的批大小
+            ivf_threshold: Chunk数量超过该值时使用IVF索引，否则使用精确的Flat索引
+            nprobe: IVF索引查询时探测的聚类数
+        """
+        config = CHUNK_VECTOR_INDEX_SETTINGS
+        self.graph = graph
+        self.index_dir = str(index_dir or config["dir"])
+        self.sync_interval = config["sync_interval"] if sync_interval is None else sync_interval
+        self.fetch_batch_size = fetch_batch_size or config["fetch_batch_size"]
+        self.ivf_threshold = ivf_threshold or config["ivf_threshold"]
+        self.nprobe = nprobe or config["nprobe"]
+
+        self.index = None
+        self.dimension: Optional[int] = None
+
+        # chunk id 与 FAISS 整数ID 的双向映射
+        self.chunk_to_id: Dict[str, int] = {}
+        self.id_to_chunk: Dict[int, str] = {}
+        self._next_id = 0
+
+        # 增量同步水位线（Neo4j服务器时间，ISO字符串）
+        self._watermark: Optional[str] = None
+        self._last_sync_time = 0.0
+
+        self._lock = threading.RLock()
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._load()
+
+    @property
+    def size(self) -> int:
+        """索引中的向量数量"""
+        return self.index.ntotal if self.index is not None else 0
+
+    def _index_path(self) -> str:
+        return os.path.join(self.index_dir, "chunks.faiss")
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.index_dir, "chunks.pkl")
+
+    # ===== 构建与同步 =====
+
+    def build(self) -> int:
+        """
+        从Neo4j全量构建索引
+
+        返回:
+            int: 索引中的向量数量
+        """
+        with self._lock:
+            start_time = time.time()
+            server_now = self._server_time()
+
+            ids, vectors = [], []
+            after = ""
+            while True:
+                rows = self.graph.query("""
+                MATCH (c:`__Chunk__`)
+                WHERE c.embedding IS NOT NULL AND c.id > $after
+                RETURN c.id AS id, c.embedding AS embedding
+                ORDER BY c.id
+                LIMIT $limit
+                """, params={"after": after, "limit": self.fetch_batch_size})
+                if not rows:
+                    break
+                for row in rows:
+                    if row.get("embedding"):
+                        ids.append(row["id"])
+                        vectors.append(row["embedding"])
+                after = rows[-1]["id"]
+                if len(rows) < self.fetch_batch_size:
+                    break
+
+            self.chunk_to_id.clear()
+            self.id_to_chunk.clear()
+            self._next_id = 0
+
+            if not vectors:
+                self.index = None
+                self.dimension = None
+            else:
+                matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+                self.dimension = matrix.shape[1]
+                faiss_ids = self._assign_ids(ids)
+                self.index = self._create_index(matrix)
+                self.index.add_with_ids(matrix, faiss_ids)
+
+            self._watermark = server_now
+            self._last_sync_time = time.time()
+            self._save()
+
+            print(f"Chunk向量索引构建完成: {self.size} 个向量，耗时 {time.time() - start_time:.2f}秒")
+            return self.size
+
+    def sync(self, force: bool = False) -> int:
+        """
+        与Neo4j增量同步
+
+        只拉取last_embedded不早于上次水位线的Chunk，再按ID集合对账
+        （处理被删除的Chunk，以及由未写入last_embedded的流程生成的向量）。
+
+        参数:
+            force: 是否忽略同步间隔立即同步
+
+        返回:
+            int: 本次新增或更新的向量数量
+        """
+        with self._lock:
+            if not force and time.time() - self._last_sync_time < self.sync_interval:
+                return 0
+
+            if self.index is None or self._watermark is None:
+                return self.build()
+
+            server_now = self._server_time()
+
+            # 增量拉取重新计算过向量的Chunk
+            updated = 0
+            after = ""
+            while True:
+                rows = self.graph.query("""
+                MATCH (c:`__Chunk__`)
+                WHERE c.embedding IS NOT NULL
+                  AND c.last_embedded IS NOT NULL
+                  AND c.last_embedded >= datetime($since)
+                  AND c.id > $after
+                RETURN c.id AS id, c.embedding AS embedding
+                ORDER BY c.id
+                LIMIT $limit
+                """, params={
+                    "since": self._watermark,
+                    "after": after,
+                    "limit": self.fetch_batch_size
+                })
+                if not rows:
+                    break
+                if self._upsert_rows(rows) is None:
+                    # 向量维度发生变化，说明嵌入模型已更换
+                    return self.build()
+                updated += len(rows)
+                after = rows[-1]["id"]
+                if len(rows) < self.fetch_batch_size:
+                    break
+
+            updated += self._reconcile()
+
+            # 小规模Flat索引增长到阈值后切换为IVF
+            if not isinstance(self.index, faiss.IndexIVF) and self.size > self.ivf_threshold:
+                return self.build()
+
+            self._watermark = server_now
+            self._last_sync_time = time.time()
+            if updated:
+                self._save()
+            return updated
+
+    def _reconcile(self) -> int:
+        """按ID集合对账，处理被删除或缺少时间戳的Chunk（数量相同但ID不同时也能发现）"""
+        rows = self.graph.query("""
+        MATCH (c:`__Chunk__`)
+        WHERE c.embedding IS NOT NULL
+        RETURN c.id AS id
+        """)
+        current_ids = {row["id"] for row in rows}
+        if current_ids == self.chunk_to_id.keys():
+            return 0
+
+        removed = [cid for cid in self.chunk_to_id if cid not in current_ids]
+        if removed:
+            self._remove_chunks(removed)
+
+        missing = [cid for cid in current_ids if cid not in self.chunk_to_id]
+        added = 0
+        for i in range(0, len(missing), self.fetch_batch_size):
+            batch = missing[i:i + self.fetch_batch_size]
+            rows = self.graph.query("""
+            MATCH (c:`__Chunk__`)
+            WHERE c.id IN $ids AND c.embedding IS NOT NULL
+            RETURN c.id AS id, c.embedding AS embedding
+            """, params={"ids": batch})
+            if self._upsert_rows(rows) is None:
+                return self.build()
+            added += len(rows)
+
+        return added + len(removed)
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> Optional[int]:
+        """写入或覆盖一批Chunk向量，维度不匹配时返回None"""
+        rows = [row for row in rows if row.get("embedding")]
+        if not rows:
+            return 0
+
+        matrix = self._normalize(np.asarray([row["embedding"] for row in rows], dtype=np.float32))
+        if matrix.shape[1] != self.dimension:
+            return None
+
+        chunk_ids = [row["id"] for row in rows]
+        existing = [self.chunk_to_id[cid] for cid in chunk_ids if cid in self.chunk_to_id]
+        if existing:
+            self.index.remove_ids(np.asarray(existing, dtype=np.int64))
+
+        self.index.add_with_ids(matrix, self._assign_ids(chunk_ids))
+        return len(rows)
+
+    def _remove_chunks(self, chunk_ids: List[str]) -> None:
+        """从索引中移除Chunk"""
+        faiss_ids = [self.chunk_to_id.pop(cid) for cid in chunk_ids if cid in self.chunk_to_id]
+        for fid in faiss_ids:
+            self.id_to_chunk.pop(fid, None)
+        if faiss_ids:
+            self.index.remove_ids(np.asarray(faiss_ids, dtype=np.int64))
+
+    def _assign_ids(self, chunk_ids: List[str]) -> np.ndarray:
+        """为Chunk分配FAISS整数ID，已存在的Chunk沿用原ID"""
+        faiss_ids = []
+        for cid in chunk_ids:
+            fid = self.chunk_to_id.get(cid)
+            if fid is None:
+                fid = self._next_id
+                self._next_id += 1
+                self.chunk_to_id[cid] = fid
+                self.id_to_chunk[fid] = cid
+            faiss_ids.append(fid)
+        return np.asarray(faiss_ids, dtype=np.int64)
+
+    def _create_index(self, matrix: np.ndarray):
+        """根据数据规模创建Flat或IVF索引"""
+        count = matrix.shape[0]
+        if count <= self.ivf_threshold:
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+        index.nprobe = min(self.nprobe, nlist)
+        return index
+
+    def _server_time(self) -> str:
+        """获取Neo4j服务器当前时间，作为同步水位线"""
+        result = self.graph.query("RETURN toString(datetime()) AS now")
+        return result[0]["now"]
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """按行归一化，使内积等价于余弦相似度"""
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+    # ===== 查询 =====
+
+    def search(self, query_embedding: List[float], top_k: int) -> List[Tuple[str, float]]:
+        """
+        检索与查询向量最相似的Chunk
+
+        参数:
+            query_embedding: 查询向量
+            top_k: 返回数量
+
+        返回:
+            List[Tuple[str, float]]: (chunk_id, 余弦相似度) 列表，按相似度降序
+        """
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+
+            query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+            if query.shape[1] != self.dimension:
+                return []
+
+            scores, ids = self.index.search(query, min(top_k, self.index.ntotal))
+
+            results = []
+            for score, fid in zip(scores[0], ids[0]):
+                if fid == -1:
+                    continue
+                chunk_id = self.id_to_chunk.get(int(fid))
+                if chunk_id is not None:
+                    results.append((chunk_id, float(score)))
+            return results
+
+    # ===== 持久化 =====
+
+    def _save(self) -> None:
+        """
+        保存索引与映射关系
+
+        两个文件都先写到临时文件再用os.replace替换，写入中途崩溃不会留下半个文件；
+        元数据记录向量数，加载时与索引核对，两次替换之间崩溃造成的不一致会被发现并重建。
+        """
+        index_tmp = f"{self._index_path()}.tmp"
+        meta_tmp = f"{self._meta_path()}.tmp"
+        try:
+            if self.index is not None:
+                faiss.write_index(self.index, index_tmp)
+
+            with open(meta_tmp, 'wb') as f:
+                pickle.dump({
+                    'dimension': self.dimension,
+                    'chunk_to_id': self.chunk_to_id,
+                    'next_id': self._next_id,
+                    'watermark': self._watermark,
+                    'ntotal': self.size
+                }, f)
+
+            if self.index is not None:
+                os.replace(index_tmp, self._index_path())
+            elif os.path.exists(self._index_path()):
+                os.remove(self._index_path())
+            os.replace(meta_tmp, self._meta_path())
+        except Exception as e:
+            print(f"保存Chunk向量索引失败: {e}")
+            for path in (index_tmp, meta_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _load(self) -> None:
+        """加载本地索引，失败时等待下次同步重建"""
+        if not (os.path.exists(self._meta_path()) and os.path.exists(self._index_path())):
+            return
+
+        try:
+            with open(self._meta_path(), 'rb') as f:
+                data = pickle.load(f)
+            self.index = faiss.read_index(self._index_path())
+            chunk_to_id = data.get('chunk_to_id', {})
+            if self.index.ntotal != data.get('ntotal', self.index.ntotal) or self.index.ntotal != len(chunk_to_id):
+                raise ValueError("索引文件与元数据不一致")
+            if isinstance(self.index, faiss.IndexIVF):
+                self.index.nprobe = min(self.nprobe, self.index.nlist)
+            self.dimension = data.get('dimension')
+            self.chunk_to_id = chunk_to_id
+            self.id_to_chunk = {fid: cid for cid, fid in self.chunk_to_id.items()}
+            self._next_id = data.get('next_id', 0)
+            self._watermark = data.get('watermark')
+        except Exception as e:
+            print(f"加载Chunk向量索引失败: {e}")
+            self.index = None
+            self.dimension = None
+            self.chunk_to_id = {}
+            self.id_to_chunk = {}
+            self._next_id = 0
+            self._watermark = None
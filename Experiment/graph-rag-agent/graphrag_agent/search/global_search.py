@@ -1,4 +1,4 @@
-from typing import List
+from typing import Callable, List, Optional
 from tqdm import tqdm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -10,6 +10,7 @@ from graphrag_agent.config.prompts import (
     GLOBAL_SEARCH_REDUCE_PROMPT,
 )
 from graphrag_agent.config.neo4jdb import get_db_manager
+from graphrag_agent.search.map_reduce import CommunityMapReduce
 
 class GlobalSearch:
     """
@@ -17,8 +18,8 @@ class GlobalSearch:
     
     该类主要用于在整个知识图谱范围内进行搜索，采用以下步骤：
     1. 获取指定层级的所有社区数据
-    2. Map阶段：为每个社区生成中间结果
-    3. Reduce阶段：整合所有中间结果生成最终答案
+    2. Map阶段：按token预算把社区打包成批次，并发生成中间结果
+    3. Reduce阶段：整合所有中间结果生成最终答案，超出上下文预算时分层归并
     """
     
     def __init__(self, llm, response_type: str = "多个段落"):
@@ -38,6 +39,20 @@ class GlobalSearch:
         
         # 初始化Neo4j图实例
         self.graph = db_manager.get_graph()
+
+        # 设置Map和Reduce阶段的处理链
+        map_prompt = ChatPromptTemplate.from_messages([
+            ("system", MAP_SYSTEM_PROMPT),
+            ("human", GLOBAL_SEARCH_MAP_PROMPT),
+        ])
+        reduce_prompt = ChatPromptTemplate.from_messages([
+            ("system", REDUCE_SYSTEM_PROMPT),
+            ("human", GLOBAL_SEARCH_REDUCE_PROMPT),
+        ])
+        self.map_reduce = CommunityMapReduce(
+            map_prompt | self.llm | StrOutputParser(),
+            reduce_prompt | self.llm | StrOutputParser(),
+        )
         
     def _get_community_data(self, level: int) -> List[dict]:
         """
@@ -58,37 +73,28 @@ class GlobalSearch:
             params={"level": level},
         )
     
-    def _process_communities(self, query: str, communities: List[dict]) -> List[str]:
+    def _process_communities(self, query: str, communities: List[dict],
+                             on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
         """
         处理社区数据生成中间结果（Map阶段）
         
         参数:
             query: 搜索查询字符串
             communities: 社区数据列表
+            on_result: 每个批次完成时的回调，参数为 (批次序号, 批次结果)
             
         返回:
-            List[str]: 中间结果列表
+            List[str]: 按批次顺序排列的中间结果列表
         """
-        # 设置Map阶段的提示模板
-        map_prompt = ChatPromptTemplate.from_messages([
-            ("system", MAP_SYSTEM_PROMPT),
-            ("human", GLOBAL_SEARCH_MAP_PROMPT),
-        ])
-        
-        # 创建Map阶段的处理链
-        map_chain = map_prompt | self.llm | StrOutputParser()
-        
-        # 处理每个社区
-        results = []
-        for community in tqdm(communities, desc="正在处理社区数据"):
-            response = map_chain.invoke({
-                "question": query,
-                "context_data": community["output"]
-            })
-            results.append(response)
-            print(response)  # 输出处理进度
-            
-        return results
+        # 只打包一次，进度条总数和Map阶段共用同一组批次
+        batches = self.map_reduce.pack_batches(communities)
+        with tqdm(total=len(batches), desc="正在处理社区数据") as progress:
+            def handle(index: int, result: str):
+                progress.update(1)
+                if on_result:
+                    on_result(index, result)
+
+            return self.map_reduce.map(query, communities, on_result=handle, batches=batches)
     
     def _reduce_results(self, query: str, intermediate_results: List[str]) -> str:
         """
@@ -101,29 +107,18 @@ class GlobalSearch:
         返回:
             str: 最终生成的答案
         """
-        # 设置Reduce阶段的提示模板
-        reduce_prompt = ChatPromptTemplate.from_messages([
-            ("system", REDUCE_SYSTEM_PROMPT),
-            ("human", GLOBAL_SEARCH_REDUCE_PROMPT),
-        ])
-        
-        # 创建Reduce阶段的处理链
-        reduce_chain = reduce_prompt | self.llm | StrOutputParser()
-        
-        # 生成最终答案
-        return reduce_chain.invoke({
-            "report_data": intermediate_results,
-            "question": query,
-            "response_type": self.response_type,
-        })
+        # 生成最终答案，中间结果过多时分层归并
+        return self.map_reduce.reduce(query, intermediate_results, response_type=self.response_type)
     
-    def search(self, query: str, level: int) -> str:
+    def search(self, query: str, level: int,
+               on_map_result: Optional[Callable[[int, str], None]] = None) -> str:
         """
         执行全局搜索
         
         参数:
             query: 搜索查询字符串
             level: 要搜索的社区层级
+            on_map_result: 每个Map批次完成时的回调，可用于流式展示部分结果
             
         返回:
             str: 生成的最终答案
@@ -132,7 +127,7 @@ class GlobalSearch:
         communities = self._get_community_data(level)
         
         # 处理社区数据（Map阶段）
-        intermediate_results = self._process_communities(query, communities)
+        intermediate_results = self._process_communities(query, communities, on_result=on_map_result)
         
         # 生成最终答案（Reduce阶段）
         return self._reduce_results(query, intermediate_results)
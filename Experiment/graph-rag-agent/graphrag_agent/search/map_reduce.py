@@ -0,0 +1,217 @@
+import concurrent.futures
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from graphrag_agent.config.settings import GLOBAL_SEARCH_SETTINGS
+from graphrag_agent.models.get_models import count_tokens
+
+
+# 中间层Reduce的输出格式：保留要点和社区引用，供上一层继续合并
+INTERMEDIATE_RESPONSE_TYPE = "保留原始引用和communityId的要点列表"
+
+
+def format_community(item: Dict[str, Any]) -> str:
+    """
+    把社区查询结果格式化为Map阶段的上下文片段
+
+    参数:
+        item: 社区查询结果，形如 {"output": {"communityId": ..., "full_content": ...}}
+
+    返回:
+        str: 社区上下文文本
+    """
+    info = item.get("output", item)
+    return f"社区ID: {info.get('communityId')}\n内容: {info.get('full_content')}"
+
+
+class CommunityMapReduce:
+    """
+    全局搜索的并发Map-Reduce执行器
+
+    Map阶段按token预算把社区打包成批次（每批不超过max_batch_size个社区），
+    各批次在线程池中并发调用map_chain，完成一个就可以通过回调或迭代器拿到结果；
+    Reduce阶段在中间结果超出上下文预算时先分组归并，逐层向上直到一次放得下。
+    """
+
+    def __init__(self,
+                 map_chain,
+                 reduce_chain,
+                 map_token_budget: Optional[int] = None,
+                 max_batch_size: Optional[int] = None,
+                 concurrency: Optional[int] = None,
+                 reduce_token_budget: Optional[int] = None,
+                 formatter: Callable[[Dict[str, Any]], str] = format_community,
+                 token_counter: Callable[[str], int] = count_tokens):
+        """
+        初始化执行器
+
+        参数:
+            map_chain: Map链，输入变量为question和context_data
+            reduce_chain: Reduce链，输入变量为report_data、question和response_type
+            map_token_budget: 单个Map批次的上下文token上限
+            max_batch_size: 单个Map批次的社区数上限
+            concurrency: 同时进行的LLM调用数上限
+            reduce_token_budget: 单次Reduce的中间结果token上限
+            formatter: 社区数据到上下文文本的格式化函数
+            token_counter: token计数函数
+        """
+        self.map_chain = map_chain
+        self.reduce_chain = reduce_chain
+        self.map_token_budget = max(1, map_token_budget or GLOBAL_SEARCH_SETTINGS["map_token_budget"])
+        self.max_batch_size = max(1, max_batch_size or GLOBAL_SEARCH_SETTINGS["community_batch_size"])
+        self.concurrency = max(1, concurrency or GLOBAL_SEARCH_SETTINGS["map_concurrency"])
+        self.reduce_token_budget = max(1, reduce_token_budget or GLOBAL_SEARCH_SETTINGS["reduce_token_budget"])
+        self.formatter = formatter
+        self.token_counter = token_counter
+
+    # ----- Map -----
+
+    def pack_batches(self, communities: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        按token预算把社区打包成批次，保持原有顺序
+
+        单个社区超过预算时独占一个批次，不做截断。
+
+        参数:
+            communities: 社区数据列表
+
+        返回:
+            List[List[str]]: 每个批次的社区上下文文本
+        """
+        texts = [self.formatter(item) for item in communities]
+        return self._pack(texts, self.map_token_budget, self.max_batch_size)
+
+    def _pack(self, texts: List[str], budget: int, max_items: Optional[int] = None) -> List[List[str]]:
+        """按token预算顺序装箱"""
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = self.token_counter(text)
+            full = max_items is not None and len(current) >= max_items
+            if current and (full or current_tokens + tokens > budget):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _map_batch(self, query: str, batch: List[str]) -> str:
+        """对一个批次调用Map链"""
+        return self.map_chain.invoke({
+            "question": query,
+            "context_data": "\n---\n".join(batch),
+        })
+
+    def iter_map(self, query: str, communities: List[Dict[str, Any]],
+                 batches: Optional[List[List[str]]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        并发执行Map阶段，按完成顺序逐个产出结果
+
+        参数:
+            query: 搜索查询字符串
+            communities: 社区数据列表
+            batches: 调用方已用pack_batches打包好的批次，提供时不再重新打包
+
+        返回:
+            Iterator[Tuple[int, str]]: (批次序号, 批次结果)，失败或空结果的批次不产出
+        """
+        if batches is None:
+            batches = self.pack_batches(communities)
+        if not batches:
+            return
+
+        workers = min(self.concurrency, len(batches))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="global-map")
+        try:
+            futures = {
+                executor.submit(self._map_batch, query, batch): index
+                for index, batch in enumerate(batches)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"批处理失败: {e}")
+                    continue
+                if result and result.strip():
+                    yield index, result
+        finally:
+            # 调用方提前停止迭代时不再等待排队中的批次
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def map(self, query: str, communities: List[Dict[str, Any]],
+            on_result: Optional[Callable[[int, str], None]] = None,
+            batches: Optional[List[List[str]]] = None) -> List[str]:
+        """
+        并发执行Map阶段
+
+        参数:
+            query: 搜索查询字符串
+            communities: 社区数据列表
+            on_result: 每个批次完成时的回调，参数为 (批次序号, 批次结果)
+            batches: 调用方已用pack_batches打包好的批次，提供时不再重新打包
+
+        返回:
+            List[str]: 按批次顺序排列的中间结果
+        """
+        ordered: Dict[int, str] = {}
+        for index, result in self.iter_map(query, communities, batches=batches):
+            ordered[index] = result
+            if on_result:
+                try:
+                    on_result(index, result)
+                except Exception as e:
+                    print(f"Map结果回调失败: {e}")
+        return [ordered[index] for index in sorted(ordered)]
+
+    # ----- Reduce -----
+
+    def reduce(self, query: str, intermediate_results: List[str], response_type: str = "多个段落") -> str:
+        """
+        分层Reduce：中间结果超出预算时分组归并，直到剩余结果可以一次合并
+
+        参数:
+            query: 搜索查询字符串
+            intermediate_results: Map阶段的中间结果
+            response_type: 最终回答的长度和格式
+
+        返回:
+            str: 最终答案
+        """
+        results = [result for result in intermediate_results if result and result.strip()]
+        while len(results) > 1:
+            groups = self._pack(results, self.reduce_token_budget)
+            if len(groups) == 1:
+                break
+            # 预算过小导致每组只有一个结果时，两两合并保证层数收敛
+            if len(groups) == len(results):
+                groups = [results[i:i + 2] for i in range(0, len(results), 2)]
+            results = self._reduce_groups(query, groups)
+
+        return self.reduce_chain.invoke({
+            "report_data": results,
+            "question": query,
+            "response_type": response_type,
+        })
+
+    def _reduce_groups(self, query: str, groups: List[List[str]]) -> List[str]:
+        """并发归并一层分组，单组只有一个结果时直接上移"""
+        def reduce_group(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            try:
+                return self.reduce_chain.invoke({
+                    "report_data": group,
+                    "question": query,
+                    "response_type": INTERMEDIATE_RESPONSE_TYPE,
+                })
+            except Exception as e:
+                print(f"中间层Reduce失败: {e}")
+                return "\n\n".join(group)
+
+        workers = min(self.concurrency, len(groups))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="global-reduce") as executor:
+            return list(executor.map(reduce_group, groups))
@@ -8,7 +8,7 @@ from graphrag_agent.models.get_models import get_llm_model, get_embeddings_model
 from graphrag_agent.cache_manager.manager import CacheManager, ContextAndKeywordAwareCacheKeyStrategy, MemoryCacheBackend
 from graphrag_agent.config.neo4jdb import get_db_manager
 from graphrag_agent.search.utils import VectorUtils
-from graphrag_agent.config.settings import BASE_SEARCH_CONFIG
+from graphrag_agent.config.settings import BASE_SEARCH_CONFIG, CACHE_SETTINGS
 
 
 class BaseSearchTool(ABC):
@@ -29,12 +29,18 @@ class BaseSearchTool(ABC):
         self.default_semantic_top_k = BASE_SEARCH_CONFIG["semantic_top_k"]
         self.default_relevance_top_k = BASE_SEARCH_CONFIG["relevance_top_k"]
         
-        # 初始化缓存管理器
+        # 初始化缓存管理器（多worker部署时可切换为跨进程共享缓存）
+        if CACHE_SETTINGS["shared_enabled"]:
+            storage_backend = CacheManager.create_shared_backend(
+                cache_dir, BASE_SEARCH_CONFIG["cache_max_size"]
+            )
+        else:
+            storage_backend = MemoryCacheBackend(
+                max_size=BASE_SEARCH_CONFIG["cache_max_size"]
+            )
         self.cache_manager = CacheManager(
             key_strategy=ContextAndKeywordAwareCacheKeyStrategy(),
-            storage_backend=MemoryCacheBackend(
-                max_size=BASE_SEARCH_CONFIG["cache_max_size"]
-            ),
+            storage_backend=storage_backend,
             cache_dir=cache_dir
         )
         
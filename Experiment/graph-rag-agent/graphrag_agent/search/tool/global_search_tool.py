@@ -1,6 +1,6 @@
 import time
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional
 
 from langchain_core.tools import BaseTool
 from langchain_core.prompts import ChatPromptTemplate
@@ -13,8 +13,13 @@ from graphrag_agent.config.prompts import (
     GLOBAL_SEARCH_REDUCE_PROMPT,
     GLOBAL_SEARCH_KEYWORD_PROMPT,
 )
-from graphrag_agent.config.settings import gl_description, GLOBAL_SEARCH_SETTINGS
+from graphrag_agent.config.settings import (
+    gl_description,
+    GLOBAL_SEARCH_SETTINGS,
+    COMMUNITY_INDEX_SETTINGS,
+)
 from graphrag_agent.search.tool.base import BaseSearchTool
+from graphrag_agent.search.map_reduce import CommunityMapReduce
 from graphrag_agent.search.retrieval_adapter import (
     create_retrieval_metadata,
     create_retrieval_result,
@@ -58,6 +63,9 @@ class GlobalSearchTool(BaseSearchTool):
             ("human", GLOBAL_SEARCH_REDUCE_PROMPT),
         ])
         self.reduce_chain = reduce_prompt | self.llm | StrOutputParser()
+
+        # 按token预算打包、并发执行的Map-Reduce
+        self.map_reduce = CommunityMapReduce(self.map_chain, self.reduce_chain)
         
         # 关键词提取链
         self.keyword_prompt = ChatPromptTemplate.from_messages([
@@ -123,6 +131,63 @@ class GlobalSearchTool(BaseSearchTool):
         """
         使用关键词检索社区数据
         
+        有关键词时先走社区全文索引，索引不存在时回退到CONTAINS过滤。
+        
+        参数:
+            keywords: 关键词列表，用于过滤社区
+            
+        返回:
+            List[dict]: 社区数据列表
+        """
+        keywords = [kw for kw in (keywords or []) if kw and kw.strip()]
+        if keywords:
+            communities = self._query_community_fulltext(keywords)
+            if communities is not None:
+                return communities
+        return self._query_community_scan(keywords)
+    
+    @staticmethod
+    def _fulltext_query(keywords: List[str]) -> str:
+        """把关键词拼成Lucene短语查询，任一短语命中即可"""
+        phrases = []
+        for keyword in keywords:
+            escaped = keyword.strip().replace("\\", "\\\\").replace('"', '\\"')
+            phrases.append(f'"{escaped}"')
+        return " OR ".join(phrases)
+    
+    def _query_community_fulltext(self, keywords: List[str]) -> Optional[List[dict]]:
+        """
+        通过社区全文索引检索社区
+        
+        参数:
+            keywords: 关键词列表
+            
+        返回:
+            Optional[List[dict]]: 社区数据列表，索引不可用时返回None
+        """
+        try:
+            return self.graph.query("""
+            CALL db.index.fulltext.queryNodes($index_name, $search_text)
+            YIELD node AS c
+            WHERE c.level = $level
+            WITH c
+            ORDER BY c.community_rank DESC, c.weight DESC
+            LIMIT $limit
+            RETURN {communityId: c.id, full_content: c.full_content} AS output
+            """, params={
+                "index_name": COMMUNITY_INDEX_SETTINGS["fulltext_index"],
+                "search_text": self._fulltext_query(keywords),
+                "level": self.level,
+                "limit": COMMUNITY_INDEX_SETTINGS["candidate_limit"],
+            })
+        except Exception as e:
+            print(f"社区全文索引不可用，回退到逐个匹配: {e}")
+            return None
+    
+    def _query_community_scan(self, keywords: List[str] = None) -> List[dict]:
+        """
+        不依赖索引的社区检索（CONTAINS过滤）
+        
         参数:
             keywords: 关键词列表，用于过滤社区
             
@@ -152,62 +217,32 @@ class GlobalSearchTool(BaseSearchTool):
         cypher_query += """
         WITH c
         ORDER BY c.community_rank DESC, c.weight DESC
-        LIMIT 20
+        LIMIT $limit
         RETURN {communityId: c.id, full_content: c.full_content} AS output
         """
+        params["limit"] = COMMUNITY_INDEX_SETTINGS["candidate_limit"]
         
         # 执行查询
         return self.graph.query(cypher_query, params=params)
     
-    def _process_community_batch(self, query: str, batch: List[dict]) -> str:
-        """
-        处理社区批次，提高效率
-        
-        参数:
-            query: 查询字符串
-            batch: 社区数据批次
-            
-        返回:
-            str: 批次处理结果
-        """
-        # 合并批次内的社区数据
-        combined_data = []
-        for item in batch:
-            combined_data.append(f"社区ID: {item['output']['communityId']}\n内容: {item['output']['full_content']}")
-        
-        batch_context = "\n---\n".join(combined_data)
-        
-        # 一次性处理整个批次
-        return self.map_chain.invoke({
-            "question": query, 
-            "context_data": batch_context
-        })
-    
-    def _process_communities(self, query: str, communities: List[dict]) -> List[str]:
+    def _process_communities(self, query: str, communities: List[dict],
+                             on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
         """
         处理社区数据生成中间结果（Map阶段）
         
+        社区按token预算打包成批次并发处理，批次大小和并发数由GLOBAL_SEARCH_SETTINGS控制。
+        
         参数:
             query: 搜索查询字符串
             communities: 社区数据列表
+            on_result: 每个批次完成时的回调，参数为 (批次序号, 批次结果)
             
         返回:
-            List[str]: 中间结果列表
+            List[str]: 按批次顺序排列的中间结果列表
         """
-        batch_size = GLOBAL_SEARCH_SETTINGS["community_batch_size"]  # 每批处理若干社区，提高效率
-        
-        results = []
-        
-        # 使用批处理提高效率
-        for i in range(0, len(communities), batch_size):
-            batch = communities[i:i+batch_size]
-            try:
-                batch_result = self._process_community_batch(query, batch)
-                if batch_result and len(batch_result.strip()) > 0:
-                    results.append(batch_result)
-            except Exception as e:
-                print(f"批处理失败: {e}")
-        
+        map_start = time.time()
+        results = self.map_reduce.map(query, communities, on_result=on_result)
+        self.performance_metrics["map_time"] = time.time() - map_start
         return results
     
     def _reduce_results(self, query: str, intermediate_results: List[str]) -> str:
@@ -221,12 +256,11 @@ class GlobalSearchTool(BaseSearchTool):
         返回:
             str: 最终生成的答案
         """
-        # 调用Reduce链生成最终答案
-        return self.reduce_chain.invoke({
-            "report_data": intermediate_results,
-            "question": query,
-            "response_type": "多个段落",
-        })
+        # 中间结果超出上下文预算时分层归并
+        reduce_start = time.time()
+        answer = self.map_reduce.reduce(query, intermediate_results, response_type="多个段落")
+        self.performance_metrics["reduce_time"] = time.time() - reduce_start
+        return answer
     
     def _normalize_input(self, query_input: Any) -> Dict[str, Any]:
         """标准化输入格式。"""
@@ -267,13 +301,32 @@ class GlobalSearchTool(BaseSearchTool):
             retrieval_results.append(result)
         return results_to_payload(retrieval_results)
 
+    def stream_intermediate_results(self, query_input: Any) -> Iterator[Dict[str, Any]]:
+        """
+        流式执行Map阶段，每完成一个批次就产出一次结果
+
+        参数:
+            query_input: 查询字符串或包含query/keywords的字典
+
+        返回:
+            Iterator[Dict]: {"batch": 批次序号, "result": 批次结果}
+        """
+        parsed = self._normalize_input(query_input)
+        if not parsed["query"]:
+            raise ValueError("query不能为空")
+
+        community_data = self._get_community_data(parsed["keywords"])
+        for index, result in self.map_reduce.iter_map(parsed["query"], community_data):
+            yield {"batch": index, "result": result}
+
     def search(self, query_input: Any) -> List[str]:
         """兼容旧接口，返回中间结果列表。"""
         structured = self.structured_search(query_input)
         return structured.get("intermediate_results", [])
 
-    def structured_search(self, query_input: Any) -> Dict[str, Any]:
-        """执行全局搜索并返回结构化数据。"""
+    def structured_search(self, query_input: Any,
+                          on_map_result: Optional[Callable[[int, str], None]] = None) -> Dict[str, Any]:
+        """执行全局搜索并返回结构化数据，on_map_result在每个Map批次完成时被调用。"""
         overall_start = time.time()
         parsed = self._normalize_input(query_input)
         query = parsed["query"]
@@ -302,7 +355,7 @@ class GlobalSearchTool(BaseSearchTool):
                     "retrieval_results": [],
                 }
 
-            intermediate_results = self._process_communities(query, community_data)
+            intermediate_results = self._process_communities(query, community_data, on_result=on_map_result)
             final_answer = self._reduce_results(query, intermediate_results) if intermediate_results else ""
             retrieval_payload = self._community_results_to_retrieval(community_data)
 
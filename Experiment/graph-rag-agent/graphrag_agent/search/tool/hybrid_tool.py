@@ -13,7 +13,13 @@ from graphrag_agent.config.prompts import (
     HYBRID_TOOL_QUERY_PROMPT,
     LOCAL_SEARCH_KEYWORD_PROMPT,
 )
-from graphrag_agent.config.settings import gl_description, response_type, HYBRID_SEARCH_SETTINGS
+from graphrag_agent.config.settings import (
+    gl_description,
+    response_type,
+    HYBRID_SEARCH_SETTINGS,
+    ENTITY_NAME_INDEX_SETTINGS,
+)
+from graphrag_agent.graph.core.entity_name_index import get_entity_name_index
 from graphrag_agent.search.tool.base import BaseSearchTool
 from graphrag_agent.agents.multi_agent.core.retrieval_result import RetrievalResult
 from graphrag_agent.search.retrieval_adapter import (
@@ -80,6 +86,15 @@ class HybridSearchTool(BaseSearchTool):
         cached_keywords = self.cache_manager.get(f"keywords:{query}")
         if cached_keywords:
             return cached_keywords
+        
+        # 查询基本由已知实体名称组成时，实体即低级关键词，不再调用LLM；
+        # 实体名称给不出主题，高级关键词使用原始查询
+        linked_names, coverage = self._link_entity_names(query)
+        if (linked_names and ENTITY_NAME_INDEX_SETTINGS["skip_llm_keywords"]
+                and coverage >= ENTITY_NAME_INDEX_SETTINGS["skip_llm_min_coverage"]):
+            keywords = {"low_level": linked_names, "high_level": [query]}
+            self.cache_manager.set(f"keywords:{query}", keywords)
+            return keywords
             
         try:
             llm_start = time.time()
@@ -154,6 +169,12 @@ class HybridSearchTool(BaseSearchTool):
                 keywords["low_level"] = [str(keywords["low_level"])]
             if not isinstance(keywords["high_level"], list):
                 keywords["high_level"] = [str(keywords["high_level"])]
+            
+            # 识别出的实体排在LLM给出的低级关键词前面
+            if linked_names:
+                keywords["low_level"] = linked_names + [
+                    keyword for keyword in keywords["low_level"] if keyword not in linked_names
+                ]
                 
             # 缓存结果
             self.cache_manager.set(f"keywords:{query}", keywords)
@@ -165,6 +186,56 @@ class HybridSearchTool(BaseSearchTool):
             # 返回基于原始查询的默认值
             return {"low_level": [query], "high_level": [query.split()[0] if query.split() else query]}
     
+    def _link_entity_names(self, query: str) -> Tuple[List[str], float]:
+        """
+        用实体名称索引识别查询中提到的实体
+        
+        参数:
+            query: 查询字符串
+            
+        返回:
+            Tuple[List[str], float]: 按出现顺序排列的实体ID（名称索引不可用时为空），
+            以及实体名称覆盖查询中字母数字字符的比例
+        """
+        try:
+            index = get_entity_name_index()
+            if index is None:
+                return [], 0.0
+            matches = index.find(query)
+            text = query.lower()
+            total = sum(1 for char in text if char.isalnum())
+            covered = sum(
+                1 for match in matches for char in text[match.start:match.end] if char.isalnum()
+            )
+            entity_ids = list(dict.fromkeys(match.entity_ids[0] for match in matches))
+            return entity_ids, (covered / total if total else 0.0)
+        except Exception as e:
+            print(f"实体名称识别失败: {e}")
+            return [], 0.0
+    
+    def _seed_entities_from_index(self, query: str, keywords: List[str]) -> List[str]:
+        """
+        从名称索引中查找种子实体：查询中提到的实体，以及与关键词同名的实体
+        
+        参数:
+            query: 查询字符串
+            keywords: 低级关键词列表
+            
+        返回:
+            List[str]: 实体ID列表（含消歧后的规范实体），未命中时为空
+        """
+        try:
+            index = get_entity_name_index()
+            if index is None:
+                return []
+            entity_ids = index.entity_ids(query)
+            for keyword in keywords:
+                entity_ids.extend(index.lookup(str(keyword)))
+            return list(dict.fromkeys(entity_ids))[:self.entity_limit]
+        except Exception as e:
+            print(f"实体名称索引查询失败: {e}")
+            return []
+    
     def db_query(self, cypher: str, params: Dict[str, Any] = {}) -> pd.DataFrame:
         """
         执行Cypher查询并返回结果
@@ -243,10 +314,11 @@ class HybridSearchTool(BaseSearchTool):
         query_start = time.time()
         retrieval_results: List[RetrievalResult] = []
         
-        # 首先使用关键词查询获取相关实体
-        entity_ids = []
+        # 首先从实体名称索引中查找查询和关键词提到的实体，命中时不再扫描实体
+        entity_ids = self._seed_entities_from_index(query, keywords)
         
-        if keywords:
+        # 名称索引没有命中时，使用关键词查询获取相关实体
+        if not entity_ids and keywords:
             keyword_params = {}
             keyword_conditions = []
             
@@ -7,9 +7,15 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from graphrag_agent.config.prompts import NAIVE_PROMPT, NAIVE_SEARCH_QUERY_PROMPT
-from graphrag_agent.config.settings import response_type, naive_description, NAIVE_SEARCH_TOP_K
+from graphrag_agent.config.settings import (
+    response_type,
+    naive_description,
+    NAIVE_SEARCH_TOP_K,
+    CHUNK_VECTOR_INDEX_SETTINGS,
+)
 from graphrag_agent.search.tool.base import BaseSearchTool
 from graphrag_agent.search.utils import VectorUtils
+from graphrag_agent.search.chunk_index import ChunkVectorIndex
 
 
 class NaiveSearchTool(BaseSearchTool):
@@ -23,6 +29,14 @@ class NaiveSearchTool(BaseSearchTool):
         # 搜索参数设置
         self.top_k = NAIVE_SEARCH_TOP_K  # 检索的最大文档数量
         
+        # 本地Chunk向量索引，替代每次查询时从Neo4j拉取候选向量
+        self.chunk_index = None
+        if CHUNK_VECTOR_INDEX_SETTINGS["enabled"]:
+            try:
+                self.chunk_index = ChunkVectorIndex(self.graph)
+            except Exception as e:
+                print(f"初始化Chunk向量索引失败，回退到Neo4j扫描: {e}")
+        
         # 设置处理链
         self._setup_chains()
         
@@ -77,6 +91,54 @@ class NaiveSearchTool(BaseSearchTool):
             
         return dot_product / (norm_a * norm_b)
     
+    def _retrieve_chunks(self, query_embedding: List[float]) -> List[Dict[str, Any]]:
+        """
+        检索与查询向量最相似的Chunk
+        
+        优先使用本地向量索引，只需回查top_k个Chunk的文本；
+        索引不可用时回退到从Neo4j拉取候选集后在内存中排序
+        
+        参数:
+            query_embedding: 查询向量
+            
+        返回:
+            List[Dict[str, Any]]: 包含id、text、score的Chunk列表
+        """
+        if self.chunk_index is not None:
+            try:
+                self.chunk_index.sync()
+                hits = self.chunk_index.search(query_embedding, self.top_k)
+                if hits:
+                    rows = self.graph.query("""
+                    MATCH (c:__Chunk__)
+                    WHERE c.id IN $ids
+                    RETURN c.id AS id, c.text AS text
+                    """, params={"ids": [chunk_id for chunk_id, _ in hits]})
+                    texts = {row["id"]: row["text"] for row in rows}
+                    return [
+                        {"id": chunk_id, "text": texts[chunk_id], "score": score}
+                        for chunk_id, score in hits
+                        if chunk_id in texts
+                    ]
+            except Exception as e:
+                print(f"本地向量索引检索失败，回退到Neo4j扫描: {e}")
+        
+        # 获取带embedding的Chunk节点
+        chunks_with_embedding = self.graph.query("""
+        MATCH (c:__Chunk__)
+        WHERE c.embedding IS NOT NULL
+        RETURN c.id AS id, c.text AS text, c.embedding AS embedding
+        LIMIT 100  // 获取候选集
+        """)
+        
+        # 使用工具类对候选集进行排序
+        return VectorUtils.rank_by_similarity(
+            query_embedding,
+            chunks_with_embedding,
+            "embedding",
+            self.top_k
+        )
+    
     def search(self, query_input: Any) -> str:
         """
         执行Naive RAG搜索 - 纯向量搜索
@@ -107,24 +169,7 @@ class NaiveSearchTool(BaseSearchTool):
             search_start = time.time()
             query_embedding = self.embeddings.embed_query(query)
             
-            # 获取带embedding的Chunk节点
-            chunks_with_embedding = self.graph.query("""
-            MATCH (c:__Chunk__)
-            WHERE c.embedding IS NOT NULL
-            RETURN c.id AS id, c.text AS text, c.embedding AS embedding
-            LIMIT 100  // 获取候选集
-            """)
-            
-            # 使用工具类对候选集进行排序
-            scored_chunks = VectorUtils.rank_by_similarity(
-                query_embedding,
-                chunks_with_embedding,
-                "embedding",
-                self.top_k
-            )
-            
-            # 取top_k个结果
-            results = scored_chunks[:self.top_k]
+            results = self._retrieve_chunks(query_embedding)
             
             search_time = time.time() - search_start
             self.performance_metrics["query_time"] = search_time
@@ -6,6 +6,8 @@ import asyncio
 import pandas as pd
 import re
 
+from graphrag_agent.graph.core.graph_snapshot import get_graph_snapshot
+
 class ChainOfExplorationSearcher:
     """
     增强版Chain of Exploration检索器
@@ -295,7 +297,10 @@ class ChainOfExplorationSearcher:
     
     def _get_neighbors(self, entities):
         """
-        获取实体的邻居节点
+        获取实体的邻居节点，连同已存储的向量和类型标签一次取回
+        
+        图快照可用时在内存中找出邻居，按关系权重保留前100个，再用一次查询补全属性；
+        否则直接用Cypher查询邻居。
         
         Args:
             entities: 实体ID列表
@@ -303,11 +308,17 @@ class ChainOfExplorationSearcher:
         Returns:
             List: 邻居节点列表
         """
+        neighbors = self._get_neighbors_from_snapshot(entities)
+        if neighbors is not None:
+            return neighbors
+        
         try:
             query = """
             MATCH (e:__Entity__)-[r]-(neighbor:__Entity__)
             WHERE e.id IN $entity_ids AND NOT neighbor.id IN $visited_ids
             RETURN neighbor.id AS id, neighbor.description AS description,
+                   neighbor.embedding AS embedding,
+                   [label IN labels(neighbor) WHERE label <> '__Entity__'] AS types,
                    type(r) AS relation_type, startNode(r).id AS source,
                    endNode(r).id AS target,
                    CASE WHEN r.weight IS NOT NULL THEN r.weight ELSE 1.0 END AS weight
@@ -336,12 +347,103 @@ class ChainOfExplorationSearcher:
             print(f"获取邻居节点失败: {e}")
             return []
     
+    def _get_neighbors_from_snapshot(self, entities, limit=100):
+        """
+        在图快照上展开邻居，只为最终保留的邻居查询属性
+        
+        Args:
+            entities: 实体ID列表
+            limit: 保留的邻居关系数
+            
+        Returns:
+            List: 邻居节点列表；快照不可用或实体不在快照中时返回None
+        """
+        try:
+            snapshot = get_graph_snapshot()
+            if snapshot is None or not any(entity in snapshot for entity in entities):
+                return None
+            
+            adjacent = snapshot.neighbors(entities, direction="both", exclude=self.visited_nodes)
+            if not adjacent:
+                return []
+            adjacent = sorted(adjacent, key=lambda item: -item[1].weight)[:limit]
+            
+            neighbor_ids = list(dict.fromkeys(neighbor_id for neighbor_id, _ in adjacent))
+            rows = self.graph.query("""
+            UNWIND $ids AS entity_id
+            MATCH (neighbor:__Entity__ {id: entity_id})
+            RETURN neighbor.id AS id, neighbor.description AS description,
+                   neighbor.embedding AS embedding,
+                   [label IN labels(neighbor) WHERE label <> '__Entity__'] AS types
+            """, params={"ids": neighbor_ids})
+            if isinstance(rows, pd.DataFrame):
+                rows = rows.to_dict('records')
+            properties = {row['id']: row for row in rows}
+            
+            neighbors = []
+            for neighbor_id, edge in adjacent:
+                row = properties.get(neighbor_id)
+                if row is None:
+                    continue
+                neighbors.append({
+                    **row,
+                    'relation_type': edge.type,
+                    'source': edge.source,
+                    'target': edge.target,
+                    'weight': edge.weight,
+                })
+            return neighbors
+        except Exception as e:
+            print(f"图快照获取邻居失败，回退到Cypher查询: {e}")
+            return None
+    
+    def _neighbor_similarities(self, neighbors, query_embedding):
+        """
+        用一次矩阵乘法计算所有邻居与查询的余弦相似度
+        
+        直接使用邻居节点上已存储的向量；没有向量（或维度不一致）但有描述的邻居
+        合并成一次embed_documents调用，没有描述的邻居相似度为0。
+        
+        Args:
+            neighbors: 邻居节点列表
+            query_embedding: 查询嵌入向量
+            
+        Returns:
+            np.ndarray: 与neighbors一一对应的相似度
+        """
+        query_vector = np.asarray(query_embedding, dtype=np.float64)
+        dimension = query_vector.shape[0]
+        matrix = np.zeros((len(neighbors), dimension), dtype=np.float64)
+        
+        missing = []
+        for i, neighbor in enumerate(neighbors):
+            embedding = neighbor.get('embedding')
+            if embedding is not None and len(embedding) == dimension:
+                matrix[i] = embedding
+            elif neighbor.get('description'):
+                missing.append(i)
+        
+        if missing:
+            try:
+                vectors = self.embeddings.embed_documents(
+                    [neighbors[i]['description'] for i in missing]
+                )
+                for i, vector in zip(missing, vectors):
+                    if len(vector) == dimension:
+                        matrix[i] = vector
+            except Exception as e:
+                print(f"计算邻居向量失败: {e}")
+        
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        dots = matrix @ query_vector
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+    
     def _score_neighbors_enhanced(self, neighbors, query, query_embedding, exploration_strategy):
         """
         增强版邻居评分，考虑策略权重、相似度和关系权重
         
         Args:
-            neighbors: 邻居节点列表
+            neighbors: 邻居节点列表（包含_get_neighbors返回的embedding和types）
             query: 查询字符串
             query_embedding: 查询嵌入向量
             exploration_strategy: 探索策略
@@ -349,108 +451,88 @@ class ChainOfExplorationSearcher:
         Returns:
             List: 评分后的邻居列表
         """
-        scored_neighbors = []
+        if not neighbors:
+            return []
+        
         relation_weights = exploration_strategy.get("relation_weights", {})
-        focus_relations = exploration_strategy.get("focus_relations", [])
+        focus_relations = set(exploration_strategy.get("focus_relations", []))
         focus_entity_types = exploration_strategy.get("focus_entity_types", [])
-        avoid_relations = exploration_strategy.get("avoid_relations", [])
+        avoid_relations = set(exploration_strategy.get("avoid_relations", []))
+        
+        try:
+            similarities = self._neighbor_similarities(neighbors, query_embedding)
+        except Exception as e:
+            print(f"计算节点相似度失败: {e}")
+            similarities = np.zeros(len(neighbors), dtype=np.float64)
+        
+        relation_types = [neighbor.get('relation_type', '') for neighbor in neighbors]
+        
+        # 获取关系权重
+        relation_weight = np.array(
+            [relation_weights.get(rel, 1.0) for rel in relation_types], dtype=np.float64
+        )
+        
+        # 计算策略匹配分数：关注的关系+0.5，关注的实体类型+0.3，需要避免的关系-0.5
+        # 注意：旧版按DataFrame解析类型查询结果，实际总得到"unknown"，实体类型加分从未生效；
+        # 现在类型随邻居一起取回，focus_entity_types会真正影响排序
+        strategy_score = np.ones(len(neighbors), dtype=np.float64)
+        strategy_score += 0.5 * np.array([rel in focus_relations for rel in relation_types])
+        strategy_score += 0.3 * np.array([
+            self._entity_type(neighbor) in focus_entity_types for neighbor in neighbors
+        ])
+        strategy_score -= 0.5 * np.array([rel in avoid_relations for rel in relation_types])
+        
+        # 添加来自图的原始权重
+        graph_weight = np.array(
+            [self._to_float(neighbor.get('weight', 1.0)) for neighbor in neighbors], dtype=np.float64
+        )
+        
+        # 计算最终得分(语义相似度*策略分数*关系权重*图权重)
+        final_scores = similarities * strategy_score * relation_weight * graph_weight
+        
+        scored_neighbors = [
+            {
+                "id": neighbor.get('id', ''),
+                "description": neighbor.get('description', ''),
+                "relation_type": relation_types[i],
+                "source": neighbor.get('source', ''),
+                "target": neighbor.get('target', ''),
+                "similarity": float(similarities[i]),
+                "strategy_score": float(strategy_score[i]),
+                "relation_weight": float(relation_weight[i]),
+                "graph_weight": float(graph_weight[i]),
+                "final_score": float(final_scores[i])
+            }
+            for i, neighbor in enumerate(neighbors)
+        ]
         
-        for neighbor in neighbors:
-            # 构建描述文本
-            description = neighbor.get('description', '')
-            relation_type = neighbor.get('relation_type', '')
-            neighbor_id = neighbor.get('id', '')
-            
-            # 初始权重 - 基础值0.5
-            base_weight = 0.5
-            
-            try:
-                # 计算语义相似度
-                if description:
-                    neighbor_embedding = self.embeddings.embed_query(description)
-                    similarity = cosine_similarity(
-                        np.array(query_embedding).reshape(1, -1),
-                        np.array(neighbor_embedding).reshape(1, -1)
-                    )[0][0]
-                else:
-                    similarity = 0.0
-                    
-                # 获取关系权重
-                relation_weight = relation_weights.get(relation_type, 1.0)
-                
-                # 计算策略匹配分数
-                strategy_score = 1.0
-                
-                # 增加关注的关系类型的权重
-                if relation_type in focus_relations:
-                    strategy_score += 0.5
-                
-                # 检查实体类型
-                entity_type = self._get_entity_type(neighbor_id)
-                if entity_type in focus_entity_types:
-                    strategy_score += 0.3
-                
-                # 降低需要避免的关系类型的权重
-                if relation_type in avoid_relations:
-                    strategy_score -= 0.5
-                
-                # 添加来自图的原始权重
-                graph_weight = float(neighbor.get('weight', 1.0))
-                
-                # 计算最终得分(语义相似度*策略分数*关系权重*图权重)
-                final_score = similarity * strategy_score * relation_weight * graph_weight
-                
-                # 添加到评分列表
-                scored_neighbors.append({
-                    "id": neighbor_id,
-                    "description": description,
-                    "relation_type": relation_type,
-                    "source": neighbor.get('source', ''),
-                    "target": neighbor.get('target', ''),
-                    "similarity": similarity,
-                    "strategy_score": strategy_score,
-                    "relation_weight": relation_weight,
-                    "graph_weight": graph_weight,
-                    "final_score": final_score
-                })
-            except Exception as e:
-                print(f"计算节点相似度失败: {e}")
-                
         # 按最终得分排序
         return sorted(scored_neighbors, key=lambda x: x['final_score'], reverse=True)
     
-    def _get_entity_type(self, entity_id):
+    @staticmethod
+    def _entity_type(neighbor):
         """
-        获取实体类型
+        从邻居记录中取实体类型（第一个非__Entity__标签）
         
         Args:
-            entity_id: 实体ID
+            neighbor: 邻居节点记录
             
         Returns:
             str: 实体类型
         """
+        types = neighbor.get('types')
+        if types is None or isinstance(types, str):
+            return types or "unknown"
+        types = list(types)
+        return types[0] if types else "unknown"
+    
+    @staticmethod
+    def _to_float(value, default=1.0):
+        """把图中的权重转换为float，无法转换时使用默认值"""
         try:
-            query = """
-            MATCH (e:__Entity__ {id: $entity_id})
-            RETURN labels(e) AS types
-            """
-            
-            result = self.graph.query(query, params={"entity_id": entity_id})
-            
-            if not result or (hasattr(result, 'empty') and result.empty):
-                return "unknown"
-                
-            if isinstance(result, pd.DataFrame):
-                types = result.iloc[0]['types']
-                # 过滤掉 "__Entity__" 标签
-                entity_types = [t for t in types if t != "__Entity__"]
-                return entity_types[0] if entity_types else "unknown"
-            else:
-                # 处理其他结果格式
-                return "unknown"
-        except Exception as e:
-            print(f"获取实体类型失败: {e}")
-            return "unknown"
+            return float(value)
+        except (TypeError, ValueError):
+            return default
     
     def _decide_next_step_with_memory(self, query, current_entities, scored_neighbors, width, current_step):
         """
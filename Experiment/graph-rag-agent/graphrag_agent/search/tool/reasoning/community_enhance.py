@@ -1,10 +1,12 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 import numpy as np
 import jieba.analyse
 import re
 from sklearn.metrics.pairwise import cosine_similarity
 
+from graphrag_agent.config.settings import COMMUNITY_INDEX_SETTINGS
+
 class CommunityAwareSearchEnhancer:
     """
     社区感知搜索增强器
@@ -78,48 +80,35 @@ class CommunityAwareSearchEnhancer:
         Returns:
             List[Dict]: 相关社区列表
         """
-        # 嵌入查询文本
+        # 嵌入查询文本（每次查询只调用一次嵌入）
         query_embedding = self.embeddings.embed_query(query)
         
-        # 查询社区信息
-        community_query = """
-        MATCH (c:__Community__)
-        WHERE c.summary IS NOT NULL
-        RETURN c.id AS community_id, c.summary AS summary, 
-               c.community_rank AS rank
-        ORDER BY c.community_rank DESC
-        LIMIT 20
-        """
-        
         try:
-            communities = self.graph.query(community_query)
+            # 在预先计算的社区摘要向量上做一次索引检索
+            communities = self._query_community_index(query_embedding)
+            if not communities:
+                communities = self._query_communities_fallback(query_embedding)
             
             # 如果找不到社区，返回空列表
             if not communities:
                 return []
+            
+            high_level_kw = [kw.lower() for kw in keywords.get('high_level', [])]
+            low_level_kw = [kw.lower() for kw in keywords.get('low_level', [])]
                 
             # 计算社区与查询的相关性
             scored_communities = []
             for comm in communities:
-                # 计算语义相似度
                 if not comm.get('summary'):
                     continue
                     
                 try:
-                    comm_embedding = self.embeddings.embed_query(comm['summary'])
-                    similarity = cosine_similarity(
-                        np.array(query_embedding).reshape(1, -1),
-                        np.array(comm_embedding).reshape(1, -1)
-                    )[0][0]
+                    similarity = float(comm.get('similarity') or 0.0)
+                    summary_lower = comm['summary'].lower()
                     
                     # 关键词匹配得分
-                    high_level_kw = keywords.get('high_level', [])
-                    low_level_kw = keywords.get('low_level', [])
-                    
-                    kw_score = sum(1 for kw in high_level_kw 
-                                   if kw.lower() in comm['summary'].lower()) * 2.0
-                    kw_score += sum(0.5 for kw in low_level_kw 
-                                    if kw.lower() in comm['summary'].lower())
+                    kw_score = sum(1 for kw in high_level_kw if kw in summary_lower) * 2.0
+                    kw_score += sum(0.5 for kw in low_level_kw if kw in summary_lower)
                     
                     # 社区重要性（如果有）
                     importance = comm.get('rank', 1) or 1
@@ -155,6 +144,69 @@ class CommunityAwareSearchEnhancer:
             print(f"查询社区信息时出错: {e}")
             return []
     
+    def _query_community_index(self, query_embedding: List[float]) -> Optional[List[Dict]]:
+        """
+        通过社区向量索引检索候选社区
+        
+        Args:
+            query_embedding: 查询向量
+            
+        Returns:
+            Optional[List[Dict]]: 候选社区，索引不可用时返回None
+        """
+        try:
+            return self.graph.query("""
+            CALL db.index.vector.queryNodes($index_name, $limit, $embedding)
+            YIELD node, score
+            WHERE node.summary IS NOT NULL
+            // 索引返回 (1 + cos) / 2，换回余弦相似度以保持原有打分权重
+            RETURN node.id AS community_id, node.summary AS summary,
+                   node.community_rank AS rank, score * 2 - 1 AS similarity
+            ORDER BY score DESC
+            """, params={
+                "index_name": COMMUNITY_INDEX_SETTINGS["vector_index"],
+                "limit": COMMUNITY_INDEX_SETTINGS["candidate_limit"],
+                "embedding": query_embedding,
+            })
+        except Exception as e:
+            print(f"社区向量索引不可用，回退到摘要排序检索: {e}")
+            return None
+    
+    def _query_communities_fallback(self, query_embedding: List[float]) -> List[Dict]:
+        """
+        没有社区向量索引时，取排名靠前的社区并批量计算相似度
+        
+        Args:
+            query_embedding: 查询向量
+            
+        Returns:
+            List[Dict]: 带similarity字段的候选社区
+        """
+        communities = self.graph.query("""
+        MATCH (c:__Community__)
+        WHERE c.summary IS NOT NULL
+        RETURN c.id AS community_id, c.summary AS summary, 
+               c.community_rank AS rank, c.embedding AS embedding
+        ORDER BY c.community_rank DESC
+        LIMIT $limit
+        """, params={"limit": COMMUNITY_INDEX_SETTINGS["candidate_limit"]})
+        if not communities:
+            return []
+        
+        # 已有向量的直接使用，其余摘要合并成一次嵌入请求
+        missing = [comm for comm in communities if not comm.get('embedding')]
+        if missing:
+            vectors = self.embeddings.embed_documents([comm['summary'] for comm in missing])
+            for comm, vector in zip(missing, vectors):
+                comm['embedding'] = vector
+        
+        matrix = np.array([comm['embedding'] for comm in communities], dtype=float)
+        similarities = cosine_similarity(np.array(query_embedding).reshape(1, -1), matrix)[0]
+        for comm, similarity in zip(communities, similarities):
+            comm['similarity'] = float(similarity)
+            comm.pop('embedding', None)
+        return communities
+    
     def extract_community_knowledge(self, communities: List[Dict]) -> Dict:
         """
         从社区中提取有用的知识，增加摘要的权重
@@ -3,6 +3,9 @@ from typing import Dict, List
 import re
 import time
 
+from graphrag_agent.config.settings import GRAPH_SNAPSHOT_SETTINGS
+from graphrag_agent.graph.core.graph_snapshot import get_graph_snapshot
+
 class DynamicKnowledgeGraphBuilder:
     """
     动态知识图谱构建器
@@ -83,6 +86,10 @@ class DynamicKnowledgeGraphBuilder:
         """
         if current_depth >= max_depth or not entities:
             return
+        
+        # 快照可用时一次性在内存中完成剩余各层的扩展
+        if self._explore_with_snapshot(entities, max_depth - current_depth):
+            return
             
         # 查询实体的相邻节点和关系
         try:
@@ -144,6 +151,66 @@ class DynamicKnowledgeGraphBuilder:
         except Exception as e:
             print(f"探索图谱时出错: {e}")
     
+    def _explore_with_snapshot(self, entities: List[str], depth: int) -> bool:
+        """
+        在图快照上逐层扩展出边，最后用一次查询补全新实体的描述
+        
+        每一跳保留的关系数由GRAPH_SNAPSHOT_EXPAND_LIMIT控制，超出时优先保留权重大的关系。
+        
+        Args:
+            entities: 起始实体列表
+            depth: 扩展层数
+            
+        Returns:
+            bool: 是否完成扩展；快照不可用或实体都不在快照中时返回False
+        """
+        try:
+            snapshot = get_graph_snapshot()
+            if snapshot is None or not any(entity in snapshot for entity in entities):
+                return False
+            
+            edges = snapshot.k_hop_edges(
+                entities, depth, direction="out",
+                max_edges_per_hop=GRAPH_SNAPSHOT_SETTINGS["expand_limit"]
+            )
+        except Exception as e:
+            print(f"图快照扩展失败，回退到Cypher查询: {e}")
+            return False
+        
+        new_entities = []
+        for edge in edges:
+            if edge.target not in self.knowledge_graph:
+                self.knowledge_graph.add_node(
+                    edge.target,
+                    type="entity",
+                    properties={"description": ""}
+                )
+                new_entities.append(edge.target)
+            
+            if not self.knowledge_graph.has_edge(edge.source, edge.target):
+                self.knowledge_graph.add_edge(
+                    edge.source,
+                    edge.target,
+                    type=edge.type
+                )
+        
+        if new_entities:
+            try:
+                rows = self.graph.query(
+                    """
+                    MATCH (e:__Entity__)
+                    WHERE e.id IN $entity_ids
+                    RETURN e.id AS id, e.description AS description
+                    """,
+                    params={"entity_ids": new_entities}
+                )
+                for row in rows:
+                    self.knowledge_graph.nodes[row['id']]['properties']['description'] = row.get('description', '')
+            except Exception as e:
+                print(f"补全实体描述失败: {e}")
+        
+        return True
+    
     def build_hierarchical_graph(self, documents):
         """
         构建包含文档层级、章节和特殊元素的图谱
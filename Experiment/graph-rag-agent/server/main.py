@@ -4,6 +4,7 @@ from routers import api_router
 from server_config.database import get_db_manager
 from server_config.settings import UVICORN_CONFIG
 from services.agent_service import agent_manager
+from utils.concurrent import chat_executor
 
 # 初始化 FastAPI 应用
 app = FastAPI(title="知识图谱问答系统", description="基于知识图谱的智能问答系统后端API")
@@ -22,6 +23,9 @@ def shutdown_event():
     # 关闭所有Agent资源
     agent_manager.close_all()
     
+    # 关闭聊天执行线程池
+    chat_executor.shutdown()
+    
     # 关闭Neo4j连接
     if driver:
         driver.close()
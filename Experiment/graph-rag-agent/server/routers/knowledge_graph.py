@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from typing import Optional
 import traceback
 from services.kg_service import (
@@ -14,6 +16,7 @@ from services.kg_service import (
     get_simplified_community,
 )
 from server_config.database import get_db_manager
+from utils.cache import graph_response_cache
 from models.schemas import (ReasoningRequest, EntityData, EntityDeleteData, EntitySearchFilter, EntityUpdateData,
                             RelationData, RelationDeleteData, RelationSearchFilter, RelationUpdateData)
 
@@ -21,8 +24,58 @@ from models.schemas import (ReasoningRequest, EntityData, EntityDeleteData, Enti
 router = APIRouter()
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    判断If-None-Match请求头是否包含当前ETag
+    
+    请求头可以是逗号分隔的多个ETag，按完整的值比较（忽略弱校验前缀W/），"*"匹配任意ETag。
+    
+    Args:
+        if_none_match: If-None-Match请求头
+        etag: 当前ETag
+        
+    Returns:
+        bool: 是否匹配
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+async def _graph_response(request: Request, key: str, compute, *args):
+    """
+    带ETag的图谱响应：If-None-Match与当前图版本下的ETag一致时直接返回304，不访问Neo4j
+    
+    Args:
+        request: 请求对象
+        key: 响应键（端点和参数）
+        compute: 计算响应的同步函数
+        
+    Returns:
+        Response: 304响应或带ETag的JSON响应
+    """
+    etag = graph_response_cache.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    
+    content = await run_in_threadpool(compute, *args)
+    if isinstance(content, dict) and content.get("error"):
+        return content
+    return JSONResponse(content=content, headers=headers)
+
+
+def _mark_graph_changed(*entity_ids):
+    """图编辑成功后递增图版本，使图谱响应缓存和图快照失效"""
+    graph_response_cache.mark_changed([entity_id for entity_id in entity_ids if entity_id])
+
+
 @router.get("/knowledge_graph")
-async def knowledge_graph(limit: int = 100, query: Optional[str] = None):
+async def knowledge_graph(request: Request, limit: int = 100, query: Optional[str] = None):
     """
     获取知识图谱数据
     
@@ -33,11 +86,11 @@ async def knowledge_graph(limit: int = 100, query: Optional[str] = None):
     Returns:
         Dict: 知识图谱数据，包含节点和连接
     """
-    return get_knowledge_graph(limit, query)
+    return await _graph_response(request, f"knowledge_graph:{limit}:{query}", get_knowledge_graph, limit, query)
 
 
 @router.get("/knowledge_graph_from_message")
-async def knowledge_graph_from_message(message: Optional[str] = None, query: Optional[str] = None):
+async def knowledge_graph_from_message(request: Request, message: Optional[str] = None, query: Optional[str] = None):
     """
     从消息文本中提取知识图谱数据
     
@@ -51,7 +104,9 @@ async def knowledge_graph_from_message(message: Optional[str] = None, query: Opt
     if not message:
         return {"nodes": [], "links": []}
     
-    return extract_kg_from_message(message, query)
+    return await _graph_response(
+        request, f"knowledge_graph_from_message:{message}:{query}", extract_kg_from_message, message, query
+    )
 
 @router.get("/chunks")
 async def chunks(limit: int = 10, offset: int = 0):
@@ -436,6 +491,7 @@ def create_entity(entity_data: EntityData):
         result = db_manager.execute_query(create_query, params)
         
         if not result.empty:
+            _mark_graph_changed(entity_data.id)
             return {"success": True, "id": result.iloc[0]['id']}
         else:
             return {"success": False, "message": "创建实体失败: 未能获取返回结果"}
@@ -508,6 +564,7 @@ def update_entity(entity_data: EntityUpdateData):
             
             db_manager.execute_query(update_query, params)
         
+        _mark_graph_changed(entity_data.id)
         return {"success": True}
     except Exception as e:
         print(e)
@@ -559,6 +616,7 @@ def delete_entity(entity_data: EntityDeleteData):
         
         db_manager.execute_query(delete_query, {"id": entity_data.id})
         
+        _mark_graph_changed(entity_data.id)
         return {"success": True}
     except Exception as e:
         print(e)
@@ -628,6 +686,7 @@ def create_relation(relation_data: RelationData):
         result = db_manager.execute_query(create_query, params)
         
         if not result.empty:
+            _mark_graph_changed(relation_data.source, relation_data.target)
             return {"success": True, "type": result.iloc[0]['type']}
         else:
             return {"success": False, "message": "创建关系失败: 未能获取返回结果"}
@@ -756,6 +815,7 @@ def update_relation(relation_data: RelationUpdateData):
                 
                 db_manager.execute_query(update_query, params)
         
+        _mark_graph_changed(relation_data.source, relation_data.target)
         return {"success": True}
     except Exception as e:
         print(e)
@@ -796,6 +856,7 @@ def delete_relation(relation_data: RelationDeleteData):
             "relType": relation_data.type
         })
         
+        _mark_graph_changed(relation_data.source, relation_data.target)
         return {"success": True}
     except Exception as e:
         print(e)
@@ -36,6 +36,18 @@ SERVER_LOG_LEVEL = os.getenv("SERVER_LOG_LEVEL", "info")  # 日志等级
 # Worker 数量优先使用 SERVER_WORKERS，否则回落到核心配置
 SERVER_WORKERS = _get_env_int("SERVER_WORKERS", core_workers) or core_workers
 
+# ===== 聊天执行层 =====
+
+CHAT_WORKER_THREADS = _get_env_int("CHAT_WORKER_THREADS", 8) or 8  # 执行同步Agent调用的线程数（同时处理的请求上限）
+AGENT_POOL_SIZE = _get_env_int("AGENT_POOL_SIZE", 4) or 4  # 每种Agent的实例数，会话按哈希固定到其中一个
+CHAT_QUEUE_TIMEOUT = _get_env_int("CHAT_QUEUE_TIMEOUT", 60)  # 请求排队等待的最长时间(秒)，超时返回503
+
+# ===== 知识图谱响应缓存 =====
+
+KG_CACHE_SIZE = _get_env_int("KG_CACHE_SIZE", 256) or 256  # 缓存的图谱响应条数
+KG_CACHE_TTL = _get_env_int("KG_CACHE_TTL", 600) or 600  # 单条响应的最长缓存时间(秒)，兜底绕过版本记录的直接改库
+KG_CACHE_VERSION_CHECK_INTERVAL = _get_env_int("KG_CACHE_VERSION_CHECK_INTERVAL", 5)  # 检查图版本的最小间隔(秒)
+
 # 统一封装 uvicorn.run 可用参数
 UVICORN_CONFIG = {
     "host": SERVER_HOST,
@@ -1,14 +1,27 @@
 from typing import Dict, List
 import threading
+import zlib
 from langchain_core.messages import RemoveMessage, AIMessage, HumanMessage, ToolMessage
 
+from server_config.settings import AGENT_POOL_SIZE
+
 
 # 创建Agent管理类
 class AgentManager:
-    """Agent管理类"""
+    """
+    Agent管理类
     
-    def __init__(self):
-        """初始化Agent管理器"""
+    每种Agent最多创建pool_size个实例。Agent的对话记忆保存在实例内，
+    因此会话按哈希固定到其中一个实例，不同会话分散到各实例上并行处理。
+    """
+    
+    def __init__(self, pool_size: int = AGENT_POOL_SIZE):
+        """
+        初始化Agent管理器
+        
+        Args:
+            pool_size: 每种Agent的实例数
+        """
         # 导入各种Agent
         from graphrag_agent.agents.graph_agent import GraphAgent
         from graphrag_agent.agents.hybrid_agent import HybridAgent
@@ -26,14 +39,29 @@ class AgentManager:
         }
         
         # 保留Agent实例池
+        self.pool_size = max(1, pool_size)
         self.agent_instances = {}
         
         # 添加锁来保护实例访问
         self.agent_lock = threading.RLock()
     
+    def instance_key(self, agent_type: str, session_id: str = "default") -> str:
+        """
+        会话对应的Agent实例键
+        
+        Args:
+            agent_type: Agent类型名称
+            session_id: 会话ID
+            
+        Returns:
+            str: 实例键，形如 "hybrid_agent:2"
+        """
+        slot = zlib.crc32(str(session_id).encode("utf-8")) % self.pool_size
+        return f"{agent_type}:{slot}"
+    
     def get_agent(self, agent_type: str, session_id: str = "default"):
         """
-        获取指定类型的Agent，对每个会话使用独立实例
+        获取会话对应的Agent实例，实例在首次使用时创建
         
         Args:
             agent_type: Agent类型名称
@@ -45,8 +73,7 @@ class AgentManager:
         if agent_type not in self.agent_classes:
             raise ValueError(f"未知的agent类型: {agent_type}")
         
-        # 为每个会话使用单独的Agent实例，避免资源争用
-        instance_key = f"{agent_type}:{session_id}"
+        instance_key = self.instance_key(agent_type, session_id)
         
         with self.agent_lock:
             if instance_key not in self.agent_instances:
@@ -71,7 +98,7 @@ class AgentManager:
             # 清除对应会话的所有agent实例历史
             with self.agent_lock:
                 for agent_type in self.agent_classes.keys():
-                    instance_key = f"{agent_type}:{session_id}"
+                    instance_key = self.instance_key(agent_type, session_id)
                     if instance_key in self.agent_instances:
                         agent = self.agent_instances[instance_key]
                         config = {"configurable": {"thread_id": session_id}}
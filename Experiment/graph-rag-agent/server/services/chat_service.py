@@ -8,7 +8,45 @@ import asyncio
 
 from services.agent_service import agent_manager
 from services.kg_service import extract_kg_from_message
-from utils.concurrent import chat_manager, feedback_manager
+from utils.concurrent import chat_executor, feedback_manager, QueueTimeoutError
+
+
+# 排队超时时返回给客户端的提示
+QUEUE_TIMEOUT_MESSAGE = "服务繁忙，请求排队超时，请稍后再试"
+
+
+async def _call_agent(agent, method: str, *args, **kwargs):
+    """
+    调用Agent方法，不阻塞事件循环
+    
+    Agent提供同名协程（如 aask、aask_with_trace）时直接await，否则在执行层的线程池中运行同步方法。
+    
+    Args:
+        agent: Agent实例
+        method: 方法名
+        
+    Returns:
+        方法返回值
+    """
+    native = getattr(agent, f"a{method}", None)
+    if native is not None and asyncio.iscoroutinefunction(native):
+        return await native(*args, **kwargs)
+    return await chat_executor.run(getattr(agent, method), *args, **kwargs)
+
+
+async def _get_agent(agent_type: str, session_id: str):
+    """
+    在线程池中获取（必要时创建）会话对应的Agent实例
+    
+    需在chat_executor.acquire()内调用，创建Agent与LLM调用共用运行名额和排队期限。
+    """
+    return await chat_executor.run(agent_manager.get_agent, agent_type, session_id)
+
+
+def _check_agent_type(agent_type: str) -> None:
+    """排队前校验Agent类型，未知类型不占用执行资格"""
+    if agent_type not in agent_manager.agent_classes:
+        raise ValueError(f"未知的agent类型: {agent_type}")
 
 
 async def process_chat(message: str, session_id: str, debug: bool = False, agent_type: str = "hybrid_agent", 
@@ -16,6 +54,8 @@ async def process_chat(message: str, session_id: str, debug: bool = False, agent
     """
     处理聊天请求
     
+    请求在执行层中排队：同一个Agent实例上的请求依次执行，超过CHAT_QUEUE_TIMEOUT仍未轮到时返回503。
+    
     Args:
         message: 用户消息
         session_id: 会话ID
@@ -27,177 +67,173 @@ async def process_chat(message: str, session_id: str, debug: bool = False, agent
     Returns:
         Dict: 聊天响应结果
     """
-    # 生成锁的键
-    lock_key = f"{session_id}_chat"
-    
-    # 非阻塞方式尝试获取锁
-    lock_acquired = chat_manager.try_acquire_lock(lock_key)
-    if not lock_acquired:
-        # 如果无法获取锁，说明有另一个请求正在处理
-        raise HTTPException(
-            status_code=429, 
-            detail="当前有其他请求正在处理，请稍后再试"
-        )
+    try:
+        _check_agent_type(agent_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # 更新操作时间戳
-        chat_manager.update_timestamp(lock_key)
-        
-        # 获取指定的agent
-        try:
-            selected_agent = agent_manager.get_agent(agent_type)
+        async with chat_executor.acquire(agent_manager.instance_key(agent_type, session_id)):
+            # 获取指定的agent
+            selected_agent = await _get_agent(agent_type, session_id)
             if agent_type == "deep_research_agent":
                 selected_agent.is_deeper_tool(use_deeper_tool)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+            return await _run_chat(selected_agent, message, session_id, debug, agent_type)
+    except QueueTimeoutError:
+        raise HTTPException(status_code=503, detail=QUEUE_TIMEOUT_MESSAGE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"处理聊天请求时出错: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _run_chat(selected_agent, message: str, session_id: str, debug: bool, agent_type: str) -> Dict:
+    """在已获得执行资格的Agent实例上处理一次聊天请求"""
+    # 首先尝试快速路径 - 跳过完整处理
+    try:
+        start_fast = time.time()
+        fast_result = await _call_agent(selected_agent, "check_fast_cache", message, session_id)
         
-        # 首先尝试快速路径 - 跳过完整处理
-        try:
-            start_fast = time.time()
-            fast_result = selected_agent.check_fast_cache(message, session_id)
+        if fast_result:
+            print(f"API快速路径命中: {time.time() - start_fast:.4f}s")
             
-            if fast_result:
-                print(f"API快速路径命中: {time.time() - start_fast:.4f}s")
-                
-                # 在调试模式下，需要提供额外信息
-                if debug:
-                    # 提供模拟的执行日志
-                    mock_log = [{
-                        "node": "fast_cache_hit", 
-                        "timestamp": time.time(), 
-                        "input": message, 
-                        "output": "高质量缓存命中，跳过完整处理"
-                    }]
-                    
-                    # 尝试提取图谱数据，对deep_research_agent禁用
-                    kg_data = {"nodes": [], "links": []}
-                    if agent_type != "deep_research_agent":
-                        try:
-                            kg_data = extract_kg_from_message(fast_result)
-                        except:
-                            kg_data = {"nodes": [], "links": []}
-                        
-                    return {
-                        "answer": fast_result,
-                        "execution_log": mock_log,
-                        "kg_data": kg_data
-                    }
-                else:
-                    # 标准模式直接返回答案
-                    return {"answer": fast_result}
-        except Exception as e:
-            # 快速路径失败，继续常规流程
-            print(f"快速路径检查失败: {e}")
-        
-        # 检查是否为deep_research_agent且是否显示思考过程
-        show_thinking = agent_type == "deep_research_agent"
-        
-        if debug:
-            # 在Debug模式下使用ask_with_trace或ask_with_thinking，并返回知识图谱数据
-            if agent_type == "deep_research_agent":
-                # 使用ask_with_thinking方法获取带思考过程的结果
-                result = selected_agent.ask_with_thinking(message, thread_id=session_id)
-                
-                # 从结果字典中获取各个组件
-                thinking_process = result.get("thinking_process", "")
-                answer_content = result.get("answer", "")
-                retrieved_info = result.get("retrieved_info", [])
-                reference = result.get("reference", {})
-                execution_logs = result.get("execution_logs", [])  # 获取执行日志
-                
-                # 为deep_research_agent禁用知识图谱数据
-                kg_data = {"nodes": [], "links": []}
-                
-                # 提取迭代轮次信息以便前端展示
-                iterations = extract_iterations(retrieved_info)
-                
-                # 如果未能从retrieved_info提取到有效迭代，尝试从thinking_process中提取
-                if not iterations or len(iterations) == 0:
-                    print("从retrieved_info中没有提取到迭代信息，尝试从thinking_process中提取")
-                    thinking_iterations = extract_iterations_from_thinking(thinking_process)
-                    if thinking_iterations and len(thinking_iterations) > 0:
-                        print(f"从thinking_process中提取到{len(thinking_iterations)}轮迭代")
-                        iterations = thinking_iterations
-                
-                # 构建执行日志
-                execution_log = [{
-                    "node": "deep_research", 
+            # 在调试模式下，需要提供额外信息
+            if debug:
+                # 提供模拟的执行日志
+                mock_log = [{
+                    "node": "fast_cache_hit", 
+                    "timestamp": time.time(), 
                     "input": message, 
-                    "output": "\n".join(execution_logs) if execution_logs else "无执行日志"
+                    "output": "高质量缓存命中，跳过完整处理"
                 }]
                 
-                # 打印日志长度信息
-                logs_count = len(execution_logs)
-                print(f"执行日志数量: {logs_count}条")
-                
-                # 构建完整响应，包含执行日志
+                # 尝试提取图谱数据，对deep_research_agent禁用
+                kg_data = {"nodes": [], "links": []}
+                if agent_type != "deep_research_agent":
+                    try:
+                        kg_data = await chat_executor.run(extract_kg_from_message, fast_result)
+                    except:
+                        kg_data = {"nodes": [], "links": []}
+                    
                 return {
-                    "answer": answer_content,
-                    "execution_log": execution_log,
-                    "kg_data": kg_data,
-                    "reference": reference,
-                    "iterations": iterations,
-                    "raw_thinking": thinking_process,
-                    "execution_logs": execution_logs,
+                    "answer": fast_result,
+                    "execution_log": mock_log,
+                    "kg_data": kg_data
                 }
             else:
-                # 其他Agent使用标准的ask_with_trace
-                result = selected_agent.ask_with_trace(
+                # 标准模式直接返回答案
+                return {"answer": fast_result}
+    except Exception as e:
+        # 快速路径失败，继续常规流程
+        print(f"快速路径检查失败: {e}")
+    
+    # 检查是否为deep_research_agent且是否显示思考过程
+    show_thinking = agent_type == "deep_research_agent"
+    
+    if debug:
+        # 在Debug模式下使用ask_with_trace或ask_with_thinking，并返回知识图谱数据
+        if agent_type == "deep_research_agent":
+            # 使用ask_with_thinking方法获取带思考过程的结果
+            result = await _call_agent(selected_agent, "ask_with_thinking", message, thread_id=session_id)
+            
+            # 从结果字典中获取各个组件
+            thinking_process = result.get("thinking_process", "")
+            answer_content = result.get("answer", "")
+            retrieved_info = result.get("retrieved_info", [])
+            reference = result.get("reference", {})
+            execution_logs = result.get("execution_logs", [])  # 获取执行日志
+            
+            # 为deep_research_agent禁用知识图谱数据
+            kg_data = {"nodes": [], "links": []}
+            
+            # 提取迭代轮次信息以便前端展示
+            iterations = extract_iterations(retrieved_info)
+            
+            # 如果未能从retrieved_info提取到有效迭代，尝试从thinking_process中提取
+            if not iterations or len(iterations) == 0:
+                print("从retrieved_info中没有提取到迭代信息，尝试从thinking_process中提取")
+                thinking_iterations = extract_iterations_from_thinking(thinking_process)
+                if thinking_iterations and len(thinking_iterations) > 0:
+                    print(f"从thinking_process中提取到{len(thinking_iterations)}轮迭代")
+                    iterations = thinking_iterations
+            
+            # 构建执行日志
+            execution_log = [{
+                "node": "deep_research", 
+                "input": message, 
+                "output": "\n".join(execution_logs) if execution_logs else "无执行日志"
+            }]
+            
+            # 打印日志长度信息
+            logs_count = len(execution_logs)
+            print(f"执行日志数量: {logs_count}条")
+            
+            # 构建完整响应，包含执行日志
+            return {
+                "answer": answer_content,
+                "execution_log": execution_log,
+                "kg_data": kg_data,
+                "reference": reference,
+                "iterations": iterations,
+                "raw_thinking": thinking_process,
+                "execution_logs": execution_logs,
+            }
+        else:
+            # 其他Agent使用标准的ask_with_trace
+            result = await _call_agent(
+                selected_agent,
+                "ask_with_trace",
+                message, 
+                thread_id=session_id,
+            )
+            
+            # 从结果中提取知识图谱数据
+            kg_data = await chat_executor.run(extract_kg_from_message, result["answer"])
+            
+            return {
+                "answer": result["answer"],
+                "execution_log": result["execution_log"],
+                "kg_data": kg_data,
+            }
+    else:
+        # 标准模式
+        if agent_type == "deep_research_agent" and show_thinking:
+            # 使用ask_with_thinking方法获取带思考过程的结果
+            result = await _call_agent(selected_agent, "ask_with_thinking", message, thread_id=session_id)
+            
+            # 从结果字典中获取各个组件
+            thinking_process = result.get("thinking_process", "")
+            answer_content = result.get("answer", "")
+            execution_logs = result.get("execution_logs", [])
+            
+            # 返回思考过程、答案和执行日志
+            return {
+                "answer": answer_content,
+                "raw_thinking": thinking_process,
+                "execution_logs": execution_logs
+            }
+        else:
+            # 普通模式，使用标准ask方法
+            # 检查是否为DeepResearchAgent类型，只有DeepResearchAgent支持show_thinking参数
+            if agent_type == "deep_research_agent":
+                answer = await _call_agent(
+                    selected_agent,
+                    "ask",
                     message, 
                     thread_id=session_id,
+                    show_thinking=show_thinking # deep_research_agent支持此参数
                 )
-                
-                # 从结果中提取知识图谱数据
-                kg_data = extract_kg_from_message(result["answer"])
-                
-                return {
-                    "answer": result["answer"],
-                    "execution_log": result["execution_log"],
-                    "kg_data": kg_data,
-                }
-        else:
-            # 标准模式
-            if agent_type == "deep_research_agent" and show_thinking:
-                # 使用ask_with_thinking方法获取带思考过程的结果
-                result = selected_agent.ask_with_thinking(message, thread_id=session_id)
-                
-                # 从结果字典中获取各个组件
-                thinking_process = result.get("thinking_process", "")
-                answer_content = result.get("answer", "")
-                execution_logs = result.get("execution_logs", [])
-                
-                # 返回思考过程、答案和执行日志
-                return {
-                    "answer": answer_content,
-                    "raw_thinking": thinking_process,
-                    "execution_logs": execution_logs
-                }
             else:
-                # 普通模式，使用标准ask方法
-                # 检查是否为DeepResearchAgent类型，只有DeepResearchAgent支持show_thinking参数
-                if agent_type == "deep_research_agent":
-                    answer = selected_agent.ask(
-                        message, 
-                        thread_id=session_id,
-                        show_thinking=show_thinking # deep_research_agent支持此参数
-                    )
-                else:
-                    # 其他Agent类型不支持show_thinking参数
-                    answer = selected_agent.ask(
-                        message, 
-                        thread_id=session_id
-                    )
-                return {"answer": answer}
-    except Exception as e:
-        print(f"处理聊天请求时出错: {str(e)}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # 释放锁
-        chat_manager.release_lock(lock_key)
-        
-        # 清理过期的锁
-        chat_manager.cleanup_expired_locks()
+                # 其他Agent类型不支持show_thinking参数
+                answer = await _call_agent(
+                    selected_agent,
+                    "ask",
+                    message, 
+                    thread_id=session_id
+                )
+            return {"answer": answer}
 
 async def process_chat_stream(
     message: str, 
@@ -210,6 +246,8 @@ async def process_chat_stream(
     """
     处理聊天请求，返回流式输出
     
+    与process_chat共用执行层排队；流式输出期间一直占用对应的Agent实例。
+    
     Args:
         message: 用户消息
         session_id: 会话ID
@@ -221,165 +259,158 @@ async def process_chat_stream(
     Yields:
         流式文本块或状态更新
     """
-    # 生成锁的键
-    lock_key = f"{session_id}_chat"
-    
-    # 非阻塞方式尝试获取锁
-    lock_acquired = chat_manager.try_acquire_lock(lock_key)
-    if not lock_acquired:
-        # 返回错误流
-        yield json.dumps({"status": "error", "message": "当前有其他请求正在处理，请稍后再试"})
+    try:
+        _check_agent_type(agent_type)
+    except ValueError as e:
+        yield json.dumps({"status": "error", "message": str(e)})
         return
     
     try:
-        # 更新操作时间戳
-        chat_manager.update_timestamp(lock_key)
-        
-        # 获取指定的agent
-        try:
-            selected_agent = agent_manager.get_agent(agent_type)
+        async with chat_executor.acquire(agent_manager.instance_key(agent_type, session_id)):
+            # 获取指定的agent
+            selected_agent = await _get_agent(agent_type, session_id)
             if agent_type == "deep_research_agent":
                 selected_agent.is_deeper_tool(use_deeper_tool)
-        except ValueError as e:
-            yield json.dumps({"status": "error", "message": str(e)})
-            return
+            async for chunk in _run_chat_stream(selected_agent, message, session_id, debug, agent_type, show_thinking):
+                yield chunk
+    except QueueTimeoutError:
+        yield json.dumps({"status": "error", "message": QUEUE_TIMEOUT_MESSAGE})
+    except Exception as e:
+        print(f"处理聊天请求时出错: {str(e)}")
+        print(traceback.format_exc())
+        yield json.dumps({"status": "error", "message": str(e)})
+
+
+async def _run_chat_stream(selected_agent, message: str, session_id: str, debug: bool,
+                           agent_type: str, show_thinking: bool) -> AsyncGenerator[str, None]:
+    """在已获得执行资格的Agent实例上流式处理一次聊天请求"""
+    # 首先尝试快速路径缓存
+    try:
+        start_fast = time.time()
+        fast_result = await _call_agent(selected_agent, "check_fast_cache", message, session_id)
         
-        # 首先尝试快速路径缓存
-        try:
-            start_fast = time.time()
-            fast_result = selected_agent.check_fast_cache(message, session_id)
+        if fast_result:
+            print(f"API快速路径命中: {time.time() - start_fast:.4f}s")
+            # 如果是调试模式，生成模拟执行日志
+            if debug:
+                mock_log = {
+                    "node": "fast_cache_hit", 
+                    "timestamp": time.time(), 
+                    "input": message, 
+                    "output": "高质量缓存命中，跳过完整处理"
+                }
+                yield {"execution_log": mock_log}
             
-            if fast_result:
-                print(f"API快速路径命中: {time.time() - start_fast:.4f}s")
-                # 如果是调试模式，生成模拟执行日志
-                if debug:
-                    mock_log = {
-                        "node": "fast_cache_hit", 
-                        "timestamp": time.time(), 
-                        "input": message, 
-                        "output": "高质量缓存命中，跳过完整处理"
-                    }
-                    yield {"execution_log": mock_log}
+            yield json.dumps({"status": "token", "content": fast_result})
+            yield json.dumps({"status": "done"})
+            return
+    except Exception as e:
+        print(f"快速路径检查失败: {e}")
+    
+    # 保存执行轨迹（针对调试模式）
+    execution_log = []
+    
+    # 对于深度研究Agent使用思考流
+    if agent_type == "deep_research_agent" and show_thinking:
+        # 获取思考过程的流处理
+        thinking_step = False
+        thinking_content = ""
+        
+        async for chunk in selected_agent.ask_stream(message, thread_id=session_id):
+            if isinstance(chunk, dict):
+                # 字典形式包含状态信息
+                if "execution_log" in chunk and debug:
+                    execution_log.append(chunk["execution_log"])
+                    yield {"execution_log": chunk["execution_log"]}
+                else:
+                    yield chunk
+            elif "[深度研究]" in chunk or "[KB检索]" in chunk:
+                # 这是思考步骤
+                thinking_step = True
+                thinking_content += chunk
+                yield json.dumps({"status": "thinking", "content": chunk})
+            else:
+                # 正常内容
+                if thinking_step:
+                    thinking_step = False
+                    yield json.dumps({"status": "answer_start"})
                 
-                yield json.dumps({"status": "token", "content": fast_result})
-                yield json.dumps({"status": "done"})
-                return
-        except Exception as e:
-            print(f"快速路径检查失败: {e}")
+                yield json.dumps({"status": "token", "content": chunk})
         
-        # 保存执行轨迹（针对调试模式）
-        execution_log = []
+        # 发送完成消息
+        yield json.dumps({"status": "done", "thinking_content": thinking_content})
         
-        # 对于深度研究Agent使用思考流
-        if agent_type == "deep_research_agent" and show_thinking:
-            # 获取思考过程的流处理
-            thinking_step = False
-            thinking_content = ""
-            
-            async for chunk in selected_agent.ask_stream(message, thread_id=session_id):
-                if isinstance(chunk, dict):
-                    # 字典形式包含状态信息
-                    if "execution_log" in chunk and debug:
-                        execution_log.append(chunk["execution_log"])
-                        yield {"execution_log": chunk["execution_log"]}
-                    else:
-                        yield chunk
-                elif "[深度研究]" in chunk or "[KB检索]" in chunk:
-                    # 这是思考步骤
-                    thinking_step = True
-                    thinking_content += chunk
-                    yield json.dumps({"status": "thinking", "content": chunk})
-                else:
-                    # 正常内容
-                    if thinking_step:
-                        thinking_step = False
-                        yield json.dumps({"status": "answer_start"})
-                    
-                    yield json.dumps({"status": "token", "content": chunk})
+        return
+    
+    # 对于其他Agent类型，使用标准流式处理
+    if agent_type in ["hybrid_agent", "graph_agent", "naive_rag_agent"]:
+        # 为调试模式收集执行轨迹
+        if debug:
+            # 首先获取执行轨迹
+            trace_result = await _call_agent(
+                selected_agent,
+                "ask_with_trace",
+                message,
+                thread_id=session_id
+            )
             
-            # 发送完成消息
-            yield json.dumps({"status": "done", "thinking_content": thinking_content})
+            # 发送执行轨迹
+            if "execution_log" in trace_result:
+                for log_entry in trace_result["execution_log"]:
+                    yield {"execution_log": log_entry}
+                    execution_log.append(log_entry)
             
-            return
+            # 发送答案，模拟流式输出
+            answer = trace_result["answer"]
+            chunk_size = 10  # 每个块的字符数
+            for i in range(0, len(answer), chunk_size):
+                chunk = answer[i:i+chunk_size]
+                yield json.dumps({"status": "token", "content": chunk})
+                await asyncio.sleep(0.01)  # 小延迟模拟流式输出
+        else:
+            # 使用Agent的流式接口
+            async for chunk in selected_agent.ask_stream(message, thread_id=session_id):
+                yield json.dumps({"status": "token", "content": chunk})
         
-        # 对于其他Agent类型，使用标准流式处理
-        if agent_type in ["hybrid_agent", "graph_agent", "naive_rag_agent"]:
-            # 为调试模式收集执行轨迹
-            if debug:
-                # 首先获取执行轨迹
-                trace_result = await asyncio.to_thread(
-                    selected_agent.ask_with_trace,
-                    message,
-                    thread_id=session_id
-                )
-                
-                # 发送执行轨迹
-                if "execution_log" in trace_result:
-                    for log_entry in trace_result["execution_log"]:
-                        yield {"execution_log": log_entry}
-                        execution_log.append(log_entry)
-                
-                # 发送答案，模拟流式输出
-                answer = trace_result["answer"]
-                chunk_size = 10  # 每个块的字符数
-                for i in range(0, len(answer), chunk_size):
-                    chunk = answer[i:i+chunk_size]
-                    yield json.dumps({"status": "token", "content": chunk})
-                    await asyncio.sleep(0.01)  # 小延迟模拟流式输出
-            else:
-                # 使用Agent的流式接口
-                async for chunk in selected_agent.ask_stream(message, thread_id=session_id):
-                    yield json.dumps({"status": "token", "content": chunk})
+        # 发送完成消息
+        yield json.dumps({"status": "done"})
+    else:
+        # 对于不支持流式处理的Agent，回退到非流式处理并模拟流
+        if debug:
+            # 首先获取执行轨迹
+            trace_result = await _call_agent(
+                selected_agent,
+                "ask_with_trace",
+                message,
+                thread_id=session_id
+            )
             
-            # 发送完成消息
-            yield json.dumps({"status": "done"})
-        else:
-            # 对于不支持流式处理的Agent，回退到非流式处理并模拟流
-            if debug:
-                # 首先获取执行轨迹
-                trace_result = await asyncio.to_thread(
-                    selected_agent.ask_with_trace,
-                    message,
-                    thread_id=session_id
-                )
-                
-                # 发送执行轨迹
-                if "execution_log" in trace_result:
-                    for log_entry in trace_result["execution_log"]:
-                        yield {"execution_log": log_entry}
-                        execution_log.append(log_entry)
-                
-                # 发送答案，模拟流式输出
-                answer = trace_result["answer"]
-                chunk_size = 10  # 每个块的字符数
-                for i in range(0, len(answer), chunk_size):
-                    chunk = answer[i:i+chunk_size]
-                    yield json.dumps({"status": "token", "content": chunk})
-                    await asyncio.sleep(0.01)  # 小延迟模拟流式输出
-            else:
-                # 非调试模式，简单获取答案
-                answer = selected_agent.ask(message, thread_id=session_id)
-                
-                # 分块发送响应以模拟流式输出
-                chunk_size = 10  # 每个块的字符数
-                for i in range(0, len(answer), chunk_size):
-                    chunk = answer[i:i+chunk_size]
-                    yield json.dumps({"status": "token", "content": chunk})
-                    await asyncio.sleep(0.01)  # 小延迟模拟流式输出
+            # 发送执行轨迹
+            if "execution_log" in trace_result:
+                for log_entry in trace_result["execution_log"]:
+                    yield {"execution_log": log_entry}
+                    execution_log.append(log_entry)
             
-            # 发送完成消息
-            yield json.dumps({"status": "done"})
+            # 发送答案，模拟流式输出
+            answer = trace_result["answer"]
+            chunk_size = 10  # 每个块的字符数
+            for i in range(0, len(answer), chunk_size):
+                chunk = answer[i:i+chunk_size]
+                yield json.dumps({"status": "token", "content": chunk})
+                await asyncio.sleep(0.01)  # 小延迟模拟流式输出
+        else:
+            # 非调试模式，简单获取答案
+            answer = await _call_agent(selected_agent, "ask", message, thread_id=session_id)
             
-    except Exception as e:
-        print(f"处理聊天请求时出错: {str(e)}")
-        print(traceback.format_exc())
-        yield json.dumps({"status": "error", "message": str(e)})
-    finally:
-        # 释放锁
-        chat_manager.release_lock(lock_key)
+            # 分块发送响应以模拟流式输出
+            chunk_size = 10  # 每个块的字符数
+            for i in range(0, len(answer), chunk_size):
+                chunk = answer[i:i+chunk_size]
+                yield json.dumps({"status": "token", "content": chunk})
+                await asyncio.sleep(0.01)  # 小延迟模拟流式输出
         
-        # 清理过期的锁
-        chat_manager.cleanup_expired_locks()
+        # 发送完成消息
+        yield json.dumps({"status": "done"})
 
 
 def extract_iterations(retrieved_info):
@@ -620,11 +651,11 @@ async def process_feedback(message_id: str, query: str, is_positive: bool, threa
         with feedback_manager.get_lock(lock_key):
             # 确保agent_type存在
             try:
-                selected_agent = agent_manager.get_agent(agent_type)
+                selected_agent = agent_manager.get_agent(agent_type, thread_id)
             except ValueError:
                 agent_type = "graph_agent"  # 回退到默认agent
                 print(f"未知的agent类型，使用默认值: {agent_type}")
-                selected_agent = agent_manager.get_agent(agent_type)
+                selected_agent = agent_manager.get_agent(agent_type, thread_id)
             
             # 根据反馈进行处理
             if is_positive:
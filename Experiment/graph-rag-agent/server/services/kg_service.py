@@ -3,6 +3,7 @@ import traceback
 from typing import Dict, List, Any
 from server_config.database import get_db_manager
 from utils.keywords import extract_smart_keywords
+from utils.cache import graph_cached
 
 
 # 获取数据库连接
@@ -216,6 +217,7 @@ def get_entities_from_chunk(chunk_id: str) -> List:
         return []
 
 
+@graph_cached("graph_from_chunks")
 def get_graph_from_chunks(chunk_ids: List[str]) -> Dict:
     """
     直接从文本块获取知识图谱
@@ -327,9 +329,10 @@ def get_graph_from_chunks(chunk_ids: List[str]) -> Dict:
         
     except Exception as e:
         print(f"从文本块获取知识图谱失败: {str(e)}")
-        return {"nodes": [], "links": []}
+        return {"error": str(e), "nodes": [], "links": []}
 
 
+@graph_cached("knowledge_graph_for_ids")
 def get_knowledge_graph_for_ids(entity_ids=None, relationship_ids=None, chunk_ids=None) -> Dict:
     """
     根据ID获取知识图谱数据
@@ -499,9 +502,10 @@ def get_knowledge_graph_for_ids(entity_ids=None, relationship_ids=None, chunk_id
         # 尝试直接使用文本块查询
         if chunk_ids:
             return get_graph_from_chunks(chunk_ids)
-        return {"nodes": [], "links": []}
+        return {"error": str(e), "nodes": [], "links": []}
 
 
+@graph_cached("knowledge_graph")
 def get_knowledge_graph(limit: int = 100, query: str = None) -> Dict:
     """
     获取知识图谱数据
@@ -753,8 +757,184 @@ def get_chunks(limit: int = 10, offset: int = 0):
         return {"error": str(e), "chunks": []}
     
 
+def _load_snapshot(*entity_ids):
+    """获取内存图快照；未启用、加载失败或实体不在快照中时返回None，由调用方回退到Cypher查询"""
+    try:
+        from graphrag_agent.graph.core.graph_snapshot import get_graph_snapshot
+        snapshot = get_graph_snapshot()
+    except Exception as e:
+        print(f"获取图快照失败: {str(e)}")
+        return None
+    if snapshot is None or any(entity_id not in snapshot for entity_id in entity_ids):
+        return None
+    return snapshot
+
+def _path_node_ids(start_id, edges):
+    """沿路径关系依次取出经过的实体（关系方向可能与行进方向相反）"""
+    node_ids = [start_id]
+    for edge in edges:
+        node_ids.append(edge.target if edge.source == node_ids[-1] else edge.source)
+    return node_ids
+
+def _visual_graph(driver, node_ids, edges, groups=None):
+    """
+    把快照上的遍历结果转换为可视化格式，节点属性用一次查询补全
+
+    Args:
+        driver: Neo4j驱动
+        node_ids: 实体ID列表（按展示顺序）
+        edges: 快照关系列表
+        groups: 指定节点分组，未指定的节点使用实体类型
+
+    Returns:
+        Tuple[List, List]: (nodes, links)
+    """
+    node_ids = list(dict.fromkeys(node_ids))
+    result = driver.execute_query("""
+    UNWIND $ids AS entity_id
+    MATCH (e:__Entity__ {id: entity_id})
+    RETURN e.id AS id, e.description AS description,
+           [label IN labels(e) WHERE label <> '__Entity__'] AS labels
+    """, {"ids": node_ids})
+    properties = {record.get("id"): record for record in result.records}
+
+    nodes = []
+    for node_id in node_ids:
+        record = properties.get(node_id)
+        labels = (record.get("labels") if record else None) or []
+        nodes.append({
+            "id": node_id,
+            "label": node_id,
+            "description": (record.get("description") if record else None) or "",
+            "group": (groups or {}).get(node_id) or (labels[0] if labels else "Unknown")
+        })
+
+    links = []
+    link_keys = set()
+    for edge in edges:
+        link_key = f"{edge.source}_{edge.target}_{edge.type}"
+        if link_key not in link_keys:
+            link_keys.add(link_key)
+            links.append({
+                "source": edge.source,
+                "target": edge.target,
+                "label": edge.type,
+                "weight": 1
+            })
+    return nodes, links
+
+def _describe_path(edges):
+    return " -> ".join([f"{edge.source} -[{edge.type}]-> {edge.target}" for edge in edges])
+
+def _shortest_path_from_snapshot(driver, entity_a, entity_b, max_hops):
+    """在图快照上BFS求最短路径"""
+    snapshot = _load_snapshot(entity_a, entity_b)
+    if snapshot is None:
+        return None
+    try:
+        edges = snapshot.shortest_path(entity_a, entity_b, max_hops) or []
+        nodes, links = _visual_graph(driver, _path_node_ids(entity_a, edges) if edges else [], edges)
+        return {
+            "nodes": nodes,
+            "links": links,
+            "path_info": f"从 {entity_a} 到 {entity_b} 的最短路径",
+            "path_length": len(edges)
+        }
+    except Exception as e:
+        print(f"图快照最短路径失败，回退到Cypher查询: {str(e)}")
+        return None
+
+def _all_paths_from_snapshot(driver, entity_a, entity_b, max_depth):
+    """在图快照上枚举两个实体之间的路径（短路径优先，最多10条）"""
+    snapshot = _load_snapshot(entity_a, entity_b)
+    if snapshot is None:
+        return None
+    try:
+        paths = snapshot.paths(entity_a, entity_b, max_depth, limit=10)
+        node_ids, edges, paths_info = [], [], []
+        for path in paths:
+            node_ids.extend(_path_node_ids(entity_a, path))
+            edges.extend(path)
+            path_str = _describe_path(path)
+            if path_str not in paths_info:
+                paths_info.append(path_str)
+        nodes, links = _visual_graph(driver, node_ids, edges)
+        return {
+            "nodes": nodes,
+            "links": links,
+            "paths_info": paths_info,
+            "path_count": len(paths_info)
+        }
+    except Exception as e:
+        print(f"图快照路径枚举失败，回退到Cypher查询: {str(e)}")
+        return None
+
+def _cycles_from_snapshot(driver, entity_id, max_depth):
+    """在图快照上沿出边查找经过实体的环路（最多10条）"""
+    snapshot = _load_snapshot(entity_id)
+    if snapshot is None:
+        return None
+    try:
+        cycles = snapshot.paths(entity_id, entity_id, max_depth, limit=10, direction="out")
+        node_ids, edges, cycles_info = [], [], []
+        for cycle in cycles:
+            node_ids.extend(_path_node_ids(entity_id, cycle))
+            edges.extend(cycle)
+            cycle_str = _describe_path(cycle)
+            if cycle_str not in [c["description"] for c in cycles_info]:
+                cycles_info.append({"description": cycle_str, "length": len(cycle)})
+        nodes, links = _visual_graph(driver, node_ids, edges)
+        return {
+            "nodes": nodes,
+            "links": links,
+            "cycles_info": cycles_info,
+            "cycle_count": len(cycles_info)
+        }
+    except Exception as e:
+        print(f"图快照环路查找失败，回退到Cypher查询: {str(e)}")
+        return None
+
+def _influence_from_snapshot(driver, entity_id, max_depth, max_nodes=100):
+    """在图快照上按BFS层次分析实体的影响范围"""
+    snapshot = _load_snapshot(entity_id)
+    if snapshot is None:
+        return None
+    try:
+        depths = snapshot.bfs([entity_id], max_depth, max_nodes=max_nodes + 1)
+        inner = [node_id for node_id, depth in depths.items() if depth < max_depth]
+        edges = [edge for neighbor_id, edge in snapshot.neighbors(inner) if neighbor_id in depths]
+
+        groups = {node_id: f"Level{depth}" for node_id, depth in depths.items()}
+        groups[entity_id] = "Center"
+        nodes, links = _visual_graph(driver, list(depths), edges, groups)
+        nodes[0]["description"] = ""
+
+        connection_types = {}
+        for link in links:
+            connection_types[link["label"]] = connection_types.get(link["label"], 0) + 1
+
+        influence_stats = {
+            "direct_connections": sum(1 for depth in depths.values() if depth == 1),
+            "total_connections": len(nodes) - 1,
+            "connection_types": [{"type": k, "count": v} for k, v in connection_types.items()],
+            "relation_distribution": connection_types
+        }
+        return {
+            "nodes": nodes,
+            "links": links,
+            "influence_stats": influence_stats
+        }
+    except Exception as e:
+        print(f"图快照影响范围分析失败，回退到Cypher查询: {str(e)}")
+        return None
+
 def get_shortest_path(driver, entity_a, entity_b, max_hops=3):
     """查询实体A和实体B之间的最短路径"""
+    hops = min(max_hops, 5) if max_hops >= 1 else 3
+    snapshot_result = _shortest_path_from_snapshot(driver, entity_a, entity_b, hops)
+    if snapshot_result is not None:
+        return snapshot_result
+
     try:
         # 根据max_hops构建相应的路径模式
         if max_hops == 1:
@@ -992,6 +1172,11 @@ def get_common_neighbors(driver, entity_a, entity_b):
 
 def get_all_paths(driver, entity_a, entity_b, max_depth=3):
     """查询两个实体之间的所有路径（有深度限制）"""
+    depth = min(max_depth, 5) if max_depth >= 1 else 3
+    snapshot_result = _all_paths_from_snapshot(driver, entity_a, entity_b, depth)
+    if snapshot_result is not None:
+        return snapshot_result
+
     try: 
         # 验证实体存在性
         check_query = """
@@ -1105,6 +1290,11 @@ def get_all_paths(driver, entity_a, entity_b, max_depth=3):
 
 def get_entity_cycles(driver, entity_id, max_depth=4):
     """查找实体的环路"""
+    depth = max_depth if 1 <= max_depth <= 4 else 4
+    snapshot_result = _cycles_from_snapshot(driver, entity_id, depth)
+    if snapshot_result is not None:
+        return snapshot_result
+
     try:
         # 根据max_depth构建适当的路径模式
         if max_depth == 1:
@@ -1198,6 +1388,11 @@ def get_entity_cycles(driver, entity_id, max_depth=4):
 
 def get_entity_influence(driver, entity_id, max_depth=2):
     """分析实体的影响范围"""
+    depth = max_depth if 1 <= max_depth <= 3 else 2
+    snapshot_result = _influence_from_snapshot(driver, entity_id, depth)
+    if snapshot_result is not None:
+        return snapshot_result
+
     try:
         # 根据max_depth构建路径模式
         if max_depth == 1:
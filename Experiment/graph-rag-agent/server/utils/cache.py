@@ -1,5 +1,13 @@
+import copy
+import functools
+import hashlib
+import json
+import threading
 import time
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+
+from server_config.settings import KG_CACHE_SIZE, KG_CACHE_TTL, KG_CACHE_VERSION_CHECK_INTERVAL
 
 
 class CacheManager:
@@ -142,5 +150,147 @@ class CacheManager:
             del self.cache[entries[0][0]]
 
 
+class GraphResponseCache:
+    """
+    按图版本失效的知识图谱响应缓存
+    
+    缓存键包含图版本（__GraphMeta__节点，由构建流程和图编辑接口递增），版本变化后旧条目自然失效。
+    图版本在本地缓存，最多每version_check_interval秒读取一次，因此命中缓存和计算ETag都不访问Neo4j；
+    本进程内的图编辑会立即更新版本。
+    """
+    
+    def __init__(self, max_size: int = KG_CACHE_SIZE, ttl_seconds: int = KG_CACHE_TTL,
+                 version_check_interval: float = KG_CACHE_VERSION_CHECK_INTERVAL):
+        """
+        初始化响应缓存
+        
+        Args:
+            max_size: 最大缓存条目数
+            ttl_seconds: 条目最长缓存时间(秒)
+            version_check_interval: 两次读取图版本的最小间隔(秒)
+        """
+        self.entries: "OrderedDict[Tuple[int, str], Tuple[float, Any]]" = OrderedDict()
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self.version_check_interval = version_check_interval
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def graph_version(self) -> int:
+        """
+        获取当前图版本
+        
+        Returns:
+            int: 图版本，读取失败时沿用上一次的值
+        """
+        now = time.time()
+        if self._version is not None and now - self._checked_at < self.version_check_interval:
+            return self._version
+        try:
+            from graphrag_agent.config.neo4jdb import get_db_manager
+            from graphrag_agent.graph.core.graph_snapshot import get_graph_version
+            version, _ = get_graph_version(get_db_manager().graph)
+            self._version = version
+        except Exception as e:
+            print(f"读取图版本失败: {e}")
+            if self._version is None:
+                self._version = 0
+        self._checked_at = now
+        return self._version
+    
+    def mark_changed(self, entity_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        记录一次图编辑：递增图版本（同时通知图快照），本进程的缓存立即失效
+        
+        Args:
+            entity_ids: 受影响的实体ID，为None表示全量变更
+        """
+        version = 0
+        try:
+            from graphrag_agent.config.neo4jdb import get_db_manager
+            from graphrag_agent.graph.core.graph_snapshot import mark_graph_changed
+            version = mark_graph_changed(get_db_manager().graph, entity_ids)
+        except Exception as e:
+            print(f"记录图变更失败: {e}")
+        
+        with self._lock:
+            if version:
+                self._version = version
+                self._checked_at = time.time()
+            else:
+                # 版本记录失败时直接清空，避免返回编辑前的结果
+                self.entries.clear()
+    
+    def etag(self, key: str) -> str:
+        """
+        计算当前图版本下的ETag
+        
+        Args:
+            key: 响应键（端点和参数）
+            
+        Returns:
+            str: 带引号的ETag
+        """
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return f'"{self.graph_version()}-{digest}"'
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中时计算并写入
+        
+        包含error字段的结果不缓存。
+        
+        Args:
+            key: 响应键
+            compute: 计算函数
+            
+        Returns:
+            Any: 响应内容（副本，调用方可以修改）
+        """
+        full_key = (self.graph_version(), key)
+        with self._lock:
+            entry = self.entries.get(full_key)
+            if entry is not None and time.time() - entry[0] <= self.ttl_seconds:
+                self.entries.move_to_end(full_key)
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+        
+        self.stats["misses"] += 1
+        value = compute()
+        if isinstance(value, dict) and value.get("error"):
+            return value
+        
+        with self._lock:
+            self.entries[full_key] = (time.time(), copy.deepcopy(value))
+            self.entries.move_to_end(full_key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return value
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self.entries.clear()
+
+
+def graph_cached(name: str):
+    """
+    用图版本感知的响应缓存包装知识图谱查询函数
+    
+    Args:
+        name: 缓存键前缀
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = f"{name}:" + json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+            return graph_response_cache.get_or_compute(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
 # 创建全局实例
-cache_manager = CacheManager()
\ No newline at end of file
+cache_manager = CacheManager()
+graph_response_cache = GraphResponseCache()
\ No newline at end of file
@@ -1,6 +1,13 @@
+import asyncio
+import functools
 import threading
 import time
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from server_config.settings import CHAT_WORKER_THREADS, CHAT_QUEUE_TIMEOUT
 
 
 class ConcurrentManager:
@@ -94,6 +101,136 @@ class ConcurrentManager:
                 del self.timestamps[key]
 
 
+class QueueTimeoutError(Exception):
+    """请求排队超过期限"""
+
+
+class _Lease:
+    """一次执行资格，记录期间提交到线程池的调用"""
+    
+    def __init__(self):
+        self.futures: List[asyncio.Future] = []
+
+
+# 当前请求持有的执行资格，run()据此登记线程池中的调用
+_current_lease: ContextVar[Optional[_Lease]] = ContextVar("chat_lease", default=None)
+
+
+class ChatExecutor:
+    """
+    聊天请求执行层
+
+    同步的Agent调用在有界线程池中执行，不阻塞事件循环。每个Agent实例同一时刻只服务一个请求，
+    同时运行的请求数不超过线程数；其余请求在事件循环中异步排队，超过排队期限才失败。
+    请求被取消（如客户端断开）时，线程中的调用无法中断，Agent实例和运行名额要等它结束后才归还。
+    """
+    
+    def __init__(self, max_workers: int = CHAT_WORKER_THREADS, queue_timeout: float = CHAT_QUEUE_TIMEOUT):
+        """
+        初始化执行层
+        
+        Args:
+            max_workers: 线程池大小，也是同时运行的请求上限
+            queue_timeout: 排队等待的最长时间(秒)
+        """
+        self.max_workers = max(1, max_workers)
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chat-worker")
+        self._permits: Optional[asyncio.Semaphore] = None
+        self._slot_locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"queued": 0, "running": 0, "completed": 0, "timeouts": 0}
+    
+    def _get_permits(self) -> asyncio.Semaphore:
+        if self._permits is None:
+            self._permits = asyncio.Semaphore(self.max_workers)
+        return self._permits
+    
+    @asynccontextmanager
+    async def acquire(self, slot_key: str):
+        """
+        排队获取执行资格：先等待Agent实例空闲，再等待运行名额
+        
+        Args:
+            slot_key: Agent实例键，同一实例上的请求按到达顺序执行
+            
+        Raises:
+            QueueTimeoutError: 超过排队期限仍未轮到
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        slot_lock = self._slot_locks.setdefault(slot_key, asyncio.Lock())
+        permits = self._get_permits()
+        
+        self.stats["queued"] += 1
+        try:
+            try:
+                await asyncio.wait_for(slot_lock.acquire(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise QueueTimeoutError(f"排队超过 {self.queue_timeout} 秒")
+            try:
+                await asyncio.wait_for(permits.acquire(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                slot_lock.release()
+                self.stats["timeouts"] += 1
+                raise QueueTimeoutError(f"排队超过 {self.queue_timeout} 秒")
+        finally:
+            self.stats["queued"] -= 1
+        
+        lease = _Lease()
+        token = _current_lease.set(lease)
+        self.stats["running"] += 1
+        try:
+            yield
+        finally:
+            try:
+                _current_lease.reset(token)
+            except ValueError:
+                # 流式生成器可能在其他上下文中被关闭
+                pass
+            self._release_after(lease.futures, permits, slot_lock)
+    
+    def _release_after(self, futures: List[asyncio.Future], permits: asyncio.Semaphore,
+                       slot_lock: asyncio.Lock) -> None:
+        """线程池中的调用全部结束后归还运行名额和Agent实例"""
+        def release(_=None):
+            self.stats["running"] -= 1
+            self.stats["completed"] += 1
+            permits.release()
+            slot_lock.release()
+        
+        pending = [future for future in futures if not future.done()]
+        if not pending:
+            release()
+            return
+        # 请求已被取消而线程仍在运行Agent调用，此时放行下一个请求会与它并发使用同一个Agent
+        asyncio.gather(*pending, return_exceptions=True).add_done_callback(release)
+    
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行同步函数
+        
+        Args:
+            func: 同步函数
+            
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+        lease = _current_lease.get()
+        if lease is None:
+            return await future
+        lease.futures.append(future)
+        # 请求被取消时不取消future本身，它在线程结束时才完成，执行资格随之归还
+        return await asyncio.shield(future)
+    
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
 # 创建全局实例
 chat_manager = ConcurrentManager()
-feedback_manager = ConcurrentManager()
\ No newline at end of file
+feedback_manager = ConcurrentManager()
+chat_executor = ChatExecutor()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import re
+import unittest
+import sys
+from types import SimpleNamespace
+sys.path.append('.')
+
+from graphrag_agent.graph.extraction.bulk_writer import BulkGraphWriter, PLACEHOLDER_TYPE
+
+
+class FakeGraph:
+    """只模拟实体写入的内存图，实体为 id -> {"labels": set, "properties": dict}"""
+
+    def __init__(self, entities=None):
+        self.entities = entities or {}
+        self.queries = []
+
+    def query(self, query, params=None):
+        self.queries.append(query)
+        if "MERGE (e:`__Entity__`" not in query:
+            return []
+        on_create = "ON CREATE SET" in query
+        label = re.search(r", e:`([^`]+)`", query)
+        for row in params["rows"]:
+            created = row["id"] not in self.entities
+            entity = self.entities.setdefault(row["id"], {"labels": set(), "properties": {}})
+            if created or not on_create:
+                entity["properties"].update(row["properties"])
+                if label:
+                    entity["labels"].add(label.group(1))
+        return []
+
+
+def make_document(chunk_id, nodes, relationships=()):
+    """nodes为 (id, 类型, 属性)，relationships为 (源id, 目标id, 类型)"""
+    node_map = {
+        node_id: SimpleNamespace(id=node_id, type=node_type, properties=properties)
+        for node_id, node_type, properties in nodes
+    }
+    return SimpleNamespace(
+        source=SimpleNamespace(metadata={"chunk_id": chunk_id}),
+        nodes=list(node_map.values()),
+        relationships=[
+            SimpleNamespace(source=node_map[s], target=node_map[t], type=rel_type, properties={})
+            for s, t, rel_type in relationships
+        ],
+    )
+
+
+PLACEHOLDER_PROPERTIES = {"description": "No additional data"}
+
+
+class TestBulkGraphWriter(unittest.TestCase):
+    """批量写入器占位节点测试"""
+
+    def test_placeholder_does_not_overwrite_existing_entity(self):
+        """测试占位节点只在实体不存在时写入，不覆盖已有实体的属性和标签"""
+        graph = FakeGraph({"Neo4j": {"labels": {"数据库"}, "properties": {"description": "图数据库"}}})
+        writer = BulkGraphWriter(graph, parallel_sessions=1)
+        writer.write_graph_documents([make_document("c1", [
+            ("Cypher", "语言", {"description": "查询语言"}),
+            ("Neo4j", PLACEHOLDER_TYPE, PLACEHOLDER_PROPERTIES),
+            ("APOC", PLACEHOLDER_TYPE, PLACEHOLDER_PROPERTIES),
+        ], [("Cypher", "Neo4j", "used by"), ("APOC", "Neo4j", "extends")])])
+
+        self.assertEqual(graph.entities["Neo4j"], {"labels": {"数据库"}, "properties": {"description": "图数据库"}})
+        # 不存在的端点仍按占位节点创建
+        self.assertEqual(graph.entities["APOC"], {"labels": {PLACEHOLDER_TYPE}, "properties": PLACEHOLDER_PROPERTIES})
+        self.assertEqual(graph.entities["Cypher"]["properties"], {"description": "查询语言"})
+
+    def test_real_entity_in_batch_replaces_placeholder(self):
+        """测试同一批次中已有真实类型的实体不再写占位行"""
+        graph = FakeGraph()
+        writer = BulkGraphWriter(graph, parallel_sessions=2)
+        result = writer.write_graph_documents([
+            make_document("c1", [
+                ("Python", "语言", {"description": "编程语言"}),
+                ("Django", PLACEHOLDER_TYPE, PLACEHOLDER_PROPERTIES),
+            ], [("Django", "Python", "written in")]),
+            make_document("c2", [
+                ("Django", "框架", {"description": "Web框架"}),
+            ]),
+        ])
+
+        self.assertEqual(result["nodes"], 2)
+        self.assertEqual(graph.entities["Django"], {"labels": {"框架"}, "properties": {"description": "Web框架"}})
+        self.assertFalse(any(f"`{PLACEHOLDER_TYPE}`" in query for query in graph.queries))
+
+
+if __name__ == '__main__':
+    unittest.main()
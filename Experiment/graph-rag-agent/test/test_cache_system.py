@@ -6,7 +6,7 @@ import os
 import sys
 sys.path.append('.')
 
-from graphrag_agent.cache_manager import CacheManager, ContextAwareCacheKeyStrategy, SimpleCacheKeyStrategy
+from graphrag_agent.cache_manager import CacheManager, ContextAwareCacheKeyStrategy, ContextAndKeywordAwareCacheKeyStrategy, SimpleCacheKeyStrategy, SegmentCacheBackend, DiskCacheBackend, SharedCacheBackend
 
 
 class TestCacheSystem(unittest.TestCase):
@@ -190,6 +190,310 @@ class TestCacheSystem(unittest.TestCase):
         finally:
             context_manager.clear()
     
+    def test_vector_index_eviction(self):
+        """测试向量索引容量上限与淘汰"""
+        eviction_manager = CacheManager(
+            cache_dir=self.temp_dir + "_eviction",
+            memory_only=True,
+            enable_vector_similarity=True,
+            max_vectors=10
+        )
+        
+        try:
+            eviction_manager.set("常用问题", "常用答案")
+            for i in range(30):
+                # 持续访问的缓存项不应被LRU淘汰
+                eviction_manager.get("常用问题")
+                eviction_manager.set(f"问题{i}", f"答案{i}")
+            
+            matcher = eviction_manager.vector_matcher
+            self.assertLessEqual(len(matcher.key_to_index), 10)
+            self.assertLessEqual(matcher.index.ntotal, 10)
+            self.assertIn(eviction_manager._get_consistent_key("常用问题"), matcher.key_to_index)
+            
+            # 删除后压缩应物理移除向量
+            live_count = len(matcher.key_to_index)
+            eviction_manager.delete("常用问题")
+            matcher.compact()
+            self.assertEqual(matcher.index.ntotal, live_count - 1)
+        
+        finally:
+            eviction_manager.clear()
+    
+    def test_query_embedding_reuse(self):
+        """测试查询向量复用与批量编码"""
+        matcher = self.cache_manager.vector_matcher
+        provider = matcher.embedding_provider
+        original_encode = provider.encode
+        calls = []
+        
+        def counting_encode(texts):
+            calls.append(texts)
+            return original_encode(texts)
+        
+        provider.encode = counting_encode
+        try:
+            self.cache_manager.set("已有问题", "已有答案")
+            calls.clear()
+            
+            # 未命中后写入同一查询，只编码一次
+            self.assertIsNone(self.cache_manager.get("全新的问题"))
+            self.cache_manager.set("全新的问题", "全新的答案")
+            self.assertEqual(len(calls), 1)
+            
+            # 批量预热只调用一次嵌入模型
+            self.cache_manager.warm_up([("预热1", "答案1"), ("预热2", "答案2"), ("预热3", "答案3")])
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(self.cache_manager.get("预热2"), "答案2")
+        finally:
+            del provider.encode
+    
+    def test_segment_backend_persistence(self):
+        """测试段文件缓存后端的重启恢复与压缩"""
+        segment_dir = os.path.join(self.temp_dir, "segment")
+        backend = SegmentCacheBackend(cache_dir=segment_dir, segment_max_bytes=512, compaction_interval=0)
+        
+        for i in range(50):
+            backend.set(f"key_{i % 10}", {"content": f"答案{i}"})
+        backend.delete("key_0")
+        backend.flush()
+        
+        # 压缩后有效数据保持不变
+        backend.compact()
+        self.assertEqual(backend.get("key_9"), {"content": "答案49"})
+        
+        # 检查点之后的写入在重启时通过重放恢复
+        backend.set("key_tail", {"content": "尾部写入"})
+        backend.close()
+        
+        reopened = SegmentCacheBackend(cache_dir=segment_dir, compaction_interval=0)
+        self.assertIsNone(reopened.get("key_0"))
+        self.assertEqual(reopened.get("key_5"), {"content": "答案45"})
+        self.assertEqual(reopened.get("key_tail"), {"content": "尾部写入"})
+        reopened.close()
+    
+    def test_segment_backend_drops_stale_tombstones(self):
+        """测试更早的段不再有对应写入记录时，压缩会丢弃删除标记"""
+        from graphrag_agent.cache_manager.backends.segment import _OP_PUT, _OP_DELETE
+        segment_dir = os.path.join(self.temp_dir, "segment_tombstones")
+        backend = SegmentCacheBackend(cache_dir=segment_dir, segment_max_bytes=256, compaction_interval=0)
+        
+        def records(op):
+            return [
+                (segment_id, key)
+                for segment_id in backend.segment_ids
+                for _, _, record_op, key, _ in backend._iter_records(segment_id)
+                if record_op == op
+            ]
+        
+        # 第一个段几乎全部有效，不会被压缩
+        for i in range(5):
+            backend.set(f"pinned_{i}", {"content": f"常驻{i}"})
+        for i in range(5):
+            backend.set(f"deleted_{i}", {"content": f"删除{i}"})
+        deleted_keys = ["pinned_0"] + [f"deleted_{i}" for i in range(5)]
+        for key in deleted_keys:
+            backend.delete(key)
+        first_segment = backend.segment_ids[0]
+        first_keys = {key for _, _, _, key, _ in backend._iter_records(first_segment)}
+        
+        for round_id in range(10):
+            for i in range(5):
+                backend.set(f"key_{i}", {"content": f"答案{round_id}"})
+            backend.compact()
+        
+        # 只有写入记录仍留在第一个段的键保留删除标记，且不会重复堆积
+        self.assertEqual(backend.segment_ids[0], first_segment)
+        self.assertEqual(sorted(key for _, key in records(_OP_DELETE)),
+                         sorted(first_keys.intersection(deleted_keys)))
+        self.assertFalse(any(key.startswith("deleted_") and segment_id != first_segment
+                             for segment_id, key in records(_OP_PUT)))
+        backend.close()
+        
+        # 没有索引时全量重放，已删除的键不会复活
+        os.remove(os.path.join(segment_dir, "segments", "index.bin"))
+        reopened = SegmentCacheBackend(cache_dir=segment_dir, compaction_interval=0)
+        for key in deleted_keys:
+            self.assertIsNone(reopened.get(key))
+        self.assertEqual(reopened.get("pinned_4"), {"content": "常驻4"})
+        self.assertEqual(reopened.get("key_4"), {"content": "答案9"})
+        reopened.close()
+    
+    def test_disk_backend_heap_eviction(self):
+        """测试磁盘缓存后端按优先级堆淘汰"""
+        disk_dir = os.path.join(self.temp_dir, "disk")
+        backend = DiskCacheBackend(cache_dir=disk_dir, max_size=10, batch_size=1)
+        
+        for i in range(10):
+            backend.set(f"key_{i}", {"content": f"答案{i}"})
+        # 频繁访问的项优先级更高
+        for _ in range(5):
+            backend.get("key_0")
+            backend.get("key_1")
+        
+        for i in range(10, 40):
+            backend.set(f"key_{i}", {"content": f"答案{i}"})
+            self.assertLessEqual(len(backend.metadata), 10)
+        
+        self.assertEqual(backend.get("key_0"), {"content": "答案0"})
+        self.assertEqual(backend.get("key_1"), {"content": "答案1"})
+        self.assertIsNone(backend.get("key_2"))
+        # 过期条目不会让堆无限增长
+        self.assertLessEqual(len(backend._heap), 2 * len(backend._priorities) + 64)
+        
+        # 重启后保留优先级，热点项仍不会先被淘汰
+        backend.flush()
+        reopened = DiskCacheBackend(cache_dir=disk_dir, max_size=10, batch_size=1)
+        self.assertEqual(set(reopened.metadata), set(backend.metadata))
+        reopened.set("key_new", {"content": "新答案"})
+        self.assertEqual(reopened.get("key_0"), {"content": "答案0"})
+    
+    def test_shared_backend_across_instances(self):
+        """测试共享缓存后端在多个实例间共享数据并限制容量"""
+        shared_dir = os.path.join(self.temp_dir, "shared")
+        # 两个实例模拟两个worker进程
+        first = SharedCacheBackend(cache_dir=shared_dir, max_size=20, num_shards=2)
+        second = SharedCacheBackend(cache_dir=shared_dir, max_size=20, num_shards=2)
+        other = SharedCacheBackend(cache_dir=shared_dir, namespace="other", max_size=20, num_shards=2)
+        try:
+            first.set("问题", {"content": "答案", "metadata": {"user_verified": False}})
+            self.assertEqual(second.get("问题")["content"], "答案")
+            self.assertIsNone(other.get("问题"))
+            
+            # 质量标记等更新对其他实例可见
+            second.set("问题", {"content": "答案", "metadata": {"user_verified": True}})
+            self.assertTrue(first.get("问题")["metadata"]["user_verified"])
+            
+            # 访问统计写回后参与LRU淘汰
+            first.flush()
+            second.flush()
+            shard = first._shard_of("问题")
+            count = first._connect(shard).execute(
+                "SELECT access_count FROM cache WHERE ns = ? AND key = ?", ("default", "问题")
+            ).fetchone()[0]
+            self.assertEqual(count, 2)
+            
+            for i in range(100):
+                first.set(f"key_{i}", {"content": i})
+            total = sum(
+                first._connect(s).execute("SELECT COUNT(*) FROM cache WHERE ns = ?", ("default",)).fetchone()[0]
+                for s in range(first.num_shards)
+            )
+            self.assertLessEqual(total, 20)
+            self.assertEqual(second.get("key_99"), {"content": 99})
+            
+            self.assertTrue(second.delete("key_99"))
+            self.assertIsNone(first.get("key_99"))
+        finally:
+            for backend in (first, second, other):
+                backend.close()
+    
+    def test_get_or_compute_coalescing(self):
+        """测试并发未命中只执行一次计算"""
+        import threading
+        
+        calls = []
+        gate = threading.Event()
+        
+        def compute():
+            calls.append(1)
+            gate.wait(1)
+            return "热门问题的答案"
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache_manager.get_or_compute("热门问题", compute)
+            ))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        gate.set()
+        for t in threads:
+            t.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["热门问题的答案"] * 5)
+        self.assertEqual(self.cache_manager.get("热门问题"), "热门问题的答案")
+    
+    def test_get_or_compute_rechecks_after_leading(self):
+        """测试未命中后、登记计算前已被写入的结果不会重复计算"""
+        manager = CacheManager(key_strategy=SimpleCacheKeyStrategy(), memory_only=True,
+                               enable_vector_similarity=False)
+        manager.set("热门问题", "上一次计算的答案")
+        # 模拟读取缓存时上一个计算者尚未写入
+        manager.get = lambda query, **kwargs: None
+        
+        calls = []
+        result = manager.get_or_compute("热门问题", lambda: calls.append(1) or "重新计算的答案")
+        self.assertEqual(result, "上一次计算的答案")
+        self.assertEqual(calls, [])
+    
+    def test_get_or_compute_follower_timeout(self):
+        """测试计算者卡住时，等待者超时后自行计算"""
+        import threading
+        
+        manager = CacheManager(key_strategy=SimpleCacheKeyStrategy(), memory_only=True,
+                               enable_vector_similarity=False)
+        manager.coalesce_timeout = 0.2
+        gate = threading.Event()
+        leader = threading.Thread(target=lambda: manager.get_or_compute("热门问题", lambda: gate.wait(5) and "计算者的答案"))
+        leader.start()
+        time.sleep(0.05)
+        
+        start = time.time()
+        result = manager.get_or_compute("热门问题", lambda: "等待者的答案")
+        self.assertEqual(result, "等待者的答案")
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(manager.performance_metrics['coalesce_timeouts'], 1)
+        
+        gate.set()
+        leader.join()
+    
+    def test_fast_cache_two_level_keys(self):
+        """测试快速缓存先查主键，命中时不提取关键词"""
+        manager = CacheManager(
+            key_strategy=ContextAndKeywordAwareCacheKeyStrategy(context_window=0),
+            memory_only=True,
+            enable_vector_similarity=False
+        )
+        keywords = {"low_level_keywords": ["Python"], "high_level_keywords": ["编程语言"]}
+        calls = []
+        
+        def keyword_provider():
+            calls.append(1)
+            return {"low_level": ["Python"], "high_level": ["编程语言"]}
+        
+        # 带关键词写入时，主键和关键词键各存一份
+        manager.set("什么是Python?", "Python是一种编程语言", **keywords)
+        keys = manager._candidate_keys("什么是Python?", **keywords)
+        self.assertEqual(len(keys), 2)
+        
+        # 不带关键词也能标记质量，两份缓存项同步更新
+        self.assertTrue(manager.mark_quality("什么是Python?", True))
+        for key in keys:
+            self.assertTrue(manager.storage.get(key)["metadata"]["user_verified"])
+        
+        # 主键命中（查询中的多余空白被规范化），不调用关键词提取
+        result = manager.get_fast("  什么是Python?  ", keyword_provider=keyword_provider)
+        self.assertEqual(result, "Python是一种编程语言")
+        self.assertEqual(calls, [])
+        
+        # 只存在关键词键时，主键未命中后才提取关键词
+        keyword_key = manager._get_consistent_key("什么是Java?", **keywords)
+        manager.storage.set(keyword_key, {"content": "Java答案", "metadata": {"user_verified": True}})
+        self.assertEqual(manager.get_fast("什么是Java?", keyword_provider=keyword_provider), "Java答案")
+        self.assertEqual(len(calls), 1)
+        
+        # 删除时一并删除两份缓存项
+        manager.set("临时问题", "临时答案", **keywords)
+        keys = manager._candidate_keys("临时问题", **keywords)
+        self.assertTrue(manager.delete("临时问题"))
+        for key in keys:
+            self.assertIsNone(manager.storage.get(key))
+    
     def test_cache_persistence(self):
         """测试缓存持久化"""
         # 设置缓存
@@ -0,0 +1,116 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+sys.path.append('.')
+
+from graphrag_agent.models.embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+class FakeEmbeddings:
+    """记录调用次数的假嵌入模型"""
+
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.document_calls = []
+        self.query_calls = []
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [[float(len(text)) + self.offset, 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text)) + self.offset, 0.0]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """嵌入向量缓存测试"""
+
+    def setUp(self):
+        """测试前设置"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = EmbeddingStore(os.path.join(self.temp_dir, "embeddings.db"))
+
+    def tearDown(self):
+        """测试后清理"""
+        self.store.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_documents_embedded_once(self):
+        """测试相同文本只请求一次嵌入API"""
+        fake = FakeEmbeddings()
+        embeddings = CachedEmbeddings(fake, self.store, model_name="m")
+
+        first = embeddings.embed_documents(["苹果", "香蕉", "苹果"])
+        second = embeddings.embed_documents(["香蕉", "西瓜"])
+
+        self.assertEqual(fake.document_calls, [["苹果", "香蕉"], ["西瓜"]])
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second[0], first[1])
+
+        # 新实例共用同一存储时直接命中
+        fresh = FakeEmbeddings()
+        reopened = CachedEmbeddings(fresh, self.store, model_name="m")
+        self.assertEqual(reopened.embed_documents(["苹果"]), [first[0]])
+        self.assertEqual(fresh.document_calls, [])
+
+    def test_same_model_name_on_different_endpoints(self):
+        """测试不同服务地址下的同名模型互不共用向量"""
+        local = FakeEmbeddings(offset=0.0)
+        remote = FakeEmbeddings(offset=100.0)
+        local_cached = CachedEmbeddings(local, self.store, model_name="m", base_url="http://local/v1")
+        remote_cached = CachedEmbeddings(remote, self.store, model_name="m", base_url="http://remote/v1")
+
+        local_vector = local_cached.embed_documents(["文本"])[0]
+        remote_vector = remote_cached.embed_documents(["文本"])[0]
+
+        self.assertNotEqual(local_vector, remote_vector)
+        self.assertEqual(len(remote.document_calls), 1)
+
+    def test_query_vectors_bounded_and_not_persisted(self):
+        """测试查询向量只在进程内按容量保留"""
+        fake = FakeEmbeddings()
+        embeddings = CachedEmbeddings(fake, self.store, model_name="m", query_memo_size=2)
+
+        embeddings.embed_query("问题一")
+        embeddings.embed_query("问题一")
+        self.assertEqual(fake.query_calls, ["问题一"])
+
+        embeddings.embed_query("问题二")
+        embeddings.embed_query("问题三")
+        embeddings.embed_query("问题一")
+        self.assertEqual(fake.query_calls, ["问题一", "问题二", "问题三", "问题一"])
+        self.assertLessEqual(len(embeddings._query_memo), 2)
+
+        # 存储中没有查询向量
+        count = self.store._connect().execute(
+            "SELECT COUNT(*) FROM embeddings WHERE kind = 'query'"
+        ).fetchone()[0]
+        self.assertEqual(count, 0)
+
+        stats = embeddings.cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 4)
+
+    def test_embed_queries_matches_embed_query(self):
+        """测试批量查询向量与逐条embed_query一致"""
+        fake = FakeEmbeddings()
+        embeddings = CachedEmbeddings(fake, self.store, model_name="m")
+        vectors = embeddings.embed_queries(["问题一", "问题二", "问题一"])
+        self.assertEqual(vectors, [fake.embed_query("问题一"), fake.embed_query("问题二"), fake.embed_query("问题一")])
+        self.assertEqual(fake.document_calls, [])
+
+        # 查询与文档编码相同的模型合并为一次批量请求
+        symmetric = FakeEmbeddings()
+        embeddings = CachedEmbeddings(symmetric, self.store, model_name="m", symmetric_queries=True)
+        embeddings.embed_queries(["问题一", "问题二"])
+        embeddings.embed_queries(["问题二", "问题三"])
+        self.assertEqual(symmetric.document_calls, [["问题一", "问题二"], ["问题三"]])
+        self.assertEqual(symmetric.query_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import random
+import sys
+sys.path.append('.')
+
+from graphrag_agent.graph.core.entity_name_index import EntityNameIndex, EntityNameIndexManager
+
+FULL_QUERY_MARK = "WHERE e.id IS NOT NULL"
+
+
+class FakeGraph:
+    """按查询文本分派的内存图，实体为 id -> canonical_id"""
+
+    def __init__(self, entities, version=1, full_version=1, changes=None):
+        self.entities = dict(entities)
+        self.version = version
+        self.full_version = full_version
+        self.changes = changes or {}
+        self.queries = []
+
+    def query(self, query, params=None):
+        params = params or {}
+        self.queries.append(query)
+        if "__GraphMeta__" in query:
+            return [{"version": self.version, "full_version": self.full_version}]
+        if "__GraphChange__" in query:
+            return [
+                {"entity_ids": ids} for version, ids in self.changes.items()
+                if params["since"] < version <= params["version"]
+            ]
+        if "UNWIND $ids" in query:
+            ids = [e for e in params["ids"] if e in self.entities]
+        else:
+            ids = sorted(self.entities)
+        return [{"id": e, "canonical_id": self.entities[e]} for e in ids]
+
+
+def is_ascii_word(char):
+    return char.isascii() and char.isalnum()
+
+
+def naive_find(names, text):
+    """逐个位置、逐个名称比较，返回全部(start, end, name)"""
+    text = text.lower()
+    spans = []
+    for name in {name.lower() for name in names if name}:
+        start = text.find(name)
+        while start != -1:
+            end = start + len(name)
+            inside_word = (
+                (start > 0 and is_ascii_word(text[start]) and is_ascii_word(text[start - 1]))
+                or (end < len(text) and is_ascii_word(text[end - 1]) and is_ascii_word(text[end]))
+            )
+            if not inside_word:
+                spans.append((start, end, name))
+            start = text.find(name, start + 1)
+    return sorted(spans, key=lambda span: (span[0], span[0] - span[1]))
+
+
+class TestEntityNameIndex(unittest.TestCase):
+    """实体名称自动机测试"""
+
+    def test_overlapping_and_leftmost_longest(self):
+        """测试默认只保留最左最长的命中，overlapping=True返回全部命中"""
+        index = EntityNameIndex({
+            "New York": ["New York"],
+            "York": ["York"],
+            "New York Times": ["New York Times"],
+            "Times": ["Times"],
+            "Times Square": ["Times Square"],
+        })
+        text = "The New York Times Square office"
+
+        matches = index.find(text)
+        self.assertEqual([(m.start, m.end, m.name) for m in matches],
+                         [(4, 18, "new york times")])
+        self.assertEqual(matches[0].entity_ids, ("New York Times",))
+
+        spans = [(m.start, m.end, m.name) for m in index.find(text, overlapping=True)]
+        self.assertEqual(spans, [
+            (4, 18, "new york times"),
+            (4, 12, "new york"),
+            (8, 12, "york"),
+            (13, 25, "times square"),
+            (13, 18, "times"),
+        ])
+
+    def test_ascii_word_boundaries(self):
+        """测试ASCII名称不在单词内部命中，中文名称不受边界限制"""
+        index = EntityNameIndex({
+            "AI": ["AI"],
+            "Java": ["Java"],
+            "Neo4j": ["Neo4j"],
+            "图谱": ["图谱"],
+        })
+        text = "Said: Java-based AI uses neo4jx, 用Neo4j存储知识图谱"
+        self.assertEqual([m.name for m in index.find(text)], ["java", "ai", "neo4j", "图谱"])
+        self.assertEqual(index.find("JavaScript and OpenAI"), [])
+        self.assertEqual(index.entity_ids("用Neo4j存储知识图谱"), ["Neo4j", "图谱"])
+
+    def test_find_matches_naive_scan(self):
+        """测试随机名称与文本下，自动机结果与逐个位置比较一致"""
+        rng = random.Random(24)
+        alphabet = "abAB 图谱-"
+        for _ in range(50):
+            names = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(15)]
+            index = EntityNameIndex({name: [name] for name in names})
+            for _ in range(10):
+                text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+                expected = naive_find(names, text)
+                actual = [(m.start, m.end, m.name) for m in index.find(text, overlapping=True)]
+                self.assertEqual(actual, expected, (names, text))
+
+                # 非重叠结果：依次取起点最靠左、其次最长且不与前一个命中重叠的
+                covered, leftmost = 0, []
+                for start, end, name in expected:
+                    if start >= covered:
+                        leftmost.append((start, end, name))
+                        covered = end
+                self.assertEqual([(m.start, m.end, m.name) for m in index.find(text)], leftmost)
+
+
+class TestEntityNameIndexManager(unittest.TestCase):
+    """名称索引加载与刷新测试"""
+
+    def test_canonical_targets(self):
+        """测试消歧后的别名同时指向自身和规范实体，过短的名称不参与识别"""
+        graph = FakeGraph({"OpenAI": None, "Open AI": "OpenAI", "X": None, "openai": "OpenAI"})
+        manager = EntityNameIndexManager(graph=graph, min_name_length=2)
+        index = manager.load()
+
+        self.assertEqual(index.lookup("open ai"), ("Open AI", "OpenAI"))
+        self.assertEqual(index.lookup("OPENAI"), ("OpenAI", "openai"))
+        self.assertEqual(index.lookup("x"), ())
+        self.assertEqual(index.entity_ids("Open AI 和 OpenAI"), ["Open AI", "OpenAI", "openai"])
+
+    def test_refresh_delta_and_full(self):
+        """测试增量变更只读取受影响实体，全量变更重新读取全部实体"""
+        graph = FakeGraph({"Neo4j": None, "Python": None, "Java": None})
+        manager = EntityNameIndexManager(graph=graph)
+        self.assertEqual(len(manager.load()), 3)
+
+        # Java 被删除，新增 Py 并消歧到 Python
+        del graph.entities["Java"]
+        graph.entities["Py"] = "Python"
+        graph.version = 2
+        graph.changes = {2: ["Java", "Py"]}
+        graph.queries.clear()
+        index = manager.load()
+        self.assertEqual(index.version, 2)
+        self.assertEqual(index.lookup("java"), ())
+        self.assertEqual(index.lookup("py"), ("Py", "Python"))
+        self.assertEqual(index.lookup("neo4j"), ("Neo4j",))
+        self.assertFalse(any(FULL_QUERY_MARK in query for query in graph.queries))
+
+        # 版本未变时不重新读取
+        graph.queries.clear()
+        self.assertIs(manager.load(), index)
+        self.assertFalse(any("RETURN e.id AS id" in query for query in graph.queries))
+
+        # 全量变更
+        graph.entities = {"Rust": None}
+        graph.version = graph.full_version = 3
+        graph.queries.clear()
+        index = manager.load()
+        self.assertEqual(index.version, 3)
+        self.assertEqual(list(index.targets), ["rust"])
+        self.assertTrue(any(FULL_QUERY_MARK in query for query in graph.queries))
+
+        # 变更记录不完整时回退到全量读取
+        graph.entities["Go"] = None
+        graph.version = 5
+        graph.changes = {5: ["Go"]}
+        graph.queries.clear()
+        self.assertEqual(manager.load().lookup("go"), ("Go",))
+        self.assertTrue(any(FULL_QUERY_MARK in query for query in graph.queries))
+
+
+if __name__ == '__main__':
+    unittest.main()
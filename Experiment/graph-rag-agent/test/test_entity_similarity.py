@@ -0,0 +1,123 @@
+import unittest
+import random
+import sys
+from unittest import mock
+sys.path.append('.')
+
+from graphrag_agent.graph.processing import similar_entity
+from graphrag_agent.graph.processing.similar_entity import bounded_edit_distance, find_edit_distance_groups
+from graphrag_agent.graph.processing.entity_disambiguation import _NgramIndex
+
+
+ALPHABET = "abcAB中文实体"
+
+
+def levenshtein(a: str, b: str) -> int:
+    """朴素的Levenshtein编辑距离"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def random_strings(rng: random.Random, count: int, max_length: int = 7):
+    return [
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+        for _ in range(count)
+    ]
+
+
+class TestEditDistanceGroups(unittest.TestCase):
+    """编辑距离与重复实体分组测试"""
+
+    def test_bounded_edit_distance(self):
+        """测试有上限的编辑距离与朴素实现一致"""
+        rng = random.Random(21)
+        pairs = list(zip(random_strings(rng, 400), random_strings(rng, 400)))
+
+        def check():
+            for a, b in pairs:
+                distance = levenshtein(a, b)
+                for max_distance in range(4):
+                    expected = distance if distance <= max_distance else max_distance + 1
+                    self.assertEqual(bounded_edit_distance(a, b, max_distance), expected, (a, b, max_distance))
+
+        check()
+        # 未安装rapidfuzz时走纯Python实现
+        with mock.patch.object(similar_entity, "_Levenshtein", None):
+            check()
+
+    def test_find_edit_distance_groups(self):
+        """测试分块后的分组结果与两两比较的结果一致"""
+        rng = random.Random(7)
+        for _ in range(20):
+            entity_ids = [s for s in random_strings(rng, 60, max_length=5) if s]
+            for max_distance in (1, 2):
+                unique = list(dict.fromkeys(entity_ids))
+                parent = {entity_id: entity_id for entity_id in unique}
+
+                def find(item):
+                    while parent[item] != item:
+                        item = parent[item]
+                    return item
+
+                for i, a in enumerate(unique):
+                    for b in unique[:i]:
+                        if levenshtein(a.lower(), b.lower()) <= max_distance:
+                            parent[find(a)] = find(b)
+                groups = {}
+                for entity_id in unique:
+                    groups.setdefault(find(entity_id), []).append(entity_id)
+                expected = sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+                self.assertEqual(find_edit_distance_groups(entity_ids, max_distance), expected)
+
+    def test_groups_ignore_case(self):
+        """测试分组忽略大小写并传递合并"""
+        groups = find_edit_distance_groups(["OpenAI", "openai", "OpenAl", "Neo4j"], 1)
+        self.assertEqual(groups, [["OpenAI", "OpenAl", "openai"]])
+
+
+class TestNgramIndex(unittest.TestCase):
+    """二元组倒排索引召回测试"""
+
+    @staticmethod
+    def brute_force(entity_ids, mention, threshold, top_k):
+        """逐个计算apoc.text.levenshteinSimilarity语义的相似度（忽略大小写）"""
+        text = mention.lower()
+        matches = []
+        for entity_id in entity_ids:
+            other = entity_id.lower()
+            similarity = 1.0 - levenshtein(text, other) / max(len(text), len(other))
+            if similarity >= threshold:
+                matches.append((entity_id, similarity))
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches[:top_k]
+
+    def test_search_matches_brute_force(self):
+        """测试召回结果与逐个比较的结果一致"""
+        rng = random.Random(22)
+        entity_ids = list(dict.fromkeys(s for s in random_strings(rng, 300, max_length=9) if s))
+        index = _NgramIndex(entity_ids)
+        mentions = [s for s in random_strings(rng, 150, max_length=9) if s] + entity_ids[:30]
+        for mention in mentions:
+            for threshold in (0.3, 0.5, 0.7, 0.9, 1.0):
+                for top_k in (3, 1000):
+                    expected = self.brute_force(entity_ids, mention, threshold, top_k)
+                    self.assertEqual(index.search(mention, threshold, top_k), expected,
+                                     (mention, threshold, top_k))
+
+    def test_case_variants_share_text(self):
+        """测试只有大小写不同的实体都会被召回"""
+        index = _NgramIndex(["Neo4j", "neo4j", "", "Neo"])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search("NEO4J", 0.9, 10), [("Neo4j", 1.0), ("neo4j", 1.0)])
+        self.assertEqual(index.search("", 0.5, 10), [])
+        self.assertEqual(_NgramIndex([]).search("Neo4j", 0.5, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import unittest
+import time
+import sys
+sys.path.append('.')
+
+from graphrag_agent.graph.core.graph_snapshot import GraphSnapshot, GraphSnapshotManager
+
+
+class FakeGraph:
+    """按查询文本分派的内存图，模拟快照加载用到的几类Cypher查询"""
+
+    def __init__(self, entities, edges, version=1, full_version=1, changes=None):
+        self.entities = set(entities)
+        self.edges = list(edges)
+        self.version = version
+        self.full_version = full_version
+        self.changes = changes or {}
+        self.queries = []
+
+    def query(self, query, params=None):
+        params = params or {}
+        self.queries.append(query)
+        if "__GraphMeta__" in query:
+            return [{"version": self.version, "full_version": self.full_version}]
+        if "__GraphChange__" in query:
+            return [
+                {"entity_ids": ids} for version, ids in self.changes.items()
+                if params["since"] < version <= params["version"]
+            ]
+        if "-[r]-" in query:
+            undirected = "-[r]->" not in query
+            # 与Neo4j一致：无向查询时两端都在ids中的关系按每个端点各返回一次
+            return [
+                {"rel_id": rel_id, "source": s, "target": t, "type": r, "weight": w}
+                for entity_id in params["ids"]
+                for rel_id, (s, t, r, w) in enumerate(self.edges)
+                if s == entity_id or (undirected and t == entity_id)
+            ]
+        if "UNWIND $ids" in query:
+            return [{"id": e} for e in params["ids"] if e in self.entities]
+        return [{"id": e} for e in sorted(self.entities)]
+
+
+class FailingGraph:
+    """所有查询都失败的图"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, query, params=None):
+        self.calls += 1
+        raise ConnectionError("数据库不可用")
+
+
+def edge_set(edges):
+    return {(e.source, e.target, e.type, e.weight) for e in edges}
+
+
+class TestGraphSnapshot(unittest.TestCase):
+    """内存图快照测试"""
+
+    def setUp(self):
+        """测试前设置：A→B→C→A 构成环，A→D 权重更大，E 为孤立实体"""
+        self.edges = [
+            ("A", "B", "R", 1.0),
+            ("B", "C", "R", 1.0),
+            ("C", "A", "R", 1.0),
+            ("A", "D", "S", 5.0),
+        ]
+        self.snapshot = GraphSnapshot.from_edges(["A", "B", "C", "D", "E"], self.edges, version=1)
+
+    def test_from_edges(self):
+        """测试快照构建与邻居访问"""
+        self.assertEqual(self.snapshot.node_count, 5)
+        self.assertEqual(self.snapshot.edge_count, 4)
+        self.assertIn("E", self.snapshot)
+        self.assertNotIn("F", self.snapshot)
+        self.assertEqual(self.snapshot.rel_types, ["R", "S"])
+
+        out = {(n, e.type) for n, e in self.snapshot.neighbors(["A"], direction="out")}
+        self.assertEqual(out, {("B", "R"), ("D", "S")})
+        incoming = [n for n, _ in self.snapshot.neighbors(["A"], direction="in")]
+        self.assertEqual(incoming, ["C"])
+        self.assertEqual(self.snapshot.neighbors(["E"]), [])
+
+        # 关系端点不在实体列表中时自动补上
+        extra = GraphSnapshot.from_edges(["A"], [("A", "X", "R", 1.0)])
+        self.assertIn("X", extra)
+
+    def test_bfs(self):
+        """测试BFS距离与方向"""
+        self.assertEqual(self.snapshot.bfs(["A"], 1, direction="out"), {"A": 0, "B": 1, "D": 1})
+        self.assertEqual(self.snapshot.bfs(["A"], 2, direction="out"), {"A": 0, "B": 1, "D": 1, "C": 2})
+        self.assertEqual(self.snapshot.bfs(["A"], 1, direction="both"), {"A": 0, "B": 1, "C": 1, "D": 1})
+        self.assertEqual(self.snapshot.bfs(["E"], 3), {"E": 0})
+        self.assertEqual(len(self.snapshot.bfs(["A"], 2, max_nodes=2)), 2)
+
+    def test_shortest_path(self):
+        """测试最短路径"""
+        path = self.snapshot.shortest_path("A", "C", 3, direction="out")
+        self.assertEqual([(e.source, e.target) for e in path], [("A", "B"), ("B", "C")])
+
+        path = self.snapshot.shortest_path("A", "C", 3, direction="both")
+        self.assertEqual([(e.source, e.target) for e in path], [("C", "A")])
+
+        self.assertIsNone(self.snapshot.shortest_path("D", "A", 3, direction="out"))
+        self.assertIsNone(self.snapshot.shortest_path("A", "C", 1, direction="out"))
+        self.assertIsNone(self.snapshot.shortest_path("A", "E", 5))
+        self.assertEqual(self.snapshot.shortest_path("A", "A", 3), [])
+
+    def test_paths_and_cycles(self):
+        """测试路径枚举，环路不重复使用同一条关系"""
+        paths = self.snapshot.paths("A", "C", 3, direction="out")
+        self.assertEqual([[(e.source, e.target) for e in p] for p in paths], [[("A", "B"), ("B", "C")]])
+
+        cycles = self.snapshot.paths("A", "A", 3, direction="out")
+        self.assertEqual([[(e.source, e.target) for e in p] for p in cycles],
+                         [[("A", "B"), ("B", "C"), ("C", "A")]])
+
+        cycles = self.snapshot.paths("A", "A", 3, limit=20, direction="both")
+        self.assertEqual(len(cycles), 2)
+        for cycle in cycles:
+            self.assertEqual(len(cycle), 3)
+            self.assertEqual(len(set(cycle)), len(cycle))
+        self.assertEqual({edge_set(c) == edge_set(cycles[0]) for c in cycles}, {True})
+
+        # 自环只返回一次
+        loop = GraphSnapshot.from_edges(["A"], [("A", "A", "R", 1.0)])
+        self.assertEqual(len(loop.paths("A", "A", 2, direction="both")), 1)
+
+    def test_personalized_pagerank(self):
+        """测试个性化PageRank"""
+        ranks = self.snapshot.personalized_pagerank(["A"], top_k=None, include_seeds=True)
+        scores = dict(ranks)
+        self.assertAlmostEqual(sum(scores.values()), 1.0, places=4)
+        self.assertNotIn("E", scores)
+        self.assertEqual(ranks[0][0], "A")
+
+        ranks = self.snapshot.personalized_pagerank(["A"], top_k=2)
+        self.assertEqual(len(ranks), 2)
+        self.assertEqual(ranks[0][0], "D")
+        self.assertNotIn("A", dict(ranks))
+        self.assertEqual(self.snapshot.personalized_pagerank(["F"]), [])
+
+    def test_apply_delta(self):
+        """测试增量合并：删除实体、新增实体和关系"""
+        # D 被删除，新增 E 与关系 B→E
+        graph = FakeGraph(
+            ["A", "B", "C", "E"],
+            [("A", "B", "R", 1.0), ("B", "C", "R", 1.0), ("C", "A", "R", 1.0), ("B", "E", "T", 2.0)],
+        )
+        manager = GraphSnapshotManager(graph=graph)
+        merged = manager._apply_delta(self.snapshot, {"D", "B", "E"}, 2)
+
+        self.assertEqual(merged.version, 2)
+        self.assertNotIn("D", merged)
+        self.assertIn("E", merged)
+        self.assertEqual(merged.node_count, 4)
+        expected = GraphSnapshot.from_edges(sorted(graph.entities), graph.edges)
+        self.assertEqual(edge_set(merged.edge(i) for i in range(merged.edge_count)),
+                         edge_set(expected.edge(i) for i in range(expected.edge_count)))
+        self.assertEqual(merged.bfs(["D"], 2), {})
+        self.assertEqual(merged.bfs(["A"], 2, direction="out"), {"A": 0, "B": 1, "C": 2, "E": 2})
+
+    def test_apply_delta_keeps_parallel_relationships(self):
+        """测试增量合并保留端点、类型、权重都相同的平行关系，与全量加载一致"""
+        edges = [("A", "B", "R", 1.0), ("A", "B", "R", 1.0), ("B", "C", "R", 1.0)]
+        graph = FakeGraph(["A", "B", "C"], edges)
+        manager = GraphSnapshotManager(graph=graph)
+        full = manager._load_full(1)
+        self.assertEqual(full.edge_count, 3)
+
+        merged = manager._apply_delta(full, {"A", "B"}, 2)
+        self.assertEqual(merged.edge_count, 3)
+        self.assertEqual(sorted((merged.edge(i).source, merged.edge(i).target) for i in range(merged.edge_count)),
+                         [("A", "B"), ("A", "B"), ("B", "C")])
+
+    def test_refresh_delta_and_full(self):
+        """测试版本检查：增量变更走合并，全量变更重新加载"""
+        graph = FakeGraph(["A", "B", "C", "D", "E"], self.edges, version=1, full_version=1)
+        manager = GraphSnapshotManager(graph=graph)
+        self.assertEqual(manager.load().edge_count, 4)
+
+        graph.edges.append(("E", "A", "R", 1.0))
+        graph.version = 2
+        graph.changes = {2: ["E", "A"]}
+        graph.queries.clear()
+        snapshot = manager.load()
+        self.assertEqual(snapshot.version, 2)
+        self.assertEqual(snapshot.edge_count, 5)
+        self.assertNotIn("MATCH (e:`__Entity__`) RETURN e.id AS id", graph.queries)
+
+        graph.version = graph.full_version = 3
+        graph.queries.clear()
+        self.assertEqual(manager.load().version, 3)
+        self.assertIn("MATCH (e:`__Entity__`) RETURN e.id AS id", graph.queries)
+
+    def test_background_initial_load(self):
+        """测试首次加载在后台进行，失败后退避"""
+        manager = GraphSnapshotManager(graph=FakeGraph(["A", "B"], [("A", "B", "R", 1.0)]))
+        manager.get()
+        deadline = time.time() + 5
+        while manager.get() is None and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(manager.get().edge_count, 1)
+
+        failing = FailingGraph()
+        manager = GraphSnapshotManager(graph=failing, retry_interval=60)
+        self.assertIsNone(manager.get())
+        while manager._loading:
+            time.sleep(0.01)
+        for _ in range(5):
+            self.assertIsNone(manager.get())
+        self.assertEqual(failing.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()